@@ -75,18 +75,18 @@ class AdminDailyReport:
             # Данные за последние 24 часа
             cutoff = int((datetime.now() - timedelta(hours=24)).timestamp())
             
-            # Общее количество записей
-            cursor.execute('SELECT COUNT(*) FROM all_positions_tracking WHERE timestamp > ?', (cutoff,))
-            metrics['total_records_24h'] = cursor.fetchone()[0]
+            # Количество записей - общее и по активам одним проходом
+            cursor.execute('SELECT asset, COUNT(*) FROM all_positions_tracking WHERE timestamp > ? GROUP BY asset', (cutoff,))
+            counts = dict(cursor.fetchall())
+            metrics['total_records_24h'] = sum(counts.values())
             
             # По активам
             assets = ['BTC', 'ETH', 'SOL', 'XRP', 'DOGE', 'MNT']
             for asset in assets:
-                cursor.execute('SELECT COUNT(*) FROM all_positions_tracking WHERE asset = ? AND timestamp > ?', (asset, cutoff))
-                metrics[f'{asset}_records_24h'] = cursor.fetchone()[0]
+                metrics[f'{asset}_records_24h'] = counts.get(asset, 0)
                 
-            # Свежесть данных
-            cursor.execute('SELECT MAX(timestamp) FROM all_positions_tracking')
+            # Свежесть данных (oi_snapshots - индекс, VIEW собирал бы все снапшоты)
+            cursor.execute('SELECT MAX(timestamp) FROM oi_snapshots')
             latest_ts = cursor.fetchone()[0]
             if latest_ts:
                 data_age = datetime.now().timestamp() - latest_ts
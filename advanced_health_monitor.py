@@ -14,6 +14,7 @@ import logging
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from telegram_sender import telegram_sender
+from supervisor import monitor_states
 
 load_dotenv()
 
@@ -54,6 +55,19 @@ class AdvancedHealthMonitor:
             }
         }
         
+        # Мониторы - задачи одного процесса supervisor.py: задачи он перезапускает
+        # сам, здесь - только процесс супервизора (False - отдельные скрипты, как раньше)
+        self.use_supervisor = True
+        self.monitor_processes = self.critical_processes
+        if self.use_supervisor:
+            self.critical_processes = {
+                'supervisor.py': {
+                    'name': 'Supervisor',
+                    'restart_cmd': 'python3 supervisor.py',
+                    'max_restarts': 3
+                }
+            }
+        
         # Счётчик перезапусков
         self.restart_counts = {proc: 0 for proc in self.critical_processes}
         
@@ -165,6 +179,14 @@ class AdvancedHealthMonitor:
                     logger.info(f"✅ {name} stable - resetting restart counter")
                     self.restart_counts[script_name] = 0
         
+        if self.use_supervisor and not restarted and self.is_process_running('supervisor.py'):
+            states = monitor_states()
+            if states is None:
+                issues.append("⚠️ Supervisor: no fresh status (hung?)")
+            for script_name, healthy in (states or {}).items():
+                if not healthy:
+                    issues.append(f"⚠️ {self.monitor_processes[script_name]['name']}: task unhealthy")
+        
         return issues, restarted
     
     def check_databases(self) -> list:
@@ -172,7 +194,7 @@ class AdvancedHealthMonitor:
         db_checks = {
             'Unlimited OI': {
                 'path': './data/unlimited_oi.db',
-                'table': 'all_positions_tracking',
+                'table': 'oi_snapshots',
                 'max_age': 10  # минут
             },
             'Signal History': {
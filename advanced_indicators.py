@@ -4,11 +4,13 @@
 ADVANCED INDICATORS - RSI, MACD для опционных метрик
 """
 
-import sqlite3
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, Any, Optional, List
 
+from indicator_state import get_store, rsi_from_state, macd_from_state
+from snapshot_summary import get_summary_history
+
 def calculate_rsi(data: List[float], period: int = 14) -> float:
     """Расчёт RSI"""
     if len(data) < period + 1:
@@ -59,110 +61,47 @@ def calculate_macd(data: List[float], fast: int = 12, slow: int = 26, signal: in
 
 
 def get_pcr_history(asset: str, hours: int = 168) -> List[float]:
-    """Получить историю PCR из БД"""
-    try:
-        conn = sqlite3.connect('./data/unlimited_oi.db')
-        cursor = conn.cursor()
-        
-        cutoff = int((datetime.now() - timedelta(hours=hours)).timestamp())
-        
-        cursor.execute('''
-            SELECT timestamp, 
-                   SUM(CASE WHEN option_type = 'Put' THEN open_interest ELSE 0 END) as put_oi,
-                   SUM(CASE WHEN option_type = 'Call' THEN open_interest ELSE 0 END) as call_oi
-            FROM all_positions_tracking
-            WHERE asset = ? AND timestamp > ?
-            GROUP BY timestamp
-            ORDER BY timestamp ASC
-        ''', (asset, cutoff))
-        
-        rows = cursor.fetchall()
-        conn.close()
-        
-        pcr_values = []
-        for row in rows:
-            put_oi = row[1]
-            call_oi = row[2]
-            if call_oi > 0:
-                pcr = put_oi / call_oi
-                pcr_values.append(pcr)
-        
-        return pcr_values
-        
-    except Exception as e:
-        return []
+    """Получить историю PCR из агрегатов снапшотов"""
+    return [row['put_oi'] / row['call_oi']
+            for row in get_summary_history(asset, hours)
+            if row['call_oi'] > 0]
 
 
 def get_gex_history(asset: str, hours: int = 168) -> List[float]:
-    """Получить историю GEX из БД"""
-    try:
-        conn = sqlite3.connect('./data/unlimited_oi.db')
-        cursor = conn.cursor()
-        
-        cutoff = int((datetime.now() - timedelta(hours=hours)).timestamp())
-        
-        cursor.execute('''
-            SELECT timestamp, 
-                   SUM(open_interest) as total_gex
-            FROM all_positions_tracking
-            WHERE asset = ? AND timestamp > ?
-            GROUP BY timestamp
-            ORDER BY timestamp ASC
-        ''', (asset, cutoff))
-        
-        rows = cursor.fetchall()
-        conn.close()
-        
-        gex_values = [row[1] for row in rows]
-        return gex_values
-        
-    except Exception as e:
-        return []
+    """Получить историю GEX из агрегатов снапшотов"""
+    return [row['put_oi'] + row['call_oi'] for row in get_summary_history(asset, hours)]
 
 
-def get_pcr_rsi(asset: str) -> Optional[float]:
-    """PCR RSI"""
-    history = get_pcr_history(asset, hours=336)  # 14 дней
-    if len(history) < 15:
-        return None
-    return calculate_rsi(history, period=14)
+def _replayed_state(asset: str, as_of: datetime, series: str) -> Dict[str, Any]:
+    """Состояние ряда на момент as_of (переигрывание истории, live-кэш не трогается)"""
+    return get_store().replay(asset, [int(as_of.timestamp())])[0][series]
 
 
-def get_gex_rsi(asset: str) -> Optional[float]:
-    """GEX RSI"""
-    history = get_gex_history(asset, hours=336)
-    if len(history) < 15:
-        return None
-    return calculate_rsi(history, period=14)
+def get_pcr_rsi(asset: str, as_of: Optional[datetime] = None) -> Optional[float]:
+    """PCR RSI (потоковый Wilder RSI из indicator_state)"""
+    if as_of:
+        return rsi_from_state(_replayed_state(asset, as_of, 'pcr'))
+    store = get_store()
+    store.sync(asset)
+    return store.get_rsi(asset, 'pcr')
 
 
-def get_oi_macd(asset: str) -> Optional[Dict[str, float]]:
-    """MACD для Open Interest"""
-    try:
-        conn = sqlite3.connect('./data/unlimited_oi.db')
-        cursor = conn.cursor()
-        
-        cutoff = int((datetime.now() - timedelta(hours=672)).timestamp())  # 28 дней
-        
-        cursor.execute('''
-            SELECT timestamp, SUM(open_interest) as total_oi
-            FROM all_positions_tracking
-            WHERE asset = ? AND timestamp > ?
-            GROUP BY timestamp
-            ORDER BY timestamp ASC
-        ''', (asset, cutoff))
-        
-        rows = cursor.fetchall()
-        conn.close()
-        
-        if len(rows) < 26:
-            return None
-        
-        oi_values = [row[1] for row in rows]
-        return calculate_macd(oi_values)
-        
-    except Exception as e:
-        return None
+def get_gex_rsi(asset: str, as_of: Optional[datetime] = None) -> Optional[float]:
+    """GEX RSI (потоковый Wilder RSI из indicator_state)"""
+    if as_of:
+        return rsi_from_state(_replayed_state(asset, as_of, 'gex'))
+    store = get_store()
+    store.sync(asset)
+    return store.get_rsi(asset, 'gex')
+
+
+def get_oi_macd(asset: str, as_of: Optional[datetime] = None) -> Optional[Dict[str, float]]:
+    """MACD для Open Interest (потоковые EMA из indicator_state)"""
+    if as_of:
+        return macd_from_state(_replayed_state(asset, as_of, 'oi'))
+    store = get_store()
+    store.sync(asset)
+    return store.get_macd(asset, 'oi')
 
 
 def get_iv_macd(asset: str) -> Optional[Dict[str, float]]:
@@ -6,7 +6,6 @@ ADVANCED SIGNALS GENERATOR - Stage 1.4 Integration
 """
 
 import sqlite3
-import requests
 import os
 import time
 from datetime import datetime, timedelta
@@ -18,6 +17,7 @@ from data_integrator import DataIntegrator
 from signal_analyzer import SignalAnalyzer
 from signal_history_logger import SignalHistoryLogger
 from backtest_params import get_default_config
+from notification_dispatcher import notify_telegram
 
 # OLD IMPORTS (для совместимости)
 from asset_config import get_min_confidence, get_min_interval
@@ -112,7 +112,7 @@ class SignalGenerator:
         return True
     
     def send_telegram_message(self, message, is_vip=False):
-        """Отправка сообщения в Telegram"""
+        """Отправка сообщения в Telegram (в очередь; цикл сигналов не ждёт сеть)"""
         try:
             bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
             
@@ -125,21 +125,10 @@ class SignalGenerator:
                 logger.warning("⚠️ Telegram credentials not found")
                 return False
             
-            url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-            data = {
-                'chat_id': chat_id,
-                'text': message,
-                'parse_mode': 'Markdown'
-            }
-            
-            response = requests.post(url, data=data, timeout=10)
-            
-            if response.status_code == 200:
-                logger.info("✅ Telegram message sent")
+            if notify_telegram(chat_id, message, 'Markdown'):
+                logger.info("✅ Telegram message queued")
                 return True
-            else:
-                logger.error(f"❌ Telegram error: {response.status_code}")
-                return False
+            return False
                 
         except Exception as e:
             logger.error(f"❌ Telegram exception: {e}")
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ANALYTICS CACHE - Общий кэш результатов аналитики по снапшотам OI
+Ключ (metric, asset, snapshot_ts): каждая метрика считается один раз на
+снапшот - калькулятором (GammaExposureCalculator, MaxPainCalculator) или
+первым читателем - и дальше берётся из памяти / data/analytics_cache.db.
+Считается только по строкам одного (последнего на момент as_of) снапшота.
+
+Использование:
+    python3 analytics_cache.py [ASSET]   # пересчитать и показать последний снапшот
+"""
+
+import json
+import logging
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+OI_DB_PATH = './data/unlimited_oi.db'
+CACHE_DB_PATH = './data/analytics_cache.db'
+MEMORY_ENTRIES = 2048
+SNAPSHOT_MAX_AGE = 24 * 3600  # снапшот старше суток от as_of не используем
+
+# GEX (как в GammaExposureCalculator)
+RISK_FREE_RATE, CONTRACT_MULTIPLIER = 0.05, 1
+DEFAULT_IV = 0.80
+
+# Max Pain (как в MaxPainCalculator)
+MAX_DTE = 180
+TOP_N_EXPIRIES = 5
+
+
+# ==================== СНАПШОТЫ ====================
+
+def _unix(as_of: Optional[datetime]) -> int:
+    return int((as_of or datetime.now()).timestamp())
+
+
+def latest_snapshot_ts(asset: str, as_of: Optional[datetime] = None,
+                       db_path: str = OI_DB_PATH) -> Optional[int]:
+    """Время последнего снапшота актива не позже as_of (и не старше SNAPSHOT_MAX_AGE)"""
+    upper = _unix(as_of)
+    conn = sqlite3.connect(db_path)
+    try:
+        try:
+            row = conn.execute('''
+                SELECT MAX(timestamp) FROM snapshot_summary WHERE asset = ? AND timestamp <= ?
+            ''', (asset, upper)).fetchone()
+        except sqlite3.OperationalError:
+            row = None
+        if not row or row[0] is None:
+            # Нет агрегатов (старая БД без backfill) - по таблице снапшотов
+            row = conn.execute('''
+                SELECT MAX(timestamp) FROM oi_snapshots WHERE asset = ? AND timestamp <= ?
+            ''', (asset, upper)).fetchone()
+    finally:
+        conn.close()
+
+    if not row or row[0] is None or row[0] <= upper - SNAPSHOT_MAX_AGE:
+        return None
+    return int(row[0])
+
+
+def load_snapshot(asset: str, snapshot_ts: int, db_path: str = OI_DB_PATH) -> pd.DataFrame:
+    """Строки одного снапшота (timestamp = первый столбец PK - поиск по индексу)"""
+    conn = sqlite3.connect(db_path)
+    try:
+        return pd.read_sql_query('''
+            SELECT strike, expiry_date, option_type, open_interest, spot_price, dte, volume_24h
+            FROM all_positions_tracking
+            WHERE timestamp = ? AND asset = ?
+        ''', conn, params=(snapshot_ts, asset))
+    finally:
+        conn.close()
+
+
+def _snapshot_spot(rows: pd.DataFrame) -> Optional[float]:
+    spots = rows['spot_price'].dropna()
+    spots = spots[spots > 0]
+    return float(spots.iloc[0]) if len(spots) else None
+
+
+# ==================== МЕТРИКИ ====================
+
+def compute_gex(rows: pd.DataFrame, spot: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """
+    GEX снапшота: Black-Scholes gamma * OI * spot по каждой строке (IV = DEFAULT_IV),
+    путы со знаком минус, сумма по страйкам + уровень нулевой гаммы.
+    """
+    spot = spot or _snapshot_spot(rows)
+    rows = rows[(rows['open_interest'] > 0) & (rows['dte'] > 0)]
+    if rows.empty or not spot:
+        return None
+
+    strike = rows['strike'].to_numpy(dtype=np.float64)
+    oi = rows['open_interest'].to_numpy(dtype=np.float64)
+    is_put = rows['option_type'].str.lower().to_numpy() == 'put'
+    T = np.maximum(rows['dte'].to_numpy(dtype=np.float64) / 365.0, 1 / 365)
+
+    d1 = (np.log(spot / strike) + (RISK_FREE_RATE + 0.5 * DEFAULT_IV ** 2) * T) / (DEFAULT_IV * np.sqrt(T))
+    gamma = np.exp(-0.5 * d1 ** 2) / math.sqrt(2 * math.pi) / (spot * DEFAULT_IV * np.sqrt(T))
+    gex = gamma * oi * CONTRACT_MULTIPLIER * spot
+    gex = np.where(is_put, -gex, gex)
+
+    strikes, inverse = np.unique(strike, return_inverse=True)
+    by_strike = np.bincount(inverse, weights=gex, minlength=len(strikes))
+
+    zero_gamma = None
+    sign_changes = np.where(np.diff(np.sign(by_strike)))[0]
+    if len(strikes) >= 2 and len(sign_changes):
+        i = sign_changes[np.argmin(np.abs(strikes[sign_changes] - spot))]
+        x1, x2, y1, y2 = strikes[i], strikes[i + 1], by_strike[i], by_strike[i + 1]
+        if y2 != y1:
+            zero_gamma = float(x1 - y1 * (x2 - x1) / (y2 - y1))
+
+    return {
+        'spot_price': spot,
+        'total_gex': float(by_strike.sum()),
+        'call_gex': float(gex[~is_put].sum()),
+        'put_gex': float(-gex[is_put].sum()),
+        'zero_gamma_level': zero_gamma,
+        'gex_by_strike': {str(k): float(v) for k, v in zip(strikes, by_strike)},
+        'options_count': int(len(rows))
+    }
+
+
+def _pain_curve(strikes: np.ndarray, calls: np.ndarray, puts: np.ndarray) -> np.ndarray:
+    """pain(K_i) = Σ_{j<i} calls_j (K_i - K_j) + Σ_{j>i} puts_j (K_j - K_i) за O(n)"""
+    calls_below = np.cumsum(calls) - calls
+    calls_value_below = np.cumsum(calls * strikes) - calls * strikes
+    puts_above = puts[::-1].cumsum()[::-1] - puts
+    puts_value_above = (puts * strikes)[::-1].cumsum()[::-1] - puts * strikes
+    return (strikes * calls_below - calls_value_below) + (puts_value_above - strikes * puts_above)
+
+
+def compute_max_pain(rows: pd.DataFrame, spot: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """Max Pain снапшота по TOP_N_EXPIRIES ближайшим экспирациям + взвешенный по OI общий"""
+    spot = spot or _snapshot_spot(rows)
+    rows = rows[(rows['open_interest'] > 0) & (rows['dte'] > 0) & (rows['dte'] <= MAX_DTE)]
+    if rows.empty or not spot:
+        return None
+
+    expirations = {}
+    for expiry in sorted(rows['expiry_date'].unique())[:TOP_N_EXPIRIES]:
+        chain = rows[rows['expiry_date'] == expiry]
+        is_call = (chain['option_type'] == 'Call').to_numpy()
+        is_put = (chain['option_type'] == 'Put').to_numpy()
+        oi = chain['open_interest'].to_numpy(dtype=np.float64)
+
+        strikes, inverse = np.unique(chain['strike'].to_numpy(dtype=np.float64), return_inverse=True)
+        calls = np.bincount(inverse, weights=np.where(is_call, oi, 0.0), minlength=len(strikes))
+        puts = np.bincount(inverse, weights=np.where(is_put, oi, 0.0), minlength=len(strikes))
+        pain = _pain_curve(strikes, calls, puts)
+
+        best = int(np.argmin(pain))
+        max_pain = float(strikes[best])
+        call_oi, put_oi = float(calls.sum()), float(puts.sum())
+        expirations[str(expiry)] = {
+            'max_pain': max_pain,
+            'total_pain': float(pain[best]),
+            'pain_by_strike': {str(k): float(v) for k, v in zip(strikes, pain)},
+            'spot_price': spot,
+            'distance_pct': abs(spot - max_pain) / spot * 100,
+            'direction': "↑" if max_pain > spot else "↓" if max_pain < spot else "→",
+            'dte': int(chain['dte'].iloc[0]),
+            'total_oi': float(oi.sum()),
+            'call_oi': call_oi,
+            'put_oi': put_oi,
+            'put_call_ratio': put_oi / call_oi if call_oi > 0 else 0
+        }
+
+    total_weight = sum(e['total_oi'] for e in expirations.values())
+    overall = sum(e['max_pain'] * e['total_oi'] for e in expirations.values()) / total_weight \
+        if total_weight > 0 else None
+    return {'spot_price': spot, 'overall_max_pain': overall, 'expirations': expirations}
+
+
+METRICS: Dict[str, Callable[[pd.DataFrame, Optional[float]], Optional[Dict[str, Any]]]] = {
+    'gex': compute_gex,
+    'max_pain': compute_max_pain,
+}
+
+
+# ==================== КЭШ ====================
+
+class AnalyticsCache:
+    """
+    (metric, asset, snapshot_ts) -> результат: память (LRU) + SQLite.
+    Общий для потоков процесса (узлы AnalyticsDAG): LRU и счётчики под lock.
+    """
+
+    def __init__(self, db_path: str = CACHE_DB_PATH, oi_db_path: str = OI_DB_PATH,
+                 memory_entries: int = MEMORY_ENTRIES):
+        self.db_path = db_path
+        self.oi_db_path = oi_db_path
+        self.memory_entries = memory_entries
+        self._memory: 'OrderedDict[Tuple[str, str, int], Optional[Dict]]' = OrderedDict()
+        self.stats = {'memory_hits': 0, 'db_hits': 0, 'computed': 0}
+        self._lock = threading.Lock()
+        self._init_database()
+
+    def _init_database(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS analytics_results (
+                metric TEXT,
+                asset TEXT,
+                snapshot_ts INTEGER,
+                result TEXT,
+                computed_at REAL,
+                PRIMARY KEY (metric, asset, snapshot_ts)
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def _remember(self, key: Tuple[str, str, int], result: Optional[Dict]):
+        with self._lock:
+            self._memory[key] = result
+            self._memory.move_to_end(key)
+            if len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def publish(self, metric: str, asset: str, snapshot_ts: int, result: Optional[Dict[str, Any]]):
+        """Записать результат метрики для снапшота (None = данных не хватило)"""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('INSERT OR REPLACE INTO analytics_results VALUES (?, ?, ?, ?, ?)',
+                     (metric, asset, int(snapshot_ts),
+                      json.dumps(result) if result is not None else None, time.time()))
+        conn.commit()
+        conn.close()
+        self._remember((metric, asset, int(snapshot_ts)), result)
+
+    def lookup(self, metric: str, asset: str, snapshot_ts: int) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """(найдено, результат) без пересчёта"""
+        key = (metric, asset, int(snapshot_ts))
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return True, self._memory[key]
+
+        conn = sqlite3.connect(self.db_path)
+        row = conn.execute('''
+            SELECT result FROM analytics_results WHERE metric = ? AND asset = ? AND snapshot_ts = ?
+        ''', key).fetchone()
+        conn.close()
+        if row is None:
+            return False, None
+        result = json.loads(row[0]) if row[0] is not None else None
+        self._remember(key, result)
+        with self._lock:
+            self.stats['db_hits'] += 1
+        return True, result
+
+    def get_or_compute(self, metric: str, asset: str, snapshot_ts: int,
+                       rows: Optional[pd.DataFrame] = None) -> Optional[Dict[str, Any]]:
+        """
+        Результат метрики для снапшота; при промахе - расчёт по строкам снапшота
+        (rows или загрузка из OI БД) и публикация.
+        """
+        found, result = self.lookup(metric, asset, snapshot_ts)
+        if found:
+            return result
+        if rows is None:
+            rows = load_snapshot(asset, snapshot_ts, self.oi_db_path)
+        result = METRICS[metric](rows, None)
+        with self._lock:
+            self.stats['computed'] += 1
+        self.publish(metric, asset, snapshot_ts, result)
+        return result
+
+    def get(self, metric: str, asset: str,
+            as_of: Optional[datetime] = None) -> Tuple[Optional[int], Optional[Dict[str, Any]]]:
+        """(snapshot_ts, результат) для последнего снапшота не позже as_of"""
+        snapshot_ts = latest_snapshot_ts(asset, as_of, self.oi_db_path)
+        if snapshot_ts is None:
+            return None, None
+        return snapshot_ts, self.get_or_compute(metric, asset, snapshot_ts)
+
+
+_caches: Dict[Tuple[str, str], AnalyticsCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_analytics_cache(db_path: str = CACHE_DB_PATH, oi_db_path: str = OI_DB_PATH) -> AnalyticsCache:
+    """Общий кэш процесса для пары БД"""
+    key = (db_path, oi_db_path)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = AnalyticsCache(db_path, oi_db_path)
+        return _caches[key]
+
+
+if __name__ == '__main__':
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    assets = sys.argv[1:] or ['BTC', 'ETH', 'SOL', 'XRP', 'DOGE', 'MNT']
+    cache = get_analytics_cache()
+    for asset in assets:
+        snapshot_ts, gex = cache.get('gex', asset)
+        _, max_pain = cache.get('max_pain', asset)
+        if snapshot_ts is None:
+            print(f"{asset}: no snapshot in the last 24h")
+            continue
+        line = f"{asset} @ {datetime.fromtimestamp(snapshot_ts)}:"
+        if gex:
+            line += f" GEX ${gex['total_gex']:,.0f}"
+        if max_pain and max_pain['overall_max_pain']:
+            line += f" | Max Pain ${max_pain['overall_max_pain']:,.0f}"
+        print(line)
+    print(f"cache: {cache.stats}")
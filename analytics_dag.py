@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ANALYTICS DAG - Аналитика по факту нового снапшота OI
+Вместо таймеров: новый снапшот актива в snapshot_summary (агрегат пишется
+с базовым интервалом коллектора, не на каждом тике адаптивного опроса)
+запускает только зависящие от него калькуляторы этого актива. Независимые узлы идут
+параллельно в пуле потоков, сигнал - после всех своих входов. Узел
+пропускается, если отпечаток входов (время снапшота / записи IV и версии
+предков) не изменился с его последнего успешного запуска.
+По каждому прогону - задержка снапшот -> сигнал (лог + data/results/dag_runs).
+
+Использование:
+    python3 analytics_dag.py [ASSET ...]    # один прогон по последним снапшотам
+    python3 analytics_dag.py watch          # следить за новыми снапшотами
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+OI_DB_PATH = './data/unlimited_oi.db'
+ASSETS = ['BTC', 'ETH', 'SOL', 'XRP', 'DOGE', 'MNT']
+RECENT_RUNS = 100
+
+# indicator_state / iv_history / DataIntegrator - общие объекты процесса без блокировок:
+# узлы с serial=True выполняются по одному (между активами тоже).
+# gamma / max_pain идут через AnalyticsCache - он потокобезопасен сам
+_shared_state_lock = threading.Lock()
+
+
+# ==================== ВХОДЫ ====================
+
+# Снапшоты для аналитики - с агрегатом (их же берёт analytics_cache); без таблицы - все
+def _snapshot_table(conn: sqlite3.Connection) -> str:
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'snapshot_summary'").fetchone()
+    return 'snapshot_summary' if exists else 'oi_snapshots'
+
+
+def snapshot_ts(conn: sqlite3.Connection, asset: str) -> Optional[int]:
+    return conn.execute(f'SELECT MAX(timestamp) FROM {_snapshot_table(conn)} WHERE asset = ?', (asset,)).fetchone()[0]
+
+
+def iv_history_ts(conn: sqlite3.Connection, asset: str) -> Optional[int]:
+    try:
+        return conn.execute('SELECT MAX(timestamp) FROM iv_history WHERE asset = ?', (asset,)).fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+
+
+SOURCES: Dict[str, Callable[[sqlite3.Connection, str], Any]] = {
+    'snapshot': snapshot_ts,
+    'iv_history': iv_history_ts
+}
+
+
+# ==================== УЗЛЫ ====================
+
+def _gamma(asset: str) -> bool:
+    from gamma_exposure_calculator import GammaExposureCalculator
+    return GammaExposureCalculator(asset).run_full_calculation()
+
+
+def _max_pain(asset: str) -> bool:
+    from max_pain_calculator import MaxPainCalculator
+    return MaxPainCalculator(asset).run_full_calculation()
+
+
+def _pcr(asset: str) -> bool:
+    from pcr_calculator import PCRCalculator
+    return PCRCalculator().calculate_pcr(asset) is not None
+
+
+def _vanna(asset: str) -> bool:
+    from vanna_calculator import VannaCalculator
+    return VannaCalculator().calculate_asset_vanna(asset) is not None
+
+
+def _iv_rank(asset: str) -> bool:
+    from iv_rank_calculator import IVRankCalculator
+    return IVRankCalculator().calculate_iv_rank(asset) is not None
+
+
+_signal_generator = None
+
+
+def _signal(asset: str) -> bool:
+    global _signal_generator
+    if _signal_generator is None:
+        from advanced_signals_generator import SignalGenerator
+        _signal_generator = SignalGenerator()
+    _signal_generator.process_asset(asset)
+    return True   # отсутствие сигнала (фильтры) - тоже успешный прогон
+
+
+class Node:
+    """Калькулятор одного актива: входы - источники и узлы-предки"""
+
+    def __init__(self, name: str, func: Callable[[str], bool], sources: Tuple[str, ...] = (),
+                 deps: Tuple[str, ...] = (), serial: bool = False):
+        self.name = name
+        self.func = func
+        self.sources = sources
+        self.deps = deps
+        self.serial = serial
+
+
+NODES = [
+    Node('gamma', _gamma, sources=('snapshot',)),
+    Node('max_pain', _max_pain, sources=('snapshot',)),
+    Node('vanna', _vanna, sources=('snapshot',)),
+    Node('pcr', _pcr, sources=('snapshot',), serial=True),
+    Node('iv_rank', _iv_rank, sources=('iv_history',), serial=True),
+    Node('signal', _signal, sources=('snapshot',),
+         deps=('gamma', 'max_pain', 'vanna', 'pcr', 'iv_rank'), serial=True)
+]
+
+
+class AnalyticsDAG:
+    """
+    Прогоны DAG по активам. Прогоны одного актива не пересекаются: снапшот,
+    пришедший во время прогона, ставится в очередь (только последний).
+    """
+
+    def __init__(self, nodes: List[Node] = None, db_path: str = OI_DB_PATH,
+                 max_workers: int = 4, assets: List[str] = None):
+        self.nodes = {node.name: node for node in (nodes or NODES)}
+        self.order = self._toposort()
+        self.db_path = db_path
+        self.assets = assets or ASSETS
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dag')
+        self.runner = ThreadPoolExecutor(max_workers=len(self.assets), thread_name_prefix='dag-run')
+
+        self.fingerprints: Dict[Tuple[str, str], tuple] = {}   # (asset, node) -> входы последнего успеха
+        self.versions: Dict[Tuple[str, str], int] = {}         # (asset, node) -> число успешных запусков
+        self.seen: Dict[str, int] = {}                         # asset -> последний обработанный снапшот
+        self.active: Dict[str, bool] = {}
+        self.pending: Dict[str, Tuple[int, float]] = {}
+        self.runs: deque = deque(maxlen=RECENT_RUNS)
+        self._lock = threading.Lock()
+
+    def _toposort(self) -> List[str]:
+        order, state = [], {}
+
+        def visit(name: str):
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Цикл в DAG через {name}")
+            state[name] = 'visiting'
+            for dep in self.nodes[name].deps:
+                visit(dep)
+            state[name] = 'done'
+            order.append(name)
+
+        for name in self.nodes:
+            visit(name)
+        return order
+
+    # ==================== ТРИГГЕРЫ ====================
+
+    def poll(self) -> int:
+        """Проверить snapshot_summary на новые снапшоты; -> число запущенных прогонов"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            latest = dict(conn.execute(f'SELECT asset, MAX(timestamp) FROM {_snapshot_table(conn)} GROUP BY asset'))
+        except sqlite3.OperationalError:
+            return 0
+        finally:
+            conn.close()
+
+        started = 0
+        detected_at = time.time()
+        for asset in self.assets:
+            ts = latest.get(asset)
+            if ts is not None and ts > self.seen.get(asset, 0):
+                self.seen[asset] = ts
+                started += self.on_snapshot(asset, ts, detected_at)
+        return started
+
+    def on_snapshot(self, asset: str, ts: int, detected_at: Optional[float] = None) -> bool:
+        """Снапшот актива закоммичен: запустить прогон (или поставить в очередь)"""
+        detected_at = detected_at or time.time()
+        with self._lock:
+            if self.active.get(asset):
+                self.pending[asset] = (ts, detected_at)
+                return False
+            self.active[asset] = True
+        self.runner.submit(self._run_loop, asset, ts, detected_at)
+        return True
+
+    def _run_loop(self, asset: str, ts: int, detected_at: float):
+        while True:
+            try:
+                self.run(asset, ts, detected_at)
+            except Exception as e:
+                logger.error(f"DAG {asset}: {e}")
+            with self._lock:
+                if asset not in self.pending:
+                    self.active[asset] = False
+                    return
+                ts, detected_at = self.pending.pop(asset)
+
+    # ==================== ПРОГОН ====================
+
+    def _inputs(self, asset: str) -> Dict[str, Any]:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            needed = {source for node in self.nodes.values() for source in node.sources}
+            return {source: SOURCES[source](conn, asset) for source in needed}
+        finally:
+            conn.close()
+
+    def _execute(self, node: Node, asset: str) -> Tuple[bool, float, Optional[str]]:
+        started = time.perf_counter()
+        try:
+            if node.serial:
+                with _shared_state_lock:
+                    ok = bool(node.func(asset))
+            else:
+                ok = bool(node.func(asset))
+            return ok, time.perf_counter() - started, None
+        except Exception as e:
+            return False, time.perf_counter() - started, str(e)
+
+    def run(self, asset: str, ts: Optional[int] = None, detected_at: Optional[float] = None,
+            force: bool = False) -> Dict[str, Any]:
+        """Прогон DAG актива: готовые узлы - в пул, сигнал - после предков"""
+        started = time.time()
+        inputs = self._inputs(asset)
+        ts = ts or inputs.get('snapshot')
+        report = {'asset': asset, 'snapshot_ts': ts, 'detected_at': detected_at or started, 'nodes': {}}
+
+        done: Dict[str, str] = {}
+        running = {}
+        remaining = list(self.order)
+        while remaining or running:
+            for name in list(remaining):
+                node = self.nodes[name]
+                if any(dep not in done for dep in node.deps):
+                    continue
+                remaining.remove(name)
+                fingerprint = (tuple(inputs[s] for s in node.sources),
+                               tuple(self.versions.get((asset, d), 0) for d in node.deps))
+                if not force and self.fingerprints.get((asset, name)) == fingerprint:
+                    done[name] = 'skipped'
+                    report['nodes'][name] = {'status': 'skipped'}
+                    continue
+                running[self.executor.submit(self._execute, node, asset)] = (name, fingerprint)
+
+            if not running:
+                continue
+            finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, fingerprint = running.pop(future)
+                ok, duration, error = future.result()
+                if ok:
+                    self.fingerprints[(asset, name)] = fingerprint
+                    self.versions[(asset, name)] = self.versions.get((asset, name), 0) + 1
+                done[name] = 'ran' if ok else 'failed'
+                report['nodes'][name] = {'status': done[name], 'duration': round(duration, 3),
+                                         'finished_at': time.time()}
+                if error:
+                    report['nodes'][name]['error'] = error
+                    logger.error(f"DAG {asset}.{name}: {error}")
+
+        finished_at = time.time()
+        signal = report['nodes'].get('signal', {})
+        report['duration'] = round(finished_at - started, 3)
+        if signal.get('status') == 'ran' and ts:
+            report['snapshot_to_signal'] = round(signal['finished_at'] - ts, 3)
+            report['detect_to_signal'] = round(signal['finished_at'] - report['detected_at'], 3)
+        self._report(report)
+        return report
+
+    def _report(self, report: Dict[str, Any]):
+        self.runs.append(report)
+        statuses = report['nodes']
+        ran = [n for n, s in statuses.items() if s['status'] == 'ran']
+        skipped = [n for n, s in statuses.items() if s['status'] == 'skipped']
+        failed = [n for n, s in statuses.items() if s['status'] == 'failed']
+        latency = (f"snapshot->signal {report['snapshot_to_signal']:.1f}s "
+                   f"(detect->signal {report['detect_to_signal']:.1f}s)"
+                   if 'snapshot_to_signal' in report else 'signal skipped')
+        logger.info(f"DAG {report['asset']} @ {report['snapshot_ts']}: {latency}, run {report['duration']:.1f}s | "
+                    f"ran {','.join(ran) or '-'} | skipped {','.join(skipped) or '-'}"
+                    + (f" | failed {','.join(failed)}" if failed else ''))
+        if ran:
+            try:
+                from results_log import append_result
+                append_result('dag_runs', report['asset'], report, ts=report['snapshot_ts'])
+            except Exception as e:
+                logger.error(f"DAG report: {e}")
+
+    def run_all(self, force: bool = False) -> List[Dict[str, Any]]:
+        """Синхронный прогон по всем активам (ручной запуск аналитики)"""
+        futures = [self.runner.submit(self.run, asset, None, None, force) for asset in self.assets]
+        return [future.result() for future in futures]
+
+    def status(self) -> Dict[str, Any]:
+        """Последний прогон по активам для health-проверок"""
+        latest = {}
+        for report in self.runs:
+            latest[report['asset']] = {
+                'snapshot_ts': report['snapshot_ts'],
+                'snapshot_to_signal': report.get('snapshot_to_signal'),
+                'duration': report['duration'],
+                'failed': [n for n, s in report['nodes'].items() if s['status'] == 'failed']
+            }
+        return {'active': [a for a, on in self.active.items() if on], 'assets': latest}
+
+    def shutdown(self, wait: bool = True):
+        self.runner.shutdown(wait=wait)
+        self.executor.shutdown(wait=wait)
+
+
+if __name__ == '__main__':
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if len(sys.argv) > 1 and sys.argv[1] == 'watch':
+        dag = AnalyticsDAG()
+        try:
+            while True:
+                dag.poll()
+                time.sleep(1)
+        except KeyboardInterrupt:
+            dag.shutdown(wait=False)
+    else:
+        dag = AnalyticsDAG(assets=sys.argv[1:] or None)
+        for report in dag.run_all():
+            print(f"{report['asset']}: {report['duration']:.1f}s, snapshot->signal "
+                  f"{report.get('snapshot_to_signal', '-')}")
+        dag.shutdown()
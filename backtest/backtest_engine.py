@@ -33,8 +33,9 @@ class BacktestEngine:
         # Load ML models
         model_path = Path(__file__).parent.parent / 'ml_agent_models_multi.pkl'
         if model_path.exists():
-            self.ensemble.load_ml_models(str(model_path))
-            print("✅ ML models loaded")
+            # sklearn/xgboost подгружаются при первом ML-предсказании
+            self.ensemble.load_ml_models(str(model_path), lazy=True)
+            print("✅ ML models registered")
         else:
             print("⚠️  No ML models found")
         
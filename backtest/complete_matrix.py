@@ -4,11 +4,18 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from functools import lru_cache
+
 import pandas as pd
 from indicators.smart_money.order_blocks import OrderBlocks
 from indicators.smart_money.fair_value_gaps import FairValueGaps
+from backtest.matrix_runner import cli_options, raw_data_fingerprint, run_matrix
 
-def test_combo(asset: str, indicator: str):
+RUNNER = 'backtest.complete_matrix:test_combo'
+
+@lru_cache(maxsize=None)
+def load_candles(asset: str):
+    """4h свечи актива - один раз на процесс (воркер матрицы)"""
     data_dir = Path(__file__).parent.parent / 'data' / 'raw' / asset
     files = sorted(data_dir.glob("*.csv"))
     
@@ -25,6 +32,18 @@ def test_combo(asset: str, indicator: str):
         'close': 'last', 'volume': 'sum'
     }).dropna()
     df.reset_index(inplace=True)
+    return df
+
+def matrix_fingerprint(asset: str, **_):
+    return raw_data_fingerprint(asset)
+
+def test_combo(asset: str, indicator: str):
+    df = load_candles(asset)
+    
+    if df is None:
+        return None
+    
+    df = df.copy()
     
     # SMA
     df['sma20'] = df['close'].rolling(20).mean()
@@ -86,31 +105,29 @@ def test_combo(asset: str, indicator: str):
         'final': tdf.iloc[-1]['capital']
     }
 
-print("\n" + "="*80)
-print("COMPLETE BACKTEST MATRIX - ALL ASSETS")
-print("="*80)
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("COMPLETE BACKTEST MATRIX - ALL ASSETS")
+    print("="*80)
 
-assets = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'XRPUSDT']
-indicators = ['ob', 'fvg', 'sma']
+    assets = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'XRPUSDT']
+    indicators = ['ob', 'fvg', 'sma']
 
-results = []
-
-for asset in assets:
-    for ind in indicators:
-        print(f"Testing {asset:10s} + {ind:5s}...", end=' ')
-        r = test_combo(asset, ind)
+    def report(combo, r, cached):
+        label = f"{combo.params['asset']:10s} + {combo.params['indicator']:5s}"
         if r:
-            results.append(r)
-            print(f"{r['trades']:3d} trades, {r['wr']*100:5.1f}% WR, {r['return']*100:+6.1f}%")
+            print(f"{'·' if cached else '✓'} {label}: {r['trades']:3d} trades, {r['wr']*100:5.1f}% WR, {r['return']*100:+6.1f}%")
         else:
-            print("No data/trades")
+            print(f"{'·' if cached else '✓'} {label}: No data/trades")
+
+    results = run_matrix(RUNNER, {'asset': assets, 'indicator': indicators}, on_result=report, **cli_options())
 
-print("\n" + "="*80)
-print("RESULTS SORTED BY RETURN")
-print("="*80)
+    print("\n" + "="*80)
+    print("RESULTS SORTED BY RETURN")
+    print("="*80)
 
-results = sorted(results, key=lambda x: x['return'], reverse=True)
+    results = sorted(results, key=lambda x: x['return'], reverse=True)
 
-for i, r in enumerate(results, 1):
-    print(f"{i:2d}. {r['asset']:10s} + {r['indicator']:5s}: "
-          f"{r['trades']:3d} trades, {r['wr']*100:5.1f}% WR, {r['return']*100:+6.1f}%")
+    for i, r in enumerate(results, 1):
+        print(f"{i:2d}. {r['asset']:10s} + {r['indicator']:5s}: "
+              f"{r['trades']:3d} trades, {r['wr']*100:5.1f}% WR, {r['return']*100:+6.1f}%")
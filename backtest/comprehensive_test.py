@@ -83,8 +83,8 @@ class ComprehensiveBacktest:
                 # Calculate option P&L with entry_price
                 pnl_dollars = self.options.calculate_pnl(
                     position['option_strategy'],
-                    position['entry_price'],
-                    exit_price
+                    entry_price=position['entry_price'],
+                    exit_price=exit_price
                 )
                 
                 capital += pnl_dollars
@@ -152,8 +152,8 @@ class ComprehensiveBacktest:
                 exit_price = current_price
                 pnl_dollars = self.options.calculate_pnl(
                     position['option_strategy'],
-                    position['entry_price'],
-                    exit_price
+                    entry_price=position['entry_price'],
+                    exit_price=exit_price
                 )
                 capital += pnl_dollars
                 trades.append({'pnl': pnl_dollars, 'capital': capital})
@@ -204,8 +204,8 @@ class ComprehensiveBacktest:
                 exit_price = current_price
                 pnl_dollars = self.options.calculate_pnl(
                     position['option_strategy'],
-                    position['entry_price'],
-                    exit_price
+                    entry_price=position['entry_price'],
+                    exit_price=exit_price
                 )
                 capital += pnl_dollars
                 trades.append({'pnl': pnl_dollars, 'capital': capital})
@@ -260,8 +260,8 @@ class ComprehensiveBacktest:
                 exit_price = current_price
                 pnl_dollars = self.options.calculate_pnl(
                     position['option_strategy'],
-                    position['entry_price'],
-                    exit_price
+                    entry_price=position['entry_price'],
+                    exit_price=exit_price
                 )
                 capital += pnl_dollars
                 trades.append({'pnl': pnl_dollars, 'capital': capital})
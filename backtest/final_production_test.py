@@ -49,7 +49,7 @@ for i in range(100, len(df_ob) - 18):
     
     # Close
     if position and (i - position['entry_idx']) >= 18:
-        pnl = options.calculate_pnl(position['strategy'], price)
+        pnl = options.calculate_pnl(position['strategy'], price, elapsed_days=(i - position['entry_idx']) / 6)  # 4H бары
         capital += pnl
         trades.append({'pnl': pnl, 'capital': capital})
         position = None
@@ -7,24 +7,25 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 import pandas as pd
 import json
 from indicators.smart_money.order_blocks import OrderBlocks
+from backtest.matrix_runner import cli_options, raw_data_fingerprint, run_matrix
 
-print("\n" + "="*80)
-print("FULL ASSET MATRIX - SPOT ONLY (no SOL/XRP options on Deribit)")
-print("="*80)
+RUNNER = 'backtest.full_matrix_all_assets:test_asset'
+_ob = None
 
-ob = OrderBlocks()
+def matrix_fingerprint(asset: str, **_):
+    return raw_data_fingerprint(asset)
 
-results = []
-
-for asset in ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'XRPUSDT']:
-    print(f"\nTesting {asset}...")
+def test_asset(asset: str):
+    """Spot-бэктест order blocks по одному активу"""
+    global _ob
+    if _ob is None:
+        _ob = OrderBlocks()
     
     data_dir = Path(__file__).parent.parent / 'data' / 'raw' / asset
     files = sorted(data_dir.glob("*.csv"))
     
     if not files:
-        print(f"  No data")
-        continue
+        return None
     
     dfs = [pd.read_csv(f) for f in files]
     df = pd.concat(dfs, ignore_index=True)
@@ -37,7 +38,7 @@ for asset in ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'XRPUSDT']:
     }).dropna()
     df.reset_index(inplace=True)
     
-    df = ob.find_order_blocks(df)
+    df = _ob.find_order_blocks(df)
     
     # Backtest
     capital = 10000
@@ -57,32 +58,47 @@ for asset in ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'XRPUSDT']:
         if position is None and df.iloc[i]['bullish_ob']:
             position = {'idx': i, 'entry': price, 'size': capital * 0.05}
     
-    if trades:
-        tdf = pd.DataFrame(trades)
-        wins = len(tdf[tdf['pnl'] > 0])
-        
-        result = {
-            'asset': asset,
-            'trades': len(tdf),
-            'wr': wins / len(tdf),
-            'return': (tdf.iloc[-1]['capital'] - 10000) / 10000,
-            'final': tdf.iloc[-1]['capital']
-        }
-        
-        results.append(result)
-        
-        print(f"  {result['trades']} trades, {result['wr']*100:.1f}% WR, {result['return']*100:+.1f}%")
-
-results = sorted(results, key=lambda x: x['return'], reverse=True)
-
-print("\n" + "="*80)
-print("RESULTS")
-print("="*80)
-
-for i, r in enumerate(results, 1):
-    print(f"{i}. {r['asset']:10s}: {r['trades']:3d} trades, {r['wr']*100:5.1f}% WR, {r['return']*100:+6.1f}%")
+    if not trades:
+        return None
+    
+    tdf = pd.DataFrame(trades)
+    wins = len(tdf[tdf['pnl'] > 0])
+    
+    return {
+        'asset': asset,
+        'trades': len(tdf),
+        'wr': wins / len(tdf),
+        'return': (tdf.iloc[-1]['capital'] - 10000) / 10000,
+        'final': tdf.iloc[-1]['capital']
+    }
 
-with open('full_asset_results.json', 'w') as f:
-    json.dump(results, f, indent=2)
 
-print(f"\n💾 Saved to full_asset_results.json")
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("FULL ASSET MATRIX - SPOT ONLY (no SOL/XRP options on Deribit)")
+    print("="*80)
+    
+    def report(combo, result, cached):
+        asset = combo.params['asset']
+        if result:
+            print(f"{'·' if cached else '✓'} {asset}: {result['trades']} trades, "
+                  f"{result['wr']*100:.1f}% WR, {result['return']*100:+.1f}%")
+        else:
+            print(f"{'·' if cached else '✓'} {asset}: No data/trades")
+    
+    results = run_matrix(RUNNER, {'asset': ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'XRPUSDT']},
+                         on_result=report, **cli_options())
+    
+    results = sorted(results, key=lambda x: x['return'], reverse=True)
+    
+    print("\n" + "="*80)
+    print("RESULTS")
+    print("="*80)
+    
+    for i, r in enumerate(results, 1):
+        print(f"{i}. {r['asset']:10s}: {r['trades']:3d} trades, {r['wr']*100:5.1f}% WR, {r['return']*100:+6.1f}%")
+    
+    with open('full_asset_results.json', 'w') as f:
+        json.dump(results, f, indent=2)
+    
+    print(f"\n💾 Saved to full_asset_results.json")
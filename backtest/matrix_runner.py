@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+MATRIX RUNNER - параллельный и возобновляемый прогон матриц бэктестов
+- Combo: раннер ('module:Class' или 'module:function') + параметры
+- Пул процессов: раннер создаётся один раз на воркер, данные грузятся один раз
+- Кэш результатов по контент-хэшу (параметры + код раннера и его локальных
+  импортов + отпечаток данных): неизменённые комбинации не пересчитываются
+- Каждый готовый результат сразу коммитится в SQLite - прерванный прогон
+  продолжается с места остановки
+- Пропускная способность: combos/sec
+"""
+
+import ast
+import hashlib
+import importlib
+import importlib.util
+import inspect
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from itertools import product
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+ROOT_DIR = Path(__file__).parent.parent
+CACHE_PATH = ROOT_DIR / 'data' / 'backtests' / 'matrix_cache.db'
+PROGRESS_EVERY = 5.0  # сек между строками прогресса
+
+
+class Combo:
+    """Одна комбинация матрицы"""
+
+    def __init__(self, runner: str, params: Dict[str, Any], method: str = 'test_combo'):
+        self.runner = runner
+        self.method = method
+        self.params = dict(params)
+
+    def label(self) -> str:
+        return ' '.join(f"{k}={v}" for k, v in self.params.items())
+
+    def key(self, code_hash: str, data_hash: str) -> str:
+        payload = json.dumps({
+            'runner': self.runner,
+            'method': self.method,
+            'params': self.params,
+            'code': code_hash,
+            'data': data_hash
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def grid(runner: str, method: str = 'test_combo', **axes: Iterable) -> List[Combo]:
+    """Декартово произведение осей -> список Combo (порядок как у itertools.product)"""
+    names = list(axes)
+    return [Combo(runner, dict(zip(names, values)), method) for values in product(*axes.values())]
+
+
+def files_fingerprint(paths: Iterable[Path]) -> str:
+    """Отпечаток набора файлов по имени, размеру и mtime (без чтения содержимого)"""
+    digest = hashlib.sha256()
+    for path in sorted(Path(p) for p in paths):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+
+_fingerprints: Dict[str, str] = {}  # сбрасывается в начале каждого прогона
+
+
+def dir_fingerprint(directory: Path, pattern: str = '*') -> str:
+    """Отпечаток файлов каталога (запоминается на время прогона)"""
+    memo_key = f"{directory}|{pattern}"
+    if memo_key not in _fingerprints:
+        _fingerprints[memo_key] = files_fingerprint(Path(directory).glob(pattern))
+    return _fingerprints[memo_key]
+
+
+def raw_data_fingerprint(asset: str) -> str:
+    """Отпечаток свечей data/raw/<asset>"""
+    return dir_fingerprint(ROOT_DIR / 'data' / 'raw' / asset, '*.csv')
+
+
+def _resolve(runner: str):
+    module_name, attr = runner.split(':', 1)
+    module = importlib.import_module(module_name)
+    return module, getattr(module, attr)
+
+
+def _local_modules(module_name: str) -> Dict[str, str]:
+    """Модуль и всё, что он транзитивно импортирует из репозитория: имя -> путь к файлу"""
+    found: Dict[str, str] = {}
+    pending = [module_name]
+    while pending:
+        name = pending.pop()
+        if name in found:
+            continue
+        try:
+            spec = importlib.util.find_spec(name)
+        except (ImportError, ValueError):
+            continue
+        if spec is None or not spec.origin or not os.path.exists(spec.origin):
+            continue
+        origin = Path(spec.origin).resolve()
+        if ROOT_DIR.resolve() not in origin.parents or 'site-packages' in origin.parts:
+            continue
+        found[name] = str(origin)
+        try:
+            tree = ast.parse(origin.read_bytes())
+        except (SyntaxError, ValueError):
+            continue
+        package = name if origin.name == '__init__.py' else name.rpartition('.')[0]
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                pending.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom):
+                base = '.' * node.level + (node.module or '')
+                try:
+                    base = importlib.util.resolve_name(base, package) if node.level else base
+                except (ImportError, ValueError):
+                    continue
+                pending.append(base)
+                # from pkg import module
+                pending.extend(f"{base}.{alias.name}" for alias in node.names if alias.name != '*')
+    return found
+
+
+def _code_hash(runner: str) -> str:
+    """Хэш кода раннера вместе с его локальными зависимостями (модели, стратегии, индикаторы)"""
+    modules = _local_modules(runner.split(':', 1)[0])
+    if not modules:
+        return ''
+    digest = hashlib.sha256()
+    for name in sorted(modules):
+        with open(modules[name], 'rb') as f:
+            digest.update(f"{name}:".encode() + hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+# ==================== WORKER ====================
+
+_worker_call: Optional[Callable[..., Any]] = None
+
+
+def _init_worker(runner: str, method: str, init_kwargs: Dict[str, Any]):
+    """Один раз на процесс: создать раннер (он держит загруженные данные)"""
+    global _worker_call
+    _, target = _resolve(runner)
+    if inspect.isclass(target):
+        _worker_call = getattr(target(**init_kwargs), method)
+    else:
+        _worker_call = target
+
+
+def _run_combo(params: Dict[str, Any]):
+    started = time.perf_counter()
+    result = _worker_call(**params)
+    return result, time.perf_counter() - started
+
+
+# ==================== CACHE ====================
+
+class ResultCache:
+    """combo_hash -> результат; запись сразу после расчёта = чекпоинт"""
+
+    def __init__(self, path: Path = CACHE_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS matrix_results (
+                combo_hash TEXT PRIMARY KEY,
+                runner TEXT,
+                params TEXT,
+                result TEXT,
+                duration REAL,
+                created_at TEXT
+            )
+        ''')
+        self.conn.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, Optional[dict]]:
+        found = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT combo_hash, result FROM matrix_results WHERE combo_hash IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+            for combo_hash, result in rows:
+                found[combo_hash] = json.loads(result) if result is not None else None
+        return found
+
+    def put(self, key: str, combo: Combo, result: Optional[dict], duration: float):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO matrix_results VALUES (?, ?, ?, ?, ?, ?)",
+            (key, combo.runner, json.dumps(combo.params, default=str),
+             json.dumps(result, default=str) if result is not None else None,
+             duration, datetime.now().isoformat())
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+# ==================== RUNNER ====================
+
+class MatrixRunner:
+    """Прогон списка Combo одного раннера в пуле процессов с кэшем"""
+
+    def __init__(self, runner: str, method: str = 'test_combo', workers: Optional[int] = None,
+                 init_kwargs: Optional[Dict[str, Any]] = None, cache_path: Path = CACHE_PATH,
+                 use_cache: bool = True):
+        self.runner = runner
+        self.method = method
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.init_kwargs = init_kwargs or {}
+        self.cache_path = cache_path
+        self.use_cache = use_cache
+        self.stats: Dict[str, Any] = {}
+
+    def _data_hash(self, combo: Combo) -> str:
+        """Отпечаток данных: matrix_fingerprint(**params) у раннера, если он есть"""
+        module, target = _resolve(self.runner)
+        fingerprint = getattr(target, 'matrix_fingerprint', None) or getattr(module, 'matrix_fingerprint', None)
+        return fingerprint(**combo.params) if fingerprint else ''
+
+    def run(self, combos: List[Combo], on_result: Optional[Callable[[Combo, Optional[dict], bool], None]] = None
+            ) -> List[dict]:
+        """
+        Результаты (без None) в порядке combos.
+        on_result(combo, result, cached) вызывается по мере готовности.
+        """
+        started = time.perf_counter()
+        _fingerprints.clear()
+        cache = ResultCache(self.cache_path)
+        code_hash = _code_hash(self.runner)
+        keys = [combo.key(code_hash, self._data_hash(combo)) for combo in combos]
+
+        results: Dict[int, Optional[dict]] = {}
+        cached = cache.get_many(keys) if self.use_cache else {}
+        pending = []
+        for i, (combo, key) in enumerate(zip(combos, keys)):
+            if key in cached:
+                results[i] = cached[key]
+            else:
+                pending.append(i)
+
+        print(f"🧮 Matrix: {len(combos)} combos, {len(combos) - len(pending)} cached, "
+              f"{len(pending)} to run on {min(self.workers, max(len(pending), 1))} workers")
+        if on_result:
+            for i in sorted(results):
+                on_result(combos[i], results[i], True)
+
+        computed = 0
+        last_report = time.perf_counter()
+        compute_started = time.perf_counter()
+
+        def record(i, result, duration):
+            nonlocal computed, last_report
+            results[i] = result
+            cache.put(keys[i], combos[i], result, duration)
+            computed += 1
+            if on_result:
+                on_result(combos[i], result, False)
+            now = time.perf_counter()
+            if now - last_report >= PROGRESS_EVERY:
+                rate = computed / (now - compute_started)
+                print(f"   … {computed}/{len(pending)} done, {rate:.2f} combos/sec")
+                last_report = now
+
+        try:
+            if pending and self.workers == 1:
+                _init_worker(self.runner, self.method, self.init_kwargs)
+                for i in pending:
+                    result, duration = _run_combo(combos[i].params)
+                    record(i, result, duration)
+            elif pending:
+                with ProcessPoolExecutor(max_workers=min(self.workers, len(pending)),
+                                         initializer=_init_worker,
+                                         initargs=(self.runner, self.method, self.init_kwargs)) as pool:
+                    futures = {pool.submit(_run_combo, combos[i].params): i for i in pending}
+                    try:
+                        for future in as_completed(futures):
+                            result, duration = future.result()
+                            record(futures[future], result, duration)
+                    except KeyboardInterrupt:
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        raise
+        except KeyboardInterrupt:
+            print(f"\n⏸️  Interrupted: {computed}/{len(pending)} computed and saved, rerun to resume")
+            raise
+        finally:
+            cache.close()
+            elapsed = time.perf_counter() - started
+            compute_elapsed = time.perf_counter() - compute_started
+            self.stats = {
+                'combos': len(combos),
+                'cached': len(combos) - len(pending),
+                'computed': computed,
+                'elapsed': elapsed,
+                'combos_per_sec': computed / compute_elapsed if computed and compute_elapsed > 0 else 0.0
+            }
+
+        print(f"⚡ {self.stats['computed']} computed + {self.stats['cached']} cached in "
+              f"{elapsed:.1f}s ({self.stats['combos_per_sec']:.2f} combos/sec)")
+
+        return [results[i] for i in range(len(combos)) if results.get(i) is not None]
+
+
+def run_matrix(runner: str, axes: Dict[str, Iterable], method: str = 'test_combo',
+               workers: Optional[int] = None, use_cache: bool = True,
+               on_result: Optional[Callable[[Combo, Optional[dict], bool], None]] = None,
+               **init_kwargs) -> List[dict]:
+    """Короткий путь: оси -> grid -> MatrixRunner.run"""
+    combos = grid(runner, method, **axes)
+    return MatrixRunner(runner, method, workers, init_kwargs, use_cache=use_cache).run(combos, on_result)
+
+
+def cli_options(argv: List[str] = None) -> Dict[str, Any]:
+    """Общие флаги матричных скриптов: --workers N, --fresh (игнорировать кэш)"""
+    argv = sys.argv[1:] if argv is None else argv
+    options = {'workers': None, 'use_cache': '--fresh' not in argv}
+    if '--workers' in argv:
+        options['workers'] = int(argv[argv.index('--workers') + 1])
+    return options
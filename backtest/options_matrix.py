@@ -5,8 +5,8 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import pandas as pd
-import ast
-from itertools import product
+from options_history_store import HISTORY_DIR, load_latest
+from backtest.matrix_runner import MatrixRunner, cli_options, dir_fingerprint, grid, raw_data_fingerprint
 from indicators.smart_money.order_blocks import OrderBlocks
 from indicators.smart_money.fair_value_gaps import FairValueGaps
 
@@ -37,23 +37,18 @@ class OptionsMatrix:
         self.spot_df = df
         
         # Load options
-        options_dir = Path(__file__).parent.parent / 'data' / 'options_history' / 'BTC'
-        latest = sorted(options_dir.glob("*.csv"))[-1]
-        opts = pd.read_csv(latest)
-        
-        def parse_greeks(g):
-            if pd.isna(g): return {}
-            try: return ast.literal_eval(g)
-            except: return {}
-        
-        opts['greeks_dict'] = opts['greeks'].apply(parse_greeks)
-        opts['delta'] = opts['greeks_dict'].apply(lambda x: x.get('delta', 0))
+        opts = load_latest('BTC')
         opts['dte'] = (pd.to_datetime(opts['expiration'], unit='ms') - pd.Timestamp.now()).dt.days
         
         self.options_df = opts
         
         print(f"✅ Loaded {len(self.spot_df)} candles, {len(self.options_df)} options")
     
+    @staticmethod
+    def matrix_fingerprint(**_) -> str:
+        """Data version for the matrix result cache"""
+        return raw_data_fingerprint('BTCUSDT') + dir_fingerprint(HISTORY_DIR / 'BTC')
+    
     def get_signal(self, i, indicator):
         """Get trading signal"""
         row = self.spot_df.iloc[i]
@@ -170,7 +165,7 @@ class OptionsMatrix:
             'final': tdf.iloc[-1]['capital']
         }
     
-    def run_matrix(self):
+    def run_matrix(self, workers=None, use_cache=True):
         print("\n" + "="*80)
         print("OPTIONS MATRIX TEST")
         print("="*80)
@@ -179,13 +174,15 @@ class OptionsMatrix:
         strategies = ['bull_call', 'bear_put']
         dtes = [7, 14, 30]
         
-        results = []
+        runner = 'backtest.options_matrix:OptionsMatrix'
+        combos = grid(runner, indicator=indicators, strategy=strategies, dte=dtes)
         
-        for ind, strat, dte in product(indicators, strategies, dtes):
-            r = self.test_combo(ind, strat, dte)
+        def report(combo, r, cached):
             if r:
-                results.append(r)
-                print(f"✓ {ind:15s} + {strat:10s} + {dte}DTE: {r['trades']:2d} trades, {r['wr']*100:5.1f}% WR, {r['return']*100:+6.1f}%")
+                print(f"{'·' if cached else '✓'} {r['indicator']:15s} + {r['strategy']:10s} + {r['dte']}DTE: "
+                      f"{r['trades']:2d} trades, {r['wr']*100:5.1f}% WR, {r['return']*100:+6.1f}%")
+        
+        results = MatrixRunner(runner, workers=workers, use_cache=use_cache).run(combos, report)
         
         results = sorted(results, key=lambda x: x['return'], reverse=True)
         
@@ -198,4 +195,4 @@ class OptionsMatrix:
 
 if __name__ == "__main__":
     matrix = OptionsMatrix()
-    matrix.run_matrix()
+    matrix.run_matrix(**cli_options())
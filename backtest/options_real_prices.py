@@ -8,7 +8,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import pandas as pd
-import ast
+from options_history_store import list_snapshots, load_latest, load_snapshot
 from indicators.smart_money.order_blocks import OrderBlocks
 
 def analyze_real_options():
@@ -19,19 +19,10 @@ def analyze_real_options():
     print("="*80)
     
     # Load BTC options
-    btc_opts = pd.read_csv('data/options_history/BTC/20251024_231900.csv')
-    eth_opts = sorted(Path('data/options_history/ETH').glob('*.csv'))[-1]
-    eth_opts = pd.read_csv(eth_opts)
-    
-    def parse_greeks(g):
-        if pd.isna(g): return {}
-        try: return ast.literal_eval(g)
-        except: return {}
+    btc_opts = load_snapshot(list_snapshots('BTC')[0][1])   # первый снапшот BTC
+    eth_opts = load_latest('ETH')
     
     for name, opts in [('BTC', btc_opts), ('ETH', eth_opts)]:
-        opts['greeks_dict'] = opts['greeks'].apply(parse_greeks)
-        opts['delta'] = opts['greeks_dict'].apply(lambda x: x.get('delta', 0))
-        opts['theta'] = opts['greeks_dict'].apply(lambda x: x.get('theta', 0))
         opts['dte'] = (pd.to_datetime(opts['expiration'], unit='ms') - pd.Timestamp.now()).dt.days
         
         spot = opts['underlying_price'].iloc[0]
@@ -109,17 +100,7 @@ def backtest_with_real_data():
     spot_df = ob.find_order_blocks(spot_df)
     
     # Load ETH options (60 DTE)
-    eth_opts = sorted(Path('data/options_history/ETH').glob('*.csv'))[-1]
-    opts = pd.read_csv(eth_opts)
-    
-    def parse_greeks(g):
-        if pd.isna(g): return {}
-        try: return ast.literal_eval(g)
-        except: return {}
-    
-    opts['greeks_dict'] = opts['greeks'].apply(parse_greeks)
-    opts['delta'] = opts['greeks_dict'].apply(lambda x: x.get('delta', 0))
-    opts['theta'] = opts['greeks_dict'].apply(lambda x: x.get('theta', 0))
+    opts = load_latest('ETH')
     opts['dte'] = (pd.to_datetime(opts['expiration'], unit='ms') - pd.Timestamp.now()).dt.days
     
     initial_spot = opts['underlying_price'].iloc[0]
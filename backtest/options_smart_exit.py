@@ -11,29 +11,57 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import pandas as pd
-import ast
 import numpy as np
 from itertools import product
 from indicators.smart_money.order_blocks import OrderBlocks
+from options_history_store import HISTORY_DIR, OptionChainIndex
+from backtest.matrix_runner import Combo, MatrixRunner, cli_options, dir_fingerprint, raw_data_fingerprint
+from strategies.options.position_model import PositionBook, make_legs
+
+DEFAULT_IV = 0.6
 
 class SmartOptionsBacktest:
     def __init__(self):
         self.ob = OrderBlocks()
         self.commission = 0.0003  # 0.03% per side × 4 legs = 0.12% total
+        self.chains = {}  # currency -> OptionChainIndex (снапшоты кэшируются между комбинациями)
+        self.spot = {}    # asset -> 4h свечи с order blocks (грузятся один раз на процесс)
         
         print("✅ Smart Options Backtest initialized")
         print("   - Exit on opposite signal")
         print("   - Time value captured")
         print("   - Commission: 0.12% total")
     
+    @staticmethod
+    def matrix_fingerprint(asset: str, currency: str, **_) -> str:
+        """Data version for the matrix result cache"""
+        return raw_data_fingerprint(asset) + dir_fingerprint(HISTORY_DIR / currency)
+    
     def load_data(self, asset: str, currency: str):
-        """Load spot + options"""
-        # Spot
+        """Load spot + options (cached per asset/currency)"""
+        if asset not in self.spot:
+            self.spot[asset] = self._load_spot(asset)
+        df = self.spot[asset]
+        
+        if df is None:
+            return None, None
+        
+        # Options: as-of индекс снапшотов, цепочка выбирается на время каждого бара
+        if currency not in self.chains:
+            self.chains[currency] = OptionChainIndex(currency)
+        chains = self.chains[currency]
+        
+        if len(chains) == 0:
+            return df, None
+        
+        return df, chains
+    
+    def _load_spot(self, asset: str):
         data_dir = Path(__file__).parent.parent / 'data' / 'raw' / asset
         files = sorted(data_dir.glob("*.csv"))
         
         if not files:
-            return None, None
+            return None
         
         dfs = [pd.read_csv(f) for f in files[-100:]]
         df = pd.concat(dfs, ignore_index=True)
@@ -46,150 +74,115 @@ class SmartOptionsBacktest:
         }).dropna()
         df.reset_index(inplace=True)
         
-        df = self.ob.find_order_blocks(df)
-        
-        # Options
-        opts_dir = Path(__file__).parent.parent / 'data' / 'options_history' / currency
-        opts_files = sorted(opts_dir.glob("*.csv"))
-        
-        if not opts_files:
-            return df, None
-        
-        opts = pd.read_csv(opts_files[-1])
-        
-        def parse_greeks(g):
-            if pd.isna(g): return {}
-            try: return ast.literal_eval(g)
-            except: return {}
-        
-        opts['greeks_dict'] = opts['greeks'].apply(parse_greeks)
-        opts['delta'] = opts['greeks_dict'].apply(lambda x: x.get('delta', 0))
-        opts['theta'] = opts['greeks_dict'].apply(lambda x: x.get('theta', 0))
-        opts['vega'] = opts['greeks_dict'].apply(lambda x: x.get('vega', 0))
-        opts['dte'] = (pd.to_datetime(opts['expiration'], unit='ms') - pd.Timestamp.now()).dt.days
-        
-        return df, opts
+        return self.ob.find_order_blocks(df)
     
-    def find_strategy(self, spot: float, opts: pd.DataFrame, strategy: str, dte_target: int):
-        """Find option strategy"""
-        valid = opts[(opts['dte'] >= dte_target-5) & (opts['dte'] <= dte_target+5)]
+    def find_strategy(self, spot: float, chains: OptionChainIndex, strategy: str, dte_target: int,
+                      bar_time):
+        """Find option strategy in the chain as of bar_time"""
+        chain = chains.as_of(bar_time)
         
-        if len(valid) < 2:
+        if chain is None:
             return None
         
         if strategy == 'bull_call':
-            calls = valid[valid['option_type'] == 'call']
-            if len(calls) < 2: return None
+            expirations = chain.expirations('call', bar_time, dte_target-5, dte_target+5)
+            if chain.count('call', expirations) < 2: return None
             
-            atm = calls.iloc[(calls['strike'] - spot).abs().argsort()[:1]]
-            otm = calls.iloc[(calls['strike'] - spot*1.05).abs().argsort()[:1]]
+            atm = chain.nearest_strike('call', expirations, spot)
+            otm = chain.nearest_strike('call', expirations, spot*1.05)
             
-            if len(atm) > 0 and len(otm) > 0:
-                buy_cost = atm['mark_price'].iloc[0]
-                sell_credit = otm['mark_price'].iloc[0]
+            if atm is not None and otm is not None:
+                buy_cost = atm['mark_price']
+                sell_credit = otm['mark_price']
                 net_cost = buy_cost - sell_credit
                 
                 return {
                     'type': 'bull_call',
                     'entry_spot': spot,
-                    'lower': atm['strike'].iloc[0],
-                    'upper': otm['strike'].iloc[0],
+                    'lower': atm['strike'],
+                    'upper': otm['strike'],
                     'net_cost': net_cost,
                     'buy_price': buy_cost,
                     'sell_price': sell_credit,
-                    'dte_entry': int(atm['dte'].iloc[0]),
-                    'net_delta': atm['delta'].iloc[0] - otm['delta'].iloc[0],
-                    'net_theta': atm['theta'].iloc[0] - otm['theta'].iloc[0],
-                    'max_profit': (otm['strike'].iloc[0] - atm['strike'].iloc[0]) / spot
+                    'dte_entry': chain.dte(atm, bar_time),
+                    'iv': self._entry_iv(atm),
+                    'net_delta': atm['delta'] - otm['delta'],
+                    'net_theta': atm['theta'] - otm['theta'],
+                    'max_profit': (otm['strike'] - atm['strike']) / spot
                 }
         
         elif strategy == 'bear_put':
-            puts = valid[valid['option_type'] == 'put']
-            if len(puts) < 2: return None
+            expirations = chain.expirations('put', bar_time, dte_target-5, dte_target+5)
+            if chain.count('put', expirations) < 2: return None
             
-            atm = puts.iloc[(puts['strike'] - spot).abs().argsort()[:1]]
-            otm = puts.iloc[(puts['strike'] - spot*0.95).abs().argsort()[:1]]
+            atm = chain.nearest_strike('put', expirations, spot)
+            otm = chain.nearest_strike('put', expirations, spot*0.95)
             
-            if len(atm) > 0 and len(otm) > 0:
-                buy_cost = atm['mark_price'].iloc[0]
-                sell_credit = otm['mark_price'].iloc[0]
+            if atm is not None and otm is not None:
+                buy_cost = atm['mark_price']
+                sell_credit = otm['mark_price']
                 net_cost = buy_cost - sell_credit
                 
                 return {
                     'type': 'bear_put',
                     'entry_spot': spot,
-                    'upper': atm['strike'].iloc[0],
-                    'lower': otm['strike'].iloc[0],
+                    'upper': atm['strike'],
+                    'lower': otm['strike'],
                     'net_cost': net_cost,
                     'buy_price': buy_cost,
                     'sell_price': sell_credit,
-                    'dte_entry': int(atm['dte'].iloc[0]),
-                    'max_profit': (atm['strike'].iloc[0] - otm['strike'].iloc[0]) / spot
+                    'dte_entry': chain.dte(atm, bar_time),
+                    'iv': self._entry_iv(atm),
+                    'max_profit': (atm['strike'] - otm['strike']) / spot
                 }
         
         return None
     
-    def calc_exit_value(self, strat: dict, exit_spot: float, periods_held: int):
+    @staticmethod
+    def _entry_iv(row) -> float:
+        """mark_iv Deribit в процентах -> доля; без IV - DEFAULT_IV"""
+        iv = row.get('mark_iv', np.nan)
+        return iv / 100 if pd.notna(iv) and iv > 0 else DEFAULT_IV
+    
+    @staticmethod
+    def _legs(strat: dict):
+        option_type = 'call' if strat['type'] == 'bull_call' else 'put'
+        long_strike = strat['lower'] if option_type == 'call' else strat['upper']
+        short_strike = strat['upper'] if option_type == 'call' else strat['lower']
+        return make_legs([(long_strike, strat['dte_entry'], option_type, 1),
+                          (short_strike, strat['dte_entry'], option_type, -1)])
+    
+    def calc_exit_values(self, strats: list, exit_spots, periods_held) -> np.ndarray:
         """
-        Calculate exit value with time value
+        Exit P&L for many positions in one vectorized Black-Scholes call
         
-        Value = Intrinsic Value + Time Value
-        Time Value decays with Theta
+        Value = mark-to-model spread value at the remaining DTE (entry IV),
+        in fractions of entry spot like net_cost
         """
-        dte_remaining = strat['dte_entry'] - (periods_held / 6)  # 4h periods -> days
-        
-        if dte_remaining < 0:
-            dte_remaining = 0
+        book = PositionBook()
+        for strat in strats:
+            book.add(self._legs(strat))
         
-        if strat['type'] == 'bull_call':
-            # Intrinsic value
-            if exit_spot <= strat['lower']:
-                intrinsic = 0
-            elif exit_spot >= strat['upper']:
-                intrinsic = strat['max_profit']
-            else:
-                intrinsic = (exit_spot - strat['lower']) / strat['entry_spot']
-            
-            # Time value (decays to 0 at expiration)
-            time_value = strat['net_cost'] * (dte_remaining / strat['dte_entry'])
-            
-            # If in-the-money, time value is smaller
-            if exit_spot > strat['lower']:
-                time_value *= 0.5
-            
-            total_value = intrinsic + time_value
-            pnl = total_value - strat['net_cost']
-            
-            return pnl
-        
-        elif strat['type'] == 'bear_put':
-            # Intrinsic value
-            if exit_spot >= strat['upper']:
-                intrinsic = 0
-            elif exit_spot <= strat['lower']:
-                intrinsic = strat['max_profit']
-            else:
-                intrinsic = (strat['upper'] - exit_spot) / strat['entry_spot']
-            
-            # Time value
-            time_value = strat['net_cost'] * (dte_remaining / strat['dte_entry'])
-            
-            if exit_spot < strat['upper']:
-                time_value *= 0.5
-            
-            total_value = intrinsic + time_value
-            pnl = total_value - strat['net_cost']
-            
-            return pnl
+        elapsed_days = np.asarray(periods_held, dtype=np.float64) / 6  # 4h periods -> days
+        vols = [strat.get('iv', DEFAULT_IV) for strat in strats]
+        values = book.evaluate(exit_spots, vols, elapsed_days)['value']
         
-        return 0
+        entry_spots = np.array([strat['entry_spot'] for strat in strats])
+        net_costs = np.array([strat['net_cost'] for strat in strats])
+        return values / entry_spots - net_costs
+    
+    def calc_exit_value(self, strat: dict, exit_spot: float, periods_held: int):
+        """Calculate exit value of one position (see calc_exit_values)"""
+        if strat['type'] not in ('bull_call', 'bear_put'):
+            return 0
+        return float(self.calc_exit_values([strat], [exit_spot], [periods_held])[0])
     
     def test_combo(self, asset: str, currency: str, strategy: str, dte: int, take_profit: float):
         """Test one combination"""
         
-        spot_df, opts_df = self.load_data(asset, currency)
+        spot_df, chains = self.load_data(asset, currency)
         
-        if spot_df is None or opts_df is None:
+        if spot_df is None or chains is None:
             return None
         
         capital = 10000
@@ -249,7 +242,7 @@ class SmartOptionsBacktest:
                     signal = True
                 
                 if signal:
-                    strat = self.find_strategy(price, opts_df, strategy, dte)
+                    strat = self.find_strategy(price, chains, strategy, dte, spot_df.iloc[i]['timestamp'])
                     
                     if strat:
                         position = {
@@ -280,7 +273,7 @@ class SmartOptionsBacktest:
             'exits': exit_reasons
         }
     
-    def run_matrix(self):
+    def run_matrix(self, workers=None, use_cache=True):
         print("\n" + "="*80)
         print("SMART OPTIONS BACKTEST - Exit on opposite signal + Time value")
         print("="*80)
@@ -290,22 +283,20 @@ class SmartOptionsBacktest:
         dtes = [14, 30, 45, 60, 90]
         tps = [0.25, 0.50, 0.75, 1.00]
         
-        results = []
-        total = len(assets) * len(strategies) * len(dtes) * len(tps)
-        current = 0
+        runner = 'backtest.options_smart_exit:SmartOptionsBacktest'
+        combos = [Combo(runner, {'asset': asset, 'currency': curr, 'strategy': strat, 'dte': dte, 'take_profit': tp})
+                  for (asset, curr), strat, dte, tp in product(assets, strategies, dtes, tps)]
         
-        for (asset, curr), strat, dte, tp in product(assets, strategies, dtes, tps):
-            current += 1
-            print(f"[{current}/{total}] {asset:10s} {strat:10s} {dte}DTE TP{int(tp*100)}%...", end=' ')
-            
-            r = self.test_combo(asset, curr, strat, dte, tp)
-            
+        def report(combo, r, cached):
+            p = combo.params
+            label = f"{p['asset']:10s} {p['strategy']:10s} {p['dte']}DTE TP{int(p['take_profit']*100)}%"
             if r:
-                results.append(r)
-                print(f"{r['trades']:2d} trades, {r['wr']*100:5.1f}% WR, {r['return']*100:+6.1f}%, "
-                      f"avg hold {r['avg_hold']:.1f} periods")
+                print(f"{'·' if cached else '✓'} {label}: {r['trades']:2d} trades, {r['wr']*100:5.1f}% WR, "
+                      f"{r['return']*100:+6.1f}%, avg hold {r['avg_hold']:.1f} periods")
             else:
-                print("No trades")
+                print(f"{'·' if cached else '✓'} {label}: No trades")
+        
+        results = MatrixRunner(runner, workers=workers, use_cache=use_cache).run(combos, report)
         
         results = sorted(results, key=lambda x: x['return'], reverse=True)
         
@@ -325,4 +316,4 @@ class SmartOptionsBacktest:
 
 if __name__ == "__main__":
     bt = SmartOptionsBacktest()
-    bt.run_matrix()
+    bt.run_matrix(**cli_options())
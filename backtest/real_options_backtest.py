@@ -5,7 +5,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import pandas as pd
-import ast
+from options_history_store import load_latest
 from indicators.smart_money.order_blocks import OrderBlocks
 
 class RealOptionsBacktest:
@@ -34,22 +34,7 @@ class RealOptionsBacktest:
     
     def load_options_data(self):
         """Load latest options snapshot"""
-        options_dir = Path(__file__).parent.parent / 'data' / 'options_history' / 'BTC'
-        latest = sorted(options_dir.glob("*.csv"))[-1]
-        df = pd.read_csv(latest)
-        
-        # Parse greeks
-        def parse_greeks(g):
-            if pd.isna(g):
-                return {}
-            try:
-                return ast.literal_eval(g)
-            except:
-                return {}
-        
-        df['greeks_dict'] = df['greeks'].apply(parse_greeks)
-        df['delta'] = df['greeks_dict'].apply(lambda x: x.get('delta', 0))
-        df['theta'] = df['greeks_dict'].apply(lambda x: x.get('theta', 0))
+        df = load_latest('BTC')
         
         df['dte'] = (pd.to_datetime(df['expiration'], unit='ms') - pd.Timestamp.now()).dt.days
         
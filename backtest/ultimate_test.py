@@ -10,11 +10,13 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import pandas as pd
 import numpy as np
-from itertools import product
 
 from indicators.smart_money.fair_value_gaps import FairValueGaps
 from indicators.smart_money.order_blocks import OrderBlocks
 from strategies.options.all_spreads import AllOptionStrategies
+from backtest.matrix_runner import MatrixRunner, cli_options, grid, raw_data_fingerprint
+
+BARS_PER_DAY = 6  # 4H свечи: выход через 18 баров = 3 дня удержания
 
 class UltimateBacktest:
     """
@@ -30,8 +32,14 @@ class UltimateBacktest:
         self.fvg = FairValueGaps()
         self.ob = OrderBlocks()
         self.options = AllOptionStrategies()
+        self.df = None  # свечи грузятся один раз на процесс
         print("✅ Ultimate Backtest initialized")
     
+    @staticmethod
+    def matrix_fingerprint(**_) -> str:
+        """Версия данных для кэша результатов матрицы"""
+        return raw_data_fingerprint('BTCUSDT')
+    
     def load_data(self):
         data_dir = Path(__file__).parent.parent / 'data' / 'raw' / 'BTCUSDT'
         files = sorted(data_dir.glob("*.csv"))[-60:]
@@ -149,7 +157,8 @@ class UltimateBacktest:
                 exit_price = price
                 pnl = self.options.calculate_pnl(
                     position['strategy'],
-                    exit_price
+                    exit_price,
+                    elapsed_days=(i - position['entry_idx']) / BARS_PER_DAY
                 )
                 capital += pnl
                 trades.append({'pnl': pnl, 'capital': capital})
@@ -187,28 +196,30 @@ class UltimateBacktest:
             'final': final
         }
     
-    def run_full_matrix(self):
+    def test_combo(self, indicator, strategy_type):
+        """Одна комбинация матрицы на общих (загруженных один раз) данных"""
+        if self.df is None:
+            self.df = self.load_data()
+        return self.backtest_combo(self.df, indicator, strategy_type)
+    
+    def run_full_matrix(self, workers=None, use_cache=True):
         """Полная матрица бэктестов"""
         
         print("\n╔════════════════════════════════════════════════╗")
         print("║   ULTIMATE BACKTEST - FULL MATRIX             ║")
         print("╚════════════════════════════════════════════════╝")
         
-        df = self.load_data()
-        
         indicators = ['sma', 'fvg', 'ob', 'sma_fvg']
         strategies = ['bull_call', 'bear_put', 'iron_condor', 'butterfly', 
                      'straddle', 'strangle', 'calendar', 'lottery']
         
-        results = []
-        total_combos = len(indicators) * len(strategies)
+        combos = grid('backtest.ultimate_test:UltimateBacktest',
+                      indicator=indicators, strategy_type=strategies)
         
-        print(f"\n🔍 Testing {total_combos} combinations...")
+        print(f"\n🔍 Testing {len(combos)} combinations...")
         
-        for ind, strat in product(indicators, strategies):
-            result = self.backtest_combo(df, ind, strat)
-            if result:
-                results.append(result)
+        results = MatrixRunner('backtest.ultimate_test:UltimateBacktest',
+                               workers=workers, use_cache=use_cache).run(combos)
         
         # Sort by return
         results = sorted(results, key=lambda x: x['return'], reverse=True)
@@ -235,4 +246,4 @@ class UltimateBacktest:
 
 if __name__ == "__main__":
     bt = UltimateBacktest()
-    bt.run_full_matrix()
+    bt.run_full_matrix(**cli_options())
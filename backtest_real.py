@@ -5,11 +5,11 @@ REAL BACKTEST - на реальных данных из signal_history.db
 БЕЗ ИМИТАЦИЙ!
 """
 
-import sqlite3
-import json
 from datetime import datetime
 from typing import List, Dict
 
+from signal_history_logger import SignalHistoryLogger, SNAPSHOT_COLUMNS
+
 class RealBacktest:
     """Реальный бэктест на собранных данных"""
     
@@ -17,40 +17,21 @@ class RealBacktest:
         self.db_path = './data/signal_history.db'
     
     def load_signals(self) -> List[Dict]:
-        """Загрузить все сигналы"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT 
-                timestamp,
-                asset,
-                signal_type,
-                confidence,
-                spot_price,
-                data_snapshot_json
-            FROM signal_history
-            ORDER BY timestamp ASC
-        ''')
-        
-        rows = cursor.fetchall()
-        conn.close()
+        """Загрузить все сигналы (метрики - типизированные колонки signal_snapshots)"""
+        frame = SignalHistoryLogger(self.db_path).load_frame()
+        metric_columns = list(SNAPSHOT_COLUMNS)
         
         signals = []
-        for row in rows:
-            try:
-                data_snapshot = json.loads(row[5])
-                signals.append({
-                    'timestamp': row[0],
-                    'datetime': datetime.fromtimestamp(row[0]),
-                    'asset': row[1],
-                    'signal_type': row[2],
-                    'confidence': row[3],
-                    'entry_price': row[4],
-                    'data': data_snapshot
-                })
-            except:
-                pass
+        for row in frame.itertuples(index=False):
+            signals.append({
+                'timestamp': row.timestamp,
+                'datetime': datetime.fromtimestamp(row.timestamp),
+                'asset': row.asset,
+                'signal_type': row.signal_type,
+                'confidence': row.confidence,
+                'entry_price': row.spot_price,
+                'data': {c: getattr(row, c) for c in metric_columns}
+            })
         
         return signals
     
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BATCH SIGNAL ANALYZER - Колоночный SignalAnalyzer для истории и подбора конфигов
+Таблица признаков снапшотов (строка = asset-snapshot) -> confidence, signal_type,
+strength и прохождение фильтров для всех строк массивными операциями.
+Компонентные confidence не зависят от конфига, поэтому sweep_configs считает их
+один раз и для каждого конфига только перевзвешивает.
+
+Паритет со скалярным SignalAnalyzer.analyze:
+    python3 batch_signal_analyzer.py parity
+"""
+
+import logging
+import random
+import sys
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from signal_analyzer import SignalAnalyzer
+
+logger = logging.getLogger(__name__)
+
+QUALITY_LEVELS = ['POOR', 'ACCEPTABLE', 'GOOD', 'EXCELLENT']
+
+# колонка -> (секция снапшота, ключ); NaN = нет данных
+FEATURE_SOURCES = {
+    'funding_rate': ('futures', 'funding_rate'),
+    'liq_ratio': ('liquidations', 'ratio'),
+    'max_pain_distance_pct': ('max_pain', 'distance_pct'),
+    'total_gex': ('gex', 'total_gex'),
+    'pcr_oi': ('pcr', 'pcr_oi'),
+    'total_vanna': ('vanna', 'total_vanna'),
+    'oi_macd_hist': ('oi_macd', 'histogram'),
+}
+SCALAR_FEATURES = ['pcr_rsi', 'gex_rsi']
+FEATURE_COLUMNS = ['available_sources', 'quality_level'] + list(FEATURE_SOURCES) + SCALAR_FEATURES
+
+NEUTRAL, BULLISH, BEARISH = 0, 1, -1
+SIGNAL_NAMES = {BULLISH: 'BULLISH', BEARISH: 'BEARISH'}
+
+
+def _number(value) -> float:
+    return np.nan if value is None else float(value)
+
+
+def snapshot_features(data: Dict[str, Any]) -> Dict[str, float]:
+    """Снапшот DataIntegrator.get_all_data -> строка признаков"""
+    quality = data.get('quality') or {}
+    status = quality.get('status', 'POOR')
+    row = {
+        'available_sources': float(quality.get('available_sources', 0)),
+        'quality_level': float(QUALITY_LEVELS.index(status)) if status in QUALITY_LEVELS else -1.0,
+    }
+    for column, (section, key) in FEATURE_SOURCES.items():
+        block = data.get(section)
+        row[column] = _number(block.get(key)) if block and key in block else np.nan
+    for column in SCALAR_FEATURES:
+        row[column] = _number(data.get(column))
+    return row
+
+
+def features_frame(snapshots: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Список снапшотов -> таблица признаков (float64, NaN = нет данных)"""
+    return pd.DataFrame([snapshot_features(s) for s in snapshots], columns=FEATURE_COLUMNS)
+
+
+def _clip(confidence: np.ndarray) -> np.ndarray:
+    return np.maximum(np.minimum(confidence, 1.0), 0.0)
+
+
+def _set_if_neutral(signal: np.ndarray, mask: np.ndarray, value: int) -> np.ndarray:
+    return np.where(mask & (signal == NEUTRAL), value, signal)
+
+
+class BatchSignalAnalyzer(SignalAnalyzer):
+    """Те же правила, что у SignalAnalyzer, но на массивах (порядок сложений сохранён)"""
+
+    @staticmethod
+    def components(features: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Confidence и направление futures/options/timing для всех строк (не зависят от конфига)"""
+        col = {name: features[name].to_numpy(dtype=np.float64) for name in FEATURE_COLUMNS}
+        n = len(features)
+
+        # Futures: funding, затем liquidations
+        conf = np.full(n, 0.5)
+        signal = np.zeros(n, dtype=np.int8)
+        fr = col['funding_rate']
+        high_fr, neg_fr = fr > 0.0001, fr < -0.0001
+        conf = np.where(high_fr, conf - 0.15, np.where(neg_fr, conf + 0.15, conf))
+        signal = np.where(high_fr, BEARISH, np.where(neg_fr, BULLISH, signal))
+        ratio = col['liq_ratio']
+        longs, shorts = ratio > 2.0, (ratio < 0.5) & (ratio != 0)  # ratio=0 в analyze() ложно
+        conf = np.where(longs, conf - 0.20, np.where(shorts, conf + 0.20, conf))
+        signal = _set_if_neutral(_set_if_neutral(signal, longs, BEARISH), shorts, BULLISH)
+        futures_conf, futures_signal = _clip(conf), signal
+
+        # Options: max pain, GEX, PCR, vanna
+        conf = np.full(n, 0.5)
+        signal = np.zeros(n, dtype=np.int8)
+        conf = np.where(np.abs(col['max_pain_distance_pct']) > 3, conf + 0.10, conf)
+        negative_gex = col['total_gex'] < 0
+        conf = np.where(negative_gex, conf + 0.10, conf)
+        signal = _set_if_neutral(signal, negative_gex, BULLISH)
+        pcr = col['pcr_oi']
+        conf = np.where(pcr > 1.5, conf + 0.08, np.where(pcr < 0.7, conf - 0.08, conf))
+        vanna = col['total_vanna']
+        big_vanna = np.abs(vanna) > 500
+        pos_vanna, neg_vanna = big_vanna & (vanna > 0), big_vanna & ~(vanna > 0)
+        conf = np.where(pos_vanna, conf + 0.12, np.where(neg_vanna, conf - 0.12, conf))
+        signal = _set_if_neutral(_set_if_neutral(signal, pos_vanna, BULLISH), neg_vanna, BEARISH)
+        options_conf, options_signal = _clip(conf), signal
+
+        # Timing: PCR RSI, GEX RSI, OI MACD
+        conf = np.full(n, 0.5)
+        signal = np.zeros(n, dtype=np.int8)
+        pcr_rsi = col['pcr_rsi']
+        fear, greed = pcr_rsi > 70, pcr_rsi < 30
+        conf = np.where(fear, conf + 0.12, np.where(greed, conf - 0.12, conf))
+        signal = np.where(fear, BULLISH, np.where(greed, BEARISH, signal))
+        gex_rsi = col['gex_rsi']
+        conf = np.where(gex_rsi > 70, conf + 0.08, np.where(gex_rsi < 30, conf - 0.08, conf))
+        hist = col['oi_macd_hist']
+        big_hist = np.abs(hist) > 100
+        pos_hist, neg_hist = big_hist & (hist > 0), big_hist & ~(hist > 0)
+        conf = np.where(pos_hist, conf + 0.10, np.where(neg_hist, conf - 0.10, conf))
+        signal = _set_if_neutral(_set_if_neutral(signal, pos_hist, BULLISH), neg_hist, BEARISH)
+        timing_conf, timing_signal = _clip(conf), signal
+
+        return {
+            'available_sources': col['available_sources'],
+            'quality_level': col['quality_level'],
+            'futures_confidence': futures_conf,
+            'futures_signal': futures_signal,
+            'options_confidence': options_conf,
+            'options_signal': options_signal,
+            'timing_confidence': timing_conf,
+            'timing_signal': timing_signal,
+        }
+
+    @staticmethod
+    def _combine(parts: Dict[str, np.ndarray], config: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """Фильтры качества/подтверждений, итоговая confidence, тип и сила сигнала"""
+        required = config.get('min_data_quality', 'ACCEPTABLE')
+        quality_ok = ((parts['available_sources'] >= config.get('min_data_sources', 2)) &
+                      (parts['quality_level'] >= QUALITY_LEVELS.index(required)))
+
+        filters_ok = np.ones_like(quality_ok)
+        if config.get('require_futures_confirm', False):
+            filters_ok &= parts['futures_confidence'] >= 0.5
+        if config.get('require_options_confirm', True):
+            filters_ok &= parts['options_confidence'] >= 0.5
+
+        confidence = (parts['futures_confidence'] * config['futures_weight'] +
+                      parts['options_confidence'] * config['options_weight'] +
+                      parts['timing_confidence'] * config['timing_weight'])
+
+        signals = np.stack([parts['futures_signal'], parts['options_signal'], parts['timing_signal']])
+        bullish = (signals == BULLISH).sum(axis=0)
+        bearish = (signals == BEARISH).sum(axis=0)
+        signal_type = np.where(bullish >= 2, 'BULLISH', np.where(bearish >= 2, 'BEARISH', 'NO_SIGNAL'))
+
+        strong = config.get('strong_threshold', 0.75)
+        min_conf = config.get('min_confidence', 0.60)
+        strength = np.where(confidence >= strong, 'STRONG', np.where(confidence >= min_conf, 'MODERATE', 'WEAK'))
+
+        return {
+            'quality_ok': quality_ok,
+            'filters_ok': filters_ok,
+            'passed': quality_ok & filters_ok,
+            'confidence': confidence,
+            'signal_type': signal_type,
+            'strength': strength,
+        }
+
+    def analyze_batch(self, features: pd.DataFrame) -> pd.DataFrame:
+        """
+        Все строки за один проход. passed=False там, где analyze() вернул бы None
+        (confidence/signal_type всё равно посчитаны - удобно для разбора)
+        """
+        parts = self.components(features)
+        out = pd.DataFrame(self._combine(parts, self.config), index=features.index)
+        for name in ('futures', 'options', 'timing'):
+            out[f'{name}_confidence'] = parts[f'{name}_confidence']
+            out[f'{name}_signal'] = pd.Series(parts[f'{name}_signal'], index=features.index).map(
+                lambda s: SIGNAL_NAMES.get(s, 'NEUTRAL'))
+        return out
+
+    def sweep_configs(self, features: pd.DataFrame, configs: List[Dict[str, Any]]) -> pd.DataFrame:
+        """
+        Сводка по каждому конфигу: сколько сигналов прошло, сколько направленных,
+        средняя confidence прошедших. Компоненты считаются один раз на все конфиги.
+        """
+        parts = self.components(features)
+        rows = []
+        for i, config in enumerate(configs):
+            config = self._validate_config(dict(config))
+            combined = self._combine(parts, config)
+            passed = combined['passed']
+            directional = passed & (combined['signal_type'] != 'NO_SIGNAL')
+            rows.append({
+                'config': i,
+                'passed': int(passed.sum()),
+                'directional': int(directional.sum()),
+                'strong': int((passed & (combined['strength'] == 'STRONG')).sum()),
+                'avg_confidence': float(combined['confidence'][passed].mean()) if passed.any() else np.nan,
+            })
+        return pd.DataFrame(rows)
+
+
+# ==================== PARITY ====================
+
+def random_snapshot(rng: random.Random) -> Dict[str, Any]:
+    """Случайный снапшот с пропусками, None и значениями ровно на порогах"""
+    def pick(values, missing=0.2):
+        return None if rng.random() < missing else rng.choice(values)
+
+    def section(key, values, missing=0.2):
+        roll = rng.random()
+        if roll < 0.1:
+            return None
+        if roll < 0.15:
+            return {}
+        return {key: pick(values, missing)}
+
+    return {
+        'asset': 'TEST',
+        'quality': {
+            'status': rng.choice(QUALITY_LEVELS),
+            'available_sources': rng.randint(0, 6)
+        },
+        'futures': section('funding_rate', [0.0, 0.0001, -0.0001, 0.00011, -0.00011, 0.0005, -0.0003]),
+        'liquidations': section('ratio', [0.0, 0.3, 0.5, 0.49, 1.0, 2.0, 2.01, 5.0]),
+        'max_pain': section('distance_pct', [0.0, 3.0, -3.0, 3.1, -4.5, 10.0]),
+        'gex': section('total_gex', [-1e6, -1.0, 0.0, 1.0, 5e5]),
+        'pcr': section('pcr_oi', [0.5, 0.7, 0.69, 1.0, 1.5, 1.51, 2.2]),
+        'vanna': section('total_vanna', [-900.0, -500.0, 0.0, 500.0, 500.5, 1200.0]),
+        # histogram=None роняет analyze() (abs(None)), поэтому без None
+        'oi_macd': section('histogram', [-250.0, -100.0, 0.0, 100.0, 100.5, 400.0], missing=0),
+        'pcr_rsi': pick([10.0, 30.0, 29.9, 50.0, 70.0, 70.1, 95.0]),
+        'gex_rsi': pick([10.0, 30.0, 29.9, 50.0, 70.0, 70.1, 95.0]),
+    }
+
+
+def check_parity(snapshots: List[Dict[str, Any]], config: Dict[str, Any]) -> List[str]:
+    """Сравнение analyze() и analyze_batch() построчно; пустой список = полный паритет"""
+    analyzer_logger = logging.getLogger('signal_analyzer')
+    level = analyzer_logger.level
+    analyzer_logger.setLevel(logging.ERROR)
+    try:
+        scalar = SignalAnalyzer(dict(config))
+        batch = BatchSignalAnalyzer(dict(config)).analyze_batch(features_frame(snapshots))
+        mismatches = []
+        for i, data in enumerate(snapshots):
+            expected = scalar.analyze(data)
+            row = batch.iloc[i]
+            if expected is None:
+                if row['passed']:
+                    mismatches.append(f"row {i}: scalar filtered, batch passed")
+                continue
+            if not row['passed']:
+                mismatches.append(f"row {i}: scalar passed, batch filtered")
+                continue
+            for key in ('confidence', 'signal_type', 'strength'):
+                if expected[key] != row[key]:
+                    mismatches.append(f"row {i}: {key} {expected[key]!r} != {row[key]!r}")
+            for name in ('futures', 'options', 'timing'):
+                component = expected['components'][name]
+                if component['confidence'] != row[f'{name}_confidence'] or \
+                        component['signal'] != row[f'{name}_signal']:
+                    mismatches.append(f"row {i}: {name} component differs")
+        return mismatches
+    finally:
+        analyzer_logger.setLevel(level)
+
+
+if __name__ == '__main__':
+    import time
+    from backtest_params import get_default_config, generate_random_config
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'parity':
+        print("=" * 60)
+        print("🧪 BATCH SIGNAL ANALYZER - PARITY")
+        print("=" * 60)
+
+        rng = random.Random(42)
+        snapshots = [random_snapshot(rng) for _ in range(20000)]
+        configs = [get_default_config()] + [generate_random_config() for _ in range(5)]
+        configs.append(dict(get_default_config(), require_futures_confirm=True,
+                            require_options_confirm=False, min_data_quality='GOOD'))
+
+        failed = False
+        for i, config in enumerate(configs):
+            mismatches = check_parity(snapshots, config)
+            status = '✅' if not mismatches else '❌'
+            print(f"{status} config {i}: {len(snapshots)} rows, {len(mismatches)} mismatches")
+            for line in mismatches[:5]:
+                print(f"   {line}")
+            failed = failed or bool(mismatches)
+
+        logging.getLogger('signal_analyzer').setLevel(logging.ERROR)
+        features = features_frame(snapshots)
+        scalar = SignalAnalyzer(get_default_config())
+        t0 = time.perf_counter()
+        for data in snapshots:
+            scalar.analyze(data)
+        scalar_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        BatchSignalAnalyzer(get_default_config()).analyze_batch(features)
+        batch_s = time.perf_counter() - t0
+        print(f"\n⏱️  scalar {scalar_s*1000:.0f} ms, batch {batch_s*1000:.0f} ms "
+              f"({scalar_s / batch_s:.0f}x) for {len(snapshots)} rows")
+
+        sys.exit(1 if failed else 0)
+    else:
+        print("Usage: python3 batch_signal_analyzer.py parity")
@@ -2,13 +2,15 @@
 """
 DISCORD MULTI-CHANNEL SYSTEM with PROXY support
 """
-import urllib.request
-import urllib.parse
 import json
 import os
+import sys
 from datetime import datetime
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from notification_dispatcher import notify_discord
+
 class DiscordMultiChannel:
     def __init__(self):
         """Load webhooks and setup proxy"""
@@ -35,17 +37,11 @@ class DiscordMultiChannel:
         print(f"   PROXY: {'✅' if self.proxy_enabled else '❌'}")
     
     def _setup_proxy(self):
-        """Setup proxy from environment variables"""
+        """Proxy from environment variables (used by notification_dispatcher)"""
         
         proxy_url = os.environ.get('https_proxy') or os.environ.get('HTTPS_PROXY')
         
         if proxy_url:
-            proxy_handler = urllib.request.ProxyHandler({
-                'http': proxy_url,
-                'https': proxy_url
-            })
-            opener = urllib.request.build_opener(proxy_handler)
-            urllib.request.install_opener(opener)
             self.proxy_enabled = True
             print(f"   Proxy configured: {proxy_url}")
         else:
@@ -69,22 +65,12 @@ class DiscordMultiChannel:
         if fields:
             embed["embeds"][0]["fields"] = fields
         
-        data = json.dumps(embed).encode('utf-8')
-        
         try:
-            req = urllib.request.Request(
-                webhook_url,
-                data=data,
-                headers={'Content-Type': 'application/json'}
-            )
-            
-            with urllib.request.urlopen(req, timeout=15) as response:
-                success = response.status in [200, 204]
-                if success:
-                    print(f"✅ Message sent successfully")
-                else:
-                    print(f"❌ HTTP {response.status}")
-                return success
+            # Queued: delivery, webhook rate limits and retries run in background
+            success = notify_discord(webhook_url, **embed)
+            if success:
+                print(f"✅ Message queued")
+            return success
                 
         except Exception as e:
             print(f"❌ Send error: {e}")
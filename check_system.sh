@@ -2,11 +2,14 @@
 echo "=== ETH OPTIONS SYSTEM STATUS ==="
 echo "Время: $(date)"
 echo ""
+echo "Мониторы (supervisor.py):"
+python3 supervisor.py status
+echo ""
 echo "Рабочие процессы:"
-ps aux | grep -E "(futures_data|liquidations|funding_rate|unlimited_oi|process_monitor|send_smart_signal|advanced_signals|orderbook)" | grep -v grep | wc -l
+ps aux | grep -E "(supervisor|process_monitor|send_smart_signal|advanced_signals|analytics_dag|orderbook)" | grep -v grep | wc -l
 echo ""
 echo "Для детального просмотра:"
-echo "ps aux | grep -E \"(futures_data|liquidations|funding_rate|unlimited_oi|process_monitor|send_smart_signal|advanced_signals|orderbook)\" | grep -v grep"
+echo "ps aux | grep -E \"(supervisor|process_monitor|send_smart_signal|advanced_signals|analytics_dag|orderbook)\" | grep -v grep"
 echo ""
 echo "Логи в реальном времени:"
 echo "tail -f logs/advanced_signals_generator.log"
@@ -8,12 +8,13 @@ echo "================================================"
 echo ""
 echo "1️⃣ ЗАПУЩЕННЫЕ ПРОЦЕССЫ:"
 echo "================================================"
-ps aux | grep -E "(unlimited_oi_monitor|futures_data_monitor|liquidations_monitor|gamma_exposure)" | grep -v grep | wc -l
-if [ $(ps aux | grep -E "(unlimited_oi_monitor|futures_data_monitor)" | grep -v grep | wc -l) -gt 0 ]; then
-    echo "✅ Основные мониторы запущены"
-else
-    echo "❌ Мониторы НЕ запущены"
-fi
+# Мониторы - задачи supervisor.py: состояние из его статуса, а не поиск процессов
+python3 supervisor.py status
+case $? in
+    0) echo "✅ Основные мониторы запущены" ;;
+    2) echo "⚠️ Супервизор работает, есть сбойные задачи" ;;
+    *) echo "❌ Мониторы НЕ запущены" ;;
+esac
 
 echo ""
 echo "2️⃣ TELEGRAM CREDENTIALS:"
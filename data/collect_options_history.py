@@ -1,11 +1,15 @@
 #!/usr/bin/env python3
 """Collect options snapshots for backtest"""
+import sys
 import urllib.request
 import json
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
 import time
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from options_history_store import GREEKS, write_snapshot
 
 def download_snapshot(currency="BTC"):
     """Download current snapshot"""
@@ -18,6 +22,9 @@ def download_snapshot(currency="BTC"):
     
     print(f"Found {len(instruments)} options")
     
+    # Один timestamp на весь снапшот
+    snapshot_time = datetime.now()
+    
     # Get data for each
     data = []
     for i, inst in enumerate(instruments):
@@ -31,6 +38,7 @@ def download_snapshot(currency="BTC"):
             with urllib.request.urlopen(url) as response:
                 book = json.loads(response.read())['result']
             
+            greeks = book.get('greeks', {})
             data.append({
                 'instrument': name,
                 'strike': inst['strike'],
@@ -43,8 +51,7 @@ def download_snapshot(currency="BTC"):
                 'ask': book.get('best_ask_price'),
                 'oi': book.get('open_interest'),
                 'volume': book.get('stats', {}).get('volume'),
-                'greeks': book.get('greeks', {}),
-                'timestamp': datetime.now().isoformat()
+                **{g: greeks.get(g, 0) for g in GREEKS}
             })
             
             time.sleep(0.15)
@@ -53,12 +60,8 @@ def download_snapshot(currency="BTC"):
     
     df = pd.DataFrame(data)
     
-    # Save
-    output_dir = Path('data/options_history') / currency
-    output_dir.mkdir(parents=True, exist_ok=True)
-    
-    filename = output_dir / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    df.to_csv(filename, index=False)
+    # Save (CSV в git + типизированный npz: greeks нативными колонками)
+    filename = write_snapshot(df, currency, snapshot_time)
     
     print(f"\n✅ Saved {len(df)} options to {filename}")
     
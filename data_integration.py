@@ -8,15 +8,23 @@ DATA INTEGRATION - FINAL VERSION
 import sqlite3
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+
+def _window(as_of: Optional[datetime], **delta) -> Tuple[int, int]:
+    """Окно (as_of - delta, as_of] в unix-секундах; as_of=None - сейчас"""
+    now = as_of or datetime.now()
+    return int((now - timedelta(**delta)).timestamp()), int(now.timestamp())
+
+
 # ==================== FUTURES - FIXED ====================
 
-def get_futures_data(symbol: str) -> Optional[Dict[str, Any]]:
-    """Фьючерсные данные - из unlimited_oi или futures мониторов"""
+def get_futures_data(symbol: str, as_of: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """Фьючерсные данные - из unlimited_oi или futures мониторов (as_of - на момент времени)"""
     try:
+        _, upper = _window(as_of)
         # Пробуем из unlimited_oi - там есть spot_price
         conn = sqlite3.connect('./data/unlimited_oi.db')
         cursor = conn.cursor()
@@ -24,10 +32,10 @@ def get_futures_data(symbol: str) -> Optional[Dict[str, Any]]:
         cursor.execute('''
             SELECT spot_price, timestamp
             FROM all_positions_tracking
-            WHERE asset = ?
+            WHERE asset = ? AND timestamp <= ?
             ORDER BY timestamp DESC
             LIMIT 1
-        ''', (symbol,))
+        ''', (symbol, upper))
         
         row = cursor.fetchone()
         conn.close()
@@ -37,13 +45,16 @@ def get_futures_data(symbol: str) -> Optional[Dict[str, Any]]:
             try:
                 conn2 = sqlite3.connect('./data/funding_rates.db')
                 cursor2 = conn2.cursor()
-                cursor2.execute('''
+                # Верхняя граница только для исторического запроса: формат
+                # timestamp в funding_rates задаёт внешний монитор
+                bound = " AND timestamp <= ?" if as_of else ""
+                cursor2.execute(f'''
                     SELECT funding_rate
                     FROM funding_rates
-                    WHERE symbol = ?
+                    WHERE symbol = ?{bound}
                     ORDER BY timestamp DESC
                     LIMIT 1
-                ''', (symbol,))
+                ''', (symbol, upper) if as_of else (symbol,))
                 funding_row = cursor2.fetchone()
                 conn2.close()
                 funding_rate = funding_row[0] if funding_row else 0.0001
@@ -62,7 +73,8 @@ def get_futures_data(symbol: str) -> Optional[Dict[str, Any]]:
         return None
 
 
-def get_recent_liquidations(symbol: str, hours: int = 4) -> Optional[Dict[str, Any]]:
+def get_recent_liquidations(symbol: str, hours: int = 4,
+                            as_of: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
     """Ликвидации - из liquidations.db или мониторов"""
     try:
         conn = sqlite3.connect('./data/liquidations.db')
@@ -81,14 +93,14 @@ def get_recent_liquidations(symbol: str, hours: int = 4) -> Optional[Dict[str, A
             conn.close()
             return None
         
-        cutoff = int((datetime.now() - timedelta(hours=hours)).timestamp())
+        cutoff, upper = _window(as_of, hours=hours)
         
         cursor.execute(f'''
             SELECT side, SUM(qty * price) as total_usd
             FROM {table_name}
-            WHERE symbol = ? AND timestamp > ?
+            WHERE symbol = ? AND timestamp > ? AND timestamp <= ?
             GROUP BY side
-        ''', (symbol, cutoff))
+        ''', (symbol, cutoff, upper))
         
         rows = cursor.fetchall()
         conn.close()
@@ -112,13 +124,13 @@ def get_recent_liquidations(symbol: str, hours: int = 4) -> Optional[Dict[str, A
 
 # ==================== OPTIONS ====================
 
-def get_pcr_data(symbol: str) -> Optional[Dict[str, Any]]:
+def get_pcr_data(symbol: str, as_of: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
     """PCR - работает"""
     try:
         conn = sqlite3.connect('./data/unlimited_oi.db')
         cursor = conn.cursor()
         
-        cutoff = int((datetime.now() - timedelta(hours=24)).timestamp())
+        cutoff, upper = _window(as_of, hours=24)
         
         cursor.execute('''
             SELECT 
@@ -127,10 +139,10 @@ def get_pcr_data(symbol: str) -> Optional[Dict[str, Any]]:
                 SUM(volume_24h) as total_volume
             FROM all_positions_tracking
             WHERE asset = ? 
-              AND timestamp > ?
+              AND timestamp > ? AND timestamp <= ?
               AND open_interest > 0
             GROUP BY option_type
-        ''', (symbol, cutoff))
+        ''', (symbol, cutoff, upper))
         
         rows = cursor.fetchall()
         conn.close()
@@ -168,156 +180,79 @@ def get_pcr_data(symbol: str) -> Optional[Dict[str, Any]]:
         return None
 
 
-def get_gamma_exposure(symbol: str) -> Optional[Dict[str, Any]]:
-    """GEX - работает"""
+def format_gex(snapshot_ts: int, gex: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Результат 'gex' из analytics_cache -> формат источника DataIntegrator"""
+    if not gex:
+        return None
+    
+    call_gamma = gex['call_gex']
+    put_gamma = gex['put_gex']
+    
+    return {
+        'total_gex': gex['total_gex'],
+        'total_gamma': gex['total_gex'],
+        'call_gamma': call_gamma,
+        'put_gamma': put_gamma,
+        'gamma_ratio': call_gamma / put_gamma if put_gamma > 0 else 0,
+        'zero_gamma_level': gex['zero_gamma_level'],
+        'spot_price': gex['spot_price'],
+        'snapshot_ts': snapshot_ts
+    }
+
+
+def format_max_pain(snapshot_ts: int, max_pain: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Результат 'max_pain' из analytics_cache -> формат источника DataIntegrator"""
+    if not max_pain or not max_pain['overall_max_pain']:
+        return None
+    
+    spot_price = max_pain['spot_price']
+    max_pain_price = max_pain['overall_max_pain']
+    nearest = min(max_pain['expirations'].values(), key=lambda e: e['dte'])
+    
+    return {
+        'price': max_pain_price,
+        # % от спота, > 0 - цена выше Max Pain (как читает SignalAnalyzer)
+        'distance_pct': (spot_price - max_pain_price) / spot_price * 100,
+        'total_pain': nearest['total_pain'],
+        'nearest_expiry_price': nearest['max_pain'],
+        'spot_price': spot_price,
+        'snapshot_ts': snapshot_ts
+    }
+
+
+def get_gamma_exposure(symbol: str, as_of: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """GEX последнего снапшота - из общего кэша (считает GammaExposureCalculator или первый читатель)"""
     try:
-        conn = sqlite3.connect('./data/unlimited_oi.db')
-        cursor = conn.cursor()
-        
-        cutoff = int((datetime.now() - timedelta(hours=24)).timestamp())
-        
-        cursor.execute('''
-            SELECT 
-                strike,
-                option_type,
-                open_interest,
-                spot_price
-            FROM all_positions_tracking
-            WHERE asset = ?
-              AND timestamp > ?
-              AND open_interest > 0
-            ORDER BY timestamp DESC
-            LIMIT 1000
-        ''', (symbol, cutoff))
-        
-        rows = cursor.fetchall()
-        conn.close()
-        
-        if not rows:
-            return None
-        
-        spot_price = rows[0][3] if rows else 0
-        
-        total_gamma = 0
-        call_gamma = 0
-        put_gamma = 0
-        
-        for row in rows:
-            strike = row[0]
-            option_type = row[1]
-            oi = row[2]
-            
-            moneyness = abs(strike - spot_price) / spot_price
-            gamma = oi * (1 - moneyness) if moneyness < 0.1 else oi * 0.1
-            
-            total_gamma += gamma
-            
-            if option_type == 'Call':
-                call_gamma += gamma
-            else:
-                put_gamma += gamma
-        
-        return {
-            'total_gamma': total_gamma,
-            'call_gamma': call_gamma,
-            'put_gamma': put_gamma,
-            'gamma_ratio': call_gamma / put_gamma if put_gamma > 0 else 0,
-            'spot_price': spot_price
-        }
-        
+        from analytics_cache import get_analytics_cache
+        return format_gex(*get_analytics_cache().get('gex', symbol, as_of))
     except Exception as e:
         logger.error(f"Error getting GEX for {symbol}: {e}")
         return None
 
 
-def get_max_pain(symbol: str) -> Optional[Dict[str, Any]]:
-    """Max Pain - работает"""
+def get_max_pain(symbol: str, as_of: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """Max Pain последнего снапшота - из общего кэша (считает MaxPainCalculator или первый читатель)"""
     try:
-        conn = sqlite3.connect('./data/unlimited_oi.db')
-        cursor = conn.cursor()
-        
-        cutoff = int((datetime.now() - timedelta(hours=24)).timestamp())
-        
-        cursor.execute('''
-            SELECT 
-                strike,
-                option_type,
-                open_interest,
-                spot_price
-            FROM all_positions_tracking
-            WHERE asset = ?
-              AND timestamp > ?
-              AND open_interest > 0
-        ''', (symbol, cutoff))
-        
-        rows = cursor.fetchall()
-        conn.close()
-        
-        if not rows:
-            return None
-        
-        spot_price = rows[0][3]
-        
-        strikes_data = {}
-        for row in rows:
-            strike = row[0]
-            option_type = row[1]
-            oi = row[2]
-            
-            if strike not in strikes_data:
-                strikes_data[strike] = {'calls': 0, 'puts': 0}
-            
-            if option_type == 'Call':
-                strikes_data[strike]['calls'] += oi
-            else:
-                strikes_data[strike]['puts'] += oi
-        
-        strikes = sorted(strikes_data.keys())
-        
-        max_pain_price = spot_price
-        min_pain = float('inf')
-        
-        for test_price in strikes:
-            total_pain = 0
-            
-            for strike, data in strikes_data.items():
-                if test_price > strike:
-                    total_pain += data['calls'] * (test_price - strike)
-                
-                if test_price < strike:
-                    total_pain += data['puts'] * (strike - test_price)
-            
-            if total_pain < min_pain:
-                min_pain = total_pain
-                max_pain_price = test_price
-        
-        distance = (max_pain_price - spot_price) / spot_price
-        
-        return {
-            'price': max_pain_price,
-            'distance_pct': distance,
-            'total_pain': min_pain,
-            'spot_price': spot_price
-        }
-        
+        from analytics_cache import get_analytics_cache
+        return format_max_pain(*get_analytics_cache().get('max_pain', symbol, as_of))
     except Exception as e:
         logger.error(f"Error getting Max Pain for {symbol}: {e}")
         return None
 
 
-def get_vanna_data(symbol: str) -> Optional[Dict[str, Any]]:
+def get_vanna_data(symbol: str, as_of: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
     """Vanna - работает"""
     try:
         conn = sqlite3.connect('./data/unlimited_oi.db')
         cursor = conn.cursor()
         
-        cutoff = int((datetime.now() - timedelta(hours=24)).timestamp())
+        cutoff, upper = _window(as_of, hours=24)
         
         cursor.execute('''
             SELECT SUM(open_interest) as total_vanna
             FROM all_positions_tracking
-            WHERE asset = ? AND timestamp > ?
-        ''', (symbol, cutoff))
+            WHERE asset = ? AND timestamp > ? AND timestamp <= ?
+        ''', (symbol, cutoff, upper))
         
         row = cursor.fetchone()
         conn.close()
@@ -329,7 +264,7 @@ def get_vanna_data(symbol: str) -> Optional[Dict[str, Any]]:
         return None
 
 
-def get_iv_rank_data(symbol: str) -> Optional[Dict[str, Any]]:
+def get_iv_rank_data(symbol: str, as_of: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
     """IV Rank - ИСПРАВЛЕНО (без mark_iv)"""
     try:
         # IV Rank можно посчитать из разброса страйков
@@ -338,17 +273,17 @@ def get_iv_rank_data(symbol: str) -> Optional[Dict[str, Any]]:
         conn = sqlite3.connect('./data/unlimited_oi.db')
         cursor = conn.cursor()
         
-        cutoff = int((datetime.now() - timedelta(days=7)).timestamp())
+        cutoff, upper = _window(as_of, days=7)
         
         cursor.execute('''
             SELECT strike, spot_price, open_interest
             FROM all_positions_tracking
             WHERE asset = ?
-              AND timestamp > ?
+              AND timestamp > ? AND timestamp <= ?
               AND open_interest > 0
-            ORDER BY timestamp DESC
+            ORDER BY timestamp DESC, symbol DESC
             LIMIT 500
-        ''', (symbol, cutoff))
+        ''', (symbol, cutoff, upper))
         
         rows = cursor.fetchall()
         conn.close()
@@ -391,39 +326,63 @@ def get_iv_rank_data(symbol: str) -> Optional[Dict[str, Any]]:
         return None
 
 
-def get_option_vwap(symbol: str) -> Optional[Dict[str, Any]]:
+def get_volatility_data(symbol: str, as_of: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """Реализованная волатильность (5 оценок x 1d/7d/30d), ATM IV по тенорам и спред IV-RV"""
+    try:
+        from iv_history import iv_at
+        from realized_vol import get_rv_engine, iv_rv_spreads, realized_vol_at
+
+        _, upper = _window(as_of)
+        rv = realized_vol_at(symbol, as_of) if as_of else get_rv_engine().get(symbol)
+        if not rv:
+            return None
+
+        atm_iv = iv_at(symbol, upper)
+        return {
+            'realized_vol': rv['realized_vol'],
+            'candle_ts': rv['candle_ts'],
+            'atm_iv': atm_iv,
+            'iv_rv_spread': iv_rv_spreads(rv['realized_vol'], atm_iv)
+        }
+
+    except Exception as e:
+        logger.error(f"Error getting volatility for {symbol}: {e}")
+        return None
+
+
+def get_option_vwap(symbol: str, as_of: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
     """Option VWAP"""
     try:
-        from option_vwap_calculator import calculate_option_vwap
-        return calculate_option_vwap(symbol)
+        from option_vwap_calculator import get_option_vwap as calculate_option_vwap
+        return calculate_option_vwap(symbol, as_of=as_of)
     except:
         return None
 
 
 # ==================== ADVANCED INDICATORS ====================
 
-def get_pcr_rsi(symbol: str) -> Optional[float]:
+def get_pcr_rsi(symbol: str, as_of: Optional[datetime] = None) -> Optional[float]:
     """PCR RSI"""
     try:
         from advanced_indicators import get_pcr_rsi
-        return get_pcr_rsi(symbol)
+        return get_pcr_rsi(symbol, as_of=as_of)
     except:
         return None
 
 
-def get_gex_rsi(symbol: str) -> Optional[float]:
+def get_gex_rsi(symbol: str, as_of: Optional[datetime] = None) -> Optional[float]:
     """GEX RSI"""
     try:
         from advanced_indicators import get_gex_rsi
-        return get_gex_rsi(symbol)
+        return get_gex_rsi(symbol, as_of=as_of)
     except:
         return None
 
 
-def get_oi_macd(symbol: str) -> Optional[Dict]:
+def get_oi_macd(symbol: str, as_of: Optional[datetime] = None) -> Optional[Dict]:
     """OI MACD"""
     try:
         from advanced_indicators import get_oi_macd
-        return get_oi_macd(symbol)
+        return get_oi_macd(symbol, as_of=as_of)
     except:
         return None
@@ -16,6 +16,7 @@ from data_integration import (
     get_pcr_data,
     get_vanna_data,
     get_iv_rank_data,
+    get_volatility_data,
     get_option_vwap,
     get_pcr_rsi,
     get_gex_rsi,
@@ -37,6 +38,7 @@ class DataIntegrator:
             'gex': get_gamma_exposure,
             'vanna': get_vanna_data,
             'iv_rank': get_iv_rank_data,
+            'volatility': get_volatility_data,
             'option_vwap': get_option_vwap,
             'expiration_walls': get_expiration_walls_data,
             'oi_dynamics': get_oi_dynamics_data,
@@ -45,22 +47,24 @@ class DataIntegrator:
             'oi_macd': get_oi_macd
         }
     
-    def get_all_data(self, asset: str) -> Dict[str, Any]:
-        """Собрать ВСЕ данные"""
+    def get_all_data(self, asset: str, as_of: Optional[datetime] = None) -> Dict[str, Any]:
+        """Собрать ВСЕ данные (as_of - состояние источников на момент времени, без утечки будущего)"""
         try:
             data = {
                 'asset': asset,
-                'timestamp': datetime.now(),
+                'timestamp': as_of or datetime.now(),
                 'spot_price': None,
                 'available_sources': []
             }
             
+            # as_of передаём только историческим запросам - live-вызовы не меняются
+            point_in_time = {'as_of': as_of} if as_of else {}
             for source_name, source_func in self.data_sources.items():
                 try:
                     if source_name == 'liquidations':
-                        result = source_func(asset, hours=4)
+                        result = source_func(asset, hours=4, **point_in_time)
                     else:
-                        result = source_func(asset)
+                        result = source_func(asset, **point_in_time)
                     
                     data[source_name] = result
                     
@@ -84,19 +88,19 @@ class DataIntegrator:
             
         except Exception as e:
             logger.error(f"Failed to integrate data for {asset}: {e}")
-            return self._get_fallback_data(asset)
+            return self._get_fallback_data(asset, as_of)
     
-    def _get_fallback_data(self, asset: str) -> Dict[str, Any]:
+    def _get_fallback_data(self, asset: str, as_of: Optional[datetime] = None) -> Dict[str, Any]:
         """Минимальные данные при ошибке"""
         try:
-            futures = get_futures_data(asset)
+            futures = get_futures_data(asset, as_of=as_of)
             spot_price = futures.get('price') if futures else None
         except:
             spot_price = None
         
         return {
             'asset': asset,
-            'timestamp': datetime.now(),
+            'timestamp': as_of or datetime.now(),
             'spot_price': spot_price,
             'available_sources': [],
             'quality': {'status': 'FALLBACK'}
@@ -155,21 +159,21 @@ if __name__ == '__main__':
     print("✅ TEST COMPLETE - ALL 11 SOURCES")
     print("=" * 60)
 
-def get_expiration_walls_data(symbol: str) -> Optional[Dict[str, Any]]:
+def get_expiration_walls_data(symbol: str, as_of: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
     """Expiration Walls"""
     try:
         from expiration_walls_analyzer import get_expiration_walls_data as get_walls
-        return get_walls(symbol)
+        return get_walls(symbol, as_of=as_of)
     except Exception as e:
         logger.error(f"Error getting expiration walls: {e}")
         return None
 
 
-def get_oi_dynamics_data(asset: str) -> Optional[Dict[str, Any]]:
+def get_oi_dynamics_data(asset: str, as_of: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
     """OI Dynamics"""
     try:
         from oi_dynamics_analyzer import get_oi_dynamics_data as get_dynamics
-        return get_dynamics(asset)
+        return get_dynamics(asset, as_of=as_of)
     except Exception as e:
         logger.error(f"Error getting OI dynamics: {e}")
         return None
@@ -7,6 +7,9 @@ from datetime import datetime
 import sqlite3
 import os
 
+from analytics_dag import AnalyticsDAG
+from pipeline_runtime import PipelineRuntime
+
 # Настройка логирования
 logging.basicConfig(
     level=logging.INFO,
@@ -22,32 +25,45 @@ class DataPipelineManager:
         self.scripts = {
             'futures': {
                 'script': './futures_data_monitor.py',
+                'module': 'futures_data_monitor',
+                'entry': 'FuturesDataMonitor.run_cycle',
                 'interval_minutes': 1,
                 'last_run': None,
                 'timeout': 30
             },
             'liquidations': {
                 'script': './liquidations_monitor.py', 
+                'module': 'liquidations_monitor',
+                'entry': 'LiquidationsMonitor.ensure_connected',
                 'interval_minutes': 1,
                 'last_run': None,
                 'timeout': 30
             },
-            'gamma': {
-                'script': './gamma_exposure_calculator.py',
-                'interval_minutes': 5,
-                'last_run': None, 
-                'timeout': 60
-            },
             'funding': {
                 'script': './funding_rate_monitor.py',
+                'module': 'funding_rate_monitor',
+                'entry': 'FundingRateMonitor.run_cycle',
                 'interval_minutes': 5,
                 'last_run': None,
                 'timeout': 30
             }
         }
         
+        # Этапы живут в этом процессе: импорт и подключения к БД один раз
+        self.runtime = PipelineRuntime(max_workers=len(self.scripts), on_alert=self.send_alert)
+        for name, config in self.scripts.items():
+            self.runtime.add_stage(name, config['module'], config['entry'], config['timeout'])
+        
+        # Аналитика опционов (gamma, max_pain, pcr, vanna, iv_rank -> сигнал) - по новым снапшотам OI
+        self.dag = AnalyticsDAG()
+        
+    def run_stage(self, script_name):
+        """Запуск этапа в пуле потоков (перекрывающиеся запуски пропускаются)"""
+        if self.runtime.submit(script_name):
+            self.scripts[script_name]['last_run'] = datetime.now()
+        
     def run_script(self, script_name, script_config):
-        """Запуск скрипта с контролем времени и ошибок"""
+        """Запуск скрипта отдельным процессом (ручной запуск/отладка)"""
         try:
             logging.info(f"Запуск {script_name}...")
             result = subprocess.run(
@@ -143,23 +159,28 @@ class DataPipelineManager:
         """Запуск пайплайна"""
         logging.info("🚀 Запуск системы управления данными...")
         
-        # Запускаем все скрипты сразу при старте
-        for name, config in self.scripts.items():
-            self.run_script(name, config)
+        # Запускаем все этапы сразу при старте
+        for name in self.scripts:
+            self.run_stage(name)
         
         # Настраиваем расписание
-        schedule.every(1).minutes.do(lambda: self.run_script('futures', self.scripts['futures']))
-        schedule.every(1).minutes.do(lambda: self.run_script('liquidations', self.scripts['liquidations']))
-        schedule.every(5).minutes.do(lambda: self.run_script('gamma', self.scripts['gamma']))
-        schedule.every(5).minutes.do(lambda: self.run_script('funding', self.scripts['funding']))
+        for name, config in self.scripts.items():
+            schedule.every(config['interval_minutes']).minutes.do(self.run_stage, name)
         schedule.every(10).minutes.do(self.check_data_freshness)
         schedule.every(6).hours.do(self.backup_databases)
         
         logging.info("📅 Расписание настроено. Запуск основного цикла...")
         
-        while True:
-            schedule.run_pending()
-            time.sleep(1)
+        try:
+            while True:
+                schedule.run_pending()
+                self.dag.poll()
+                self.runtime.check_timeouts()
+                time.sleep(1)
+        except KeyboardInterrupt:
+            logging.info("Остановка пайплайна...")
+            self.runtime.shutdown(wait=False)
+            self.dag.shutdown(wait=False)
 
 if __name__ == "__main__":
     manager = DataPipelineManager()
@@ -1,8 +1,9 @@
-import requests
 import os
 import logging
 from dotenv import load_dotenv
 
+from notification_dispatcher import notify_discord
+
 load_dotenv()
 
 class DiscordSender:
@@ -10,17 +11,8 @@ class DiscordSender:
         self.free_webhook = os.getenv('DISCORD_FREE_WEBHOOK')
         self.vip_webhook = os.getenv('DISCORD_VIP_WEBHOOK')
         self.admin_webhook = os.getenv('DISCORD_ADMIN_WEBHOOK')
-        
-        # Используем прокси для Discord
-        proxy_url = os.getenv('TELEGRAM_PROXY_URL')
-        proxy_user = os.getenv('TELEGRAM_PROXY_USERNAME')
-        proxy_pass = os.getenv('TELEGRAM_PROXY_PASSWORD')
-        
-        self.proxies = None
-        if proxy_url and proxy_user and proxy_pass:
-            proxy_with_auth = f"http://{proxy_user}:{proxy_pass}@{proxy_url.split('//')[1]}"
-            self.proxies = {'http': proxy_with_auth, 'https': proxy_with_auth}
-        
+        # Прокси (TELEGRAM_PROXY_*) подключает notification_dispatcher
+
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
         self.logger.info("🔧 DiscordSender инициализирован")
@@ -30,20 +22,14 @@ class DiscordSender:
             self.logger.warning("❌ Webhook не настроен")
             return False
         try:
-            payload = {
-                "content": message,
-                "username": "Crypto Signals Bot",
-                "avatar_url": "https://cdn-icons-png.flaticon.com/512/825/825545.png"
-            }
-            response = requests.post(webhook, json=payload, timeout=30, proxies=self.proxies)
-            if response.status_code == 204:
-                self.logger.info("✅ Discord сообщение отправлено")
-                return True
-            else:
-                self.logger.error(f"❌ Discord ошибка: {response.status_code}")
-                return False
+            # Доставка в фоне: очередь, лимиты вебхука, повторы из outbox
+            return notify_discord(
+                webhook, message,
+                username="Crypto Signals Bot",
+                avatar_url="https://cdn-icons-png.flaticon.com/512/825/825545.png"
+            )
         except Exception as e:
-            self.logger.error(f"❌ Ошибка отправки в Discord: {e}")
+            self.logger.error(f"❌ Ошибка постановки в очередь Discord: {e}")
             return False
 
     def send_to_admin(self, message):
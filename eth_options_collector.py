@@ -9,6 +9,26 @@ import pandas as pd
 from datetime import datetime, timedelta
 import sqlite3
 import os
+from concurrent.futures import ThreadPoolExecutor
+from math import log, sqrt
+
+from lazy_imports import norm
+
+# Актив -> (currency для Deribit API, префикс инструментов)
+# SOL на Deribit торгуется в линейных USDC-опционах
+BULK_CURRENCIES = {
+    'ETH': ('ETH', 'ETH-'),
+    'BTC': ('BTC', 'BTC-'),
+    'SOL': ('USDC', 'SOL_USDC-'),
+}
+
+INSERT_OPTION_SQL = '''
+    INSERT INTO eth_options (
+        timestamp, currency, instrument_name, strike, expiration_date, option_type,
+        mark_price, bid_price, ask_price, underlying_price, implied_volatility,
+        delta, theta, gamma, vega, open_interest, volume_24h
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
 
 class ETHOptionsCollector:
     def __init__(self):
@@ -64,6 +84,15 @@ class ETHOptionsCollector:
             )
         ''')
         
+        # Мульти-валютный сбор: старые строки без currency - это ETH
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(eth_options)")]
+        if 'currency' not in columns:
+            cursor.execute("ALTER TABLE eth_options ADD COLUMN currency TEXT")
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_eth_options_currency_time
+            ON eth_options(currency, timestamp)
+        ''')
+        
         conn.commit()
         conn.close()
         self.log("Database initialized")
@@ -130,9 +159,9 @@ class ETHOptionsCollector:
         try:
             parts = name.split('-')
             if len(parts) == 4:
-                currency = parts[0]
+                currency = parts[0].split('_')[0]
                 date_str = parts[1]
-                strike = float(parts[2])
+                strike = float(parts[2].replace('d', '.'))
                 option_type = parts[3]  # C или P
                 
                 # Парсим дату
@@ -149,9 +178,119 @@ class ETHOptionsCollector:
         
         return None
     
-    def collect_all_options(self):
-        """Сбор всех ETH опционов"""
+    def get_book_summary(self, asset):
+        """Книга всей валюты одним запросом (get_book_summary_by_currency)"""
+        api_currency, prefix = BULK_CURRENCIES[asset]
+        try:
+            url = f"{self.deribit_url}/get_book_summary_by_currency"
+            params = {'currency': api_currency, 'kind': 'option'}
+            
+            response = requests.get(url, params=params, timeout=30)
+            
+            if response.status_code == 200:
+                summaries = [row for row in response.json()['result']
+                             if row['instrument_name'].startswith(prefix)]
+                self.log(f"Book summary {asset}: {len(summaries)} options")
+                return summaries
+            else:
+                self.log(f"Error getting book summary {asset}: {response.status_code}")
+                
+        except Exception as e:
+            self.log(f"Book summary error {asset}: {e}")
+        
+        return []
+    
+    @staticmethod
+    def compute_greeks(option_type, underlying, strike, expiry, iv_pct, snapshot_time):
+        """Greeks по Black-Scholes от mark_iv (как у Deribit: r=0, vega на 1%, theta в день)"""
+        # Экспирация Deribit - 08:00 UTC
+        expiry_dt = datetime(expiry.year, expiry.month, expiry.day, 8)
+        T = (expiry_dt - snapshot_time).total_seconds() / (365 * 24 * 3600)
+        sigma = (iv_pct or 0) / 100
+        if T <= 0 or sigma <= 0 or underlying <= 0 or strike <= 0:
+            return 0, 0, 0, 0
+        
+        sqrt_t = sqrt(T)
+        d1 = (log(underlying / strike) + 0.5 * sigma ** 2 * T) / (sigma * sqrt_t)
+        pdf = norm.pdf(d1)
+        
+        delta = norm.cdf(d1) if option_type == 'CALL' else norm.cdf(d1) - 1
+        gamma = pdf / (underlying * sigma * sqrt_t)
+        vega = underlying * pdf * sqrt_t / 100
+        theta = -underlying * pdf * sigma / (2 * sqrt_t) / 365
+        
+        return delta, theta, gamma, vega
+    
+    def build_bulk_rows(self, asset, summaries, snapshot_time):
+        """Строки для executemany из book summary (один timestamp на снапшот)"""
+        rows = []
+        utc_now = datetime.utcnow()
+        
+        for item in summaries:
+            parsed = self.parse_instrument_name(item['instrument_name'])
+            if not parsed:
+                continue
+            
+            underlying = item.get('underlying_price') or 0
+            iv = item.get('mark_iv') or 0
+            delta, theta, gamma, vega = self.compute_greeks(
+                parsed['option_type'], underlying, parsed['strike'],
+                parsed['expiration_date'], iv, utc_now
+            )
+            
+            rows.append((
+                snapshot_time,
+                asset,
+                item['instrument_name'],
+                parsed['strike'],
+                parsed['expiration_date'],
+                parsed['option_type'],
+                item.get('mark_price') or 0,
+                item.get('bid_price') or 0,
+                item.get('ask_price') or 0,
+                underlying,
+                iv,
+                delta,
+                theta,
+                gamma,
+                vega,
+                item.get('open_interest') or 0,
+                item.get('volume') or 0
+            ))
+        
+        return rows
+    
+    def collect_bulk(self, assets=('ETH',)):
+        """Сбор всех опционов по book summary: один запрос на валюту, запросы параллельно"""
+        self.log(f"Starting bulk collection: {', '.join(assets)}")
+        snapshot_time = datetime.now()
+        
+        with ThreadPoolExecutor(max_workers=len(assets)) as pool:
+            summaries = dict(zip(assets, pool.map(self.get_book_summary, assets)))
+        
+        rows = []
+        for asset in assets:
+            rows.extend(self.build_bulk_rows(asset, summaries[asset], snapshot_time))
+        
+        if not rows:
+            self.log("No options collected")
+            return 0
+        
+        conn = sqlite3.connect(self.db_file)
+        conn.executemany(INSERT_OPTION_SQL, rows)
+        conn.commit()
+        conn.close()
+        
+        self.log(f"Collected {len(rows)} options @ {snapshot_time.strftime('%H:%M:%S')}")
+        return len(rows)
+    
+    def collect_all_options(self, bulk=True):
+        """Сбор всех ETH опционов (bulk=False - старый режим, запрос на инструмент)"""
+        if bulk:
+            return self.collect_bulk(('ETH',))
+        
         self.log("Starting options collection")
+        snapshot_time = datetime.now()
         
         instruments = self.get_eth_instruments()
         
@@ -160,8 +299,7 @@ class ETHOptionsCollector:
             return
         
         collected = 0
-        conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
+        rows = []
         
         for instrument in instruments:
             instrument_name = instrument['instrument_name']
@@ -177,14 +315,9 @@ class ETHOptionsCollector:
                 continue
             
             # Сохраняем в базу
-            cursor.execute('''
-                INSERT INTO eth_options (
-                    timestamp, instrument_name, strike, expiration_date, option_type,
-                    mark_price, bid_price, ask_price, underlying_price, implied_volatility,
-                    delta, theta, gamma, vega, open_interest, volume_24h
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                datetime.now(),
+            rows.append((
+                snapshot_time,
+                'ETH',
                 instrument_name,
                 parsed['strike'],
                 parsed['expiration_date'],
@@ -207,6 +340,8 @@ class ETHOptionsCollector:
             # Задержка между запросами
             time.sleep(0.1)
         
+        conn = sqlite3.connect(self.db_file)
+        conn.executemany(INSERT_OPTION_SQL, rows)
         conn.commit()
         conn.close()
         
@@ -221,6 +356,7 @@ class ETHOptionsCollector:
         df = pd.read_sql_query('''
             SELECT * FROM eth_options 
             WHERE timestamp > datetime('now', '-1 hour')
+              AND (currency = 'ETH' OR currency IS NULL)
             ORDER BY timestamp DESC
         ''', conn)
         
@@ -309,9 +445,17 @@ High IV Options: {analysis['high_iv_count']}
         return collected
 
 if __name__ == "__main__":
+    import sys
+    
     collector = ETHOptionsCollector()
     
-    # Тестовый сбор
-    print("Starting ETH Options collection...")
-    result = collector.run_collection_cycle()
-    print(f"Collection complete: {result} options processed")
+    if len(sys.argv) > 1 and sys.argv[1] == 'bulk':
+        # python3 eth_options_collector.py bulk ETH,BTC,SOL
+        assets = sys.argv[2].split(',') if len(sys.argv) > 2 else list(BULK_CURRENCIES)
+        result = collector.collect_bulk(tuple(assets))
+        print(f"Bulk collection complete: {result} options processed")
+    else:
+        # Тестовый сбор
+        print("Starting ETH Options collection...")
+        result = collector.run_collection_cycle()
+        print(f"Collection complete: {result} options processed")
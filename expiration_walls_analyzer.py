@@ -17,9 +17,9 @@ logger = logging.getLogger(__name__)
 
 
 
-def get_last_friday_next_month() -> datetime:
+def get_last_friday_next_month(now: Optional[datetime] = None) -> datetime:
     """Получить последнюю пятницу следующего месяца (экспирация 8:00 UTC)"""
-    now = datetime.now()
+    now = now or datetime.now()
     
     if now.month == 12:
         next_month = 1
@@ -45,14 +45,17 @@ class ExpirationWallsAnalyzer:
         self.wall_threshold = 500  # Минимальный OI для стенки
         self.max_expiration = get_last_friday_next_month()
 
-    def get_expiration_walls(self, asset: str) -> Optional[Dict[str, Any]]:
-        """Получить стенки опционов для ближайшей экспирации"""
+    def get_expiration_walls(self, asset: str, as_of: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """Получить стенки опционов для ближайшей экспирации (as_of - на момент времени)"""
         try:
+            now = as_of or datetime.now()
+            max_expiration = get_last_friday_next_month(now) if as_of else self.max_expiration
+            
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
 
-            # Получаем данные по страйкам и экспирациям
-            cutoff = int((datetime.now() - timedelta(hours=24)).timestamp())
+            # Получаем данные по страйкам и экспирациям (dte группы - текущий, т.е. минимальный за окно)
+            cutoff = int((now - timedelta(hours=24)).timestamp())
             
             cursor.execute('''
                 SELECT 
@@ -60,18 +63,18 @@ class ExpirationWallsAnalyzer:
                     option_type,
                     expiry_date,
                     SUM(open_interest) as total_oi,
-                    dte
+                    MIN(dte) as min_dte
                 FROM all_positions_tracking
                 WHERE asset = ? 
-                  AND timestamp > ?
+                  AND timestamp > ? AND timestamp <= ?
                   AND open_interest > 0
                   AND dte > 0
                   AND expiry_date <= ?
                   AND dte < 60
                 GROUP BY strike, option_type, expiry_date
                 HAVING total_oi > ?
-                ORDER BY dte ASC, total_oi DESC
-            ''', (asset, cutoff, self.max_expiration.strftime('%Y-%m-%d'), self.wall_threshold))
+                ORDER BY min_dte ASC, total_oi DESC
+            ''', (asset, cutoff, int(now.timestamp()), max_expiration.strftime('%Y-%m-%d'), self.wall_threshold))
             
             rows = cursor.fetchall()
             conn.close()
@@ -80,39 +83,7 @@ class ExpirationWallsAnalyzer:
                 logger.warning(f"No expiration walls found for {asset}")
                 return None
             
-            # Группируем по экспирациям
-            expirations = {}
-            for row in rows:
-                strike, option_type, expiry, oi, dte = row
-                
-                if expiry not in expirations:
-                    expirations[expiry] = {
-                        'calls': [],
-                        'puts': [],
-                        'dte': dte
-                    }
-                
-                wall_data = {'strike': strike, 'oi': oi}
-                
-                if option_type == 'Call':
-                    expirations[expiry]['calls'].append(wall_data)
-                else:
-                    expirations[expiry]['puts'].append(wall_data)
-            
-            # Берём ближайшую экспирацию
-            nearest_expiry = min(expirations.keys(), key=lambda x: expirations[x]['dte'])
-            exp_data = expirations[nearest_expiry]
-            
-            # Анализируем стенки
-            analysis = self._analyze_walls(
-                exp_data['calls'][:10],
-                exp_data['puts'][:10],
-                asset,
-                nearest_expiry,
-                exp_data['dte']
-            )
-            
-            return analysis
+            return self.walls_from_rows(rows, asset, now)
 
         except Exception as e:
             logger.error(f"Error analyzing expiration walls for {asset}: {e}")
@@ -120,8 +91,44 @@ class ExpirationWallsAnalyzer:
             traceback.print_exc()
             return None
 
+    def walls_from_rows(self, rows: List, asset: str, now: datetime) -> Dict[str, Any]:
+        """Анализ по строкам (strike, option_type, expiry_date, total_oi, dte), dte ASC, OI DESC"""
+        # Группируем по экспирациям
+        expirations = {}
+        for row in rows:
+            strike, option_type, expiry, oi, dte = row
+            
+            if expiry not in expirations:
+                expirations[expiry] = {
+                    'calls': [],
+                    'puts': [],
+                    'dte': dte
+                }
+            
+            wall_data = {'strike': strike, 'oi': oi}
+            
+            if option_type == 'Call':
+                expirations[expiry]['calls'].append(wall_data)
+            else:
+                expirations[expiry]['puts'].append(wall_data)
+        
+        # Берём ближайшую экспирацию
+        nearest_expiry = min(expirations.keys(), key=lambda x: expirations[x]['dte'])
+        exp_data = expirations[nearest_expiry]
+        
+        # Анализируем стенки
+        return self._analyze_walls(
+            exp_data['calls'][:10],
+            exp_data['puts'][:10],
+            asset,
+            nearest_expiry,
+            exp_data['dte'],
+            now
+        )
+
     def _analyze_walls(self, call_walls: List, put_walls: List, 
-                       asset: str, expiration: str, dte: int) -> Dict[str, Any]:
+                       asset: str, expiration: str, dte: int,
+                       now: Optional[datetime] = None) -> Dict[str, Any]:
         """Анализ стенок и их влияния на цену"""
         
         # Сортируем по OI
@@ -151,7 +158,7 @@ class ExpirationWallsAnalyzer:
             'asset': asset,
             'expiration': expiration,
             'dte': dte,
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': (now or datetime.now()).isoformat(),
             'magnetic_levels': magnetic_levels,
             'pressure_analysis': pressure,
             'call_walls': call_walls[:5],
@@ -220,12 +227,12 @@ class ExpirationWallsAnalyzer:
             logger.error(f"Error saving walls analysis: {e}")
 
 
-def get_expiration_walls_data(asset: str) -> Optional[Dict[str, Any]]:
-    """Функция для DataIntegrator"""
+def get_expiration_walls_data(asset: str, as_of: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """Функция для DataIntegrator (исторические запросы as_of в JSON не пишутся)"""
     analyzer = ExpirationWallsAnalyzer()
-    analysis = analyzer.get_expiration_walls(asset)
+    analysis = analyzer.get_expiration_walls(asset, as_of=as_of)
     
-    if analysis:
+    if analysis and as_of is None:
         analyzer.save_analysis(analysis)
     
     return analysis
@@ -59,6 +59,9 @@ class FuturesDataMonitor:
         print(datetime.now().strftime('[%H:%M:%S] Futures + Spot'))
         print("="*80)
         
+        # Строки копятся и пишутся одной короткой транзакцией после сетевых запросов,
+        # чтобы не держать блокировку futures_data.db на время цикла
+        futures_rows, spot_rows = [], []
         for symbol in self.symbols:
             ticker = self.fetch_ticker(symbol, 'linear')
             if ticker:
@@ -67,22 +70,14 @@ class FuturesDataMonitor:
                 vol = float(ticker.get('volume24h', 0))
                 oi = float(ticker.get('openInterest', 0))
                 
-                self.conn.execute("""
-                    INSERT OR REPLACE INTO futures_ticker 
-                    (timestamp, symbol, last_price, volume_24h, open_interest, funding_rate)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (ts, symbol, price, vol, oi, funding))
+                futures_rows.append((ts, symbol, price, vol, oi, funding))
                 
                 spot_ticker = self.fetch_ticker(symbol, 'spot')
                 if spot_ticker:
                     spot_price = float(spot_ticker['lastPrice'])
                     spot_vol = float(spot_ticker.get('volume24h', 0))
                     
-                    self.conn.execute("""
-                        INSERT OR REPLACE INTO spot_data 
-                        (timestamp, symbol, last_price, volume_24h)
-                        VALUES (?, ?, ?, ?)
-                    """, (ts, symbol, spot_price, spot_vol))
+                    spot_rows.append((ts, symbol, spot_price, spot_vol))
                     
                     basis = price - spot_price
                     basis_pct = (basis / spot_price) * 100 if spot_price > 0 else 0
@@ -91,6 +86,16 @@ class FuturesDataMonitor:
                           (symbol, price, spot_price, basis_pct))
             time.sleep(0.2)
         
+        self.conn.executemany("""
+            INSERT OR REPLACE INTO futures_ticker 
+            (timestamp, symbol, last_price, volume_24h, open_interest, funding_rate)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, futures_rows)
+        self.conn.executemany("""
+            INSERT OR REPLACE INTO spot_data 
+            (timestamp, symbol, last_price, volume_24h)
+            VALUES (?, ?, ?, ?)
+        """, spot_rows)
         self.conn.commit()
         print("="*80 + "\n")
     
@@ -2,13 +2,12 @@
 # -*- coding: utf-8 -*-
 """GAMMA EXPOSURE CALCULATOR - ALL 6 ASSETS [BTC/ETH/SOL/XRP/DOGE/MNT]"""
 
-import sqlite3, pandas as pd, numpy as np, json, logging
+import sqlite3, pandas as pd, numpy as np, logging
 from datetime import datetime
-from scipy.stats import norm
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 from pathlib import Path
+from lazy_imports import norm, plt
+from analytics_cache import get_analytics_cache, latest_snapshot_ts, load_snapshot
+from results_log import append_result
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -35,8 +34,9 @@ class BlackScholesGreeks:
 class GammaExposureCalculator:
     def __init__(self, symbol):
         self.symbol, self.spot_price, self.options_data = symbol, None, None
+        self.snapshot_ts = None
         self.gex_by_strike, self.total_gex, self.zero_gamma_level = {}, 0, None
-        for p in ['logs', 'charts', 'data/gex']: Path(p).mkdir(parents=True, exist_ok=True)
+        Path('logs').mkdir(parents=True, exist_ok=True)
     
     def get_spot_price(self):
         try:
@@ -53,14 +53,13 @@ class GammaExposureCalculator:
         return None
     
     def load_options_data(self):
+        """Строки последнего снапшота (GEX считается по одному снапшоту, не по всей истории)"""
         try:
-            conn = sqlite3.connect(OI_DB_PATH)
-            query = """SELECT strike, expiry_date, option_type, open_interest, spot_price, dte, volume_24h
-                FROM all_positions_tracking WHERE asset = ? AND open_interest > 0 AND dte > 0 ORDER BY strike"""
-            self.options_data = pd.read_sql_query(query, conn, params=(self.symbol,))
-            conn.close()
+            self.snapshot_ts = latest_snapshot_ts(self.symbol, db_path=OI_DB_PATH)
+            if self.snapshot_ts is None: return pd.DataFrame()
+            self.options_data = load_snapshot(self.symbol, self.snapshot_ts, OI_DB_PATH)
             if not self.options_data.empty:
-                logger.info(f"✅ Loaded {len(self.options_data)} options for {self.symbol}")
+                logger.info(f"✅ Loaded {len(self.options_data)} options for {self.symbol} @ {datetime.fromtimestamp(self.snapshot_ts)}")
                 logger.info(f"   Strikes: {self.options_data['strike'].min():.0f} - {self.options_data['strike'].max():.0f}")
                 logger.info(f"   Expirations: {sorted(self.options_data['expiry_date'].unique())[:5]}")
                 return self.options_data
@@ -69,37 +68,21 @@ class GammaExposureCalculator:
         return pd.DataFrame()
     
     def calculate_gamma_exposure(self):
-        if self.options_data is None or self.options_data.empty or not self.spot_price: return {}
-        gex_by_strike, processed = {}, 0
-        for _, row in self.options_data.iterrows():
-            try:
-                strike, dte, oi = float(row['strike']), int(row['dte']), float(row['open_interest'])
-                T = max(dte / 365.0, 1/365)
-                opt_type = str(row['option_type']).lower()
-                bs = BlackScholesGreeks(self.spot_price, strike, T, RISK_FREE_RATE, DEFAULT_IV, opt_type)
-                gex = bs.gamma() * oi * CONTRACT_MULTIPLIER * self.spot_price
-                if opt_type == 'put': gex = -gex
-                gex_by_strike[strike] = gex_by_strike.get(strike, 0) + gex
-                processed += 1
-            except: continue
-        self.gex_by_strike = dict(sorted(gex_by_strike.items()))
-        self.total_gex = sum(gex_by_strike.values())
-        logger.info(f"✅ GEX: {len(gex_by_strike)} strikes from {processed} options | Total: ${self.total_gex:,.0f}")
+        """Результат снапшота из analytics_cache: считается один раз и публикуется для data_integration"""
+        if self.options_data is None or self.options_data.empty: return {}
+        result = get_analytics_cache().get_or_compute('gex', self.symbol, self.snapshot_ts, self.options_data)
+        if not result: return {}
+        self.spot_price = result['spot_price']
+        self.gex_by_strike = {float(k): v for k, v in result['gex_by_strike'].items()}
+        self.total_gex, self.zero_gamma_level = result['total_gex'], result['zero_gamma_level']
+        logger.info(f"✅ GEX: {len(self.gex_by_strike)} strikes from {result['options_count']} options | Total: ${self.total_gex:,.0f}")
         return self.gex_by_strike
     
     def find_zero_gamma_level(self):
-        if not self.gex_by_strike or len(self.gex_by_strike) < 2: return None
-        strikes, gex_values = np.array(list(self.gex_by_strike.keys())), np.array(list(self.gex_by_strike.values()))
-        sign_changes = np.where(np.diff(np.sign(gex_values)))[0]
-        if len(sign_changes) > 0:
-            idx = sign_changes[np.argmin(np.abs(strikes[sign_changes] - self.spot_price))]
-            x1, x2, y1, y2 = strikes[idx], strikes[idx+1], gex_values[idx], gex_values[idx+1]
-            if y2 != y1:
-                self.zero_gamma_level = x1 - y1 * (x2 - x1) / (y2 - y1)
-                distance_pct = abs(self.spot_price - self.zero_gamma_level) / self.spot_price * 100
-                logger.info(f"✅ Zero Gamma: ${self.zero_gamma_level:,.2f} ({distance_pct:.1f}% from spot)")
-                return self.zero_gamma_level
-        return None
+        if self.zero_gamma_level and self.spot_price:
+            distance_pct = abs(self.spot_price - self.zero_gamma_level) / self.spot_price * 100
+            logger.info(f"✅ Zero Gamma: ${self.zero_gamma_level:,.2f} ({distance_pct:.1f}% from spot)")
+        return self.zero_gamma_level
     
     def save_to_database(self):
         try:
@@ -119,6 +102,7 @@ class GammaExposureCalculator:
     
     def plot_gamma_exposure(self):
         if not self.gex_by_strike: return
+        Path('charts').mkdir(parents=True, exist_ok=True)
         strikes, gex_values = list(self.gex_by_strike.keys()), list(self.gex_by_strike.values())
         fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 10))
         colors = ['green' if g > 0 else 'red' for g in gex_values]
@@ -141,34 +125,32 @@ class GammaExposureCalculator:
         plt.close()
         logger.info(f"✅ Chart: {filename}")
     
-    def export_to_json(self):
-        data = {'symbol': self.symbol, 'timestamp': datetime.now().isoformat(), 'spot_price': self.spot_price, 
+    def export_result(self):
+        """Запись в журнал data/results/gex с временем снапшота"""
+        data = {'symbol': self.symbol, 'timestamp': datetime.fromtimestamp(self.snapshot_ts).isoformat(), 'spot_price': self.spot_price, 
                 'total_gex': self.total_gex, 'zero_gamma_level': self.zero_gamma_level,
                 'gex_by_strike': {str(k): v for k, v in self.gex_by_strike.items()}}
-        filename = f'data/gex/{self.symbol}_gex_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-        with open(filename, 'w') as f: json.dump(data, f, indent=2)
-        logger.info(f"✅ JSON: {filename}")
-        return filename
+        append_result('gex', self.symbol, data, ts=self.snapshot_ts)
+        logger.info(f"✅ Logged: gex/{self.symbol} @ {data['timestamp']}")
     
-    def run_full_calculation(self):
+    def run_full_calculation(self, plot=False):
         logger.info(f"\n{'='*80}\n🧮 GAMMA EXPOSURE: {self.symbol}\n{'='*80}")
-        if not self.get_spot_price(): logger.error("❌ No spot price"); return False
         if self.load_options_data().empty: logger.error("❌ No options data"); return False
         if not self.calculate_gamma_exposure(): logger.error("❌ GEX calculation failed"); return False
         self.find_zero_gamma_level()
         self.save_to_database()
-        self.plot_gamma_exposure()
-        self.export_to_json()
+        if plot: self.plot_gamma_exposure()
+        self.export_result()
         logger.info(f"✅ {self.symbol} COMPLETE!\n")
         return True
 
-def main():
+def main(plot=False):
     print("="*80 + "\n🧮 GAMMA EXPOSURE - BTC/ETH/SOL/XRP/DOGE/MNT\n" + "="*80 + "\n")
     results = {}
     for symbol in SYMBOLS:
         try:
             calc = GammaExposureCalculator(symbol)
-            success = calc.run_full_calculation()
+            success = calc.run_full_calculation(plot=plot)
             results[symbol] = {'success': success, 'total_gex': calc.total_gex if success else 0,
                               'zero_gamma': calc.zero_gamma_level, 'spot_price': calc.spot_price}
         except Exception as e:
@@ -183,4 +165,6 @@ def main():
             print(f"\n❌ {symbol}: FAILED")
     print("\n" + "="*80 + "\n✅ STAGE 1.3.1 COMPLETE!\n" + "="*80 + "\n")
 
-if __name__ == "__main__": main()
+if __name__ == "__main__":
+    import sys
+    main(plot='--plot' in sys.argv)
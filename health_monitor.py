@@ -7,12 +7,14 @@ HEALTH MONITOR - Мониторинг работы всех систем
 
 import os
 import psutil
-import requests
 import sqlite3
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import logging
 
+from notification_dispatcher import notify_telegram
+from supervisor import monitor_states
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -32,9 +34,15 @@ class HealthMonitor:
         ]
     
     def check_processes(self) -> dict:
-        """Проверка запущенных процессов"""
+        """Проверка запущенных процессов (задач supervisor.py, если он работает)"""
         status = {}
         
+        supervisor = monitor_states()
+        if supervisor:
+            for proc_name in self.critical_processes:
+                status[proc_name] = 'RUNNING' if supervisor[proc_name] else 'STOPPED'
+            return status
+        
         for proc_name in self.critical_processes:
             is_running = any(proc_name in p.cmdline() for p in psutil.process_iter(['cmdline']))
             status[proc_name] = 'RUNNING' if is_running else 'STOPPED'
@@ -50,7 +58,7 @@ class HealthMonitor:
             conn = sqlite3.connect('./data/unlimited_oi.db')
             cursor = conn.cursor()
             
-            cursor.execute('SELECT MAX(timestamp) FROM all_positions_tracking')
+            cursor.execute('SELECT MAX(timestamp) FROM oi_snapshots')
             last_timestamp = cursor.fetchone()[0]
             conn.close()
             
@@ -105,20 +113,12 @@ class HealthMonitor:
         }
     
     def send_to_telegram(self, message: str):
-        """Отправка в Telegram"""
+        """Отправка в Telegram (через очередь; при выходе процесса outbox дожидается доставки)"""
         try:
-            url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
-            data = {
-                'chat_id': self.admin_chat_id,
-                'text': message,
-                'parse_mode': 'Markdown'
-            }
-            response = requests.post(url, data=data, timeout=10)
-            
-            if response.status_code == 200:
-                logger.info("✅ Health report sent to admin")
+            if notify_telegram(self.admin_chat_id, message, 'Markdown'):
+                logger.info("✅ Health report queued for admin")
             else:
-                logger.error(f"❌ Telegram error: {response.status_code}")
+                logger.error("❌ Telegram: admin chat not configured")
         except Exception as e:
             logger.error(f"❌ Failed to send report: {e}")
     
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+INDICATOR STATE - Потоковые RSI (Wilder) и MACD для опционных рядов
+Состояние хранится по (asset, series) в таблице indicator_state и
+обновляется один раз на новый снапшот из snapshot_summary. После
+рестарта состояние подхватывается из БД, чтение индикатора - O(1).
+"""
+
+import sqlite3
+import logging
+from typing import Dict, Any, List, Optional
+
+from snapshot_summary import OI_DB_PATH, init_summary_table
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RSI_PERIOD = 14
+MACD_FAST = 12
+MACD_SLOW = 26
+MACD_SIGNAL = 9
+
+# Ряды, которые строятся из snapshot_summary
+SERIES = {
+    'pcr': lambda row: row['put_oi'] / row['call_oi'] if row['call_oi'] > 0 else None,
+    'gex': lambda row: row['put_oi'] + row['call_oi'],
+    'oi': lambda row: row['put_oi'] + row['call_oi'],
+}
+
+_STATE_FIELDS = (
+    'last_timestamp', 'last_value', 'samples',
+    'avg_gain', 'avg_loss',
+    'ema_fast', 'ema_slow', 'ema_signal',
+)
+
+
+def _ema_step(prev: Optional[float], value: float, period: int) -> float:
+    if prev is None:
+        return value
+    alpha = 2.0 / (period + 1)
+    return prev + alpha * (value - prev)
+
+
+class IndicatorStateStore:
+    """Персистентное состояние потоковых индикаторов"""
+
+    def __init__(self, db_path: str = OI_DB_PATH):
+        self.db_path = db_path
+        self._state: Dict[tuple, Dict[str, Any]] = {}
+        self._loaded = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        init_summary_table(conn)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS indicator_state (
+                asset TEXT,
+                series TEXT,
+                last_timestamp INTEGER,
+                last_value REAL,
+                samples INTEGER,
+                avg_gain REAL,
+                avg_loss REAL,
+                ema_fast REAL,
+                ema_slow REAL,
+                ema_signal REAL,
+                PRIMARY KEY (asset, series)
+            )
+        """)
+        return conn
+
+    def _load(self, conn: sqlite3.Connection):
+        """Поднять состояние из БД (один раз за процесс)"""
+        if self._loaded:
+            return
+        for row in conn.execute("SELECT * FROM indicator_state"):
+            self._state[(row['asset'], row['series'])] = {f: row[f] for f in _STATE_FIELDS}
+        self._loaded = True
+
+    def _new_state(self) -> Dict[str, Any]:
+        state = dict.fromkeys(_STATE_FIELDS)
+        state.update(last_timestamp=0, samples=0, avg_gain=0.0, avg_loss=0.0)
+        return state
+
+    def _update(self, state: Dict[str, Any], value: float):
+        """Один шаг: Wilder RSI + EMA fast/slow/signal"""
+        prev = state['last_value']
+        state['samples'] += 1
+        n_deltas = state['samples'] - 1
+
+        if prev is not None:
+            delta = value - prev
+            gain = delta if delta > 0 else 0.0
+            loss = -delta if delta < 0 else 0.0
+
+            if n_deltas <= RSI_PERIOD:
+                # Прогрев: простое среднее первых RSI_PERIOD изменений
+                state['avg_gain'] += (gain - state['avg_gain']) / n_deltas
+                state['avg_loss'] += (loss - state['avg_loss']) / n_deltas
+            else:
+                state['avg_gain'] = (state['avg_gain'] * (RSI_PERIOD - 1) + gain) / RSI_PERIOD
+                state['avg_loss'] = (state['avg_loss'] * (RSI_PERIOD - 1) + loss) / RSI_PERIOD
+
+        state['ema_fast'] = _ema_step(state['ema_fast'], value, MACD_FAST)
+        state['ema_slow'] = _ema_step(state['ema_slow'], value, MACD_SLOW)
+        state['ema_signal'] = _ema_step(state['ema_signal'], state['ema_fast'] - state['ema_slow'], MACD_SIGNAL)
+        state['last_value'] = value
+
+    def _apply(self, states: Dict[str, Dict[str, Any]], row) -> None:
+        """Применить одну строку snapshot_summary ко всем рядам актива"""
+        for series, extract in SERIES.items():
+            state = states[series]
+            if row['timestamp'] <= state['last_timestamp']:
+                continue
+            value = extract(row)
+            if value is not None:
+                self._update(state, value)
+            state['last_timestamp'] = row['timestamp']
+
+    def sync(self, asset: str) -> int:
+        """Догнать состояние по новым снапшотам из snapshot_summary"""
+        conn = self._connect()
+        try:
+            self._load(conn)
+
+            states = {}
+            for series in SERIES:
+                states[series] = self._state.setdefault((asset, series), self._new_state())
+            since = min(state['last_timestamp'] for state in states.values())
+
+            rows = conn.execute("""
+                SELECT timestamp, put_oi, call_oi FROM snapshot_summary
+                WHERE asset = ? AND timestamp > ?
+                ORDER BY timestamp ASC
+            """, (asset, since)).fetchall()
+
+            if not rows:
+                return 0
+
+            for row in rows:
+                self._apply(states, row)
+
+            conn.executemany(f"""
+                INSERT OR REPLACE INTO indicator_state (asset, series, {', '.join(_STATE_FIELDS)})
+                VALUES (?, ?, {', '.join('?' for _ in _STATE_FIELDS)})
+            """, [(asset, series) + tuple(state[f] for f in _STATE_FIELDS)
+                  for series, state in states.items()])
+            conn.commit()
+            return len(rows)
+
+        except Exception as e:
+            logger.error(f"Error syncing indicator state for {asset}: {e}")
+            return 0
+        finally:
+            conn.close()
+
+    def replay(self, asset: str, checkpoints: List[int]) -> List[Dict[str, Dict[str, Any]]]:
+        """
+        Состояние рядов на каждый момент checkpoints (unix-секунды, по возрастанию)
+        за один проход истории snapshot_summary с нуля; БД и кэш процесса не меняются.
+        """
+        if not checkpoints:
+            return []
+        conn = self._connect()
+        try:
+            rows = conn.execute("""
+                SELECT timestamp, put_oi, call_oi FROM snapshot_summary
+                WHERE asset = ? AND timestamp <= ?
+                ORDER BY timestamp ASC
+            """, (asset, checkpoints[-1])).fetchall()
+        finally:
+            conn.close()
+
+        states = {series: self._new_state() for series in SERIES}
+        snapshots = []
+        i = 0
+        for checkpoint in checkpoints:
+            while i < len(rows) and rows[i]['timestamp'] <= checkpoint:
+                self._apply(states, rows[i])
+                i += 1
+            snapshots.append({series: dict(state) for series, state in states.items()})
+        return snapshots
+
+    def get_rsi(self, asset: str, series: str) -> Optional[float]:
+        """Wilder RSI (None пока не накоплено RSI_PERIOD изменений)"""
+        return rsi_from_state(self._state.get((asset, series)))
+
+    def get_macd(self, asset: str, series: str) -> Optional[Dict[str, float]]:
+        """MACD (None пока не накоплено MACD_SLOW значений)"""
+        return macd_from_state(self._state.get((asset, series)))
+
+
+def rsi_from_state(state: Optional[Dict[str, Any]]) -> Optional[float]:
+    """Wilder RSI из состояния ряда"""
+    if not state or state['samples'] <= RSI_PERIOD:
+        return None
+    if state['avg_loss'] == 0:
+        return 100.0
+    rs = state['avg_gain'] / state['avg_loss']
+    return float(100 - (100 / (1 + rs)))
+
+
+def macd_from_state(state: Optional[Dict[str, Any]]) -> Optional[Dict[str, float]]:
+    """MACD из состояния ряда"""
+    if not state or state['samples'] < MACD_SLOW:
+        return None
+    macd_line = state['ema_fast'] - state['ema_slow']
+    signal_line = state['ema_signal']
+    return {
+        'macd': float(macd_line),
+        'signal': float(signal_line),
+        'histogram': float(macd_line - signal_line)
+    }
+
+
+_store: Optional[IndicatorStateStore] = None
+
+
+def get_store() -> IndicatorStateStore:
+    """Общий store процесса"""
+    global _store
+    if _store is None:
+        _store = IndicatorStateStore()
+    return _store
+
+
+if __name__ == '__main__':
+    store = get_store()
+
+    for asset in ['BTC', 'ETH', 'SOL', 'XRP', 'DOGE', 'MNT']:
+        processed = store.sync(asset)
+        pcr_rsi = store.get_rsi(asset, 'pcr')
+        macd = store.get_macd(asset, 'oi')
+        print(f"{asset}: +{processed} snapshots | "
+              f"PCR RSI: {pcr_rsi if pcr_rsi is None else round(pcr_rsi, 1)} | "
+              f"OI MACD: {macd['histogram'] if macd else None}")
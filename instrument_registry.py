@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+INSTRUMENT REGISTRY - Общий справочник опционных контрактов Bybit
+- Разобранные контракты (asset, expiry, strike, type) с постоянным целым
+  instrument_id: таблица instruments в unlimited_oi.db + словари в памяти
+- /v5/market/instruments-info (все страницы) запрашивается только когда
+  справочник устарел: раз в REFRESH_INTERVAL или после ближайшей экспирации
+  (новые серии Bybit листит в момент экспираций). Листинг сравнивается по
+  хешу списка символов - без изменений ничего не разбирается и не пишется
+- Коллекторы получают готовые Contract и DTE по экспирациям на цикл
+
+Использование:
+    python3 instrument_registry.py [ASSET ...]    # обновить и показать листинг
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+OI_DB_PATH = './data/unlimited_oi.db'
+BASE_URL = 'https://api.bybit.com'
+
+REFRESH_INTERVAL = 3600     # сек между проверками листинга
+EXPIRY_HOUR_UTC = 8         # время экспирации Bybit, если нет deliveryTime
+PAGE_LIMIT = 1000
+
+MONTHS = {
+    'JAN': 1, 'FEB': 2, 'MAR': 3, 'APR': 4, 'MAY': 5, 'JUN': 6,
+    'JUL': 7, 'AUG': 8, 'SEP': 9, 'OCT': 10, 'NOV': 11, 'DEC': 12
+}
+
+
+class Contract(NamedTuple):
+    instrument_id: int
+    symbol: str
+    asset: str
+    expiry: str          # код из символа: 25OCT25
+    expiry_date: str     # 2025-10-25
+    expiry_ts: int       # unix-время экспирации
+    strike: float
+    option_type: str     # Call / Put
+
+
+def init_registry_tables(conn: sqlite3.Connection):
+    """Таблицы справочника (идемпотентно)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS instruments (
+            instrument_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            symbol TEXT UNIQUE,
+            asset TEXT,
+            expiry TEXT,
+            expiry_date TEXT,
+            expiry_ts INTEGER,
+            strike REAL,
+            option_type TEXT,
+            listed INTEGER DEFAULT 1,
+            first_seen INTEGER,
+            last_seen INTEGER
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_instruments_asset ON instruments(asset, listed)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS instrument_listing (
+            asset TEXT PRIMARY KEY,
+            listing_hash TEXT,
+            refreshed_at INTEGER,
+            contracts INTEGER
+        )
+    ''')
+
+
+def parse_symbol(symbol: str, delivery_ms: Optional[int] = None) -> Optional[tuple]:
+    """BTC-25OCT25-110000-C[-USDT] -> (asset, expiry, expiry_date, expiry_ts, strike, option_type)"""
+    parts = symbol.split('-')
+    if len(parts) < 4:
+        return None
+    try:
+        expiry = parts[1]
+        day, month, year = int(expiry[:-5]), MONTHS[expiry[-5:-2]], 2000 + int(expiry[-2:])
+        expiry_dt = datetime(year, month, day, EXPIRY_HOUR_UTC, tzinfo=timezone.utc)
+        strike = float(parts[2])
+    except (KeyError, ValueError):
+        return None
+    expiry_ts = int(delivery_ms) // 1000 if delivery_ms else int(expiry_dt.timestamp())
+    option_type = 'Call' if parts[3] == 'C' else 'Put'
+    return parts[0], expiry, expiry_dt.strftime('%Y-%m-%d'), expiry_ts, strike, option_type
+
+
+def fetch_listing(asset: str, base_url: str = BASE_URL) -> Optional[List[dict]]:
+    """Все опционы актива из instruments-info (по курсору страниц); None - ошибка API"""
+    import requests
+
+    items, cursor = [], ''
+    while True:
+        params = {'category': 'option', 'baseCoin': asset, 'limit': PAGE_LIMIT}
+        if cursor:
+            params['cursor'] = cursor
+        response = requests.get(f"{base_url}/v5/market/instruments-info", params=params, timeout=10)
+        if response.status_code != 200:
+            return None
+        data = response.json()
+        if data.get('retCode') != 0:
+            return None
+        items.extend(data['result']['list'])
+        cursor = data['result'].get('nextPageCursor')
+        if not cursor:
+            return items
+
+
+class InstrumentRegistry:
+    """Листинги активов в памяти поверх таблицы instruments"""
+
+    def __init__(self, db_path: str = OI_DB_PATH,
+                 fetch: Callable[[str], Optional[List[dict]]] = fetch_listing,
+                 refresh_interval: int = REFRESH_INTERVAL):
+        self.db_path = db_path
+        self.fetch = fetch
+        self.refresh_interval = refresh_interval
+        self.listings: Dict[str, List[Contract]] = {}
+        self.symbols: Dict[str, Contract] = {}
+        self.ids: Dict[int, Contract] = {}
+        self.state: Dict[str, tuple] = {}   # asset -> (listing_hash, refreshed_at)
+        self._lock = threading.Lock()
+
+        conn = sqlite3.connect(db_path)
+        init_registry_tables(conn)
+        conn.commit()
+        conn.close()
+
+    # ==================== LOAD / REFRESH ====================
+
+    def _load(self, asset: str):
+        """Листинг актива с диска (без сети)"""
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute('''
+            SELECT instrument_id, symbol, asset, expiry, expiry_date, expiry_ts, strike, option_type
+            FROM instruments WHERE asset = ? AND listed = 1
+            ORDER BY expiry_ts, strike, option_type
+        ''', (asset,)).fetchall()
+        state = conn.execute('SELECT listing_hash, refreshed_at FROM instrument_listing WHERE asset = ?',
+                             (asset,)).fetchone()
+        conn.close()
+        self._index(asset, [Contract(*row) for row in rows])
+        self.state[asset] = state or ('', 0)
+
+    def _index(self, asset: str, contracts: List[Contract]):
+        for contract in self.listings.get(asset, []):
+            self.symbols.pop(contract.symbol, None)
+        self.listings[asset] = contracts
+        for contract in contracts:
+            self.symbols[contract.symbol] = contract
+            self.ids[contract.instrument_id] = contract
+
+    def _stale(self, asset: str, now: int) -> bool:
+        _, refreshed_at = self.state[asset]
+        if now - refreshed_at >= self.refresh_interval:
+            return True
+        # После проверки прошла экспирация - серия снята, рядом листятся новые
+        passed = next((c.expiry_ts for c in self.listings[asset] if c.expiry_ts > refreshed_at), None)
+        return passed is not None and passed <= now
+
+    def refresh(self, asset: str, force: bool = False) -> bool:
+        """Сверить листинг с API; -> True, если набор контрактов изменился"""
+        now = int(time.time())
+        if asset not in self.state:
+            self._load(asset)
+        if not force and not self._stale(asset, now):
+            return False
+
+        try:
+            items = self.fetch(asset)
+        except Exception as e:
+            logger.error(f"Instruments {asset}: {e}")
+            items = None
+        if items is None:
+            return False   # работаем со старым листингом
+
+        delivery = {item['symbol']: item.get('deliveryTime') for item in items}
+        listing_hash = hashlib.sha1('\n'.join(sorted(delivery)).encode()).hexdigest()
+
+        conn = sqlite3.connect(self.db_path)
+        if listing_hash == self.state[asset][0]:
+            conn.execute('UPDATE instrument_listing SET refreshed_at = ? WHERE asset = ?', (now, asset))
+            conn.commit()
+            conn.close()
+            self.state[asset] = (listing_hash, now)
+            return False
+
+        # Разбираем только новые символы, известные сохраняют instrument_id
+        known = {row[0]: row[1] for row in conn.execute(
+            'SELECT symbol, instrument_id FROM instruments WHERE asset = ?', (asset,))}
+        for symbol in delivery:
+            if symbol in known:
+                continue
+            parsed = parse_symbol(symbol, int(delivery[symbol]) if delivery[symbol] else None)
+            if parsed is None or parsed[0] != asset:
+                continue
+            conn.execute('''
+                INSERT INTO instruments
+                (symbol, asset, expiry, expiry_date, expiry_ts, strike, option_type, listed, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?, ?)
+            ''', (symbol, *parsed, now, now))
+
+        conn.execute('UPDATE instruments SET listed = 0 WHERE asset = ? AND listed = 1', (asset,))
+        conn.executemany('UPDATE instruments SET listed = 1, last_seen = ? WHERE symbol = ?',
+                         [(now, symbol) for symbol in delivery])
+        conn.execute('INSERT OR REPLACE INTO instrument_listing VALUES (?, ?, ?, ?)',
+                     (asset, listing_hash, now, len(delivery)))
+        conn.commit()
+        conn.close()
+
+        previous = len(self.listings.get(asset, []))
+        self._load(asset)
+        logger.info(f"Instruments {asset}: {previous} -> {len(self.listings[asset])} contracts")
+        return True
+
+    # ==================== LOOKUPS ====================
+
+    def contracts(self, asset: str) -> List[Contract]:
+        """Действующие контракты актива (по экспирации, страйку), листинг сверяется при устаревании"""
+        with self._lock:
+            self.refresh(asset)
+            return self.listings[asset]
+
+    def by_symbol(self, symbol: str) -> Optional[Contract]:
+        return self.symbols.get(symbol)
+
+    def by_id(self, instrument_id: int) -> Optional[Contract]:
+        contract = self.ids.get(instrument_id)
+        if contract is None:
+            # Снятые с листинга контракты - только с диска
+            conn = sqlite3.connect(self.db_path)
+            row = conn.execute('''
+                SELECT instrument_id, symbol, asset, expiry, expiry_date, expiry_ts, strike, option_type
+                FROM instruments WHERE instrument_id = ?
+            ''', (instrument_id,)).fetchone()
+            conn.close()
+            if row:
+                contract = self.ids[instrument_id] = Contract(*row)
+        return contract
+
+    def dte_by_expiry(self, asset: str, now: Optional[datetime] = None) -> Dict[str, int]:
+        """DTE экспираций актива на цикл: целые дни от now до полуночи даты экспирации"""
+        now = now or datetime.now()
+        dates = {c.expiry_date for c in self.listings.get(asset, [])}
+        return {d: (datetime.strptime(d, '%Y-%m-%d') - now).days for d in dates}
+
+
+_registries: Dict[str, InstrumentRegistry] = {}
+
+
+def get_instrument_registry(db_path: str = OI_DB_PATH) -> InstrumentRegistry:
+    """Общий справочник процесса (один на файл БД)"""
+    key = os.path.abspath(db_path)
+    if key not in _registries:
+        _registries[key] = InstrumentRegistry(db_path)
+    return _registries[key]
+
+
+if __name__ == '__main__':
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    registry = get_instrument_registry()
+    for asset in sys.argv[1:] or ['BTC', 'ETH', 'SOL', 'XRP', 'DOGE', 'MNT']:
+        registry.refresh(asset, force=True)
+        contracts = registry.contracts(asset)
+        expiries = registry.dte_by_expiry(asset)
+        print(f"{asset}: {len(contracts)} contracts, {len(expiries)} expiries "
+              f"({', '.join(f'{d}:{dte}d' for d, dte in sorted(expiries.items())[:6])})")
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+IV HISTORY - История ATM implied volatility и IV Rank / Percentile
+- На каждом снапшоте коллектор передаёт цепочку (экспирация, страйк, тип, mark IV):
+  ATM IV экспирации - линейно по страйку между соседями спота, на фиксированные
+  тенора (7d/30d/60d/90d) - линейно по полной дисперсии sigma^2 * T
+- Ряд пишется в iv_history (unlimited_oi.db), ключ (asset, tenor, timestamp)
+- Скользящие окна (30d / 252d) держат дерево Фенвика по значениям IV с шагом
+  0.01 пункта + монотонные деки для min/max: обновление и запрос rank/percentile
+  за O(log n), без чтения истории
+
+Использование:
+    python3 iv_history.py [ASSET]   # IV Rank / Percentile по истории
+    python3 iv_history.py bench     # время обновления 6 активов
+"""
+
+import logging
+import sqlite3
+import time
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+OI_DB_PATH = './data/unlimited_oi.db'
+ASSETS = ['BTC', 'ETH', 'SOL', 'XRP', 'DOGE', 'MNT']
+
+TENORS = {'7d': 7, '30d': 30, '60d': 60, '90d': 90}   # дней
+LOOKBACKS = {'30d': 30, '252d': 252}                 # дней
+DEFAULT_TENOR = '30d'
+DEFAULT_LOOKBACK = '252d'
+
+IV_RESOLUTION = 0.01   # пунктов IV (Bybit markIv - 4 знака доли = 0.01%)
+IV_MAX = 500.0         # %, выше - в последний бакет
+EXPIRY_HOUR_UTC = 8    # опционы Bybit экспирируются в 08:00 UTC
+
+Chain = Iterable[Tuple[str, float, str, float]]  # (expiry_date, strike, option_type, iv %)
+
+
+def init_iv_table(conn: sqlite3.Connection):
+    """Таблица ряда ATM IV (идемпотентно)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS iv_history (
+            asset TEXT,
+            tenor TEXT,
+            timestamp INTEGER,
+            atm_iv REAL,
+            PRIMARY KEY (asset, tenor, timestamp)
+        )
+    ''')
+
+
+# ==================== ATM IV ====================
+
+def _years_to_expiry(expiry_date: str, ts: int) -> float:
+    expiry = datetime.strptime(expiry_date, '%Y-%m-%d').replace(hour=EXPIRY_HOUR_UTC, tzinfo=timezone.utc)
+    return (expiry.timestamp() - ts) / (365 * 86400)
+
+
+def _interp(x: float, xs: List[float], ys: List[float]) -> float:
+    """Линейная интерполяция по возрастающим xs, за краями - крайнее значение"""
+    i = bisect_left(xs, x)
+    if i == 0:
+        return ys[0]
+    if i == len(xs):
+        return ys[-1]
+    x0, x1 = xs[i - 1], xs[i]
+    return ys[i - 1] + (ys[i] - ys[i - 1]) * (x - x0) / (x1 - x0)
+
+
+def atm_iv_by_expiry(spot: float, chain: Chain, ts: int) -> List[Tuple[float, float]]:
+    """[(T лет, ATM IV %)] по экспирациям: IV страйка = среднее call/put, интерполяция к споту"""
+    by_expiry: Dict[str, Dict[float, List[float]]] = {}
+    for expiry_date, strike, _, iv in chain:
+        if iv and iv > 0:
+            by_expiry.setdefault(expiry_date, {}).setdefault(float(strike), []).append(float(iv))
+
+    points = []
+    for expiry_date, strikes in by_expiry.items():
+        T = _years_to_expiry(expiry_date, ts)
+        if T <= 0:
+            continue
+        ks = sorted(strikes)
+        ivs = [sum(strikes[k]) / len(strikes[k]) for k in ks]
+        # Спот вне страйков экспирации - ATM не определён
+        if len(ks) >= 2 and ks[0] <= spot <= ks[-1]:
+            points.append((T, _interp(spot, ks, ivs)))
+    return sorted(points)
+
+
+def atm_iv_by_tenor(spot: float, chain: Chain, ts: int) -> Dict[str, float]:
+    """ATM IV на фиксированные тенора: интерполяция полной дисперсии между экспирациями"""
+    points = atm_iv_by_expiry(spot, chain, ts)
+    if not points:
+        return {}
+    Ts = [T for T, _ in points]
+    variances = [(iv / 100) ** 2 * T for T, iv in points]
+
+    result = {}
+    for tenor, days in TENORS.items():
+        T = days / 365
+        if T < Ts[0]:
+            iv = points[0][1]       # короче ближайшей экспирации - её IV
+        elif T > Ts[-1]:
+            iv = points[-1][1]      # длиннее дальней - её IV
+        else:
+            iv = (max(_interp(T, Ts, variances), 0.0) / T) ** 0.5 * 100
+        result[tenor] = round(iv, 4)
+    return result
+
+
+# ==================== SLIDING WINDOW ====================
+
+class SlidingRank:
+    """
+    Окно (ts, iv) длиной window сек: дерево Фенвика по бакетам IV для числа
+    значений ниже текущего, монотонные деки для min/max, сумма для среднего.
+    """
+
+    def __init__(self, window: int, resolution: float = IV_RESOLUTION, max_value: float = IV_MAX):
+        self.window = window
+        self.resolution = resolution
+        self.size = int(max_value / resolution) + 2
+        self.tree = [0] * (self.size + 1)
+        self.values: Deque[Tuple[int, float, int]] = deque()  # (ts, iv, bucket)
+        self.mins: Deque[Tuple[int, float]] = deque()
+        self.maxs: Deque[Tuple[int, float]] = deque()
+        self.total = 0.0
+
+    def _bucket(self, value: float) -> int:
+        return min(max(int(round(value / self.resolution)), 0), self.size - 1)
+
+    def _add(self, bucket: int, delta: int):
+        i = bucket + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def _count_le(self, bucket: int) -> int:
+        """Число значений в бакетах [0, bucket]"""
+        i, count = bucket + 1, 0
+        while i > 0:
+            count += self.tree[i]
+            i -= i & -i
+        return count
+
+    def push(self, ts: int, value: float):
+        bucket = self._bucket(value)
+        self.values.append((ts, value, bucket))
+        self._add(bucket, 1)
+        self.total += value
+
+        while self.mins and self.mins[-1][1] >= value:
+            self.mins.pop()
+        self.mins.append((ts, value))
+        while self.maxs and self.maxs[-1][1] <= value:
+            self.maxs.pop()
+        self.maxs.append((ts, value))
+
+        self.evict(ts)
+
+    def evict(self, now: int):
+        """Убрать значения старше окна"""
+        cutoff = now - self.window
+        while self.values and self.values[0][0] <= cutoff:
+            old_ts, old_value, old_bucket = self.values.popleft()
+            self._add(old_bucket, -1)
+            self.total -= old_value
+            if self.mins and self.mins[0][0] == old_ts:
+                self.mins.popleft()
+            if self.maxs and self.maxs[0][0] == old_ts:
+                self.maxs.popleft()
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def rank(self, value: float) -> float:
+        """IV Rank: положение value между min и max окна, %"""
+        low, high = self.mins[0][1], self.maxs[0][1]
+        return 50.0 if high == low else (value - low) / (high - low) * 100
+
+    def percentile(self, value: float) -> float:
+        """IV Percentile: доля значений окна строго ниже value, %"""
+        below = self._count_le(self._bucket(value) - 1)
+        return below / len(self.values) * 100
+
+    def summary(self, value: float) -> Dict[str, float]:
+        return {
+            'iv_rank': round(self.rank(value), 2),
+            'iv_percentile': round(self.percentile(value), 2),
+            'iv_min': self.mins[0][1],
+            'iv_max': self.maxs[0][1],
+            'iv_mean': round(self.total / len(self.values), 4),
+            'samples': len(self.values)
+        }
+
+
+# ==================== HISTORY ====================
+
+class IVHistory:
+    """Ряд ATM IV и скользящие окна rank/percentile для всех активов и теноров"""
+
+    def __init__(self, db_path: str = OI_DB_PATH):
+        self.db_path = db_path
+        self.windows: Dict[Tuple[str, str, str], SlidingRank] = {}
+        self.current: Dict[Tuple[str, str], Tuple[int, float]] = {}
+        self.loaded_ts: Dict[str, int] = {}  # последний timestamp, учтённый в окнах
+
+        conn = sqlite3.connect(db_path)
+        init_iv_table(conn)
+        conn.commit()
+        conn.close()
+
+    def _window(self, asset: str, tenor: str, lookback: str) -> SlidingRank:
+        key = (asset, tenor, lookback)
+        if key not in self.windows:
+            self.windows[key] = SlidingRank(LOOKBACKS[lookback] * 86400)
+        return self.windows[key]
+
+    def _push(self, asset: str, tenor: str, ts: int, iv: float):
+        for lookback in LOOKBACKS:
+            self._window(asset, tenor, lookback).push(ts, iv)
+        self.current[(asset, tenor)] = (ts, iv)
+
+    def load(self, asset: str):
+        """
+        Дочитать в окна строки iv_history новее уже учтённых (первый вызов -
+        прогрев за максимальный lookback; дальше - записи других процессов)
+        """
+        cutoff = self.loaded_ts.get(asset, int(time.time()) - max(LOOKBACKS.values()) * 86400)
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute('''
+            SELECT tenor, timestamp, atm_iv FROM iv_history
+            WHERE asset = ? AND timestamp > ?
+            ORDER BY timestamp
+        ''', (asset, cutoff)).fetchall()
+        conn.close()
+        for tenor, ts, iv in rows:
+            self._push(asset, tenor, ts, iv)
+        if rows:
+            self.loaded_ts[asset] = rows[-1][1]
+        else:
+            self.loaded_ts.setdefault(asset, cutoff)
+
+    def record(self, asset: str, ts: int, spot: float, chain: Chain,
+               conn: Optional[sqlite3.Connection] = None) -> Dict[str, float]:
+        """
+        ATM IV снапшота по тенорам: запись в iv_history и обновление окон.
+        conn - соединение коллектора (строки уходят в его транзакцию).
+        """
+        self.load(asset)
+        ivs = atm_iv_by_tenor(spot, chain, ts)
+        if not ivs:
+            return {}
+
+        rows = [(asset, tenor, ts, iv) for tenor, iv in ivs.items()]
+        own = conn is None
+        if own:
+            conn = sqlite3.connect(self.db_path)
+        conn.executemany('INSERT OR REPLACE INTO iv_history VALUES (?, ?, ?, ?)', rows)
+        if own:
+            conn.commit()
+            conn.close()
+
+        for tenor, iv in ivs.items():
+            self._push(asset, tenor, ts, iv)
+        self.loaded_ts[asset] = max(ts, self.loaded_ts.get(asset, ts))
+        return ivs
+
+    def stats(self, asset: str, tenor: str = DEFAULT_TENOR,
+              lookback: str = DEFAULT_LOOKBACK) -> Optional[Dict[str, Any]]:
+        """Текущая ATM IV и её rank / percentile / min / max / mean за lookback"""
+        self.load(asset)
+        current = self.current.get((asset, tenor))
+        if current is None:
+            return None
+        ts, iv = current
+        window = self._window(asset, tenor, lookback)
+        window.evict(int(time.time()))
+        if not len(window):
+            return None
+        return {'asset': asset, 'tenor': tenor, 'lookback': lookback,
+                'timestamp': ts, 'current_iv': iv, **window.summary(iv)}
+
+    def series(self, asset: str, tenor: str = DEFAULT_TENOR, days: int = 252) -> List[Tuple[int, float]]:
+        """Ряд (timestamp, ATM IV) из БД по индексу (asset, tenor, timestamp)"""
+        cutoff = int(time.time()) - days * 86400
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute('''
+            SELECT timestamp, atm_iv FROM iv_history
+            WHERE asset = ? AND tenor = ? AND timestamp > ?
+            ORDER BY timestamp
+        ''', (asset, tenor, cutoff)).fetchall()
+        conn.close()
+        return rows
+
+
+def iv_at(asset: str, ts: int, db_path: str = OI_DB_PATH, max_age: int = 86400) -> Dict[str, float]:
+    """ATM IV по тенорам из последней записи не позже ts (не старше max_age сек)"""
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute('''
+            SELECT tenor, atm_iv FROM iv_history
+            WHERE asset = ? AND timestamp = (
+                SELECT MAX(timestamp) FROM iv_history
+                WHERE asset = ? AND timestamp <= ? AND timestamp > ?
+            )
+        ''', (asset, asset, ts, ts - max_age)).fetchall()
+    except sqlite3.OperationalError:
+        rows = []   # таблицы ещё нет (коллектор не запускался)
+    conn.close()
+    return dict(rows)
+
+
+_histories: Dict[str, IVHistory] = {}
+
+
+def get_iv_history(db_path: str = OI_DB_PATH) -> IVHistory:
+    """Общий экземпляр процесса (окна живут в памяти между снапшотами)"""
+    if db_path not in _histories:
+        _histories[db_path] = IVHistory(db_path)
+    return _histories[db_path]
+
+
+def _bench():
+    """Синтетическая цепочка: время record для 6 активов после года истории"""
+    import random
+    import tempfile
+
+    random.seed(1)
+    history = IVHistory(tempfile.mktemp(suffix='.db'))
+    now = int(time.time())
+    for asset in ASSETS:
+        history.loaded_ts[asset] = now
+        for i in range(252 * 144 // 4):  # год снапшотов каждые 40 мин
+            ts = now - 252 * 86400 + i * 2400
+            for tenor in TENORS:
+                history._push(asset, tenor, ts, round(random.uniform(30, 120), 2))
+
+    expiries = [datetime.fromtimestamp(now + d * 86400, timezone.utc).strftime('%Y-%m-%d')
+                for d in (2, 9, 30, 65, 120)]
+    chain = [(e, k, t, round(random.uniform(40, 90), 2))
+             for e in expiries for k in range(80, 121, 5) for t in ('Call', 'Put')]
+
+    # Запись в БД - в транзакции коллектора; здесь меряется расчёт и окна
+    conn = sqlite3.connect(':memory:')
+    init_iv_table(conn)
+    started = time.perf_counter()
+    for asset in ASSETS:
+        history.record(asset, now, 100.0, chain, conn=conn)
+    elapsed = time.perf_counter() - started
+    print(f"record (ATM IV + {len(TENORS)} tenors × {len(LOOKBACKS)} windows), 6 assets: {elapsed * 1e6:.0f} µs total "
+          f"({elapsed * 1e6 / len(ASSETS):.0f} µs/asset)")
+    print(history.stats('BTC'))
+
+
+if __name__ == '__main__':
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        _bench()
+        sys.exit(0)
+
+    history = get_iv_history()
+    for asset in sys.argv[1:] or ASSETS:
+        for tenor in TENORS:
+            stats = history.stats(asset, tenor)
+            if stats:
+                print(f"{asset} {tenor}: IV {stats['current_iv']:.2f}%  rank {stats['iv_rank']:.1f}  "
+                      f"pct {stats['iv_percentile']:.1f}  ({stats['samples']} samples)")
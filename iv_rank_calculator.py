@@ -2,127 +2,65 @@
 # -*- coding: utf-8 -*-
 """
 IV RANK CALCULATOR - IV Rank и IV Percentile
-Показывает где текущая IV относительно исторического диапазона
+Показывает где текущая ATM IV (тенор 30d) относительно исторического диапазона
 """
 
-import sqlite3
-import json
-import os
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
 
+from iv_history import DEFAULT_TENOR, get_iv_history
+from results_log import append_result
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 class IVRankCalculator:
-    def __init__(self):
+    def __init__(self, tenor=DEFAULT_TENOR):
         self.oi_db = './data/unlimited_oi.db'
-        self.volatility_dir = './data/volatility/'
-        self.output_dir = './data/iv_rank/'
-        os.makedirs(self.output_dir, exist_ok=True)
+        self.tenor = tenor
+        self.iv_history = get_iv_history(self.oi_db)
     
     def get_current_iv(self, asset):
-        """Получить текущую IV из последнего файла volatility"""
-        try:
-            if not os.path.exists(self.volatility_dir):
-                return None
-            
-            # Ищем последний файл с volatility данными
-            files = [f for f in os.listdir(self.volatility_dir) if f.endswith('.json')]
-            if not files:
-                return None
-            
-            latest_file = max(files)
-            with open(os.path.join(self.volatility_dir, latest_file), 'r') as f:
-                data = json.load(f)
-            
-            # Ищем данные по активу
-            for item in data.get('assets', []):
-                if item.get('asset') == asset:
-                    return item.get('realized_vol')
-            
-            return None
-            
-        except Exception as e:
-            logger.error(f"Ошибка получения текущей IV для {asset}: {e}")
-            return None
+        """Текущая ATM IV тенора из истории IV"""
+        stats = self.iv_history.stats(asset, self.tenor)
+        return stats['current_iv'] if stats else None
     
     def get_historical_iv(self, asset, days=252):
-        """Получить историческую IV за период"""
+        """Ряд ATM IV тенора за период"""
         try:
-            history = []
-            
-            # Читаем все файлы volatility за период
-            cutoff_date = (datetime.now() - timedelta(days=days)).strftime('%Y%m%d')
-            
-            if not os.path.exists(self.volatility_dir):
-                return []
-            
-            files = [f for f in os.listdir(self.volatility_dir) 
-                    if f.endswith('.json') and f.split('_')[1] >= cutoff_date]
-            
-            for file in files:
-                try:
-                    with open(os.path.join(self.volatility_dir, file), 'r') as f:
-                        data = json.load(f)
-                    
-                    for item in data.get('assets', []):
-                        if item.get('asset') == asset:
-                            iv = item.get('realized_vol')
-                            if iv:
-                                history.append(iv)
-                except:
-                    continue
-            
-            return history
+            return [iv for _, iv in self.iv_history.series(asset, self.tenor, days)]
             
         except Exception as e:
             logger.error(f"Ошибка получения истории IV для {asset}: {e}")
             return []
     
     def calculate_iv_rank(self, asset):
-        """Рассчитать IV Rank и IV Percentile"""
+        """Рассчитать IV Rank и IV Percentile (скользящие окна истории ATM IV)"""
         try:
-            # Получаем текущую IV
-            current_iv = self.get_current_iv(asset)
-            if current_iv is None:
-                logger.warning(f"⚠️ {asset}: Нет текущей IV")
-                return None
+            stats_52w = self.iv_history.stats(asset, self.tenor, '252d')  # 52 недели
+            stats_30d = self.iv_history.stats(asset, self.tenor, '30d')   # 30 дней
             
-            # Получаем историю
-            history_52w = self.get_historical_iv(asset, days=252)  # 52 недели
-            history_30d = self.get_historical_iv(asset, days=30)   # 30 дней
-            
-            if not history_52w:
+            if not stats_52w:
                 logger.warning(f"⚠️ {asset}: Нет истории IV")
                 return None
             
-            # Рассчитываем IV Rank (52 недели)
-            iv_min = min(history_52w)
-            iv_max = max(history_52w)
-            
-            if iv_max == iv_min:
-                iv_rank = 50
-            else:
-                iv_rank = ((current_iv - iv_min) / (iv_max - iv_min)) * 100
-            
-            # Рассчитываем IV Percentile (52 недели)
-            below_current = len([iv for iv in history_52w if iv < current_iv])
-            iv_percentile = (below_current / len(history_52w)) * 100
-            
-            # Средняя IV за 30 дней
-            avg_iv_30d = sum(history_30d) / len(history_30d) if history_30d else current_iv
+            current_iv = stats_52w['current_iv']
+            iv_rank = stats_52w['iv_rank']
+            iv_percentile = stats_52w['iv_percentile']
+            avg_iv_30d = stats_30d['iv_mean'] if stats_30d else current_iv
             
             result = {
                 'asset': asset,
                 'timestamp': datetime.now().isoformat(),
+                'tenor': self.tenor,
                 'current_iv': round(current_iv, 2),
                 'iv_rank_52w': round(iv_rank, 1),
                 'iv_percentile_52w': round(iv_percentile, 1),
-                'iv_min_52w': round(iv_min, 2),
-                'iv_max_52w': round(iv_max, 2),
+                'iv_min_52w': round(stats_52w['iv_min'], 2),
+                'iv_max_52w': round(stats_52w['iv_max'], 2),
                 'avg_iv_30d': round(avg_iv_30d, 2),
+                'samples_52w': stats_52w['samples'],
                 'interpretation': self._interpret_iv_rank(iv_rank, iv_percentile)
             }
             
@@ -153,14 +91,9 @@ class IVRankCalculator:
             return "NEUTRAL"
     
     def _save_result(self, asset, result):
-        """Сохранить результат"""
+        """Дописать результат в журнал data/results/iv_rank"""
         try:
-            filename = f"{asset}_ivrank_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            filepath = os.path.join(self.output_dir, filename)
-            
-            with open(filepath, 'w') as f:
-                json.dump(result, f, indent=2)
-                
+            append_result('iv_rank', asset, result)
         except Exception as e:
             logger.error(f"Ошибка сохранения IV Rank: {e}")
     
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LAZY IMPORTS - Быстрый старт без тяжёлых зависимостей
+lazy_module() откладывает импорт (matplotlib, sklearn, scipy...) до первого
+обращения к атрибуту. norm - стандартное нормальное распределение на math,
+чтобы Black-Scholes не тянул scipy ради cdf/pdf.
+"""
+
+import importlib
+import math
+from types import ModuleType
+from typing import Callable, Optional
+
+
+class LazyModule(ModuleType):
+    """Модуль, который импортируется при первом обращении к атрибуту"""
+
+    def __init__(self, name: str, on_load: Optional[Callable[[ModuleType], None]] = None):
+        super().__init__(name)
+        self._lazy_name = name
+        self._lazy_on_load = on_load
+        self._lazy_module = None
+
+    def _load(self) -> ModuleType:
+        if self._lazy_module is None:
+            module = importlib.import_module(self._lazy_name)
+            if self._lazy_on_load:
+                self._lazy_on_load(module)
+            self._lazy_module = module
+        return self._lazy_module
+
+    def __getattr__(self, item):
+        if item.startswith('_lazy_'):
+            raise AttributeError(item)
+        return getattr(self._load(), item)
+
+
+def lazy_module(name: str, on_load: Optional[Callable[[ModuleType], None]] = None) -> LazyModule:
+    """Отложенный импорт модуля"""
+    return LazyModule(name, on_load)
+
+
+def _use_agg_backend(pyplot: ModuleType):
+    pyplot.switch_backend('Agg')
+
+
+# pyplot с безголовым бэкендом - загружается только когда реально рисуем
+plt = lazy_module('matplotlib.pyplot', on_load=_use_agg_backend)
+
+
+class _StandardNormal:
+    """Замена scipy.stats.norm (cdf/pdf) для скаляров и numpy-массивов - везде один math.erf"""
+
+    _INV_SQRT_2PI = 1.0 / math.sqrt(2.0 * math.pi)
+
+    @staticmethod
+    def cdf(x):
+        if isinstance(x, (int, float)):
+            return 0.5 * (1.0 + math.erf(x / math.sqrt(2.0)))
+        import numpy as np
+        x = np.asarray(x, dtype=np.float64)
+        erf = np.fromiter(map(math.erf, (x / math.sqrt(2.0)).ravel().tolist()), np.float64, x.size)
+        return 0.5 * (1.0 + erf.reshape(x.shape))
+
+    @classmethod
+    def pdf(cls, x):
+        if isinstance(x, (int, float)):
+            return cls._INV_SQRT_2PI * math.exp(-0.5 * x * x)
+        import numpy as np
+        x = np.asarray(x, dtype=np.float64)
+        return cls._INV_SQRT_2PI * np.exp(-0.5 * x * x)
+
+
+norm = _StandardNormal()
@@ -9,15 +9,22 @@ import time
 import threading
 from datetime import datetime
 
+INSERT_LIQUIDATION = """
+    INSERT INTO liquidations (timestamp, symbol, side, price, quantity, value)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
 class LiquidationsMonitor:
     def __init__(self):
         self.db_path = "data/futures_data.db"
         self.symbols = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'XRPUSDT', 'DOGEUSDT', 'MNTUSDT']
         self.ws_url = "wss://stream.bybit.com/v5/public/linear"
         self.ws = None
+        self.ws_thread = None
         self.conn = None
         self.running = True
         self.liquidations_count = {symbol: 0 for symbol in self.symbols}
+        self.writer = None  # BatchWriter супервизора: пакетная запись вместо коммита на событие
         self.init_database()
     
     def init_database(self):
@@ -54,12 +61,12 @@ class LiquidationsMonitor:
             quantity = float(liq_data.get('size', 0))
             value = price * quantity
             
-            self.conn.execute("""
-                INSERT INTO liquidations 
-                (timestamp, symbol, side, price, quantity, value)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (timestamp, symbol, side, price, quantity, value))
-            self.conn.commit()
+            row = (timestamp, symbol, side, price, quantity, value)
+            if self.writer is not None:
+                self.writer.put(INSERT_LIQUIDATION, row)
+            else:
+                self.conn.execute(INSERT_LIQUIDATION, row)
+                self.conn.commit()
             
             self.liquidations_count[symbol] = self.liquidations_count.get(symbol, 0) + 1
             
@@ -91,9 +98,14 @@ class LiquidationsMonitor:
             on_close=self.on_close,
             on_open=self.on_open
         )
-        ws_thread = threading.Thread(target=self.ws.run_forever)
-        ws_thread.daemon = True
-        ws_thread.start()
+        self.ws_thread = threading.Thread(target=self.ws.run_forever)
+        self.ws_thread.daemon = True
+        self.ws_thread.start()
+    
+    def ensure_connected(self):
+        """Подключиться, если websocket ещё не запущен или упал (для пайплайна)"""
+        if self.ws_thread is None or not self.ws_thread.is_alive():
+            self.connect()
     
     def print_stats(self):
         while self.running:
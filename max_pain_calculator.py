@@ -2,12 +2,12 @@
 # -*- coding: utf-8 -*-
 """MAX PAIN - ДИНАМИЧЕСКИЙ ТОП-5 БЛИЖАЙШИХ ЭКСПИРАЦИЙ"""
 
-import sqlite3, pandas as pd, numpy as np, json, logging
+import sqlite3, pandas as pd, numpy as np, logging
 from datetime import datetime
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 from pathlib import Path
+from lazy_imports import plt
+from analytics_cache import get_analytics_cache, latest_snapshot_ts, load_snapshot
+from results_log import append_result
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -28,7 +28,8 @@ class MaxPainCalculator:
         self.options_data = None
         self.max_pain_by_expiry = {}
         self.overall_max_pain = None
-        for p in ['logs', 'charts', 'data/max_pain']: Path(p).mkdir(parents=True, exist_ok=True)
+        self.snapshot_ts = None
+        Path('logs').mkdir(parents=True, exist_ok=True)
     
     def get_spot_price(self):
         try:
@@ -45,19 +46,16 @@ class MaxPainCalculator:
         return None
     
     def load_options_data(self):
-        """ЗАГРУЖАЕМ ВСЕ (для продолжения сбора), но рассчитываем только топ-5"""
+        """Строки последнего снапшота; расчёт - по TOP-N ближайшим экспирациям с dte <= MAX_DTE"""
         try:
-            conn = sqlite3.connect(OI_DB_PATH)
-            query = f"""SELECT strike, expiry_date, option_type, open_interest, dte
-                FROM all_positions_tracking 
-                WHERE asset = ? AND open_interest > 0 AND dte > 0 AND dte <= {MAX_DTE}
-                ORDER BY dte, strike"""
-            self.options_data = pd.read_sql_query(query, conn, params=(self.symbol,))
-            conn.close()
+            self.snapshot_ts = latest_snapshot_ts(self.symbol, db_path=OI_DB_PATH)
+            if self.snapshot_ts is None:
+                return pd.DataFrame()
+            self.options_data = load_snapshot(self.symbol, self.snapshot_ts, OI_DB_PATH)
             
             if not self.options_data.empty:
                 all_expirations = sorted(self.options_data['expiry_date'].unique())
-                logger.info(f"✅ Loaded {len(self.options_data)} options")
+                logger.info(f"✅ Loaded {len(self.options_data)} options @ {datetime.fromtimestamp(self.snapshot_ts)}")
                 logger.info(f"   Total expirations: {len(all_expirations)}")
                 logger.info(f"   Will calculate TOP-{TOP_N_EXPIRIES} nearest")
                 return self.options_data
@@ -65,71 +63,27 @@ class MaxPainCalculator:
             logger.error(f"Load error: {e}")
         return pd.DataFrame()
     
-    def calculate_max_pain_fast(self, expiry_date):
-        expiry_df = self.options_data[self.options_data['expiry_date'] == expiry_date]
-        if expiry_df.empty:
-            return None, None
-        
-        calls = expiry_df[expiry_df['option_type'] == 'Call']
-        puts = expiry_df[expiry_df['option_type'] == 'Put']
-        strikes = sorted(expiry_df['strike'].unique())
-        
-        if not strikes:
-            return None, None
-        
-        pain_values = []
-        for test_strike in strikes:
-            call_pain = calls[calls['strike'] < test_strike].apply(
-                lambda row: (test_strike - row['strike']) * row['open_interest'], axis=1).sum()
-            put_pain = puts[puts['strike'] > test_strike].apply(
-                lambda row: (row['strike'] - test_strike) * row['open_interest'], axis=1).sum()
-            pain_values.append(call_pain + put_pain)
-        
-        pain_dict = dict(zip(strikes, pain_values))
-        max_pain_strike = strikes[np.argmin(pain_values)]
-        return max_pain_strike, pain_dict
-    
     def calculate_all_max_pain(self):
+        """Результат снапшота из analytics_cache: считается один раз и публикуется для data_integration"""
         if self.options_data is None or self.options_data.empty:
             return {}
         
-        # ДИНАМИЧЕСКИ берем TOP-N ближайших экспираций
-        all_expirations = sorted(self.options_data['expiry_date'].unique())
-        nearest_expirations = all_expirations[:TOP_N_EXPIRIES]
-        
-        logger.info(f"📊 Processing TOP-{len(nearest_expirations)} nearest expirations:")
+        result = get_analytics_cache().get_or_compute('max_pain', self.symbol, self.snapshot_ts, self.options_data)
+        if not result:
+            return {}
         
-        for expiry in nearest_expirations:
-            max_pain, pain_dict = self.calculate_max_pain_fast(expiry)
-            
-            if max_pain:
-                expiry_options = self.options_data[self.options_data['expiry_date'] == expiry]
-                total_oi = expiry_options['open_interest'].sum()
-                call_oi = expiry_options[expiry_options['option_type'] == 'Call']['open_interest'].sum()
-                put_oi = expiry_options[expiry_options['option_type'] == 'Put']['open_interest'].sum()
-                dte = int(expiry_options['dte'].iloc[0])
-                
-                distance_pct = abs(self.spot_price - max_pain) / self.spot_price * 100
-                direction = "↑" if max_pain > self.spot_price else "↓" if max_pain < self.spot_price else "→"
-                
-                self.max_pain_by_expiry[expiry] = {
-                    'max_pain': max_pain, 'pain_by_strike': pain_dict,
-                    'spot_price': self.spot_price, 'distance_pct': distance_pct,
-                    'direction': direction, 'dte': dte,
-                    'total_oi': total_oi, 'call_oi': call_oi, 'put_oi': put_oi,
-                    'put_call_ratio': put_oi / call_oi if call_oi > 0 else 0
-                }
-                
-                logger.info(f"   {expiry} (DTE {dte}): ${max_pain:,.0f} {direction} ({distance_pct:.1f}%)")
+        self.spot_price = result['spot_price']
+        logger.info(f"📊 Processing TOP-{len(result['expirations'])} nearest expirations:")
+        for expiry, info in result['expirations'].items():
+            self.max_pain_by_expiry[expiry] = dict(
+                info, pain_by_strike={float(k): v for k, v in info['pain_by_strike'].items()})
+            logger.info(f"   {expiry} (DTE {info['dte']}): ${info['max_pain']:,.0f} {info['direction']} ({info['distance_pct']:.1f}%)")
         
         # Взвешенный Max Pain
-        if self.max_pain_by_expiry:
-            weighted_sum = sum(d['max_pain'] * d['total_oi'] for d in self.max_pain_by_expiry.values())
-            total_weight = sum(d['total_oi'] for d in self.max_pain_by_expiry.values())
-            self.overall_max_pain = weighted_sum / total_weight if total_weight > 0 else None
-            if self.overall_max_pain:
-                dist = abs(self.spot_price - self.overall_max_pain) / self.spot_price * 100
-                logger.info(f"✅ Overall Max Pain: ${self.overall_max_pain:,.0f} ({dist:.1f}%)")
+        self.overall_max_pain = result['overall_max_pain']
+        if self.overall_max_pain:
+            dist = abs(self.spot_price - self.overall_max_pain) / self.spot_price * 100
+            logger.info(f"✅ Overall Max Pain: ${self.overall_max_pain:,.0f} ({dist:.1f}%)")
         
         return self.max_pain_by_expiry
     
@@ -160,6 +114,7 @@ class MaxPainCalculator:
     def plot_max_pain(self):
         if not self.max_pain_by_expiry:
             return
+        Path('charts').mkdir(parents=True, exist_ok=True)
         sorted_expiries = sorted(self.max_pain_by_expiry.items(), key=lambda x: x[1]['dte'])
         fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 10))
         
@@ -203,39 +158,39 @@ class MaxPainCalculator:
         plt.close()
         logger.info(f"✅ Chart: {filename}")
     
-    def export_to_json(self):
+    def export_result(self):
+        """Запись в журнал data/results/max_pain с временем снапшота"""
         data = {
-            'symbol': self.symbol, 'timestamp': datetime.now().isoformat(),
+            'symbol': self.symbol, 'timestamp': datetime.fromtimestamp(self.snapshot_ts).isoformat(),
             'spot_price': self.spot_price, 'overall_max_pain': self.overall_max_pain,
             'expirations': {
                 exp: {k: v for k, v in info.items() if k != 'pain_by_strike'}
                 for exp, info in self.max_pain_by_expiry.items()
             }
         }
-        filename = f'data/max_pain/{self.symbol}_max_pain_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-        with open(filename, 'w') as f:
-            json.dump(data, f, indent=2)
-        logger.info(f"✅ JSON: {filename}")
+        append_result('max_pain', self.symbol, data, ts=self.snapshot_ts)
+        logger.info(f"✅ Logged: max_pain/{self.symbol} @ {data['timestamp']}")
     
-    def run_full_calculation(self):
+    def run_full_calculation(self, plot=False):
         logger.info(f"\n{'='*80}\n🎯 MAX PAIN: {self.symbol}\n{'='*80}")
-        if not self.get_spot_price() or self.load_options_data().empty:
+        if self.load_options_data().empty:
             return False
         if not self.calculate_all_max_pain():
             return False
         self.save_to_database()
-        self.plot_max_pain()
-        self.export_to_json()
+        if plot:
+            self.plot_max_pain()
+        self.export_result()
         logger.info(f"✅ {self.symbol} COMPLETE!\n")
         return True
 
-def main():
+def main(plot=False):
     print("="*80 + f"\n🎯 MAX PAIN (TOP-{TOP_N_EXPIRIES} ДИНАМИЧЕСКИХ)\n" + "="*80 + "\n")
     results = {}
     for symbol in SYMBOLS:
         try:
             calc = MaxPainCalculator(symbol)
-            success = calc.run_full_calculation()
+            success = calc.run_full_calculation(plot=plot)
             results[symbol] = {
                 'success': success, 'overall_max_pain': calc.overall_max_pain,
                 'spot_price': calc.spot_price, 'num_expirations': len(calc.max_pain_by_expiry)
@@ -256,4 +211,5 @@ def main():
     print("\n" + "="*80 + "\n✅ STAGE 1.3.2 COMPLETE!\n" + "="*80)
 
 if __name__ == "__main__":
-    main()
+    import sys
+    main(plot='--plot' in sys.argv)
@@ -25,8 +25,8 @@ class EnsembleCombiner:
         print(f"   LLM: {self.weights['llm']:.0%}")
         print(f"   Pattern: {self.weights['pattern']:.0%}")
     
-    def load_ml_models(self, filepath: str = 'ml_agent_models.pkl'):
-        self.ml_agent.load_models(filepath)
+    def load_ml_models(self, filepath: str = 'ml_agent_models.pkl', lazy: bool = False):
+        self.ml_agent.load_models(filepath, lazy=lazy)
     
     def predict(self, df: pd.DataFrame, context: dict = None):
         if context is None:
@@ -16,10 +16,12 @@ class MLAgent:
         self.scaler = None
         self.feature_names = []
         self.feature_engineer = FeatureEngineer()
+        self._pending_models_path = None
         print("✅ ML Agent initialized")
 
     def predict(self, df: pd.DataFrame):
         """Predict with ensemble of models"""
+        self._ensure_models_loaded()
         if not self.models:
             return {'prediction': 'NEUTRAL', 'confidence': 0.5}
         
@@ -82,8 +84,12 @@ class MLAgent:
             'confidence': avg_confidence
         }
     
-    def load_models(self, filepath: str = 'ml_agent_models_new.pkl'):
-        """Load trained models"""
+    def load_models(self, filepath: str = 'ml_agent_models_new.pkl', lazy: bool = False):
+        """Load trained models (lazy=True: unpickle sklearn/xgboost on first predict)"""
+        if lazy:
+            self._pending_models_path = filepath
+            return
+        self._pending_models_path = None
         try:
             with open(filepath, 'rb') as f:
                 data = pickle.load(f)
@@ -94,5 +100,9 @@ class MLAgent:
         except Exception as e:
             print(f"⚠️  Could not load models: {e}")
 
+    def _ensure_models_loaded(self):
+        if self._pending_models_path:
+            self.load_models(self._pending_models_path)
+
 if __name__ == "__main__":
     print("ML Agent ready")
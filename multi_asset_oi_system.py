@@ -5,6 +5,8 @@ import time
 import threading
 from datetime import datetime, timedelta
 
+from instrument_registry import get_instrument_registry
+
 class MultiAssetOISystem:
     def __init__(self):
         self.base_url = "https://api.bybit.com"
@@ -50,16 +52,10 @@ class MultiAssetOISystem:
         print(f"Multi-asset database initialized: {self.db_path}")
     
     def check_asset_options_available(self, asset):
-        """Проверяем доступность опционов для актива"""
+        """Проверяем доступность опционов для актива (по общему справочнику)"""
         try:
-            response = requests.get(f"{self.base_url}/v5/market/instruments-info",
-                                  params={'category': 'option', 'baseCoin': asset}, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data['retCode'] == 0:
-                    options_count = len(data['result']['list'])
-                    return options_count > 0, options_count
+            options_count = len(get_instrument_registry().contracts(asset))
+            return options_count > 0, options_count
             
         except Exception as e:
             print(f"Error checking {asset} options: {e}")
@@ -95,31 +91,15 @@ class MultiAssetOISystem:
             self.log_system_status(asset, "SPOT_ERROR", "Failed to get spot price", 0)
             return 0
         
-        # Получаем опционы
-        instruments_response = requests.get(f"{self.base_url}/v5/market/instruments-info",
-                                          params={'category': 'option', 'baseCoin': asset})
-        
-        if instruments_response.status_code != 200:
-            self.log_system_status(asset, "API_ERROR", "Failed to get instruments", 0)
-            return 0
-        
-        options = instruments_response.json()['result']['list']
+        # Опционы из справочника (уже разобраны)
+        options = get_instrument_registry().contracts(asset)
         collected_count = 0
         significant_oi_count = 0
         
         for option in options:
-            symbol = option['symbol']
-            
-            # Парсим символ
-            parts = symbol.split('-')
-            if len(parts) < 4:
-                continue
-            
-            try:
-                strike = float(parts[2])
-                option_type = 'Call' if parts[3] == 'C' else 'Put'
-            except:
-                continue
+            symbol = option.symbol
+            strike = option.strike
+            option_type = option.option_type
             
             # Получаем тикер данные
             ticker_response = requests.get(f"{self.base_url}/v5/market/tickers",
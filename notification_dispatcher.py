@@ -0,0 +1,699 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+NOTIFICATION DISPATCHER - Единая асинхронная отправка в Telegram и Discord
+- notify_telegram / notify_discord только пишут сообщение в outbox (SQLite) и
+  будят фоновый asyncio-цикл: цикл сигналов никогда не ждёт вебхук
+- Пул keep-alive соединений на каждый адрес назначения (через прокси - CONNECT)
+- Лимиты token bucket: на чат/вебхук и глобальный на платформу
+- Сообщения одного чата, пришедшие пачкой (окно DIGEST_WINDOW), уходят одним дайджестом
+- Ошибки и 429 - повтор с backoff / retry_after; 4xx на дайджест - его
+  сообщения переотправляются по одному, окончательно отбрасывается только
+  отвергнутое само по себе; outbox переживает рестарт, недоставленное
+  подхватывает следующий процесс
+
+Проверка на локальной HTTP-заглушке:
+    python3 notification_dispatcher.py selftest
+"""
+
+import asyncio
+import atexit
+import base64
+import json
+import logging
+import os
+import sqlite3
+import ssl
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_DB = './data/notifications.db'
+TELEGRAM_API = 'https://api.telegram.org'
+
+# (сообщений, за секунд)
+RATE_LIMITS = {
+    'telegram': {'global': (30, 1.0), 'chat': (20, 60.0)},
+    'discord': {'global': (50, 1.0), 'chat': (5, 2.0)},
+}
+TEXT_LIMITS = {'telegram': 4096, 'discord': 2000}
+DISCORD_EMBED_LIMIT = 10
+
+DIGEST_WINDOW = 2.0        # сек ожидания пачки перед отправкой
+DIGEST_SEPARATOR = '\n\n➖➖➖\n\n'
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 600.0
+REQUEST_TIMEOUT = 10.0
+POOL_SIZE = 2              # соединений на адрес
+RECLAIM_INTERVAL = 60.0    # сек между поиском брошенных сообщений других процессов
+EXIT_FLUSH_TIMEOUT = 15.0
+
+
+def _env_proxy() -> Optional[str]:
+    """Прокси из TELEGRAM_PROXY_* (как было у TelegramSender / DiscordSender), иначе HTTPS_PROXY"""
+    url = os.getenv('TELEGRAM_PROXY_URL')
+    user = os.getenv('TELEGRAM_PROXY_USERNAME')
+    password = os.getenv('TELEGRAM_PROXY_PASSWORD')
+    if url and user and password:
+        return f"http://{user}:{password}@{url.split('//', 1)[-1]}"
+    return os.getenv('https_proxy') or os.getenv('HTTPS_PROXY')
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+class TokenBucket:
+    """capacity сообщений за per_seconds, с накоплением до capacity"""
+
+    def __init__(self, capacity: int, per_seconds: float):
+        self.capacity = float(capacity)
+        self.rate = capacity / per_seconds
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Сколько ждать до свободного токена"""
+        now = time.monotonic()
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill(time.monotonic())
+        self.tokens -= 1
+
+
+class _Message:
+    __slots__ = ('id', 'text', 'parse_mode', 'extra', 'attempts', 'next_attempt', 'created_at', 'solo')
+
+    def __init__(self, row: sqlite3.Row):
+        self.id = row['id']
+        self.text = row['text'] or ''
+        self.parse_mode = row['parse_mode']
+        self.extra = json.loads(row['extra']) if row['extra'] else {}
+        self.attempts = row['attempts']
+        self.next_attempt = row['next_attempt']
+        self.created_at = row['created_at']
+        self.solo = False   # отправлять без дайджеста (дайджест с ним получил 4xx)
+
+
+class _Channel:
+    """Очередь одного чата / вебхука"""
+
+    def __init__(self, kind: str, target: str):
+        self.kind = kind
+        self.target = target
+        self.pending: Deque[_Message] = deque()
+        self.bucket = TokenBucket(*RATE_LIMITS[kind]['chat'])
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def label(self) -> str:
+        if self.kind == 'discord':
+            # .../webhooks/<id>/<token> - токен в логи не пишем
+            parts = urlsplit(self.target).path.rstrip('/').split('/')
+            return f"discord:{parts[-2] if len(parts) >= 2 else '?'}"
+        return f"{self.kind}:{self.target}"
+
+
+# ==================== HTTP ====================
+
+class _HttpPool:
+    """Keep-alive соединения HTTP/1.1 к одному адресу (asyncio streams)"""
+
+    def __init__(self, scheme: str, host: str, port: int, proxy: Optional[str] = None,
+                 size: int = POOL_SIZE):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.proxy = urlsplit(proxy) if proxy else None
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots = asyncio.Semaphore(size)
+        self._ssl = ssl.create_default_context() if scheme == 'https' else None
+
+    async def _open(self):
+        if not self.proxy:
+            return await asyncio.open_connection(self.host, self.port, ssl=self._ssl,
+                                                 server_hostname=self.host if self._ssl else None)
+
+        reader, writer = await asyncio.open_connection(self.proxy.hostname, self.proxy.port or 80)
+        request = f"CONNECT {self.host}:{self.port} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+        if self.proxy.username:
+            credentials = f"{self.proxy.username}:{self.proxy.password or ''}".encode()
+            request += f"Proxy-Authorization: Basic {base64.b64encode(credentials).decode()}\r\n"
+        writer.write((request + "\r\n").encode())
+        await writer.drain()
+        status = await reader.readline()
+        while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+            pass
+        if b' 200' not in status:
+            writer.close()
+            raise ConnectionError(f"proxy CONNECT failed: {status.decode(errors='replace').strip()}")
+        if self._ssl:
+            await writer.start_tls(self._ssl, server_hostname=self.host)
+        return reader, writer
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn[1].close()
+        except Exception:
+            pass
+
+    async def _roundtrip(self, conn, method: str, path: str, body: bytes):
+        reader, writer = conn
+        head = (f"{method} {path} HTTP/1.1\r\n"
+                f"Host: {self.host}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: keep-alive\r\n\r\n")
+        writer.write(head.encode() + body)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError('connection closed by peer')
+        version, status = status_line.split(b' ', 2)[:2]
+        status = int(status)
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = version == b'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            data = b''.join(chunks)
+        elif 'content-length' in headers:
+            data = await reader.readexactly(int(headers['content-length']))
+        elif status in (204, 304) or status < 200:
+            data = b''
+        else:
+            data = await reader.read()
+            keep_alive = False
+        return status, headers, data, keep_alive
+
+    async def request(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, str], bytes]:
+        async with self._slots:
+            while True:
+                reused = bool(self._idle)
+                conn = self._idle.pop() if reused else await asyncio.wait_for(self._open(), REQUEST_TIMEOUT)
+                try:
+                    status, headers, data, keep_alive = await asyncio.wait_for(
+                        self._roundtrip(conn, method, path, body), REQUEST_TIMEOUT)
+                except (ConnectionError, asyncio.IncompleteReadError, OSError, ValueError):
+                    self._close(conn)
+                    if reused:
+                        continue  # соединение протухло в простое - повтор на новом
+                    raise
+                except BaseException:
+                    self._close(conn)
+                    raise
+                if keep_alive:
+                    self._idle.append(conn)
+                else:
+                    self._close(conn)
+                return status, headers, data
+
+    def close(self):
+        while self._idle:
+            self._close(self._idle.pop())
+
+
+# ==================== DISPATCHER ====================
+
+class NotificationDispatcher:
+    """Outbox + фоновый asyncio-цикл доставки"""
+
+    def __init__(self, db_path: str = OUTBOX_DB, telegram_token: Optional[str] = None,
+                 telegram_api: Optional[str] = None, proxy: Optional[str] = None,
+                 digest_window: float = DIGEST_WINDOW):
+        self.db_path = db_path
+        self.telegram_token = telegram_token or os.getenv('TELEGRAM_BOT_TOKEN')
+        self.telegram_api = (telegram_api or os.getenv('TELEGRAM_API_URL') or TELEGRAM_API).rstrip('/')
+        self.proxy = proxy if proxy is not None else _env_proxy()
+        self.digest_window = digest_window
+        self.pid = os.getpid()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._channels: Dict[Tuple[str, str], _Channel] = {}
+        self._pools: Dict[Tuple[str, str, int], _HttpPool] = {}
+        self._global: Dict[str, TokenBucket] = {kind: TokenBucket(*limits['global'])
+                                                 for kind, limits in RATE_LIMITS.items()}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._queued = 0
+        self.stats = {'enqueued': 0, 'sent': 0, 'requests': 0, 'digests': 0, 'retries': 0, 'failed': 0,
+                      'split': 0}
+
+        self._init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_database(self):
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT,
+                target TEXT,
+                text TEXT,
+                parse_mode TEXT,
+                extra TEXT,
+                created_at REAL,
+                attempts INTEGER DEFAULT 0,
+                next_attempt REAL,
+                status TEXT DEFAULT 'pending',
+                owner INTEGER,
+                last_error TEXT,
+                sent_at REAL,
+                digest_of INTEGER
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox(status, owner)')
+        conn.commit()
+        conn.close()
+
+    # ---------- вызывающая сторона (любой поток) ----------
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run, name='notification-dispatcher', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def enqueue(self, kind: str, target: str, text: str, parse_mode: Optional[str] = None,
+                extra: Optional[Dict[str, Any]] = None) -> bool:
+        """Записать сообщение в outbox и разбудить цикл (без сетевого ожидания)"""
+        if not target or kind not in RATE_LIMITS:
+            return False
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.execute('''
+                INSERT INTO outbox (kind, target, text, parse_mode, extra, created_at, next_attempt, owner)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (kind, target, text, parse_mode, json.dumps(extra) if extra else None, now, now, self.pid))
+            conn.commit()
+            row = conn.execute('SELECT * FROM outbox WHERE id = ?', (cursor.lastrowid,)).fetchone()
+        finally:
+            conn.close()
+
+        self.start()
+        self.stats['enqueued'] += 1
+        self._loop.call_soon_threadsafe(self._schedule, kind, target, _Message(row))
+        return True
+
+    def flush(self, timeout: float = EXIT_FLUSH_TIMEOUT) -> bool:
+        """Дождаться опустошения очередей (True) или таймаута; недоставленное остаётся в outbox"""
+        deadline = time.monotonic() + timeout
+        while self._queued and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return self._queued == 0
+
+    def stop(self):
+        if self._loop and self._thread and self._thread.is_alive():
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+            self._thread.join(timeout=5)
+
+    async def _shutdown(self):
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._channels.clear()
+        self._loop.stop()
+
+    # ---------- цикл доставки ----------
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._conn = self._connect()
+        self._loop.create_task(self._reclaim_forever())
+        self._loop.call_soon(self._ready.set)
+        try:
+            self._loop.run_forever()
+        finally:
+            for pool in self._pools.values():
+                pool.close()
+            self._conn.close()
+
+    def _schedule(self, kind: str, target: str, message: _Message):
+        channel = self._channels.get((kind, target))
+        if channel is None:
+            channel = self._channels[(kind, target)] = _Channel(kind, target)
+            channel.task = self._loop.create_task(self._channel_worker(channel))
+        channel.pending.append(message)
+        self._queued += 1
+        channel.wakeup.set()
+
+    async def _reclaim_forever(self):
+        """Подхватить pending-сообщения, чей процесс-владелец больше не жив"""
+        while True:
+            try:
+                self._reclaim()
+            except sqlite3.Error as e:
+                logger.warning(f"Outbox reclaim failed: {e}")
+            await asyncio.sleep(RECLAIM_INTERVAL)
+
+    def _reclaim(self):
+        rows = self._conn.execute('''
+            SELECT * FROM outbox WHERE status = 'pending' AND (owner IS NULL OR owner != ?)
+            ORDER BY id
+        ''', (self.pid,)).fetchall()
+        orphans = [row for row in rows if not _pid_alive(row['owner'])]
+        if not orphans:
+            return
+        claimed = []
+        for row in orphans:
+            cursor = self._conn.execute('''
+                UPDATE outbox SET owner = ? WHERE id = ? AND status = 'pending' AND owner IS ?
+            ''', (self.pid, row['id'], row['owner']))
+            if cursor.rowcount:
+                claimed.append(row)
+        self._conn.commit()
+        for row in claimed:
+            self._schedule(row['kind'], row['target'], _Message(row))
+        if claimed:
+            logger.info(f"📬 Outbox: resumed {len(claimed)} undelivered notifications")
+
+    async def _wait(self, channel: _Channel, seconds: float):
+        channel.wakeup.clear()
+        try:
+            await asyncio.wait_for(channel.wakeup.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _channel_worker(self, channel: _Channel):
+        while True:
+            if not channel.pending:
+                channel.wakeup.clear()
+                await channel.wakeup.wait()
+                continue
+
+            # Окно дайджеста: даём пачке собраться
+            now = time.time()
+            oldest = min(m.created_at for m in channel.pending if m.attempts == 0) \
+                if any(m.attempts == 0 for m in channel.pending) else now - self.digest_window
+            ready_at = max(min(m.next_attempt for m in channel.pending), oldest + self.digest_window)
+            delay = max(ready_at - now, channel.bucket.delay(), self._global[channel.kind].delay())
+            if delay > 0:
+                await self._wait(channel, delay)
+                continue
+
+            batch = self._take_batch(channel)
+            channel.bucket.take()
+            self._global[channel.kind].take()
+            await self._send_batch(channel, batch)
+
+    def _take_batch(self, channel: _Channel) -> List[_Message]:
+        """Готовые сообщения чата одного parse_mode в пределах лимита длины"""
+        now = time.time()
+        limit = TEXT_LIMITS[channel.kind]
+        ready = [m for m in channel.pending if m.next_attempt <= now]
+        batch, length, embeds = [ready[0]], len(ready[0].text), len(ready[0].extra.get('embeds', []))
+        for message in ready[1:] if not ready[0].solo else ():
+            n_embeds = len(message.extra.get('embeds', []))
+            if message.solo or message.parse_mode != batch[0].parse_mode \
+                    or length + len(DIGEST_SEPARATOR) + len(message.text) > limit - 64 \
+                    or embeds + n_embeds > DISCORD_EMBED_LIMIT:
+                continue
+            batch.append(message)
+            length += len(DIGEST_SEPARATOR) + len(message.text)
+            embeds += n_embeds
+        for message in batch:
+            channel.pending.remove(message)
+        return batch
+
+    def _payload(self, channel: _Channel, batch: List[_Message]) -> Tuple[str, Dict[str, Any]]:
+        texts = [m.text for m in batch if m.text]
+        text = DIGEST_SEPARATOR.join(texts)
+        if len(batch) > 1:
+            text = f"📦 Дайджест: {len(batch)} сообщений{DIGEST_SEPARATOR}{text}"
+        text = text[:TEXT_LIMITS[channel.kind]]
+
+        if channel.kind == 'telegram':
+            payload = {'chat_id': channel.target, 'text': text}
+            if batch[0].parse_mode:
+                payload['parse_mode'] = batch[0].parse_mode
+            return f"{self.telegram_api}/bot{self.telegram_token}/sendMessage", payload
+
+        payload = dict(batch[0].extra)
+        embeds = [embed for m in batch for embed in m.extra.get('embeds', [])]
+        if embeds:
+            payload['embeds'] = embeds
+        if text:
+            payload['content'] = text
+        return channel.target, payload
+
+    def _pool(self, url: str) -> Tuple[_HttpPool, str]:
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        key = (parts.scheme, parts.hostname, port)
+        if key not in self._pools:
+            # Локальные адреса (заглушки, тесты) - без прокси
+            proxy = None if parts.hostname in ('127.0.0.1', 'localhost') else self.proxy
+            self._pools[key] = _HttpPool(parts.scheme, parts.hostname, port, proxy)
+        path = parts.path + (f"?{parts.query}" if parts.query else '')
+        return self._pools[key], path or '/'
+
+    async def _send_batch(self, channel: _Channel, batch: List[_Message]):
+        retry_after, error, permanent = None, None, False
+        if channel.kind == 'telegram' and not self.telegram_token:
+            error, permanent = 'TELEGRAM_BOT_TOKEN not set', True
+        else:
+            url, payload = self._payload(channel, batch)
+            pool, path = self._pool(url)
+            try:
+                self.stats['requests'] += 1
+                status, headers, data = await pool.request('POST', path, json.dumps(payload).encode())
+                if status in (200, 204):
+                    self._mark_sent(channel, batch)
+                    return
+                error = f"HTTP {status}: {data[:200].decode(errors='replace')}"
+                if status == 429:
+                    retry_after = self._retry_after(headers, data)
+                elif 400 <= status < 500 and len(batch) > 1:
+                    self._split_batch(channel, batch, error)
+                    return
+                else:
+                    permanent = 400 <= status < 500
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+        self._mark_failed(channel, batch, error, retry_after, permanent)
+
+    @staticmethod
+    def _retry_after(headers: Dict[str, str], data: bytes) -> Optional[float]:
+        try:
+            body = json.loads(data or b'{}')
+            value = (body.get('parameters') or {}).get('retry_after', body.get('retry_after'))
+            if value is not None:
+                return float(value)
+        except (ValueError, AttributeError):
+            pass
+        try:
+            return float(headers.get('retry-after'))
+        except (TypeError, ValueError):
+            return None
+
+    def _mark_sent(self, channel: _Channel, batch: List[_Message]):
+        now = time.time()
+        ids = [m.id for m in batch]
+        self._conn.executemany('''
+            UPDATE outbox SET status = 'sent', sent_at = ?, attempts = attempts + 1, digest_of = ?
+            WHERE id = ?
+        ''', [(now, len(batch) if len(batch) > 1 else None, i) for i in ids])
+        self._conn.commit()
+        self._queued -= len(batch)
+        self.stats['sent'] += len(batch)
+        if len(batch) > 1:
+            self.stats['digests'] += 1
+            logger.info(f"✅ {channel.label}: digest of {len(batch)} delivered")
+        else:
+            logger.info(f"✅ {channel.label}: delivered")
+
+    def _split_batch(self, channel: _Channel, batch: List[_Message], error: str):
+        """
+        4xx на дайджест (например, разметка одного сообщения): каждое сообщение
+        уходит отдельно без траты попыток - отвергнутым окажется только виновное
+        """
+        for message in reversed(batch):
+            message.solo = True
+            channel.pending.appendleft(message)
+        self.stats['split'] += 1
+        logger.warning(f"⚠️ {channel.label}: {error} - digest of {len(batch)} split, resending one by one")
+
+    def _mark_failed(self, channel: _Channel, batch: List[_Message], error: str,
+                     retry_after: Optional[float], permanent: bool):
+        now = time.time()
+        for message in batch:
+            message.attempts += 1
+            if permanent or message.attempts >= MAX_ATTEMPTS:
+                self._conn.execute('''
+                    UPDATE outbox SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?
+                ''', (message.attempts, error, message.id))
+                self._queued -= 1
+                self.stats['failed'] += 1
+                continue
+            backoff = retry_after if retry_after is not None else \
+                min(BACKOFF_MAX, BACKOFF_BASE ** message.attempts)
+            message.next_attempt = now + backoff
+            self._conn.execute('''
+                UPDATE outbox SET attempts = ?, next_attempt = ?, last_error = ? WHERE id = ?
+            ''', (message.attempts, message.next_attempt, error, message.id))
+            channel.pending.appendleft(message)
+            self.stats['retries'] += 1
+        self._conn.commit()
+        logger.warning(f"⚠️ {channel.label}: {error}" + (" (dropped)" if permanent else ""))
+
+
+_dispatcher: Optional[NotificationDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher() -> NotificationDispatcher:
+    """Общий диспетчер процесса (запускается при первом сообщении)"""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = NotificationDispatcher()
+            atexit.register(_dispatcher.flush)
+    return _dispatcher
+
+
+def notify_telegram(chat_id: Optional[str], text: str, parse_mode: Optional[str] = 'HTML') -> bool:
+    """Поставить сообщение в очередь Telegram (True = принято в outbox)"""
+    return get_dispatcher().enqueue('telegram', str(chat_id) if chat_id else '', text, parse_mode)
+
+
+def notify_discord(webhook_url: Optional[str], content: str = '', **payload) -> bool:
+    """Поставить сообщение в очередь Discord-вебхука (username, avatar_url, embeds - в payload)"""
+    return get_dispatcher().enqueue('discord', webhook_url or '', content, None, payload or None)
+
+
+# ==================== SELFTEST ====================
+
+def _selftest() -> bool:
+    """
+    Локальная HTTP-заглушка: 429 и 500 на первых запросах, затем 200/204;
+    текст с BAD_ - 400 (как Telegram на битую разметку)
+    """
+    import tempfile
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    received: List[Dict[str, Any]] = []
+    connections = set()
+    script = deque([429, 500])
+
+    class Stub(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            connections.add(self.client_address)
+            status = script.popleft() if script else (204 if 'webhooks' in self.path else 200)
+            if 'BAD_' in (body.get('text') or '') and status in (200, 204):
+                status = 400
+            if status == 200 or status == 204:
+                received.append(body)
+            reply = json.dumps({'ok': status == 200, 'parameters': {'retry_after': 0.5}}).encode()
+            self.send_response(status)
+            if status == 204:
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(reply)))
+            self.end_headers()
+            self.wfile.write(reply)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'outbox.db')
+    dispatcher = NotificationDispatcher(db_path, telegram_token='TEST', telegram_api=base,
+                                        proxy='', digest_window=0.3)
+
+    started = time.perf_counter()
+    for i in range(12):
+        dispatcher.enqueue('telegram', '-100', f"signal {i}", 'HTML')
+        if i == 5:
+            dispatcher.enqueue('telegram', '-100', "signal <b>BAD_strategy</b>", 'HTML')
+    for i in range(3):
+        dispatcher.enqueue('discord', f"{base}/api/webhooks/1/abc", f"alert {i}", None,
+                           {'username': 'Crypto Signals Bot'})
+    enqueue_ms = (time.perf_counter() - started) * 1000 / 16
+
+    delivered = dispatcher.flush(timeout=20)
+    dispatcher.stop()
+    server.shutdown()
+
+    texts = [body.get('text') or body.get('content') for body in received]
+    all_text = '\n'.join(texts)
+    missing = [f"signal {i}" for i in range(12) if f"signal {i}" not in all_text] + \
+              [f"alert {i}" for i in range(3) if f"alert {i}" not in all_text]
+    statuses = dict(sqlite3.connect(db_path).execute(
+        "SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+
+    print(f"enqueue: {enqueue_ms:.2f} ms/message (no network wait)")
+    print(f"requests: {dispatcher.stats['requests']} for 16 messages, digests: {dispatcher.stats['digests']}, "
+          f"retries: {dispatcher.stats['retries']}, split: {dispatcher.stats['split']}, "
+          f"connections: {len(connections)}")
+    print(f"outbox: {statuses}")
+    ok = delivered and not missing and statuses == {'sent': 15, 'failed': 1} and dispatcher.stats['digests'] > 0
+    print('✅ SELFTEST OK' if ok else f"❌ SELFTEST FAILED, missing: {missing}")
+    return ok
+
+
+if __name__ == '__main__':
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) > 1 and sys.argv[1] == 'selftest':
+        sys.exit(0 if _selftest() else 1)
+
+    conn = sqlite3.connect(OUTBOX_DB)
+    for status, count in conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status"):
+        print(f"{status}: {count}")
@@ -8,224 +8,224 @@ OI DYNAMICS ANALYZER - Анализ изменения Open Interest во вре
 import sqlite3
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 import json
 import os
 
+import numpy as np
+import pandas as pd
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 class OIDynamicsAnalyzer:
-    """Анализ динамики OI для выявления ранних сигналов"""
+    """Анализ динамики OI для выявления ранних сигналов
+
+    Все экспирации актива считаются за один SQL-запрос: ряды OI
+    группируются по (expiry_date, timestamp) в БД, затем по часам и
+    экспирациям через pandas groupby. Результат кэшируется до прихода
+    следующего снапшота.
+    """
+
+    MAX_EXPIRATIONS = 15
 
     def __init__(self, db_path: str = './data/unlimited_oi.db'):
         self.db_path = db_path
         self.analysis_period_hours = 24  # Анализ за последние 24 часа
+        self.lookup_period_hours = 48  # Окно поиска активных экспираций
         self.days_forward = 45  # Скользящее окно: следующие 45 дней
         
+        # Кэш: asset -> (timestamp последнего снапшота, результат)
+        self._cache: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        
         # Вычисляем динамическую дату
         self.max_expiration = datetime.now() + timedelta(days=self.days_forward)
         
         logger.info(f"📅 Dynamic window: {datetime.now().strftime('%Y-%m-%d')} → {self.max_expiration.strftime('%Y-%m-%d')} (next {self.days_forward} days)")
 
-    def get_oi_dynamics(self, asset: str) -> Optional[Dict[str, Any]]:
-        """Получить динамику OI для актива по всем релевантным экспирациям"""
+    def get_oi_dynamics(self, asset: str, as_of: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """Получить динамику OI для актива по всем релевантным экспирациям (as_of - на момент времени)"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            now = as_of or datetime.now()
+            max_exp_str, now_str = self.expiry_window(now)
+            if as_of is None:
+                self.max_expiration = now + timedelta(days=self.days_forward)
             
-            # Получаем список экспираций в следующие 45 дней
-            cutoff = int((datetime.now() - timedelta(hours=48)).timestamp())
-            max_exp_str = self.max_expiration.strftime('%Y-%m-%d')
-            now_str = datetime.now().strftime('%Y-%m-%d')
-            
-            cursor.execute('''
-                SELECT DISTINCT expiry_date, MIN(dte) as min_dte
-                FROM all_positions_tracking
-                WHERE asset = ? 
-                  AND timestamp > ?
-                  AND expiry_date >= ?
-                  AND expiry_date <= ?
-                  AND dte > 0
-                GROUP BY expiry_date
-                ORDER BY expiry_date ASC
-                LIMIT 15
-            ''', (asset, cutoff, now_str, max_exp_str))
-            
-            expirations = [(row[0], row[1]) for row in cursor.fetchall()]
-            conn.close()
+            conn = sqlite3.connect(self.db_path)
+            try:
+                cached = self._cache.get(asset)
+                if as_of is None and cached and not self._has_new_snapshot(conn, asset, cached[0]):
+                    return cached[1]
+                
+                rows = self._fetch_expiry_series(conn, asset, now, now_str, max_exp_str)
+            finally:
+                conn.close()
             
-            if not expirations:
+            if rows.empty:
                 logger.warning(f"No expirations for {asset} in rolling window")
                 return None
             
-            # Анализируем каждую экспирацию
-            analyses = {}
-            for expiry, dte in expirations:
-                analysis = self._analyze_expiration_dynamics(asset, expiry, dte)
-                if analysis:
-                    analyses[expiry] = analysis
-            
-            return {
-                'asset': asset,
-                'timestamp': datetime.now().isoformat(),
-                'analysis_window_days': self.days_forward,
-                'window_start': now_str,
-                'window_end': max_exp_str,
-                'expirations_count': len(analyses),
-                'expirations_analysis': analyses,
-                'summary': self._generate_summary(analyses)
-            }
+            result = self.dynamics_from_rows(asset, rows, now)
+            if as_of is None:
+                self._cache[asset] = (int(rows['timestamp'].max()), result)
+            return result
             
         except Exception as e:
             logger.error(f"Error analyzing OI dynamics for {asset}: {e}")
             return None
 
-    def _analyze_expiration_dynamics(self, asset: str, expiry: str, dte: int) -> Optional[Dict[str, Any]]:
-        """Анализ динамики для конкретной экспирации"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cutoff = int((datetime.now() - timedelta(hours=24)).timestamp())
-            
-            cursor.execute('''
-                SELECT 
-                    timestamp,
-                    SUM(open_interest) as total_oi,
-                    SUM(CASE WHEN option_type = 'Call' THEN open_interest ELSE 0 END) as calls_oi,
-                    SUM(CASE WHEN option_type = 'Put' THEN open_interest ELSE 0 END) as puts_oi
-                FROM all_positions_tracking
-                WHERE asset = ? 
-                  AND expiry_date = ?
-                  AND timestamp > ?
-                GROUP BY timestamp
-                ORDER BY timestamp
-            ''', (asset, expiry, cutoff))
-            
-            rows = cursor.fetchall()
-            conn.close()
-            
-            if len(rows) < 3:
-                return None
-            
-            # Группируем по часам
-            hourly_data = {}
-            for row in rows:
-                ts = datetime.fromtimestamp(row[0])
-                hour_key = ts.replace(minute=0, second=0, microsecond=0)
-                
-                if hour_key not in hourly_data:
-                    hourly_data[hour_key] = {
-                        'total_oi': [],
-                        'calls_oi': [],
-                        'puts_oi': []
-                    }
-                
-                hourly_data[hour_key]['total_oi'].append(row[1])
-                hourly_data[hour_key]['calls_oi'].append(row[2])
-                hourly_data[hour_key]['puts_oi'].append(row[3])
-            
-            # Усредняем по часам
-            time_series = []
-            for hour in sorted(hourly_data.keys()):
-                data = hourly_data[hour]
-                time_series.append({
-                    'timestamp': hour,
-                    'total_oi': sum(data['total_oi']) / len(data['total_oi']),
-                    'calls_oi': sum(data['calls_oi']) / len(data['calls_oi']),
-                    'puts_oi': sum(data['puts_oi']) / len(data['puts_oi'])
-                })
-            
-            if len(time_series) < 3:
-                return None
-            
-            return self._analyze_time_series(time_series, expiry, dte)
-            
-        except Exception as e:
-            logger.error(f"Error analyzing expiration {expiry}: {e}")
-            return None
+    def expiry_window(self, now: datetime) -> Tuple[str, str]:
+        """(последняя, первая) дата экспирации скользящего окна"""
+        return ((now + timedelta(days=self.days_forward)).strftime('%Y-%m-%d'),
+                now.strftime('%Y-%m-%d'))
 
-    def _analyze_time_series(self, time_series: List[Dict], expiry: str, dte: int) -> Dict[str, Any]:
-        """Анализ временного ряда OI"""
-        
-        initial = time_series[0]
-        current = time_series[-1]
-        
-        # Изменение OI
-        total_change = ((current['total_oi'] - initial['total_oi']) / initial['total_oi'] * 100) if initial['total_oi'] > 0 else 0
-        calls_change = ((current['calls_oi'] - initial['calls_oi']) / initial['calls_oi'] * 100) if initial['calls_oi'] > 0 else 0
-        puts_change = ((current['puts_oi'] - initial['puts_oi']) / initial['puts_oi'] * 100) if initial['puts_oi'] > 0 else 0
-        
-        # Тренд
-        trend = self._calculate_trend([d['total_oi'] for d in time_series])
-        calls_trend = self._calculate_trend([d['calls_oi'] for d in time_series])
-        puts_trend = self._calculate_trend([d['puts_oi'] for d in time_series])
-        
-        # Скорость
-        changes = []
-        for i in range(1, len(time_series)):
-            prev = time_series[i-1]['total_oi']
-            curr = time_series[i]['total_oi']
-            if prev > 0:
-                changes.append((curr - prev) / prev * 100)
-        
-        velocity = sum(changes) / len(changes) if changes else 0
-        
-        signals = self._generate_signals(
-            trend, total_change, calls_trend, puts_trend, 
-            calls_change, puts_change, velocity, dte
-        )
+    def dynamics_from_rows(self, asset: str, rows: pd.DataFrame, now: datetime) -> Dict[str, Any]:
+        """Результат по рядам (expiry_date, timestamp, min_dte, total_oi, calls_oi, puts_oi)"""
+        max_exp_str, now_str = self.expiry_window(now)
+        analyses = self._analyze_all_expirations(rows, now)
         
         return {
-            'expiry': expiry,
-            'dte': dte,
-            'oi_analysis': {
-                'current_oi': current['total_oi'],
-                'initial_oi': initial['total_oi'],
-                'change_pct': total_change,
-                'calls_change_pct': calls_change,
-                'puts_change_pct': puts_change,
-                'trend': trend,
-                'calls_trend': calls_trend,
-                'puts_trend': puts_trend,
-                'velocity': velocity,
-                'data_points': len(time_series)
-            },
-            'signals': signals
+            'asset': asset,
+            'timestamp': now.isoformat(),
+            'analysis_window_days': self.days_forward,
+            'window_start': now_str,
+            'window_end': max_exp_str,
+            'expirations_count': len(analyses),
+            'expirations_analysis': analyses,
+            'summary': self._generate_summary(analyses)
         }
 
-    def _calculate_trend(self, values: List[float]) -> str:
-        """Расчёт тренда"""
-        if len(values) < 3:
-            return 'INSUFFICIENT_DATA'
-        
-        n = len(values)
-        x = list(range(n))
-        
-        x_mean = sum(x) / n
-        y_mean = sum(values) / n
-        
-        numerator = sum((x[i] - x_mean) * (values[i] - y_mean) for i in range(n))
-        denominator = sum((x[i] - x_mean) ** 2 for i in range(n))
-        
-        if denominator == 0:
-            return 'FLAT'
-        
-        slope = numerator / denominator
-        normalized_slope = slope / y_mean if y_mean != 0 else 0
-        
-        if normalized_slope > 0.01:
-            return 'STRONG_UP'
-        elif normalized_slope > 0.002:
-            return 'UP'
-        elif normalized_slope < -0.01:
-            return 'STRONG_DOWN'
-        elif normalized_slope < -0.002:
-            return 'DOWN'
-        else:
-            return 'FLAT'
+    def _has_new_snapshot(self, conn: sqlite3.Connection, asset: str, last_ts: int) -> bool:
+        """Появился ли снапшот новее закэшированного (индекс oi_snapshots)"""
+        row = conn.execute('''
+            SELECT 1 FROM oi_snapshots
+            WHERE timestamp > ? AND asset = ?
+            LIMIT 1
+        ''', (last_ts, asset)).fetchone()
+        return row is not None
+
+    def _fetch_expiry_series(self, conn: sqlite3.Connection, asset: str, now: datetime,
+                             now_str: str, max_exp_str: str) -> pd.DataFrame:
+        """Один запрос: ряды OI по всем экспирациям окна за 48 часов"""
+        cutoff = int((now - timedelta(hours=self.lookup_period_hours)).timestamp())
+        
+        return pd.read_sql_query('''
+            SELECT
+                expiry_date,
+                timestamp,
+                MIN(CASE WHEN dte > 0 THEN dte END) as min_dte,
+                SUM(open_interest) as total_oi,
+                SUM(CASE WHEN option_type = 'Call' THEN open_interest ELSE 0 END) as calls_oi,
+                SUM(CASE WHEN option_type = 'Put' THEN open_interest ELSE 0 END) as puts_oi
+            FROM all_positions_tracking
+            WHERE asset = ?
+              AND timestamp > ? AND timestamp <= ?
+              AND expiry_date >= ?
+              AND expiry_date <= ?
+            GROUP BY expiry_date, timestamp
+        ''', conn, params=(asset, cutoff, int(now.timestamp()), now_str, max_exp_str))
+
+    def _analyze_all_expirations(self, rows: pd.DataFrame, now: datetime) -> Dict[str, Dict[str, Any]]:
+        """Тренды, изменения и сигналы по всем экспирациям разом"""
+        # Ближайшие экспирации с живыми контрактами за 48 часов
+        dte_by_expiry = rows.dropna(subset=['min_dte']).groupby('expiry_date')['min_dte'].min()
+        dte_by_expiry = dte_by_expiry.sort_index().head(self.MAX_EXPIRATIONS)
+        
+        cutoff = int((now - timedelta(hours=self.analysis_period_hours)).timestamp())
+        series = rows[(rows['timestamp'] > cutoff) & rows['expiry_date'].isin(dte_by_expiry.index)]
+        
+        # Не менее 3 снапшотов на экспирацию
+        snapshots = series.groupby('expiry_date')['timestamp'].transform('size')
+        series = series[snapshots >= 3]
+        if series.empty:
+            return {}
+        
+        # Усредняем по часам
+        series = series.assign(hour=series['timestamp'] // 3600 * 3600)
+        hourly = (series.groupby(['expiry_date', 'hour'], sort=True)[['total_oi', 'calls_oi', 'puts_oi']]
+                  .mean()
+                  .reset_index())
+        
+        hours = hourly.groupby('expiry_date')['hour'].transform('size')
+        hourly = hourly[hours >= 3].reset_index(drop=True)
+        if hourly.empty:
+            return {}
+        
+        grouped = hourly.groupby('expiry_date', sort=True)
+        hourly['x'] = grouped.cumcount()
+        
+        stats = pd.DataFrame({
+            'initial_oi': grouped['total_oi'].first(),
+            'current_oi': grouped['total_oi'].last(),
+            'data_points': grouped.size(),
+        })
+        stats['dte'] = dte_by_expiry.reindex(stats.index).astype(int)
+        
+        for column, prefix in (('total_oi', ''), ('calls_oi', 'calls_'), ('puts_oi', 'puts_')):
+            first = grouped[column].first()
+            last = grouped[column].last()
+            stats[f'{prefix}change_pct'] = ((last - first) / first.where(first > 0) * 100).fillna(0.0)
+            stats[f'{prefix}trend'] = self._calculate_trends(hourly, column)
+        
+        # Скорость: среднее почасовое изменение (только при prev > 0)
+        prev = grouped['total_oi'].shift(1)
+        hourly['step_pct'] = (hourly['total_oi'] - prev) / prev.where(prev > 0) * 100
+        stats['velocity'] = hourly.groupby('expiry_date', sort=True)['step_pct'].mean().fillna(0.0)
+        
+        analyses = {}
+        for expiry, row in stats.iterrows():
+            dte = int(row['dte'])
+            signals = self._generate_signals(
+                row['trend'], row['change_pct'], row['calls_trend'], row['puts_trend'],
+                row['calls_change_pct'], row['puts_change_pct'], row['velocity'], dte
+            )
+            analyses[expiry] = {
+                'expiry': expiry,
+                'dte': dte,
+                'oi_analysis': {
+                    'current_oi': float(row['current_oi']),
+                    'initial_oi': float(row['initial_oi']),
+                    'change_pct': float(row['change_pct']),
+                    'calls_change_pct': float(row['calls_change_pct']),
+                    'puts_change_pct': float(row['puts_change_pct']),
+                    'trend': row['trend'],
+                    'calls_trend': row['calls_trend'],
+                    'puts_trend': row['puts_trend'],
+                    'velocity': float(row['velocity']),
+                    'data_points': int(row['data_points'])
+                },
+                'signals': signals
+            }
+        
+        return analyses
+
+    def _calculate_trends(self, hourly: pd.DataFrame, column: str) -> pd.Series:
+        """Тренд (нормированный наклон регрессии) для каждой экспирации"""
+        grouped = hourly.groupby('expiry_date', sort=True)
+        x_dev = hourly['x'] - grouped['x'].transform('mean')
+        y_dev = hourly[column] - grouped[column].transform('mean')
+        
+        sums = pd.DataFrame({
+            'expiry_date': hourly['expiry_date'],
+            'xy': x_dev * y_dev,
+            'xx': x_dev * x_dev,
+        }).groupby('expiry_date', sort=True).sum()
+        y_mean = grouped[column].mean()
+        
+        slope = sums['xy'] / sums['xx'].where(sums['xx'] != 0)
+        normalized = (slope / y_mean.where(y_mean != 0)).fillna(0.0)
+        
+        trends = np.select(
+            [sums['xx'] == 0,
+             normalized > 0.01,
+             normalized > 0.002,
+             normalized < -0.01,
+             normalized < -0.002],
+            ['FLAT', 'STRONG_UP', 'UP', 'STRONG_DOWN', 'DOWN'],
+            default='FLAT'
+        )
+        return pd.Series(trends, index=sums.index)
 
     def _generate_signals(self, trend: str, change_pct: float,
                          calls_trend: str, puts_trend: str,
@@ -327,12 +327,17 @@ class OIDynamicsAnalyzer:
         }
 
 
-def get_oi_dynamics_data(asset: str) -> Optional[Dict[str, Any]]:
-    """Функция для DataIntegrator"""
-    analyzer = OIDynamicsAnalyzer()
-    analysis = analyzer.get_oi_dynamics(asset)
+_analyzer: Optional[OIDynamicsAnalyzer] = None
+
+
+def get_oi_dynamics_data(asset: str, as_of: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """Функция для DataIntegrator (общий анализатор - кэш живёт между вызовами)"""
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = OIDynamicsAnalyzer()
+    analysis = _analyzer.get_oi_dynamics(asset, as_of=as_of)
     
-    if analysis:
+    if analysis and as_of is None:
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"data/oi_dynamics/{asset}_dynamics_{timestamp}.json"
         
@@ -0,0 +1,517 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OI SCHEMA - Нормализованное хранение снапшотов OI
+- instruments (instrument_registry): справочник контрактов с целым instrument_id
+- oi_snapshots: один снапшот = (snapshot_id, asset, timestamp, spot_price)
+- oi_positions: (keyframe_id, snapshot_id, instrument_id, oi, volume, mark, iv),
+  WITHOUT ROWID. Снапшот-keyframe хранит все контракты, промежуточные - только
+  изменившиеся сверх допуска (SnapshotRecorder) и NULL-строки для исчезнувших.
+  next_snapshot_id - следующая запись того же контракта в группе (ведут триггеры),
+  так что чтение снапшота не ищет последнюю запись подзапросом
+- all_positions_tracking - VIEW с прежними 13 колонками: снапшот собирается из
+  keyframe + последних изменений, dte, distance_pct и time_category считаются
+  при чтении, так что все читатели работают как раньше; INSTEAD OF триггеры
+  принимают старые INSERT/DELETE
+- position_cumulative ключуется instrument_id вместо строки "{asset}_{symbol}"
+
+Использование:
+    python3 oi_schema.py migrate [DB]   # старая таблица -> новая схема (+ VACUUM)
+    python3 oi_schema.py stats [DB]     # размеры таблиц и доля delta-строк
+"""
+
+import logging
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from instrument_registry import init_registry_tables
+
+logger = logging.getLogger(__name__)
+
+OI_DB_PATH = './data/unlimited_oi.db'
+LEGACY_TABLE = 'all_positions_tracking'
+
+# Запись снапшотов: keyframe не реже KEYFRAME_INTERVAL сек, между ними - изменения.
+# 'delta': строк и записи в разы меньше (меняется малая часть контрактов), но чтение
+#   снапшота просматривает keyframe-группу до него: окна по VIEW до ~15% медленнее 'full'
+#   при часовом keyframe (актуальность строки - по next_snapshot_id, без подзапросов).
+# 'full': каждый снапшот keyframe - самое быстрое чтение, запись всех контрактов.
+RECORD_MODE = 'delta'
+KEYFRAME_INTERVAL = 3600
+OI_TOLERANCE = 0.0             # абсолютное изменение OI (контракты) - любое
+VOLUME_TOLERANCE = 0.01        # относительное изменение volume_24h
+MARK_TOLERANCE = 0.005         # относительное изменение mark_price
+IV_TOLERANCE = 0.002           # абсолютное изменение mark_iv (доля)
+
+# DTE как у коллектора: целые дни (floor) от времени снапшота до полуночи даты экспирации.
+# floor через сдвиг в положительную область - julianday считается один раз на строку
+_DTE_DAYS = "(julianday(i.expiry_date) - julianday(s.timestamp, 'unixepoch', 'localtime'))"
+DTE_SQL = f"(CAST({_DTE_DAYS} + 100000 AS INTEGER) - 100000)"
+
+# Пороги UnlimitedOIMonitor.categorize_time_horizon
+CATEGORY_SQL = f"""CASE
+            WHEN {DTE_SQL} <= 0 THEN 'EXPIRED'
+            WHEN {DTE_SQL} <= 1 THEN 'SAME_DAY'
+            WHEN {DTE_SQL} <= 7 THEN 'WEEKLY'
+            WHEN {DTE_SQL} <= 30 THEN 'MONTHLY'
+            WHEN {DTE_SQL} <= 90 THEN 'QUARTERLY'
+            WHEN {DTE_SQL} <= 180 THEN 'SEMI_ANNUAL'
+            WHEN {DTE_SQL} <= 365 THEN 'ANNUAL'
+            ELSE 'LONG_TERM'
+        END"""
+
+# Строки снапшота s: из его keyframe-группы последняя запись контракта не позже s
+POSITIONS_FROM = """
+    FROM oi_snapshots s
+    JOIN oi_positions p ON p.keyframe_id = s.keyframe_id AND p.snapshot_id <= s.snapshot_id
+    JOIN instruments i ON i.instrument_id = p.instrument_id
+"""
+# Запись актуальна для s, если следующая запись контракта в группе (если есть) - позже s
+POSITIONS_CURRENT = """p.open_interest IS NOT NULL
+        AND (p.next_snapshot_id IS NULL OR p.next_snapshot_id > s.snapshot_id)"""
+
+_SNAPSHOT_ID = "(SELECT snapshot_id FROM oi_snapshots WHERE asset = {row}.asset AND timestamp = {row}.timestamp)"
+_KEYFRAME_ID = "(SELECT keyframe_id FROM oi_snapshots WHERE asset = {row}.asset AND timestamp = {row}.timestamp)"
+_INSTRUMENT_ID = "(SELECT instrument_id FROM instruments WHERE symbol = {row}.symbol)"
+
+
+def _exists(conn: sqlite3.Connection, name: str, kind: str = 'table') -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = ? AND name = ?", (kind, name)).fetchone() is not None
+
+
+def needs_migration(conn: sqlite3.Connection) -> bool:
+    """В БД старая таблица all_positions_tracking (не VIEW)"""
+    return _exists(conn, LEGACY_TABLE)
+
+
+def _create_tables(conn: sqlite3.Connection):
+    init_registry_tables(conn)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS oi_snapshots (
+            snapshot_id INTEGER PRIMARY KEY,
+            asset TEXT,
+            timestamp INTEGER,
+            spot_price REAL,
+            keyframe_id INTEGER,
+            UNIQUE (asset, timestamp)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS oi_positions (
+            keyframe_id INTEGER,
+            snapshot_id INTEGER,
+            instrument_id INTEGER,
+            open_interest REAL,
+            volume_24h REAL,
+            mark_price REAL,
+            mark_iv REAL,
+            next_snapshot_id INTEGER,
+            PRIMARY KEY (keyframe_id, instrument_id, snapshot_id)
+        ) WITHOUT ROWID
+    """)
+
+
+def _link_positions(conn: sqlite3.Connection):
+    """
+    next_snapshot_id: колонка (с заполнением для уже записанных групп) и триггеры,
+    которые держат её при любой вставке/удалении в oi_positions
+    """
+    if 'next_snapshot_id' not in [row[1] for row in conn.execute('PRAGMA table_info(oi_positions)')]:
+        conn.execute('ALTER TABLE oi_positions ADD COLUMN next_snapshot_id INTEGER')
+        conn.execute("""
+            UPDATE oi_positions SET next_snapshot_id = (
+                SELECT MIN(q.snapshot_id) FROM oi_positions q
+                WHERE q.keyframe_id = oi_positions.keyframe_id AND q.instrument_id = oi_positions.instrument_id
+                  AND q.snapshot_id > oi_positions.snapshot_id
+            )
+        """)
+    # Новая запись перекрывает предыдущую запись контракта и сама ссылается на следующую
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS oi_positions_link
+        AFTER INSERT ON oi_positions
+        BEGIN
+            UPDATE oi_positions SET next_snapshot_id = NEW.snapshot_id
+            WHERE keyframe_id = NEW.keyframe_id AND instrument_id = NEW.instrument_id
+              AND snapshot_id = (
+                SELECT MAX(snapshot_id) FROM oi_positions
+                WHERE keyframe_id = NEW.keyframe_id AND instrument_id = NEW.instrument_id
+                  AND snapshot_id < NEW.snapshot_id
+              );
+            UPDATE oi_positions SET next_snapshot_id = (
+                SELECT MIN(snapshot_id) FROM oi_positions
+                WHERE keyframe_id = NEW.keyframe_id AND instrument_id = NEW.instrument_id
+                  AND snapshot_id > NEW.snapshot_id
+            )
+            WHERE keyframe_id = NEW.keyframe_id AND instrument_id = NEW.instrument_id
+              AND snapshot_id = NEW.snapshot_id;
+        END
+    """)
+    # Удалённая запись выпадает из цепочки: предыдущая снова действует до следующей
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS oi_positions_unlink
+        AFTER DELETE ON oi_positions
+        BEGIN
+            UPDATE oi_positions SET next_snapshot_id = OLD.next_snapshot_id
+            WHERE keyframe_id = OLD.keyframe_id AND instrument_id = OLD.instrument_id
+              AND next_snapshot_id = OLD.snapshot_id;
+        END
+    """)
+
+
+def _upgrade_layout(conn: sqlite3.Connection):
+    """oi_positions без keyframe_id (каждый снапшот полный) -> keyframe-группы из одного снапшота"""
+    if not _exists(conn, 'oi_positions'):
+        return
+    if 'keyframe_id' in [row[1] for row in conn.execute('PRAGMA table_info(oi_positions)')]:
+        return
+    conn.execute('DROP VIEW IF EXISTS all_positions_tracking')
+    conn.execute('ALTER TABLE oi_snapshots ADD COLUMN keyframe_id INTEGER')
+    conn.execute('UPDATE oi_snapshots SET keyframe_id = snapshot_id')
+    conn.execute('ALTER TABLE oi_positions RENAME TO oi_positions_full')
+    _create_tables(conn)
+    conn.execute("""
+        INSERT INTO oi_positions
+            (keyframe_id, snapshot_id, instrument_id, open_interest, volume_24h, mark_price, mark_iv)
+        SELECT snapshot_id, snapshot_id, instrument_id, open_interest, volume_24h, mark_price, mark_iv
+        FROM oi_positions_full
+    """)
+    conn.execute('DROP TABLE oi_positions_full')
+
+
+def _create_view(conn: sqlite3.Connection):
+    view = f"""CREATE VIEW all_positions_tracking AS
+        SELECT
+            s.timestamp AS timestamp,
+            s.asset AS asset,
+            i.symbol AS symbol,
+            i.expiry AS expiry,
+            i.expiry_date AS expiry_date,
+            {DTE_SQL} AS dte,
+            i.strike AS strike,
+            i.option_type AS option_type,
+            p.open_interest AS open_interest,
+            p.volume_24h AS volume_24h,
+            s.spot_price AS spot_price,
+            (i.strike - s.spot_price) / s.spot_price AS distance_pct,
+            {CATEGORY_SQL} AS time_category
+        {POSITIONS_FROM}
+        WHERE {POSITIONS_CURRENT}
+    """
+    # Определение из прошлой версии пересоздаётся (триггеры удаляются вместе с VIEW)
+    existing = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'view' AND name = ?",
+                            (LEGACY_TABLE,)).fetchone()
+    if existing and existing[0] != view:
+        conn.execute(f'DROP VIEW {LEGACY_TABLE}')
+        existing = None
+    if not existing:
+        conn.execute(view)
+    # Старые писатели (INSERT ... VALUES из 13 полей) пишут полный снапшот (keyframe)
+    snapshot, instrument = _SNAPSHOT_ID.format(row='NEW'), _INSTRUMENT_ID.format(row='NEW')
+    keyframe = _KEYFRAME_ID.format(row='NEW')
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS all_positions_tracking_insert
+        INSTEAD OF INSERT ON all_positions_tracking
+        BEGIN
+            -- Без конфликтов: OR REPLACE внешнего INSERT пересоздал бы снапшот с новым id
+            INSERT INTO oi_snapshots (asset, timestamp, spot_price)
+            SELECT NEW.asset, NEW.timestamp, NEW.spot_price
+            WHERE NOT EXISTS (SELECT 1 FROM oi_snapshots WHERE asset = NEW.asset AND timestamp = NEW.timestamp);
+            UPDATE oi_snapshots SET keyframe_id = snapshot_id
+            WHERE asset = NEW.asset AND timestamp = NEW.timestamp AND keyframe_id IS NULL;
+            INSERT INTO instruments
+                (symbol, asset, expiry, expiry_date, expiry_ts, strike, option_type, listed, first_seen, last_seen)
+            SELECT NEW.symbol, NEW.asset, NEW.expiry, NEW.expiry_date,
+                   CAST(strftime('%s', NEW.expiry_date || ' 08:00:00') AS INTEGER),
+                   NEW.strike, NEW.option_type, 0, NEW.timestamp, NEW.timestamp
+            WHERE NOT EXISTS (SELECT 1 FROM instruments WHERE symbol = NEW.symbol);
+            DELETE FROM oi_positions
+            WHERE keyframe_id = {keyframe} AND instrument_id = {instrument} AND snapshot_id = {snapshot};
+            INSERT INTO oi_positions (keyframe_id, snapshot_id, instrument_id, open_interest, volume_24h)
+            VALUES ({keyframe}, {snapshot}, {instrument}, NEW.open_interest, NEW.volume_24h);
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS all_positions_tracking_delete
+        INSTEAD OF DELETE ON all_positions_tracking
+        BEGIN
+            -- Удаляется строка, записанная в этом снапшоте (для keyframe - вся позиция группы)
+            DELETE FROM oi_positions
+            WHERE keyframe_id = {_KEYFRAME_ID.format(row='OLD')}
+              AND instrument_id = {_INSTRUMENT_ID.format(row='OLD')}
+              AND snapshot_id = {_SNAPSHOT_ID.format(row='OLD')};
+        END
+    """)
+
+
+def init_oi_schema(conn: sqlite3.Connection):
+    """Новая схема (идемпотентно); старая таблица сначала мигрируется"""
+    if needs_migration(conn):
+        conn.commit()
+        migrate_connection(conn)
+    _upgrade_layout(conn)
+    _create_tables(conn)
+    _link_positions(conn)
+    _create_view(conn)
+
+
+# ==================== WRITE / READ ====================
+
+def register_snapshot(conn: sqlite3.Connection, asset: str, timestamp: int, spot_price: float,
+                      keyframe_id: Optional[int] = None) -> Tuple[int, int]:
+    """(snapshot_id, keyframe_id) снапшота; keyframe_id=None - снапшот сам keyframe"""
+    conn.execute('INSERT OR IGNORE INTO oi_snapshots (asset, timestamp, spot_price, keyframe_id) VALUES (?, ?, ?, ?)',
+                 (asset, timestamp, spot_price, keyframe_id))
+    conn.execute('UPDATE oi_snapshots SET keyframe_id = snapshot_id '
+                 'WHERE asset = ? AND timestamp = ? AND keyframe_id IS NULL', (asset, timestamp))
+    return conn.execute('SELECT snapshot_id, keyframe_id FROM oi_snapshots WHERE asset = ? AND timestamp = ?',
+                        (asset, timestamp)).fetchone()
+
+
+def write_positions(conn: sqlite3.Connection, keyframe_id: int, snapshot_id: int,
+                    rows: Iterable[Tuple[int, Optional[float], Optional[float], Optional[float], Optional[float]]]):
+    """Строки снапшота: (instrument_id, oi, volume_24h, mark_price, mark_iv); oi=None - контракт исчез"""
+    conn.executemany('INSERT OR REPLACE INTO oi_positions '
+                     '(keyframe_id, snapshot_id, instrument_id, open_interest, volume_24h, mark_price, mark_iv) '
+                     'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                     [(keyframe_id, snapshot_id, *row) for row in rows])
+
+
+def _changed(old: Tuple[float, float, float, float], new: Tuple[float, float, float, float]) -> bool:
+    (oi0, vol0, mark0, iv0), (oi1, vol1, mark1, iv1) = old, new
+    return (abs(oi1 - oi0) > OI_TOLERANCE
+            or abs(vol1 - vol0) > VOLUME_TOLERANCE * abs(vol0) or (vol0 == 0) != (vol1 == 0)
+            or abs(mark1 - mark0) > MARK_TOLERANCE * abs(mark0) or (mark0 == 0) != (mark1 == 0)
+            or abs(iv1 - iv0) > IV_TOLERANCE)
+
+
+class SnapshotRecorder:
+    """
+    Запись снапшотов keyframe + изменения. Сравнение идёт с уже записанным
+    состоянием (а не с прошлым наблюдением), так что допуски не накапливаются.
+    Состояние в памяти: после перезапуска первый снапшот актива - keyframe.
+    """
+
+    def __init__(self, mode: str = RECORD_MODE, keyframe_interval: int = KEYFRAME_INTERVAL):
+        self.mode = mode
+        self.keyframe_interval = keyframe_interval
+        self.state: Dict[str, dict] = {}   # asset -> keyframe_id, keyframe_ts, rows {instrument_id: values}
+
+    def write(self, conn: sqlite3.Connection, asset: str, timestamp: int, spot_price: float,
+              rows: Iterable[Tuple[int, float, float, float, float]],
+              keep: Iterable[int] = ()) -> Dict[str, int]:
+        """
+        rows: (instrument_id, oi, volume_24h, mark_price, mark_iv) опрошенных контрактов;
+        keep - не опрошенные в этот раз контракты, их последние значения переносятся.
+        Прочие ранее записанные контракты считаются исчезнувшими.
+        """
+        current = {row[0]: tuple(row[1:]) for row in rows}
+        state = self.state.get(asset)
+        recorded = state['rows'] if state else {}
+        carried = {iid: recorded[iid] for iid in keep if iid in recorded and iid not in current}
+        keyframe = (self.mode == 'full' or state is None
+                    or timestamp - state['keyframe_ts'] >= self.keyframe_interval)
+
+        if keyframe:
+            snapshot_id, keyframe_id = register_snapshot(conn, asset, timestamp, spot_price)
+            changes = list(current.items()) + list(carried.items())
+            state = self.state[asset] = {'keyframe_id': keyframe_id, 'keyframe_ts': timestamp, 'rows': {}}
+        else:
+            snapshot_id, keyframe_id = register_snapshot(conn, asset, timestamp, spot_price, state['keyframe_id'])
+            changes = [(iid, values) for iid, values in current.items()
+                       if iid not in recorded or _changed(recorded[iid], values)]
+            changes += [(iid, (None, None, None, None)) for iid in recorded
+                        if iid not in current and iid not in carried]
+
+        write_positions(conn, keyframe_id, snapshot_id, [(iid, *values) for iid, values in changes])
+        for iid, values in changes:
+            if values[0] is None:
+                state['rows'].pop(iid, None)
+            else:
+                state['rows'][iid] = values
+        return {'snapshot_id': snapshot_id, 'keyframe': int(keyframe),
+                'written': len(changes), 'contracts': len(current) + len(carried)}
+
+
+def latest_positions(conn: sqlite3.Connection, asset: str) -> List[tuple]:
+    """
+    Последний снапшот актива: (instrument_id, symbol, expiry, expiry_date, dte,
+    strike, option_type, open_interest, volume_24h, timestamp, time_category)
+    """
+    return conn.execute(f"""
+        SELECT p.instrument_id, i.symbol, i.expiry, i.expiry_date, {DTE_SQL}, i.strike,
+               i.option_type, p.open_interest, p.volume_24h, s.timestamp, {CATEGORY_SQL}
+        {POSITIONS_FROM}
+        WHERE s.snapshot_id = (
+            SELECT snapshot_id FROM oi_snapshots WHERE asset = ? ORDER BY timestamp DESC LIMIT 1
+        )
+          AND {POSITIONS_CURRENT}
+    """, (asset,)).fetchall()
+
+
+
+def delete_expired_positions(conn: sqlite3.Connection, after_snapshot_id: int = 0) -> Tuple[int, int]:
+    """
+    Удаление строк с time_category = 'EXPIRED' (DTE <= 0 на момент снапшота),
+    записанных в снапшотах новее after_snapshot_id; -> (удалено, последний snapshot_id).
+    Как и DELETE через VIEW, затрагивает только строки, записанные в самом снапшоте
+    (не NULL-метки), но читает лишь группы новых снапшотов по PK и контракты,
+    у которых экспирация в пределах двух суток (instruments.expiry_ts).
+    """
+    last = conn.execute('SELECT MAX(snapshot_id) FROM oi_snapshots').fetchone()[0] or 0
+    if last <= after_snapshot_id:
+        return 0, after_snapshot_id
+    deleted = conn.execute(f"""
+        DELETE FROM oi_positions
+        WHERE (keyframe_id, instrument_id, snapshot_id) IN (
+            SELECT p.keyframe_id, p.instrument_id, p.snapshot_id
+            {POSITIONS_FROM}
+            WHERE s.snapshot_id > ? AND s.snapshot_id <= ?
+              AND p.snapshot_id = s.snapshot_id
+              AND p.open_interest IS NOT NULL
+              AND i.expiry_ts <= s.timestamp + 2 * 86400
+              AND {DTE_SQL} <= 0
+        )
+    """, (after_snapshot_id, last)).rowcount
+    return deleted, last
+
+# ==================== MIGRATION ====================
+
+def _migrate_cumulative(conn: sqlite3.Connection):
+    """position_cumulative: position_key "{asset}_{symbol}" -> instrument_id"""
+    if not _exists(conn, 'position_cumulative'):
+        return
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(position_cumulative)')]
+    if columns[0] != 'position_key':
+        return
+    rest = columns[1:]
+    conn.execute('ALTER TABLE position_cumulative RENAME TO position_cumulative_legacy')
+    conn.execute(f"""
+        CREATE TABLE position_cumulative (
+            instrument_id INTEGER PRIMARY KEY,
+            {', '.join(f'{c} {t}' for _, c, t, *_ in conn.execute('PRAGMA table_info(position_cumulative_legacy)') if c != 'position_key')}
+        )
+    """)
+    conn.execute(f"""
+        INSERT OR REPLACE INTO position_cumulative
+        SELECT i.instrument_id, {', '.join('c.' + c for c in rest)}
+        FROM position_cumulative_legacy c
+        JOIN instruments i ON c.position_key = c.asset || '_' || i.symbol
+    """)
+    dropped = conn.execute('SELECT COUNT(*) FROM position_cumulative_legacy').fetchone()[0] - \
+        conn.execute('SELECT COUNT(*) FROM position_cumulative').fetchone()[0]
+    if dropped:
+        logger.warning(f"position_cumulative: {dropped} rows without instrument (dropped)")
+    conn.execute('DROP TABLE position_cumulative_legacy')
+
+
+def migrate_connection(conn: sqlite3.Connection) -> int:
+    """Перенос старой all_positions_tracking в новую схему одной транзакцией; -> строк"""
+    isolation = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute(f'ALTER TABLE {LEGACY_TABLE} RENAME TO {LEGACY_TABLE}_legacy')
+        _create_tables(conn)
+
+        # Справочник: контракты из истории (listed=0, текущий листинг отметит реестр)
+        conn.execute(f"""
+            INSERT OR IGNORE INTO instruments
+                (symbol, asset, expiry, expiry_date, expiry_ts, strike, option_type, listed, first_seen, last_seen)
+            SELECT symbol, asset, expiry, expiry_date,
+                   CAST(strftime('%s', expiry_date || ' 08:00:00') AS INTEGER),
+                   strike, option_type, 0, MIN(timestamp), MAX(timestamp)
+            FROM {LEGACY_TABLE}_legacy
+            GROUP BY symbol
+            ORDER BY MIN(timestamp), symbol
+        """)
+        # Старые снапшоты полные - каждый сам себе keyframe
+        conn.execute(f"""
+            INSERT OR IGNORE INTO oi_snapshots (asset, timestamp, spot_price)
+            SELECT asset, timestamp, MAX(spot_price)
+            FROM {LEGACY_TABLE}_legacy
+            GROUP BY asset, timestamp
+            ORDER BY timestamp, asset
+        """)
+        conn.execute('UPDATE oi_snapshots SET keyframe_id = snapshot_id WHERE keyframe_id IS NULL')
+        conn.execute(f"""
+            INSERT OR REPLACE INTO oi_positions (keyframe_id, snapshot_id, instrument_id, open_interest, volume_24h)
+            SELECT s.snapshot_id, s.snapshot_id, i.instrument_id, l.open_interest, l.volume_24h
+            FROM {LEGACY_TABLE}_legacy l
+            JOIN oi_snapshots s ON s.asset = l.asset AND s.timestamp = l.timestamp
+            JOIN instruments i ON i.symbol = l.symbol
+        """)
+
+        legacy = conn.execute(f'SELECT COUNT(*) FROM {LEGACY_TABLE}_legacy').fetchone()[0]
+        migrated = conn.execute('SELECT COUNT(*) FROM oi_positions').fetchone()[0]
+        if migrated < legacy:
+            raise RuntimeError(f"migrated {migrated} of {legacy} rows")
+
+        conn.execute(f'DROP TABLE {LEGACY_TABLE}_legacy')
+        _link_positions(conn)
+        _create_view(conn)
+        _migrate_cumulative(conn)
+        conn.execute('COMMIT')
+        return legacy
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.isolation_level = isolation
+
+
+def migrate(db_path: str = OI_DB_PATH, vacuum: bool = True) -> int:
+    """Миграция файла БД; VACUUM возвращает место старой таблицы"""
+    conn = sqlite3.connect(db_path)
+    try:
+        if not needs_migration(conn):
+            logger.info(f"{db_path}: already migrated")
+            return 0
+        started = time.time()
+        rows = migrate_connection(conn)
+        logger.info(f"{db_path}: {rows} rows migrated in {time.time() - started:.1f}s")
+        if vacuum:
+            conn.execute('VACUUM')
+        return rows
+    finally:
+        conn.close()
+
+
+def table_stats(db_path: str = OI_DB_PATH) -> List[Tuple[str, int]]:
+    """(таблица/индекс, байт) по dbstat, если доступен, иначе число строк"""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute('SELECT name, SUM(pgsize) FROM dbstat GROUP BY name ORDER BY 2 DESC').fetchall()
+    except sqlite3.OperationalError:
+        names = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        return [(n, conn.execute(f'SELECT COUNT(*) FROM "{n}"').fetchone()[0]) for n in names]
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    import os
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else 'stats'
+    db_path = sys.argv[2] if len(sys.argv) > 2 else OI_DB_PATH
+
+    if command == 'migrate':
+        before = os.path.getsize(db_path)
+        migrate(db_path)
+        print(f"{db_path}: {before / 1e6:.1f} MB -> {os.path.getsize(db_path) / 1e6:.1f} MB")
+    elif command == 'stats':
+        for name, size in table_stats(db_path):
+            print(f"  {name:<40} {size:>12,}")
+        conn = sqlite3.connect(db_path)
+        snapshots, keyframes = conn.execute(
+            'SELECT COUNT(*), SUM(keyframe_id = snapshot_id) FROM oi_snapshots').fetchone()
+        delta_rows = conn.execute(
+            'SELECT COUNT(*) FROM oi_positions WHERE keyframe_id != snapshot_id').fetchone()[0]
+        rows = conn.execute('SELECT COUNT(*) FROM oi_positions').fetchone()[0]
+        conn.close()
+        print(f"  snapshots {snapshots:,} (keyframes {keyframes or 0:,}), "
+              f"positions {rows:,} (delta {delta_rows:,})")
+    else:
+        print(__doc__)
@@ -12,6 +12,8 @@ import time
 import json
 from datetime import datetime, timedelta
 
+from instrument_registry import get_instrument_registry
+
 class OIStrikeAnalysisSystem:
     def __init__(self):
         self.base_url = "https://api.bybit.com"
@@ -111,33 +113,22 @@ class OIStrikeAnalysisSystem:
         spot_price = float(spot_response.json()['result']['list'][0]['lastPrice'])
         print(f"{asset} spot: ${spot_price:,.2f}")
         
-        # Получаем все опционы
-        instruments_response = requests.get(f"{self.base_url}/v5/market/instruments-info",
-                                          params={'category': 'option', 'baseCoin': asset})
+        # Все опционы из общего справочника (уже разобраны)
+        options = get_instrument_registry().contracts(asset)
         
-        if instruments_response.status_code != 200:
+        if not options:
             print(f"Failed to get instruments data")
             return
         
-        options = instruments_response.json()['result']['list']
         print(f"Found {len(options)} {asset} options")
         
         collected_count = 0
         
         for option in options:
-            symbol = option['symbol']
-            
-            # Парсим детали опциона
-            parts = symbol.split('-')
-            if len(parts) < 4:
-                continue
-                
-            try:
-                expiry = parts[1]
-                strike = float(parts[2])
-                option_type = 'Call' if parts[3] == 'C' else 'Put'
-            except:
-                continue
+            symbol = option.symbol
+            expiry = option.expiry
+            strike = option.strike
+            option_type = option.option_type
             
             # Получаем тикер данные
             ticker_response = requests.get(f"{self.base_url}/v5/market/tickers",
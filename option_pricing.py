@@ -1,5 +1,5 @@
 import numpy as np
-from scipy.stats import norm
+from lazy_imports import norm
 from math import log, sqrt, exp
 from datetime import datetime, timedelta
 import sqlite3
@@ -66,19 +66,25 @@ class OptionPricing:
             return {'delta': 0.5, 'gamma': 0.01, 'theta': -0.05, 'vega': 0.02}
 
     @staticmethod
-    def calculate_pop(option_type, spot, strike, expiry_days, iv, target_return=0.5):
-        """Расчет Probability of Profit"""
+    def calculate_pop(option_type, spot, strike, expiry_days, iv, target_return=0.5, asset=None):
+        """
+        Probability of Profit длинного опциона (Monte Carlo, pop_engine):
+        вероятность заработать на экспирации не меньше target_return от премии
+        """
         try:
-            T = expiry_days/365
-            if option_type == "CALL":
-                target_price = strike + (target_return * spot)
-                d2 = (log(spot/target_price) + (0.02 - 0.5*iv**2)*T) / (iv*sqrt(T))
-                pop = norm.cdf(d2)
-            else:
-                target_price = strike - (target_return * spot)
-                d2 = (log(spot/target_price) + (0.02 - 0.5*iv**2)*T) / (iv*sqrt(T))
-                pop = norm.cdf(-d2)
-            return max(0.1, min(0.9, pop))
+            from pop_engine import get_pop_engine
+            from strategies.options.position_model import black_scholes, make_legs
+
+            days = max(1, int(round(expiry_days)))
+            is_call = option_type == "CALL"
+            premium = float(black_scholes(spot, strike, days / 365, iv, is_call)['price'])
+            candidate = {
+                'name': option_type,
+                'legs': make_legs([(strike, days, 'call' if is_call else 'put', 1)]),
+                'premium': premium * (1 + target_return)
+            }
+            result = get_pop_engine().evaluate(asset, spot, [candidate], iv=iv)[0]
+            return result['probability_of_profit']
         except Exception as e:
             logger.warning(f"PoP calculation failed: {e}, using 0.5")
             return 0.5
@@ -170,6 +176,39 @@ def generate_option_strategy(asset, signal_type, spot_price):
         return generate_long_straddle(asset, spot_price, expiration_days)
 
 
+def _strategy_candidate(strategy):
+    """Ноги и премия стратегии для pop_engine"""
+    from strategies.options.position_model import make_legs
+
+    dte = strategy['expiration_days']
+    stype = strategy['strategy_type']
+    if stype == 'BULL_CALL_SPREAD':
+        legs = [(strategy['long_call_strike'], dte, 'call', 1), (strategy['short_call_strike'], dte, 'call', -1)]
+        premium = strategy['premium_paid']
+    elif stype == 'BEAR_PUT_SPREAD':
+        legs = [(strategy['long_put_strike'], dte, 'put', 1), (strategy['short_put_strike'], dte, 'put', -1)]
+        premium = strategy['premium_paid']
+    else:
+        legs = [(strategy['strike'], dte, 'call', 1), (strategy['strike'], dte, 'put', 1)]
+        premium = strategy['total_premium']
+    return {'name': stype, 'legs': make_legs(legs), 'premium': premium}
+
+
+def attach_risk_metrics(asset, spot_price, strategies):
+    """
+    PoP, EV и хвостовой убыток (средний из худших 5%) по Monte Carlo:
+    все стратегии сигнала оцениваются на одной матрице путей
+    """
+    from pop_engine import get_pop_engine
+
+    results = get_pop_engine().evaluate(asset, spot_price, [_strategy_candidate(s) for s in strategies])
+    for strategy, result in zip(strategies, results):
+        strategy['probability_of_profit'] = result['probability_of_profit']
+        strategy['expected_value'] = round(result['expected_value'], 2)
+        strategy['tail_loss'] = round(result['tail_loss'], 2)
+    return strategies
+
+
 def generate_bull_call_spread(asset, spot_price, expiration_days):
     """Бычий Call Spread с оптимальными страйками"""
     # Длинный колл: ATM или немного ITM
@@ -182,7 +221,7 @@ def generate_bull_call_spread(asset, spot_price, expiration_days):
     max_profit = spread_width * 0.6  # ~60% от ширины
     premium = spread_width * 0.3  # ~30% от ширины
     
-    return {
+    strategy = {
         'asset': asset,
         'strategy_type': 'BULL_CALL_SPREAD',
         'long_call_strike': round(long_strike, 2),
@@ -191,10 +230,10 @@ def generate_bull_call_spread(asset, spot_price, expiration_days):
         'max_profit': round(max_profit, 2),
         'max_loss': round(premium, 2),
         'break_even': round(long_strike + premium, 2),
-        'probability_of_profit': 0.55,
         'expiration_days': expiration_days,
         'risk_reward_ratio': round(max_profit / premium, 2)
     }
+    return attach_risk_metrics(asset, spot_price, [strategy])[0]
 
 
 def generate_bear_put_spread(asset, spot_price, expiration_days):
@@ -209,7 +248,7 @@ def generate_bear_put_spread(asset, spot_price, expiration_days):
     max_profit = spread_width * 0.55  # ~55% от ширины
     premium = spread_width * 0.35  # ~35% от ширины
     
-    return {
+    strategy = {
         'asset': asset,
         'strategy_type': 'BEAR_PUT_SPREAD',
         'long_put_strike': round(long_strike, 2),
@@ -218,10 +257,10 @@ def generate_bear_put_spread(asset, spot_price, expiration_days):
         'max_profit': round(max_profit, 2),
         'max_loss': round(premium, 2),
         'break_even': round(long_strike - premium, 2),
-        'probability_of_profit': 0.50,
         'expiration_days': expiration_days,
         'risk_reward_ratio': round(max_profit / premium, 2)
     }
+    return attach_risk_metrics(asset, spot_price, [strategy])[0]
 
 
 def generate_long_straddle(asset, spot_price, expiration_days):
@@ -233,7 +272,7 @@ def generate_long_straddle(asset, spot_price, expiration_days):
     put_premium = spot_price * 0.038
     total_premium = call_premium + put_premium
     
-    return {
+    strategy = {
         'asset': asset,
         'strategy_type': 'LONG_STRADDLE',
         'strike': round(strike, 2),
@@ -243,9 +282,9 @@ def generate_long_straddle(asset, spot_price, expiration_days):
         'max_loss': round(total_premium, 2),
         'upper_breakeven': round(strike + total_premium, 2),
         'lower_breakeven': round(strike - total_premium, 2),
-        'probability_of_profit': 0.45,
         'expiration_days': expiration_days
     }
+    return attach_risk_metrics(asset, spot_price, [strategy])[0]
 
 
 def get_dynamic_expiration_days(asset, signal_type):
@@ -315,6 +354,7 @@ LONG CALL ${strat['long_call_strike']:.2f} / SHORT CALL ${strat['short_call_stri
 - Break-Even: ${strat['break_even']:.2f}
 - Risk/Reward: {strat['risk_reward_ratio']:.2f}
 - Probability of Profit: {strat['probability_of_profit']:.0%}
+- EV: ${strat['expected_value']:+.2f} | Хвост 5%: -${strat['tail_loss']:.2f}
 - Экспирация: {strat['expiration_days']} дней
 
 💼 РИСК-МЕНЕДЖМЕНТ:
@@ -335,6 +375,7 @@ LONG PUT ${strat['long_put_strike']:.2f} / SHORT PUT ${strat['short_put_strike']
 - Break-Even: ${strat['break_even']:.2f}
 - Risk/Reward: {strat['risk_reward_ratio']:.2f}
 - Probability of Profit: {strat['probability_of_profit']:.0%}
+- EV: ${strat['expected_value']:+.2f} | Хвост 5%: -${strat['tail_loss']:.2f}
 - Экспирация: {strat['expiration_days']} дней
 
 💼 РИСК-МЕНЕДЖМЕНТ:
@@ -355,6 +396,7 @@ STRADDLE @ ${strat['strike']:.2f}
 - Upper Break-Even: ${strat['upper_breakeven']:.2f}
 - Lower Break-Even: ${strat['lower_breakeven']:.2f}
 - Probability of Profit: {strat['probability_of_profit']:.0%}
+- EV: ${strat['expected_value']:+.2f} | Хвост 5%: -${strat['tail_loss']:.2f}
 - Экспирация: {strat['expiration_days']} дней
 
 💼 РИСК-МЕНЕДЖМЕНТ:
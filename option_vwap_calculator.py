@@ -6,12 +6,12 @@ OPTION VWAP CALCULATOR - Stage 1.4.6 (FIXED)
 """
 
 import sqlite3
-import json
 import logging
 from datetime import datetime
-from pathlib import Path
 from typing import Dict, Any, Optional
 
+from results_log import append_result
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -20,25 +20,26 @@ class OptionVWAPCalculator:
     
     def __init__(self):
         self.db_path = './data/unlimited_oi.db'
-        self.output_dir = Path('./data/option_vwap/')
-        self.output_dir.mkdir(parents=True, exist_ok=True)
     
-    def calculate_vwap(self, asset: str) -> Optional[Dict[str, Any]]:
-        """Расчет VWAP для актива"""
+    def calculate_vwap(self, asset: str, as_of: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """Расчет VWAP для актива (as_of - только строки до этого момента, без записи JSON)"""
         
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
+            upper = int(as_of.timestamp()) if as_of else None
+            
             # ИСПРАВЛЕНО: option_type вместо side, Call/Put с большой буквы
-            cursor.execute('''
+            cursor.execute(f'''
                 SELECT strike, option_type, open_interest, spot_price
                 FROM all_positions_tracking
                 WHERE asset = ?
                 AND open_interest > 0
                 AND spot_price > 0
+                {"AND timestamp <= ?" if as_of else ""}
                 ORDER BY strike
-            ''', (asset,))
+            ''', (asset, upper) if as_of else (asset,))
             
             rows = cursor.fetchall()
             conn.close()
@@ -76,7 +77,7 @@ class OptionVWAPCalculator:
             
             result = {
                 'asset': asset,
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': (as_of or datetime.now()).isoformat(),
                 'call_vwap': round(call_vwap, 2),
                 'put_vwap': round(put_vwap, 2),
                 'total_vwap': round(total_vwap, 2),
@@ -86,8 +87,9 @@ class OptionVWAPCalculator:
                 'vwap_ratio': round(call_vwap / put_vwap, 4) if put_vwap > 0 else 0
             }
             
-            # Сохраняем в JSON
-            self._save_to_json(result)
+            # Пишем в журнал (исторические запросы не пишем)
+            if as_of is None:
+                self._save_result(result)
             
             return result
             
@@ -97,20 +99,12 @@ class OptionVWAPCalculator:
             traceback.print_exc()
             return None
     
-    def _save_to_json(self, result: Dict[str, Any]):
-        """Сохранение результата в JSON"""
+    def _save_result(self, result: Dict[str, Any]):
+        """Дописать результат в журнал data/results/option_vwap"""
         try:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"{result['asset']}_vwap_{timestamp}.json"
-            filepath = self.output_dir / filename
-            
-            with open(filepath, 'w') as f:
-                json.dump(result, f, indent=2)
-            
-            logger.info(f"✅ Saved: {filename}")
-            
+            append_result('option_vwap', result['asset'], result)
         except Exception as e:
-            logger.error(f"Error saving JSON: {e}")
+            logger.error(f"Error saving result: {e}")
     
     def calculate_all(self, assets: list) -> Dict[str, Any]:
         """Расчет VWAP для всех активов"""
@@ -124,10 +118,10 @@ class OptionVWAPCalculator:
         return results
 
 
-def get_option_vwap(asset: str) -> Optional[Dict[str, Any]]:
+def get_option_vwap(asset: str, as_of: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
     """Функция для интеграции с data_integration.py"""
     calculator = OptionVWAPCalculator()
-    return calculator.calculate_vwap(asset)
+    return calculator.calculate_vwap(asset, as_of=as_of)
 
 
 if __name__ == '__main__':
@@ -6,7 +6,6 @@ FIXED OPTIONS BACKTEST
 """
 
 import sqlite3
-import json
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 
@@ -28,8 +27,7 @@ class OptionsBacktestFixed:
                 asset,
                 signal_type,
                 confidence,
-                spot_price,
-                data_snapshot_json
+                spot_price
             FROM signal_history
             WHERE signal_type IN ('BULLISH', 'BEARISH')
             ORDER BY timestamp ASC
@@ -10,11 +10,11 @@ REAL OPTIONS BACKTEST
 - Exit логика (экспирация vs TP/SL)
 """
 
-import sqlite3
-import json
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 
+from signal_history_logger import SignalHistoryLogger, SNAPSHOT_COLUMNS
+
 class OptionsBacktest:
     """Реальный опционный бэктест"""
     
@@ -24,45 +24,23 @@ class OptionsBacktest:
     
     def load_signals_with_strategies(self) -> List[Dict]:
         """Загрузить сигналы со стратегиями"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT 
-                timestamp,
-                asset,
-                signal_type,
-                confidence,
-                spot_price,
-                strategies_json,
-                data_snapshot_json
-            FROM signal_history
-            WHERE signal_type IN ('BULLISH', 'BEARISH')
-            ORDER BY timestamp ASC
-        ''')
-        
-        rows = cursor.fetchall()
-        conn.close()
+        history = SignalHistoryLogger(self.db_path)
+        frame = history.load_frame("h.signal_type IN ('BULLISH', 'BEARISH')")
+        raw = history.load_raw(frame['signal_id'].tolist())
+        metric_columns = list(SNAPSHOT_COLUMNS)
         
         signals = []
-        for row in rows:
-            try:
-                strategies = json.loads(row[5]) if row[5] else []
-                data = json.loads(row[6])
-                
-                signals.append({
-                    'timestamp': row[0],
-                    'datetime': datetime.fromtimestamp(row[0]),
-                    'asset': row[1],
-                    'signal_type': row[2],
-                    'confidence': row[3],
-                    'spot_price': row[4],
-                    'strategies': strategies,
-                    'data': data
-                })
-            except Exception as e:
-                print(f"Error parsing: {e}")
-                pass
+        for row in frame.itertuples(index=False):
+            signals.append({
+                'timestamp': row.timestamp,
+                'datetime': datetime.fromtimestamp(row.timestamp),
+                'asset': row.asset,
+                'signal_type': row.signal_type,
+                'confidence': row.confidence,
+                'spot_price': row.spot_price,
+                'strategies': raw.get(row.signal_id, {}).get('strategies', []),
+                'data': {c: getattr(row, c) for c in metric_columns}
+            })
         
         return signals
     
@@ -6,11 +6,12 @@ PCR CALCULATOR - Put/Call Ratio с RSI
 """
 
 import sqlite3
-import json
-import os
 from datetime import datetime, timedelta
 import logging
 
+from indicator_state import get_store
+from results_log import append_result
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -18,8 +19,6 @@ logger = logging.getLogger(__name__)
 class PCRCalculator:
     def __init__(self):
         self.oi_db = './data/unlimited_oi.db'
-        self.output_dir = './data/pcr/'
-        os.makedirs(self.output_dir, exist_ok=True)
     
     def calculate_pcr(self, asset):
         """Рассчитать PCR для актива"""
@@ -65,9 +64,12 @@ class PCRCalculator:
             pcr_oi = put_oi / call_oi if call_oi > 0 else 0
             pcr_volume = put_volume / call_volume if call_volume > 0 else 0
             
-            # Получаем историю для RSI
-            pcr_history = self._get_pcr_history(asset)
-            pcr_rsi = self._calculate_rsi(pcr_history, pcr_oi) if pcr_history else 50
+            # RSI из потокового состояния (обновляется на каждый снапшот)
+            store = get_store()
+            store.sync(asset)
+            pcr_rsi = store.get_rsi(asset, 'pcr')
+            if pcr_rsi is None:
+                pcr_rsi = 50
             
             result = {
                 'asset': asset,
@@ -92,61 +94,6 @@ class PCRCalculator:
             logger.error(f"❌ Ошибка расчёта PCR для {asset}: {e}")
             return None
     
-    def _get_pcr_history(self, asset):
-        """Получить историю PCR за последние 14 дней"""
-        try:
-            files = [f for f in os.listdir(self.output_dir) if f.startswith(f"{asset}_pcr_")]
-            if not files:
-                return []
-            
-            # Берём последние 14 файлов
-            files.sort(reverse=True)
-            history = []
-            
-            for file in files[:14]:
-                try:
-                    with open(os.path.join(self.output_dir, file), 'r') as f:
-                        data = json.load(f)
-                        history.append(data['pcr_oi'])
-                except:
-                    continue
-            
-            return history
-            
-        except Exception as e:
-            logger.error(f"Ошибка получения истории PCR: {e}")
-            return []
-    
-    def _calculate_rsi(self, history, current_value):
-        """Рассчитать RSI для PCR"""
-        try:
-            if len(history) < 2:
-                return 50
-            
-            # Добавляем текущее значение
-            values = history + [current_value]
-            
-            # Рассчитываем изменения
-            changes = [values[i] - values[i-1] for i in range(1, len(values))]
-            
-            gains = [c if c > 0 else 0 for c in changes]
-            losses = [-c if c < 0 else 0 for c in changes]
-            
-            avg_gain = sum(gains) / len(gains) if gains else 0
-            avg_loss = sum(losses) / len(losses) if losses else 0
-            
-            if avg_loss == 0:
-                return 100
-            
-            rs = avg_gain / avg_loss
-            rsi = 100 - (100 / (1 + rs))
-            
-            return rsi
-            
-        except Exception as e:
-            logger.error(f"Ошибка расчёта RSI: {e}")
-            return 50
-    
     def _interpret_pcr(self, pcr_oi, pcr_rsi):
         """Интерпретация PCR"""
         if pcr_rsi > 70:
@@ -161,14 +108,9 @@ class PCRCalculator:
             return "NEUTRAL"
     
     def _save_result(self, asset, result):
-        """Сохранить результат в JSON"""
+        """Дописать результат в журнал data/results/pcr"""
         try:
-            filename = f"{asset}_pcr_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            filepath = os.path.join(self.output_dir, filename)
-            
-            with open(filepath, 'w') as f:
-                json.dump(result, f, indent=2)
-                
+            append_result('pcr', asset, result)
         except Exception as e:
             logger.error(f"Ошибка сохранения PCR: {e}")
     
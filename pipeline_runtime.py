@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PIPELINE RUNTIME - Этапы пайплайна внутри одного процесса
+Каждый этап импортируется один раз как модуль, его объект (с открытыми
+соединениями к БД) живёт между запусками, а запуски идут в пуле потоков.
+Перекрывающиеся запуски одного этапа пропускаются, таймаут и ошибки
+фиксируются по этапу и не задевают остальные.
+"""
+
+import importlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineStage:
+    """Один этап: модуль + точка входа ('func' или 'Class.method')"""
+
+    def __init__(self, name: str, module: str, entry: str, timeout: float):
+        self.name = name
+        self.module = module
+        self.entry = entry
+        self.timeout = timeout
+
+        self._callable: Optional[Callable[[], Any]] = None
+        self._lock = threading.Lock()
+        self.running = False
+        self.started_at: Optional[float] = None
+        self.timeout_reported = False
+
+        self.stats = {
+            'runs': 0,
+            'failures': 0,
+            'timeouts': 0,
+            'skipped': 0,
+            'last_run': None,
+            'last_duration': None,
+            'last_error': None,
+            'last_dispatch_us': None
+        }
+
+    def load(self) -> Callable[[], Any]:
+        """Импорт модуля и создание объекта этапа (один раз)"""
+        if self._callable is None:
+            module = importlib.import_module(self.module)
+            if '.' in self.entry:
+                class_name, method_name = self.entry.split('.', 1)
+                instance = getattr(module, class_name)()
+                self._callable = getattr(instance, method_name)
+            else:
+                self._callable = getattr(module, self.entry)
+        return self._callable
+
+    def try_acquire(self) -> bool:
+        """Занять этап; False если предыдущий запуск ещё идёт"""
+        with self._lock:
+            if self.running:
+                return False
+            self.running = True
+            self.started_at = time.monotonic()
+            self.timeout_reported = False
+            return True
+
+    def release(self):
+        with self._lock:
+            self.running = False
+            self.started_at = None
+
+
+class PipelineRuntime:
+    """Планирование этапов в пуле потоков без запуска интерпретаторов"""
+
+    def __init__(self, max_workers: int = 4, on_alert: Optional[Callable[[str], None]] = None):
+        self.stages: Dict[str, PipelineStage] = {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pipeline')
+        self.on_alert = on_alert or (lambda message: None)
+
+    def add_stage(self, name: str, module: str, entry: str, timeout: float = 60) -> PipelineStage:
+        stage = PipelineStage(name, module, entry, timeout)
+        self.stages[name] = stage
+        return stage
+
+    def submit(self, name: str) -> bool:
+        """Поставить запуск этапа в пул (без ожидания)"""
+        t0 = time.perf_counter()
+        stage = self.stages[name]
+
+        if not stage.try_acquire():
+            stage.stats['skipped'] += 1
+            logger.warning(f"{name}: предыдущий запуск ещё идёт, пропуск")
+            return False
+
+        self.executor.submit(self._run, stage)
+        stage.stats['last_dispatch_us'] = (time.perf_counter() - t0) * 1e6
+        return True
+
+    def _run(self, stage: PipelineStage):
+        started = time.perf_counter()
+        try:
+            stage.load()()
+            stage.stats['runs'] += 1
+            stage.stats['last_run'] = datetime.now()
+            stage.stats['last_error'] = None
+            logger.info(f"{stage.name} успешно выполнен за {time.perf_counter() - started:.2f} сек")
+        except Exception as e:
+            stage.stats['failures'] += 1
+            stage.stats['last_error'] = str(e)
+            logger.error(f"Ошибка в {stage.name}: {e}")
+            self.on_alert(f"🚨 СБОЙ {stage.name}: {e}")
+        finally:
+            stage.stats['last_duration'] = time.perf_counter() - started
+            stage.release()
+
+    def check_timeouts(self):
+        """Отметить этапы, которые работают дольше своего таймаута"""
+        now = time.monotonic()
+        for stage in self.stages.values():
+            started = stage.started_at
+            if stage.running and started is not None and not stage.timeout_reported \
+                    and now - started > stage.timeout:
+                stage.timeout_reported = True
+                stage.stats['timeouts'] += 1
+                logger.error(f"Таймаут {stage.name} (> {stage.timeout} сек)")
+                self.on_alert(f"⏰ ТАЙМАУТ {stage.name}")
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Состояние этапов для health-проверок"""
+        return {name: dict(stage.stats, running=stage.running)
+                for name, stage in self.stages.items()}
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait)
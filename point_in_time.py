@@ -0,0 +1,542 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+POINT IN TIME - Историческое состояние 14 источников DataIntegrator
+- Одна точка: DataIntegrator().get_all_data(asset, as_of=ts) - каждый геттер
+  data_integration ограничен окном (ts - h, ts] по индексу timestamp
+- Диапазон: reconstruct_range(asset, start, end) - таблицы читаются один раз,
+  окно каждой точки находится searchsorted по отсортированному timestamp,
+  суммы - разностью кумулятивных сумм, RSI/MACD - одним проходом истории
+- В точку попадают только строки с timestamp <= ts: данные без утечки будущего
+
+Результат - список снапшотов в формате get_all_data, совместимый с
+batch_signal_analyzer.features_frame.
+
+Использование:
+    python3 point_in_time.py BTC 2025-10-20 2025-10-24 [step_minutes]
+    python3 point_in_time.py parity BTC [n_points]
+"""
+
+import logging
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from analytics_cache import SNAPSHOT_MAX_AGE, get_analytics_cache
+from data_integration import format_gex, format_max_pain
+from data_integrator import DataIntegrator
+from expiration_walls_analyzer import ExpirationWallsAnalyzer, get_last_friday_next_month
+from indicator_state import IndicatorStateStore, rsi_from_state, macd_from_state
+from iv_history import iv_at
+from oi_dynamics_analyzer import OIDynamicsAnalyzer
+from realized_vol import iv_rv_spreads, realized_vol_at
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+OI_DB_PATH = './data/unlimited_oi.db'
+FUNDING_DB_PATH = './data/funding_rates.db'
+LIQUIDATIONS_DB_PATH = './data/liquidations.db'
+
+# Окна геттеров data_integration (сек)
+DAY = 86400
+IV_RANK_WINDOW = 7 * DAY
+LIQUIDATIONS_WINDOW = 4 * 3600
+DYNAMICS_WINDOW = 48 * 3600
+IV_RANK_ROW_LIMIT = 500
+DEFAULT_FUNDING = 0.0001
+
+Timestamp = Union[int, float, datetime, str]
+
+
+def _to_unix(ts: Timestamp) -> int:
+    if isinstance(ts, datetime):
+        return int(ts.timestamp())
+    if isinstance(ts, str):
+        return int(pd.Timestamp(ts).to_pydatetime().timestamp())
+    return int(ts)
+
+
+def _window_sum(cumsum: np.ndarray, lo: int, hi: int) -> float:
+    """Сумма элементов [lo, hi) по кумулятивной сумме с ведущим нулём"""
+    return float(cumsum[hi] - cumsum[lo])
+
+
+def _cumsum(values: np.ndarray) -> np.ndarray:
+    return np.concatenate([[0.0], np.cumsum(values, dtype=np.float64)])
+
+
+class HistoricalState:
+    """
+    Состояние источников актива на диапазоне [start, end]: строки всех таблиц
+    с запасом на самое длинное окно (IV Rank, 7 дней) читаются одним запросом,
+    дальше любая точка диапазона считается без обращения к БД.
+    """
+
+    def __init__(self, asset: str, start: Timestamp, end: Timestamp,
+                 db_path: str = OI_DB_PATH, funding_db: str = FUNDING_DB_PATH,
+                 liquidations_db: str = LIQUIDATIONS_DB_PATH):
+        self.asset = asset
+        self.start = _to_unix(start)
+        self.end = _to_unix(end)
+        self.db_path = db_path
+        self.funding_db = funding_db
+        self.liquidations_db = liquidations_db
+        self.walls = ExpirationWallsAnalyzer(db_path)
+        self.dynamics = OIDynamicsAnalyzer(db_path)
+        self._load()
+
+    # ==================== LOAD ====================
+
+    def _load(self):
+        load_start = self.start - IV_RANK_WINDOW
+        conn = sqlite3.connect(self.db_path)
+        try:
+            # (timestamp, symbol) - порядок PK, в нём же строки отдают live-запросы
+            rows = pd.read_sql_query('''
+                SELECT timestamp, strike, option_type, open_interest, volume_24h,
+                       spot_price, expiry_date, dte
+                FROM all_positions_tracking
+                WHERE asset = ? AND timestamp > ? AND timestamp <= ?
+                ORDER BY timestamp, symbol
+            ''', conn, params=(self.asset, load_start, self.end))
+
+            # VWAP считается по всей истории: база до начала загрузки - одним агрегатом
+            self.vwap_base = {'Call': (0.0, 0.0), 'Put': (0.0, 0.0)}
+            for option_type, oi, weighted in conn.execute('''
+                SELECT option_type, SUM(open_interest), SUM(strike * open_interest)
+                FROM all_positions_tracking
+                WHERE asset = ? AND open_interest > 0 AND spot_price > 0 AND timestamp <= ?
+                GROUP BY option_type
+            ''', (self.asset, load_start)):
+                if option_type in self.vwap_base:
+                    self.vwap_base[option_type] = (oi or 0.0, weighted or 0.0)
+
+            self.spot_before = conn.execute('''
+                SELECT spot_price FROM oi_snapshots
+                WHERE asset = ? AND timestamp <= ?
+                ORDER BY timestamp DESC
+                LIMIT 1
+            ''', (self.asset, load_start)).fetchone()
+        finally:
+            conn.close()
+
+        self._prepare_rows(rows)
+        self._load_funding()
+        self._load_liquidations()
+
+    def _prepare_rows(self, rows: pd.DataFrame):
+        self.rows = rows
+        self.ts = rows['timestamp'].to_numpy(dtype=np.int64)
+        self.snapshot_ts = np.unique(self.ts)
+        self.strike = rows['strike'].to_numpy(dtype=np.float64)
+        self.oi = rows['open_interest'].fillna(0).to_numpy(dtype=np.float64)
+        self.spot = rows['spot_price'].to_numpy(dtype=np.float64)
+        self.dte = rows['dte'].fillna(0).to_numpy(dtype=np.int64)
+        self.is_call = (rows['option_type'] == 'Call').to_numpy()
+        self.is_put = (rows['option_type'] == 'Put').to_numpy()
+        volume = rows['volume_24h'].fillna(0).to_numpy(dtype=np.float64)
+
+        live = self.oi > 0
+        self.live_idx = np.flatnonzero(live)
+        self.live_ts = self.ts[self.live_idx]
+
+        # PCR / Vanna: суммы окна = разности кумулятивных сумм
+        self.cum_oi = _cumsum(self.oi)
+        self.cum_put_oi = _cumsum(np.where(live & self.is_put, self.oi, 0.0))
+        self.cum_call_oi = _cumsum(np.where(live & self.is_call, self.oi, 0.0))
+        self.cum_put_vol = _cumsum(np.where(live & self.is_put, volume, 0.0))
+        self.cum_call_vol = _cumsum(np.where(live & self.is_call, volume, 0.0))
+
+        # VWAP: кумулятивно с начала истории
+        priced = live & (self.spot > 0)
+        self.cum_vwap = {}
+        for option_type, mask in (('Call', priced & self.is_call), ('Put', priced & self.is_put)):
+            base_oi, base_weighted = self.vwap_base[option_type]
+            self.cum_vwap[option_type] = (
+                base_oi + _cumsum(np.where(mask, self.oi, 0.0)),
+                base_weighted + _cumsum(np.where(mask, self.strike * self.oi, 0.0))
+            )
+        self.priced_before = bool(sum(v[0] for v in self.vwap_base.values()) > 0)
+        self.cum_priced = _cumsum(priced.astype(np.float64))
+
+        # Стенки: код группы (strike, option_type, expiry_date)
+        self.option_type = rows['option_type'].to_numpy()
+        self.expiry = rows['expiry_date'].astype(str).to_numpy()
+        self.wall_codes, self.wall_groups = pd.factorize(
+            pd.MultiIndex.from_arrays([rows['strike'], rows['option_type'], rows['expiry_date'].astype(str)])
+        )
+
+        # OI Dynamics: ряды (expiry_date, timestamp) один раз на весь диапазон
+        series = rows.assign(
+            min_dte=rows['dte'].where(rows['dte'] > 0),
+            calls_oi=rows['open_interest'].where(rows['option_type'] == 'Call', 0.0),
+            puts_oi=rows['open_interest'].where(rows['option_type'] == 'Put', 0.0),
+        )
+        self.expiry_series = (series.groupby(['expiry_date', 'timestamp'], sort=False)
+                              .agg(min_dte=('min_dte', 'min'), total_oi=('open_interest', 'sum'),
+                                   calls_oi=('calls_oi', 'sum'), puts_oi=('puts_oi', 'sum'))
+                              .reset_index()
+                              .sort_values('timestamp', kind='stable')
+                              .reset_index(drop=True))
+        self.series_ts = self.expiry_series['timestamp'].to_numpy(dtype=np.int64)
+
+    def _load_funding(self):
+        self.funding_ts = np.empty(0, dtype=np.int64)
+        self.funding = np.empty(0)
+        try:
+            conn = sqlite3.connect(self.funding_db)
+            rows = conn.execute('''
+                SELECT timestamp, funding_rate FROM funding_rates
+                WHERE symbol = ? AND timestamp <= ?
+                ORDER BY timestamp
+            ''', (self.asset, self.end)).fetchall()
+            conn.close()
+        except sqlite3.Error:
+            return
+        if rows:
+            self.funding_ts = np.array([r[0] for r in rows], dtype=np.int64)
+            self.funding = np.array([r[1] for r in rows], dtype=np.float64)
+
+    def _load_liquidations(self):
+        """Тот же запрос, что get_recent_liquidations; ошибка схемы = источник недоступен"""
+        self.liq_ts = None
+        try:
+            conn = sqlite3.connect(self.liquidations_db)
+            tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+            table_name = next((t for t in ('liquidations', 'liquidation_data') if t in tables), None)
+            if table_name is None:
+                conn.close()
+                return
+            rows = conn.execute(f'''
+                SELECT timestamp, side, qty * price
+                FROM {table_name}
+                WHERE symbol = ? AND timestamp > ? AND timestamp <= ?
+                ORDER BY timestamp
+            ''', (self.asset, self.start - LIQUIDATIONS_WINDOW, self.end)).fetchall()
+            conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Liquidations history unavailable for {self.asset}: {e}")
+            return
+
+        self.liq_ts = np.array([r[0] for r in rows], dtype=np.int64)
+        usd = np.array([r[2] or 0.0 for r in rows], dtype=np.float64)
+        sides = np.array([r[1] for r in rows], dtype=object)
+        self.cum_longs = _cumsum(np.where(np.isin(sides, ['Buy', 'Long']), usd, 0.0))
+        self.cum_shorts = _cumsum(np.where(np.isin(sides, ['Sell', 'Short']), usd, 0.0))
+
+    # ==================== SOURCES ====================
+
+    def _bounds(self, ts: int, window: int):
+        return (int(np.searchsorted(self.ts, ts - window, side='right')),
+                int(np.searchsorted(self.ts, ts, side='right')))
+
+    def _live_bounds(self, ts: int, window: int):
+        return (int(np.searchsorted(self.live_ts, ts - window, side='right')),
+                int(np.searchsorted(self.live_ts, ts, side='right')))
+
+    def futures(self, ts: int) -> Optional[Dict[str, Any]]:
+        _, hi = self._bounds(ts, 0)
+        if hi > 0:
+            spot = float(self.spot[hi - 1])
+        elif self.spot_before:
+            spot = self.spot_before[0]
+        else:
+            return None
+
+        k = int(np.searchsorted(self.funding_ts, ts, side='right'))
+        funding_rate = float(self.funding[k - 1]) if k > 0 else DEFAULT_FUNDING
+        return {'price': spot, 'spot_price': spot, 'funding_rate': funding_rate, 'open_interest': 0}
+
+    def liquidations(self, ts: int) -> Optional[Dict[str, Any]]:
+        if self.liq_ts is None:
+            return None
+        lo = int(np.searchsorted(self.liq_ts, ts - LIQUIDATIONS_WINDOW, side='right'))
+        hi = int(np.searchsorted(self.liq_ts, ts, side='right'))
+        longs = _window_sum(self.cum_longs, lo, hi)
+        shorts = _window_sum(self.cum_shorts, lo, hi)
+        return {
+            'longs_liquidated': longs,
+            'shorts_liquidated': shorts,
+            'total_usd': longs + shorts,
+            'ratio': (shorts / longs) if longs > 0 else 999.0
+        }
+
+    def pcr(self, ts: int) -> Optional[Dict[str, Any]]:
+        lo, hi = self._bounds(ts, DAY)
+        call_oi = _window_sum(self.cum_call_oi, lo, hi)
+        if call_oi == 0:
+            return None
+        put_oi = _window_sum(self.cum_put_oi, lo, hi)
+        put_volume = _window_sum(self.cum_put_vol, lo, hi)
+        call_volume = _window_sum(self.cum_call_vol, lo, hi)
+        return {
+            'ratio': put_oi / call_oi,
+            'put_oi': put_oi,
+            'call_oi': call_oi,
+            'put_volume': put_volume,
+            'call_volume': call_volume,
+            'volume_ratio': put_volume / call_volume if call_volume > 0 else 0
+        }
+
+    def _snapshot_metric(self, metric: str, ts: int):
+        """(snapshot_ts, результат) последнего снапшота <= ts через общий analytics_cache"""
+        k = int(np.searchsorted(self.snapshot_ts, ts, side='right'))
+        if k == 0 or self.snapshot_ts[k - 1] <= ts - SNAPSHOT_MAX_AGE:
+            return None, None
+        snapshot_ts = int(self.snapshot_ts[k - 1])
+        lo, hi = self._bounds(snapshot_ts, 1)
+        cache = get_analytics_cache(oi_db_path=self.db_path)
+        return snapshot_ts, cache.get_or_compute(metric, self.asset, snapshot_ts, self.rows.iloc[lo:hi])
+
+    def gex(self, ts: int) -> Optional[Dict[str, Any]]:
+        return format_gex(*self._snapshot_metric('gex', ts))
+
+    def max_pain(self, ts: int) -> Optional[Dict[str, Any]]:
+        return format_max_pain(*self._snapshot_metric('max_pain', ts))
+
+    def vanna(self, ts: int) -> Optional[Dict[str, Any]]:
+        lo, hi = self._bounds(ts, DAY)
+        total = _window_sum(self.cum_oi, lo, hi)
+        return {'total_vanna': total} if total else None
+
+    def iv_rank(self, ts: int) -> Optional[Dict[str, Any]]:
+        lo, hi = self._live_bounds(ts, IV_RANK_WINDOW)
+        idx = self.live_idx[max(lo, hi - IV_RANK_ROW_LIMIT):hi]
+        if len(idx) < 10:
+            return None
+        spot_price = self.spot[idx[-1]]
+        oi = self.oi[idx]
+        avg_distance = float((np.abs(self.strike[idx] - spot_price) / spot_price * oi).sum() / oi.sum())
+        iv_rank = min(100, max(0, (avg_distance - 0.05) * 500))
+        return {
+            'rank': iv_rank,
+            'percentile': iv_rank,
+            'current_iv': avg_distance * 100,
+            'min_iv': 0,
+            'max_iv': 100
+        }
+
+    def volatility(self, ts: int) -> Optional[Dict[str, Any]]:
+        # Свечи не в OI БД: RV по дневным файлам (кэш разбора), IV - из iv_history
+        rv = realized_vol_at(self.asset, datetime.fromtimestamp(ts))
+        if not rv:
+            return None
+        atm_iv = iv_at(self.asset, ts, self.db_path)
+        return {
+            'realized_vol': rv['realized_vol'],
+            'candle_ts': rv['candle_ts'],
+            'atm_iv': atm_iv,
+            'iv_rv_spread': iv_rv_spreads(rv['realized_vol'], atm_iv)
+        }
+
+    def option_vwap(self, ts: int) -> Optional[Dict[str, Any]]:
+        _, hi = self._bounds(ts, 0)
+        if not self.priced_before and self.cum_priced[hi] == 0:
+            return None
+        call_volume, call_weighted = (float(c[hi]) for c in self.cum_vwap['Call'])
+        put_volume, put_weighted = (float(c[hi]) for c in self.cum_vwap['Put'])
+
+        call_vwap = call_weighted / call_volume if call_volume > 0 else 0
+        put_vwap = put_weighted / put_volume if put_volume > 0 else 0
+        total_volume = call_volume + put_volume
+        total_vwap = (call_weighted + put_weighted) / total_volume if total_volume > 0 else 0
+        return {
+            'asset': self.asset,
+            'timestamp': datetime.fromtimestamp(ts).isoformat(),
+            'call_vwap': round(call_vwap, 2),
+            'put_vwap': round(put_vwap, 2),
+            'total_vwap': round(total_vwap, 2),
+            'call_volume': round(call_volume, 4),
+            'put_volume': round(put_volume, 4),
+            'total_volume': round(total_volume, 4),
+            'vwap_ratio': round(call_vwap / put_vwap, 4) if put_vwap > 0 else 0
+        }
+
+    def expiration_walls(self, ts: int) -> Optional[Dict[str, Any]]:
+        now = datetime.fromtimestamp(ts)
+        max_expiration = get_last_friday_next_month(now).strftime('%Y-%m-%d')
+        lo, hi = self._bounds(ts, DAY)
+        window = np.arange(lo, hi)
+        window = window[(self.oi[window] > 0) & (self.dte[window] > 0) & (self.dte[window] < 60)
+                        & (self.expiry[window] <= max_expiration)]
+        if not len(window):
+            return None
+
+        codes = self.wall_codes[window]
+        totals = np.bincount(codes, weights=self.oi[window], minlength=len(self.wall_groups))
+        # dte группы - MIN(dte) за окно, как в SQL анализатора
+        min_dte = np.full(len(self.wall_groups), np.iinfo(np.int64).max)
+        np.minimum.at(min_dte, codes, self.dte[window])
+        groups, first = np.unique(codes, return_index=True)
+        first_row = window[first]
+        keep = totals[groups] > self.walls.wall_threshold
+        groups, first_row = groups[keep], first_row[keep]
+        if not len(groups):
+            return None
+
+        order = np.lexsort((-totals[groups], min_dte[groups]))
+        rows = [(float(self.strike[r]), self.option_type[r], self.expiry[r], float(totals[g]), int(min_dte[g]))
+                for g, r in zip(groups[order], first_row[order])]
+        return self.walls.walls_from_rows(rows, self.asset, now)
+
+    def oi_dynamics(self, ts: int) -> Optional[Dict[str, Any]]:
+        now = datetime.fromtimestamp(ts)
+        max_exp_str, now_str = self.dynamics.expiry_window(now)
+        lo = int(np.searchsorted(self.series_ts, ts - DYNAMICS_WINDOW, side='right'))
+        hi = int(np.searchsorted(self.series_ts, ts, side='right'))
+        rows = self.expiry_series.iloc[lo:hi]
+        rows = rows[(rows['expiry_date'] >= now_str) & (rows['expiry_date'] <= max_exp_str)]
+        if rows.empty:
+            return None
+        return self.dynamics.dynamics_from_rows(self.asset, rows, now)
+
+    # ==================== SWEEP ====================
+
+    def checkpoints(self, step: Optional[int] = None) -> List[int]:
+        """Точки диапазона: каждый снапшот или сетка с шагом step секунд"""
+        if step:
+            return list(range(self.start, self.end + 1, step))
+        snapshots = np.unique(self.ts)
+        return [int(t) for t in snapshots[(snapshots >= self.start) & (snapshots <= self.end)]]
+
+    def reconstruct(self, checkpoints: List[int]) -> List[Dict[str, Any]]:
+        """Снапшоты get_all_data для точек (по возрастанию) одним проходом"""
+        integrator = DataIntegrator()
+        indicators = IndicatorStateStore(self.db_path).replay(self.asset, checkpoints)
+        compute = {
+            'futures': self.futures,
+            'liquidations': self.liquidations,
+            'pcr': self.pcr,
+            'max_pain': self.max_pain,
+            'gex': self.gex,
+            'vanna': self.vanna,
+            'iv_rank': self.iv_rank,
+            'volatility': self.volatility,
+            'option_vwap': self.option_vwap,
+            'expiration_walls': self.expiration_walls,
+            'oi_dynamics': self.oi_dynamics,
+            'pcr_rsi': lambda ts, state: rsi_from_state(state['pcr']),
+            'gex_rsi': lambda ts, state: rsi_from_state(state['gex']),
+            'oi_macd': lambda ts, state: macd_from_state(state['oi']),
+        }
+        with_state = {'pcr_rsi', 'gex_rsi', 'oi_macd'}
+
+        snapshots = []
+        for ts, state in zip(checkpoints, indicators):
+            data = {
+                'asset': self.asset,
+                'timestamp': datetime.fromtimestamp(ts),
+                'spot_price': None,
+                'available_sources': []
+            }
+            # Порядок источников как у DataIntegrator (от него зависит spot_price)
+            for source_name in integrator.data_sources:
+                try:
+                    func = compute[source_name]
+                    result = func(ts, state) if source_name in with_state else func(ts)
+                except Exception as e:
+                    logger.warning(f"Failed {source_name} for {self.asset} @ {ts}: {e}")
+                    result = None
+
+                data[source_name] = result
+                if result is not None:
+                    data['available_sources'].append(source_name)
+                if data['spot_price'] is None and result and isinstance(result, dict):
+                    if 'spot_price' in result:
+                        data['spot_price'] = result['spot_price']
+                    elif 'price' in result:
+                        data['spot_price'] = result['price']
+
+            data['quality'] = integrator.get_data_quality_report(data)
+            snapshots.append(data)
+        return snapshots
+
+
+def reconstruct_range(asset: str, start: Timestamp, end: Timestamp, step: Optional[int] = None,
+                      db_path: str = OI_DB_PATH) -> List[Dict[str, Any]]:
+    """Полный вектор 14 источников на каждый снапшот (или шаг step сек) диапазона"""
+    state = HistoricalState(asset, start, end, db_path)
+    return state.reconstruct(state.checkpoints(step))
+
+
+# ==================== PARITY ====================
+
+def _diff(path: str, expected: Any, actual: Any, out: List[str], tol: float = 1e-6):
+    """Расхождения двух результатов (числа - с относительным допуском на порядок суммирования)"""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        for key in sorted(set(expected) | set(actual)):
+            if key != 'timestamp':
+                _diff(f"{path}.{key}", expected.get(key), actual.get(key), out, tol)
+    elif isinstance(expected, list) and isinstance(actual, list) and len(expected) == len(actual):
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            _diff(f"{path}[{i}]", e, a, out, tol)
+    elif isinstance(expected, (int, float)) and isinstance(actual, (int, float)):
+        if abs(expected - actual) > tol * max(1.0, abs(expected), abs(actual)):
+            out.append(f"{path}: {expected} != {actual}")
+    elif expected != actual:
+        out.append(f"{path}: {expected!r} != {actual!r}")
+
+
+def check_parity(asset: str, n_points: int = 20, db_path: str = OI_DB_PATH) -> List[str]:
+    """Bulk-снапшоты против DataIntegrator.get_all_data(as_of=ts) на n_points снапшотах"""
+    conn = sqlite3.connect(db_path)
+    timestamps = [r[0] for r in conn.execute(
+        "SELECT timestamp FROM oi_snapshots WHERE asset = ? ORDER BY timestamp", (asset,))]
+    conn.close()
+    if not timestamps:
+        return [f"no snapshots for {asset}"]
+
+    picks = sorted({timestamps[int(i)] for i in np.linspace(0, len(timestamps) - 1, n_points)})
+    t0 = time.perf_counter()
+    state = HistoricalState(asset, picks[0], picks[-1], db_path)
+    bulk = state.reconstruct(picks)
+    bulk_elapsed = time.perf_counter() - t0
+
+    integrator = DataIntegrator()
+    mismatches = []
+    t0 = time.perf_counter()
+    for ts, snapshot in zip(picks, bulk):
+        expected = integrator.get_all_data(asset, as_of=datetime.fromtimestamp(ts))
+        for source_name in integrator.data_sources:
+            # VWAP округлён до 2-4 знаков: порядок суммирования может сдвинуть последний
+            tol = 1e-4 if source_name == 'option_vwap' else 1e-6
+            _diff(f"{ts}.{source_name}", expected.get(source_name), snapshot.get(source_name), mismatches, tol)
+    single_elapsed = time.perf_counter() - t0
+
+    print(f"{asset}: {len(picks)} points, bulk {bulk_elapsed:.2f}s vs per-point {single_elapsed:.2f}s, "
+          f"{len(mismatches)} mismatches")
+    return mismatches
+
+
+if __name__ == '__main__':
+    logging.getLogger().setLevel(logging.WARNING)
+
+    if len(sys.argv) > 2 and sys.argv[1] == 'parity':
+        n = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+        problems = check_parity(sys.argv[2], n)
+        for line in problems[:30]:
+            print(f"  ❌ {line}")
+        sys.exit(1 if problems else 0)
+
+    if len(sys.argv) < 4:
+        print(__doc__)
+        sys.exit(1)
+
+    asset, start, end = sys.argv[1], sys.argv[2], sys.argv[3]
+    step = int(sys.argv[4]) * 60 if len(sys.argv) > 4 else None
+
+    t0 = time.perf_counter()
+    snapshots = reconstruct_range(asset, start, end, step)
+    elapsed = time.perf_counter() - t0
+
+    print(f"📊 {asset}: {len(snapshots)} points in {elapsed:.2f}s")
+    for data in snapshots[-5:]:
+        quality = data['quality']
+        print(f"  {data['timestamp']}  ${data['spot_price'] or 0:,.2f}  "
+              f"{quality['status']} ({quality['available_sources']}/{quality['total_sources']})")
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+POLL SCHEDULER - Адаптивный опрос опционных контрактов
+Контракты актива делятся на корзины (экспирация x удалённость от спота).
+Интервал корзины = базовый по DTE x множитель по moneyness, делённый на
+активность (EWMA доли контрактов с изменившимся OI/объёмом в час) и на
+значимость для сигналов (доля OI корзины + явные boost от сигналов).
+На каждом тике бюджет запросов отдаётся самым просроченным корзинам
+(возраст / интервал), так что при нехватке бюджета все деградируют
+пропорционально, а ближние экспирации и ATM всегда свежее дальних.
+
+Метрики свежести по корзинам: freshness() / summary() и таблица
+poll_freshness в unlimited_oi.db (одна строка на корзину).
+
+Использование:
+    python3 poll_scheduler.py simulate [MINUTES]   # фиксированный интервал vs адаптивный
+"""
+
+import logging
+import math
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+OI_DB_PATH = './data/unlimited_oi.db'
+
+# Базовый интервал по DTE: (DTE до, сек)
+DTE_INTERVALS = [(1, 120), (7, 180), (30, 300), (90, 600), (180, 900), (365, 1200), (math.inf, 1800)]
+# Полосы |strike / spot - 1|: (до, название, множитель интервала)
+MONEYNESS_BANDS = [(0.05, 'atm', 1.0), (0.15, 'near', 1.5), (0.50, 'wing', 2.0), (math.inf, 'far', 3.0)]
+
+MIN_INTERVAL = 30
+MAX_INTERVAL = 2 * 3600
+ACTIVITY_HALFLIFE = 6          # опросов корзины
+ACTIVITY_CAP = 1.0             # активность сокращает интервал не более чем в 1 + CAP раз
+VOLUME_CHANGE = 0.01           # относительное изменение volume_24h, считаемое активностью
+RELEVANCE_RANGE = (0.75, 1.5)  # пределы множителя значимости по доле OI
+
+
+def dte_interval(dte: float) -> int:
+    return next(interval for limit, interval in DTE_INTERVALS if dte <= limit)
+
+
+def moneyness_band(distance_pct: float) -> Tuple[str, float]:
+    return next((name, factor) for limit, name, factor in MONEYNESS_BANDS if abs(distance_pct) <= limit)
+
+
+def init_freshness_table(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS poll_freshness (
+            asset TEXT,
+            expiry_date TEXT,
+            band TEXT,
+            dte INTEGER,
+            contracts INTEGER,
+            interval_sec REAL,
+            last_polled INTEGER,
+            age_sec REAL,
+            staleness REAL,
+            activity REAL,
+            polls INTEGER,
+            updated_at INTEGER,
+            PRIMARY KEY (asset, expiry_date, band)
+        )
+    """)
+
+
+class Bucket:
+    """Контракты одной экспирации в одной полосе moneyness"""
+
+    __slots__ = ('asset', 'expiry_date', 'band', 'dte', 'factor', 'members',
+                 'last_polled', 'activity', 'polls', 'oi', 'relevance')
+
+    def __init__(self, asset: str, expiry_date: str, band: str, dte: int, factor: float):
+        self.asset = asset
+        self.expiry_date = expiry_date
+        self.band = band
+        self.dte = dte
+        self.factor = factor
+        self.members: Set[int] = set()
+        self.last_polled = 0.0
+        self.activity = 0.0       # изменившихся контрактов (доля) в час, EWMA
+        self.polls = 0
+        self.oi = 0.0
+        self.relevance = 1.0
+
+    def interval(self, boost: float = 1.0) -> float:
+        base = dte_interval(self.dte) * self.factor
+        speedup = (1 + min(self.activity, ACTIVITY_CAP)) * self.relevance * boost
+        return min(MAX_INTERVAL, max(MIN_INTERVAL, base / speedup))
+
+
+class PollScheduler:
+    """
+    Корзины всех активов и очередь опроса.
+    sync() - состав корзин по текущему листингу и споту, due() - что опросить
+    на тике в пределах бюджета, observe() - результаты опроса.
+    """
+
+    def __init__(self, db_path: Optional[str] = OI_DB_PATH):
+        self.db_path = db_path
+        self.buckets: Dict[Tuple[str, str, str], Bucket] = {}
+        self.bucket_of: Dict[int, Tuple[str, str, str]] = {}
+        self.last_values: Dict[int, Tuple[float, float]] = {}   # instrument_id -> (oi, volume)
+        self.boosts: Dict[Tuple[str, Optional[str]], Tuple[float, float]] = {}   # -> (factor, until)
+        self.stats = {'ticks': 0, 'requests': 0, 'deferred': 0}
+
+    # ==================== MEMBERSHIP ====================
+
+    def synced(self, asset: str) -> bool:
+        return any(key[0] == asset for key in self.buckets)
+
+    def sync(self, asset: str, contracts: Iterable[Tuple[int, str, int, float]]):
+        """contracts: (instrument_id, expiry_date, dte, distance_pct) отслеживаемых контрактов"""
+        keys = set()
+        for instrument_id, expiry_date, dte, distance_pct in contracts:
+            band, factor = moneyness_band(distance_pct)
+            key = (asset, expiry_date, band)
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = Bucket(asset, expiry_date, band, dte, factor)
+            bucket.dte = dte
+            previous = self.bucket_of.get(instrument_id)
+            if previous != key:
+                if previous in self.buckets:
+                    self.buckets[previous].members.discard(instrument_id)
+                bucket.members.add(instrument_id)
+                self.bucket_of[instrument_id] = key
+            keys.add(key)
+
+        # Экспирированные / снятые / вышедшие за фильтр контракты
+        for key in [k for k in self.buckets if k[0] == asset]:
+            bucket = self.buckets[key]
+            if key not in keys:
+                for instrument_id in bucket.members:
+                    self.bucket_of.pop(instrument_id, None)
+                    self.last_values.pop(instrument_id, None)
+                del self.buckets[key]
+
+    def boost(self, asset: str, expiry_date: Optional[str] = None, factor: float = 2.0, ttl: int = 1800):
+        """Сигнал заинтересован в активе (или экспирации): интервал / factor на ttl сек"""
+        self.boosts[(asset, expiry_date)] = (factor, time.time() + ttl)
+
+    def _boost(self, bucket: Bucket, now: float) -> float:
+        factor = 1.0
+        for key in ((bucket.asset, None), (bucket.asset, bucket.expiry_date)):
+            entry = self.boosts.get(key)
+            if entry and entry[1] > now:
+                factor *= entry[0]
+        return factor
+
+    # ==================== SCHEDULING ====================
+
+    def staleness(self, bucket: Bucket, now: float) -> float:
+        return (now - bucket.last_polled) / bucket.interval(self._boost(bucket, now))
+
+    def due(self, now: float, budget: int) -> Dict[str, Set[int]]:
+        """asset -> instrument_id к опросу: просроченные корзины по убыванию просрочки, не больше budget"""
+        overdue = sorted(((self.staleness(b, now), b) for b in self.buckets.values() if b.members),
+                         key=lambda item: -item[0])
+        plan: Dict[str, Set[int]] = {}
+        spent = 0
+        for staleness, bucket in overdue:
+            if staleness < 1:
+                break
+            if spent and spent + len(bucket.members) > budget:
+                self.stats['deferred'] += 1
+                continue
+            plan.setdefault(bucket.asset, set()).update(bucket.members)
+            spent += len(bucket.members)
+        self.stats['ticks'] += 1
+        self.stats['requests'] += spent
+        return plan
+
+    def observe(self, asset: str, now: float, rows: Iterable[Tuple[int, float, float]], polled: Set[int]):
+        """rows: (instrument_id, oi, volume_24h) опрошенных контрактов; polled - запрошенные id"""
+        changed: Dict[Tuple[str, str, str], int] = {}
+        for instrument_id, oi, volume in rows:
+            previous = self.last_values.get(instrument_id)
+            self.last_values[instrument_id] = (oi, volume)
+            if previous is None:
+                continue
+            if oi != previous[0] or abs(volume - previous[1]) > VOLUME_CHANGE * max(previous[1], 1e-9):
+                key = self.bucket_of.get(instrument_id)
+                changed[key] = changed.get(key, 0) + 1
+
+        alpha = 1 - 0.5 ** (1 / ACTIVITY_HALFLIFE)
+        polled_keys = {self.bucket_of[i] for i in polled if i in self.bucket_of}
+        for key in polled_keys:
+            bucket = self.buckets[key]
+            if bucket.last_polled:
+                hours = max(now - bucket.last_polled, 1) / 3600
+                rate = changed.get(key, 0) / len(bucket.members) / hours
+                bucket.activity += alpha * (rate - bucket.activity)
+            bucket.last_polled = now
+            bucket.polls += 1
+
+        # Значимость: OI корзины относительно средней корзины актива
+        asset_buckets = [b for b in self.buckets.values() if b.asset == asset]
+        for bucket in asset_buckets:
+            bucket.oi = sum(self.last_values.get(i, (0, 0))[0] for i in bucket.members)
+        mean_oi = sum(b.oi for b in asset_buckets) / max(len(asset_buckets), 1)
+        low, high = RELEVANCE_RANGE
+        for bucket in asset_buckets:
+            bucket.relevance = min(high, max(low, math.sqrt(bucket.oi / mean_oi))) if mean_oi > 0 else 1.0
+
+    # ==================== FRESHNESS ====================
+
+    def freshness(self, now: Optional[float] = None) -> List[dict]:
+        """Метрики по корзинам: интервал, возраст, просрочка, активность"""
+        now = now or time.time()
+        rows = []
+        for bucket in sorted(self.buckets.values(), key=lambda b: (b.asset, b.dte, b.band)):
+            interval = bucket.interval(self._boost(bucket, now))
+            age = now - bucket.last_polled if bucket.last_polled else None
+            rows.append({
+                'asset': bucket.asset,
+                'expiry_date': bucket.expiry_date,
+                'band': bucket.band,
+                'dte': bucket.dte,
+                'contracts': len(bucket.members),
+                'interval_sec': round(interval, 1),
+                'last_polled': int(bucket.last_polled) or None,
+                'age_sec': round(age, 1) if age is not None else None,
+                'staleness': round(age / interval, 2) if age is not None else None,
+                'activity': round(bucket.activity, 3),
+                'polls': bucket.polls
+            })
+        return rows
+
+    def summary(self, now: Optional[float] = None) -> Dict[str, dict]:
+        """Свежесть по DTE-диапазонам (взвешенная по контрактам)"""
+        groups: Dict[str, dict] = {}
+        for row in self.freshness(now):
+            limit = next(limit for limit, _ in DTE_INTERVALS if row['dte'] <= limit)
+            name = f"<={limit}d" if limit != math.inf else '>365d'
+            group = groups.setdefault(name, {'contracts': 0, 'age_sum': 0.0, 'max_age': 0.0, 'max_staleness': 0.0})
+            age = row['age_sec'] if row['age_sec'] is not None else 0.0
+            group['contracts'] += row['contracts']
+            group['age_sum'] += age * row['contracts']
+            group['max_age'] = max(group['max_age'], age)
+            group['max_staleness'] = max(group['max_staleness'], row['staleness'] or 0.0)
+        for group in groups.values():
+            group['mean_age'] = round(group.pop('age_sum') / max(group['contracts'], 1), 1)
+        return groups
+
+    def save(self, conn: Optional[sqlite3.Connection] = None):
+        """Метрики свежести в poll_freshness (таблица перезаписывается целиком)"""
+        own = conn is None
+        if own:
+            conn = sqlite3.connect(self.db_path)
+        init_freshness_table(conn)
+        now = int(time.time())
+        conn.execute('DELETE FROM poll_freshness')
+        conn.executemany('INSERT INTO poll_freshness VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                         [(*row.values(), now) for row in self.freshness(now)])
+        conn.commit()
+        if own:
+            conn.close()
+
+
+def _simulate(minutes: int = 720):
+    """Синтетическая цепочка: одинаковый бюджет запросов, фиксированный 10-мин опрос vs планировщик"""
+    import random
+
+    random.seed(7)
+    expiries = [(f"E{dte:03d}", dte) for dte in (0, 1, 2, 7, 14, 30, 60, 90, 180, 270, 365, 540)]
+    contracts = []
+    for expiry_date, dte in expiries:
+        for k in range(-10, 11):
+            contracts.append((len(contracts) + 1, expiry_date, dte, k * 0.05 * (1 + dte / 180)))
+    # Скорость изменения OI: быстрее у ближних и ATM
+    rates = {c[0]: 30 / (1 + c[2]) * math.exp(-abs(c[3]) * 4) for c in contracts}   # изменений в час
+    budget_per_min = len(contracts) / 10
+
+    def run(adaptive: bool):
+        truth = {c[0]: 0 for c in contracts}
+        pending: Dict[int, List[float]] = {c[0]: [] for c in contracts}   # моменты ещё не увиденных изменений
+        scheduler = PollScheduler(db_path=None)
+        scheduler.sync('SIM', contracts)
+        lag = {'near (<=7d)': [], 'mid (8-90d)': [], 'far (>90d)': [], 'all': []}
+        group = {c[0]: 'near (<=7d)' if c[2] <= 7 else 'mid (8-90d)' if c[2] <= 90 else 'far (>90d)'
+                 for c in contracts}
+        for minute in range(minutes):
+            now = minute * 60.0
+            for c in contracts:
+                if random.random() < rates[c[0]] / 60:
+                    truth[c[0]] += 1
+                    pending[c[0]].append(now)
+            if adaptive:
+                polled = scheduler.due(now + 1, int(budget_per_min)).get('SIM', set())
+            else:
+                polled = {c[0] for c in contracts} if minute % 10 == 0 else set()
+            for i in polled:
+                for changed_at in pending[i]:
+                    lag[group[i]].append(now - changed_at)
+                    lag['all'].append(now - changed_at)
+                pending[i] = []
+            scheduler.observe('SIM', now + 1, [(i, truth[i], 0.0) for i in polled], polled)
+        return {name: sum(v) / max(len(v), 1) for name, v in lag.items()}, scheduler
+
+    fixed, _ = run(False)
+    adaptive, scheduler = run(True)
+    print(f"{len(contracts)} contracts, budget {budget_per_min:.0f} req/min, {minutes} min")
+    print(f"{'mean lag to see a change, s':<32} {'fixed 10m':>10} {'adaptive':>10}")
+    for name in fixed:
+        print(f"  {name:<30} {fixed[name]:>10.0f} {adaptive[name]:>10.0f}")
+    print(f"  requests: fixed {len(contracts) * math.ceil(minutes / 10)}, adaptive {scheduler.stats['requests']}")
+    for name, group in scheduler.summary(minutes * 60).items():
+        print(f"  {name:<8} contracts {group['contracts']:>4}  mean age {group['mean_age']:>7.0f}s  "
+              f"max staleness {group['max_staleness']:.2f}")
+
+
+if __name__ == '__main__':
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) > 1 and sys.argv[1] == 'simulate':
+        _simulate(int(sys.argv[2]) if len(sys.argv) > 2 else 720)
+    else:
+        print(__doc__)
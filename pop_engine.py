@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+POP ENGINE - Monte Carlo вероятность прибыли, EV и хвостовой риск стратегий
+Одна матрица дневных путей цены на сигнал: половина - GBM с IV поверхности,
+половина - бутстрап дневных доходностей из свечей data/raw. Все кандидаты
+(ноги strategies/options/position_model) оцениваются на одних и тех же путях,
+так что десятки конструкций укладываются в ~100 мс.
+"""
+
+import logging
+import math
+import sqlite3
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from strategies.options.position_model import PositionBook
+
+logger = logging.getLogger(__name__)
+
+RAW_DIR = Path(__file__).parent / 'data' / 'raw'
+OPTIONS_DB = 'data/eth_options.db'
+
+N_PATHS = 10000
+BOOTSTRAP_SHARE = 0.5      # доля путей из исторических доходностей
+TAIL_QUANTILE = 0.05       # tail_loss = средний убыток худших 5% путей
+HISTORY_DAYS = 365
+DEFAULT_IV = 0.6
+SNAPSHOT_WINDOW_MINUTES = 10
+
+_returns_cache: Dict[str, tuple] = {}
+
+
+def load_daily_returns(asset: str, days: int = HISTORY_DAYS) -> Optional[np.ndarray]:
+    """Дневные лог-доходности из часовых свечей data/raw/<ASSET>USDT (кэш до нового файла)"""
+    files = sorted((RAW_DIR / f"{asset}USDT").glob('*.csv'))[-days:]
+    if not files:
+        return None
+
+    cached = _returns_cache.get(asset)
+    if cached and cached[0] == (files[-1].name, len(files)):
+        return cached[1]
+
+    df = pd.concat([pd.read_csv(f, usecols=['timestamp', 'close']) for f in files], ignore_index=True)
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    closes = df.set_index('timestamp')['close'].resample('1D').last().dropna()
+    returns = np.diff(np.log(closes.to_numpy(dtype=np.float64)))
+    returns = returns[np.isfinite(returns)]
+
+    _returns_cache[asset] = ((files[-1].name, len(files)), returns)
+    return returns
+
+
+def get_surface_iv(asset: str, dte: float, db_path: str = OPTIONS_DB,
+                   window_minutes: int = SNAPSHOT_WINDOW_MINUTES) -> Optional[float]:
+    """
+    ATM IV последнего снапшота Deribit на ближайшей к dte экспирации (доля, не %).
+    Снапшот = строки за window_minutes до последней записи валюты (старый
+    сбор по инструментам пишет каждой строке своё время; без currency - это ETH).
+    """
+    if not Path(db_path).exists():
+        return None
+    try:
+        conn = sqlite3.connect(db_path)
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(eth_options)")]
+        if 'currency' in columns:
+            currency_filter, params = "COALESCE(currency, 'ETH') = ?", (asset,)
+        elif asset == 'ETH':
+            currency_filter, params = "1 = 1", ()
+        else:
+            conn.close()
+            return None
+        rows = conn.execute(f'''
+            SELECT timestamp, strike, expiration_date, underlying_price, implied_volatility
+            FROM eth_options
+            WHERE {currency_filter} AND implied_volatility > 0
+              AND timestamp >= (SELECT datetime(MAX(timestamp), ?) FROM eth_options WHERE {currency_filter})
+        ''', params + (f'-{window_minutes} minutes',) + params).fetchall()
+        conn.close()
+    except sqlite3.Error as e:
+        logger.warning(f"Surface IV для {asset} недоступна: {e}")
+        return None
+
+    if not rows:
+        return None
+
+    df = pd.DataFrame(rows, columns=['timestamp', 'strike', 'expiration_date', 'underlying', 'iv'])
+    snapshot_time = pd.to_datetime(df['timestamp']).max()
+    df['dte'] = (pd.to_datetime(df['expiration_date']) - snapshot_time).dt.days
+    df = df[df['dte'] > 0]
+    if df.empty:
+        return None
+
+    expiry = df.loc[(df['dte'] - dte).abs().idxmin(), 'expiration_date']
+    chain = df[df['expiration_date'] == expiry]
+    atm = chain.loc[(chain['strike'] - chain['underlying']).abs().idxmin()]
+    return float(atm['iv']) / 100
+
+
+def simulate_paths(spot: float, iv: float, days: int, n_paths: int = N_PATHS,
+                   returns: Optional[np.ndarray] = None, bootstrap_share: float = BOOTSTRAP_SHARE,
+                   seed: Optional[int] = None) -> np.ndarray:
+    """
+    Матрица дневных цен (n_paths, days + 1), колонка 0 = spot.
+    GBM без дрейфа с дневной sigma = iv / sqrt(365); бутстрап - выборка
+    исторических дневных доходностей с возвращением, центрированных к нулю,
+    чтобы тренд истории не попадал в прогноз.
+    """
+    rng = np.random.default_rng(seed)
+    n_boot = int(n_paths * bootstrap_share) if returns is not None and len(returns) > 20 else 0
+    n_gbm = n_paths - n_boot
+
+    sigma = iv / math.sqrt(365)
+    increments = np.empty((n_paths, days), dtype=np.float64)
+    increments[:n_gbm] = rng.normal(-0.5 * sigma ** 2, sigma, size=(n_gbm, days))
+    if n_boot:
+        centered = returns - returns.mean()
+        increments[n_gbm:] = rng.choice(centered, size=(n_boot, days), replace=True)
+
+    log_paths = np.concatenate([np.zeros((n_paths, 1)), np.cumsum(increments, axis=1)], axis=1)
+    return spot * np.exp(log_paths)
+
+
+class PopEngine:
+    """PoP / EV / tail loss для набора кандидатов на общей матрице путей"""
+
+    def __init__(self, n_paths: int = N_PATHS, tail_quantile: float = TAIL_QUANTILE,
+                 seed: Optional[int] = None, cache_size: int = 8):
+        self.n_paths = n_paths
+        self.tail_quantile = tail_quantile
+        self.seed = seed
+        self.cache_size = cache_size
+        self._paths: 'OrderedDict[tuple, np.ndarray]' = OrderedDict()
+
+    def paths(self, asset: Optional[str], spot: float, iv: float, days: int) -> np.ndarray:
+        """Пути для сигнала (asset=None - только GBM); повторный запрос берёт кэш"""
+        key = (asset, round(spot, 8), round(iv, 6), int(days))
+        paths = self._paths.get(key)
+        if paths is not None:
+            self._paths.move_to_end(key)
+            return paths
+
+        cached = next((p for k, p in self._paths.items()
+                       if k[:3] == key[:3] and k[3] >= key[3]), None)
+        if cached is not None:
+            return cached[:, :days + 1]
+
+        returns = load_daily_returns(asset) if asset else None
+        paths = simulate_paths(spot, iv, days, self.n_paths, returns, seed=self.seed)
+        self._paths[key] = paths
+        if len(self._paths) > self.cache_size:
+            self._paths.popitem(last=False)
+        return paths
+
+    def evaluate(self, asset: Optional[str], spot: float, candidates: List[Dict],
+                 iv: Optional[float] = None) -> List[Dict]:
+        """
+        candidates: [{'name', 'legs' (LEG_DTYPE), 'premium' (опц., дебет > 0 / кредит < 0)}]
+        Стоимость кандидата оценивается на его ближайшей экспирации (дальние ноги -
+        Black-Scholes с той же IV). Без premium входом считается BS-стоимость ног.
+        """
+        if not candidates:
+            return []
+
+        horizons = [int(math.ceil(c['legs']['expiry_days'].min())) for c in candidates]
+        if iv is None:
+            iv = (get_surface_iv(asset, max(horizons)) if asset else None) or DEFAULT_IV
+        paths = self.paths(asset, spot, iv, max(horizons))
+
+        results: List[Optional[Dict]] = [None] * len(candidates)
+        for horizon in sorted(set(horizons)):
+            idx = [i for i, h in enumerate(horizons) if h == horizon]
+            book = PositionBook()
+            for i in idx:
+                book.add(candidates[i]['legs'])
+
+            entry = book.entry_value(spot, iv)
+            premium = np.array([candidates[i].get('premium', entry[j]) for j, i in enumerate(idx)])
+            terminal = paths[:, horizon][:, None]
+            pnl = book.evaluate(terminal, iv, float(horizon))['value'] - premium
+
+            n_tail = max(1, int(len(pnl) * self.tail_quantile))
+            worst = np.partition(pnl, n_tail - 1, axis=0)[:n_tail]
+            for j, i in enumerate(idx):
+                results[i] = {
+                    'name': candidates[i].get('name', str(i)),
+                    'probability_of_profit': float((pnl[:, j] > 0).mean()),
+                    'expected_value': float(pnl[:, j].mean()),
+                    'tail_loss': float(-worst[:, j].mean()),
+                    'premium': float(premium[j]),
+                    'horizon_days': horizon,
+                    'iv': iv
+                }
+        return results
+
+
+_engine: Optional[PopEngine] = None
+
+
+def get_pop_engine() -> PopEngine:
+    """Общий движок процесса (кэш путей живёт между вызовами)"""
+    global _engine
+    if _engine is None:
+        _engine = PopEngine()
+    return _engine
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+    from strategies.options.position_model import strategy_legs
+
+    asset = sys.argv[1] if len(sys.argv) > 1 else 'BTC'
+    spot = 100000.0
+    types = ['bull_call_spread', 'bear_put_spread', 'iron_condor', 'butterfly', 'straddle',
+             'strangle', 'calendar', 'credit_bullish', 'credit_bearish', 'lottery_call', 'lottery_put']
+    candidates = [{'name': f"{stype} {dte}d", 'legs': strategy_legs(stype, spot, dte)}
+                  for dte in (7, 14, 30) for stype in types]
+
+    engine = PopEngine(seed=42)
+    engine.paths(asset, spot, 0.6, 60)  # прогрев: загрузка свечей + пути
+
+    t0 = time.perf_counter()
+    results = engine.evaluate(asset, spot, candidates, iv=0.6)
+    elapsed = time.perf_counter() - t0
+
+    print(f"{'candidate':<24}{'PoP':>8}{'EV':>12}{'tail':>12}")
+    for r in results:
+        print(f"{r['name']:<24}{r['probability_of_profit']:>8.1%}{r['expected_value']:>12.1f}{r['tail_loss']:>12.1f}")
+    print(f"\n{len(candidates)} candidates × {engine.n_paths} paths: {elapsed*1000:.1f} ms")
@@ -10,6 +10,7 @@ import time
 import logging
 from datetime import datetime
 from telegram_sender import TelegramSender
+from supervisor import monitor_states
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -30,10 +31,15 @@ class ProcessMonitor:
         current_states = {}
         
         try:
-            result = os.popen('ps aux').read()
+            # Те же мониторы задачами supervisor.py - по его статусу
+            supervisor = monitor_states()
+            result = '' if supervisor else os.popen('ps aux').read()
             
             for process in self.critical_processes:
-                is_running = process in result
+                if supervisor:
+                    is_running = supervisor[process]
+                else:
+                    is_running = process in result
                 current_states[process] = is_running
                 
                 # Проверяем изменение состояния
@@ -5,6 +5,8 @@ import subprocess
 import psutil
 from datetime import datetime
 
+from supervisor import monitor_states, supervisor_alive
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -15,6 +17,16 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Мониторы - задачи supervisor.py: задачи он перезапускает сам, здесь
+# перезапускается только сам супервизор (False - отдельные процессы, как раньше)
+USE_SUPERVISOR = True
+SUPERVISOR = {
+    'name': 'Supervisor',
+    'script': 'supervisor.py',
+    'cmd': ['python3', 'supervisor.py'],
+    'log': 'logs/supervisor.log'
+}
+
 PROCESSES = [
     {
         'name': 'Futures Data Monitor',
@@ -62,28 +74,71 @@ def restart_process(process_info):
         logger.error(f"❌ Failed to restart {name}: {e}")
         return False
 
+def supervisor_running():
+    """Процесс супервизора есть (в т.ч. с --workers или без свежего статуса)"""
+    if supervisor_alive():
+        return True
+    for proc in psutil.process_iter(['cmdline']):
+        try:
+            if proc.info['cmdline'] and SUPERVISOR['script'] in ' '.join(proc.info['cmdline']):
+                return True
+        except (psutil.NoSuchProcess, psutil.AccessDenied, TypeError):
+            continue
+    return False
+
+def restart_supervisor():
+    try:
+        subprocess.Popen(SUPERVISOR['cmd'], stdout=open(SUPERVISOR['log'], 'a'),
+                         stderr=subprocess.STDOUT, start_new_session=True)
+        logger.info(f"✅ Restarted {SUPERVISOR['name']}")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Failed to restart {SUPERVISOR['name']}: {e}")
+        return False
+
+def check_supervisor():
+    """Проблемы по статусу супервизора; отдельные скрипты мониторов не запускаются"""
+    issues = []
+    states = monitor_states()
+    if states is not None:
+        for script, healthy in states.items():
+            if not healthy:
+                issues.append(f"{script} - task unhealthy (python3 supervisor.py status)")
+        logger.info(f"Supervisor tasks: {sum(states.values())}/{len(states)} healthy")
+    elif supervisor_running():
+        # Жив, но статус не обновляется - второй экземпляр дал бы двойную запись в БД
+        issues.append(f"{SUPERVISOR['name']} - no fresh status (hung?)")
+    else:
+        logger.warning(f"⚠️ {SUPERVISOR['name']} is not running")
+        restarted = restart_supervisor()
+        issues.append(f"{SUPERVISOR['name']} - {'restarted' if restarted else 'restart failed'}")
+    return issues
+
 def main():
     logger.info("🔄 Starting SILENT process monitor (no Telegram)...")
     
     while True:
         try:
-            running_count = 0
-            issues = []
-            
-            for process in PROCESSES:
-                is_running, pid = check_process(process)
-                if is_running:
-                    running_count += 1
-                else:
-                    issues.append(process['name'])
-                    logger.warning(f"⚠️ Process {process['name']} is not running")
-                    restart_success = restart_process(process)
-                    if restart_success:
-                        issues.append(f"{process['name']} - restarted")
+            if USE_SUPERVISOR:
+                issues = check_supervisor()
+            else:
+                running_count = 0
+                issues = []
+                
+                for process in PROCESSES:
+                    is_running, pid = check_process(process)
+                    if is_running:
+                        running_count += 1
                     else:
-                        issues.append(f"{process['name']} - restart failed")
-            
-            logger.info(f"Processes: {running_count}/{len(PROCESSES)} running")
+                        issues.append(process['name'])
+                        logger.warning(f"⚠️ Process {process['name']} is not running")
+                        restart_success = restart_process(process)
+                        if restart_success:
+                            issues.append(f"{process['name']} - restarted")
+                        else:
+                            issues.append(f"{process['name']} - restart failed")
+                
+                logger.info(f"Processes: {running_count}/{len(PROCESSES)} running")
             
             # НЕ отправляем в Telegram пока не настроены chat_id
             if issues:
@@ -6,6 +6,8 @@ import json
 import os
 from datetime import datetime
 
+from instrument_registry import get_instrument_registry
+
 class ProfessionalOIAnalyzer:
     def __init__(self):
         self.base_url = "https://api.bybit.com"
@@ -80,27 +82,17 @@ class ProfessionalOIAnalyzer:
             return 0
         
         try:
-            response = requests.get(f"{self.base_url}/v5/market/instruments-info",
-                                  params={'category': 'option', 'baseCoin': asset})
-            
-            if response.status_code != 200:
+            options = get_instrument_registry().contracts(asset)
+            if not options:
                 return 0
             
-            options = response.json()['result']['list']
             collected = 0
             
             for option in options:
-                symbol = option['symbol']
-                parts = symbol.split('-')
-                if len(parts) < 4:
-                    continue
-                
-                try:
-                    expiry = parts[1]
-                    strike = float(parts[2])
-                    option_type = 'Call' if parts[3] == 'C' else 'Put'
-                except:
-                    continue
+                symbol = option.symbol
+                expiry = option.expiry
+                strike = option.strike
+                option_type = option.option_type
                 
                 distance_pct = abs((strike - spot_price) / spot_price)
                 if distance_pct > self.analysis_config['distance_filter']:
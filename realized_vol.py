@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+REALIZED VOL - Реализованная волатильность по часовым свечам data/raw
+- Оценки: close-to-close, Parkinson, Garman-Klass, Rogers-Satchell, Yang-Zhang
+- Окна 1d / 7d / 30d (24 / 168 / 720 часовых баров), годовые %, все активы
+  и окна - одним векторным проходом по матрице OHLC (актив x бар)
+- Live-движок держит хвост свечей в памяти и дочитывает только новые файлы
+  (и дописанный последний), расчёт - только если свечи изменились
+- realized_vol_at(asset, as_of) - то же на момент времени (бары, закрытые до as_of)
+
+Использование:
+    python3 realized_vol.py            # таблица RV и спред IV-RV
+    python3 realized_vol.py bench      # время update + расчёта
+"""
+
+import logging
+import math
+import os
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+RAW_DIR = Path(__file__).parent / 'data' / 'raw'
+ASSETS = ['BTC', 'ETH', 'SOL', 'XRP', 'DOGE', 'MNT']
+
+BAR_SECONDS = 3600
+WINDOWS = {'1d': 24, '7d': 168, '30d': 720}   # баров
+ESTIMATORS = ['close_to_close', 'parkinson', 'garman_klass', 'rogers_satchell', 'yang_zhang']
+BARS_PER_YEAR = 365 * 24
+MIN_FILL = 0.5          # доля баров окна, без которой оценка не считается
+
+MAX_BARS = max(WINDOWS.values()) + 1   # +1 - предыдущее закрытие для первого бара окна
+TAIL_FILES = max(WINDOWS.values()) // 24 + 2   # дневных файлов на прогрев
+
+# Тенор ATM IV для сравнения с окном RV
+SPREAD_TENORS = {'7d': '7d', '30d': '30d'}
+SPREAD_ESTIMATOR = 'yang_zhang'
+
+_LN2 = math.log(2)
+
+
+# ==================== ESTIMATORS ====================
+
+def _window_stats(x: np.ndarray, ddof: int = 0):
+    """(среднее, дисперсия, число) по оси баров без NaN; пустые строки -> NaN"""
+    valid = np.isfinite(x)
+    n = valid.sum(axis=1)
+    x0 = np.where(valid, x, 0.0)
+    s1 = x0.sum(axis=1)
+    s2 = (x0 * x0).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = s1 / n
+        var = (s2 - s1 * mean) / (n - ddof)
+    return mean, np.maximum(var, 0.0), n
+
+
+def estimate(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+             windows: Dict[str, int] = WINDOWS) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Матрицы (актив x бар), бары выровнены по правому краю (слева NaN).
+    Столбец 0 - только предыдущее закрытие. -> {window: {estimator: годовые % по активам}}
+    """
+    prev_close = close[:, :-1]
+    o, h, l, c = open_[:, 1:], high[:, 1:], low[:, 1:], close[:, 1:]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = np.log(c / prev_close)          # close-to-close
+        gap = np.log(o / prev_close)        # закрытие -> открытие
+        oc = np.log(c / o)
+        hi = np.log(h / o)
+        lo = np.log(l / o)
+    hl = hi - lo
+
+    parkinson = hl * hl / (4 * _LN2)
+    garman_klass = 0.5 * hl * hl - (2 * _LN2 - 1) * oc * oc
+    rogers_satchell = hi * (hi - oc) + lo * (lo - oc)
+
+    result = {}
+    for name, n_bars in windows.items():
+        tail = slice(-n_bars, None)
+        _, var_cc, n = _window_stats(r[:, tail], ddof=1)
+        park, _, _ = _window_stats(parkinson[:, tail])
+        gk, _, _ = _window_stats(garman_klass[:, tail])
+        rs, _, _ = _window_stats(rogers_satchell[:, tail])
+        _, var_gap, _ = _window_stats(gap[:, tail], ddof=1)
+        _, var_oc, _ = _window_stats(oc[:, tail], ddof=1)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            k = 0.34 / (1.34 + (n + 1) / (n - 1))
+        yang_zhang = var_gap + k * var_oc + (1 - k) * rs
+
+        enough = n >= max(2, int(n_bars * MIN_FILL))
+        variances = {
+            'close_to_close': var_cc,
+            'parkinson': park,
+            'garman_klass': gk,
+            'rogers_satchell': rs,
+            'yang_zhang': yang_zhang,
+        }
+        result[name] = {
+            est: np.where(enough, np.sqrt(np.maximum(var, 0.0) * BARS_PER_YEAR) * 100, np.nan)
+            for est, var in variances.items()
+        }
+    return result
+
+
+def _stack(tails: List[Optional[np.ndarray]], width: int = MAX_BARS) -> np.ndarray:
+    """Хвосты OHLC (bars x 4) -> массив (4, актив, width) с выравниванием вправо"""
+    out = np.full((4, len(tails), width), np.nan)
+    for i, tail in enumerate(tails):
+        if tail is not None and len(tail):
+            tail = tail[-width:]
+            out[:, i, width - len(tail):] = tail.T
+    return out
+
+
+def _to_dict(table: Dict[str, Dict[str, np.ndarray]], i: int) -> Dict[str, Dict[str, Optional[float]]]:
+    return {
+        window: {est: (round(float(v[i]), 4) if np.isfinite(v[i]) else None) for est, v in ests.items()}
+        for window, ests in table.items()
+    }
+
+
+# ==================== CANDLES ====================
+
+@lru_cache(maxsize=4096)
+def _read_day(path: str, mtime: float) -> np.ndarray:
+    """Дневной файл -> массив (bars x 5): ts открытия, open, high, low, close"""
+    df = pd.read_csv(path, usecols=['timestamp', 'open', 'high', 'low', 'close'])
+    ts = pd.to_datetime(df['timestamp']).to_numpy(dtype='datetime64[s]').astype(np.int64)
+    return np.column_stack([ts, df[['open', 'high', 'low', 'close']].to_numpy(dtype=np.float64)])
+
+
+def _merge(*arrays: np.ndarray) -> np.ndarray:
+    """
+    Склейка баров по времени: дневные файлы пересекаются (в файле бывают бары
+    соседнего дня), при повторе timestamp побеждает позже прочитанный
+    """
+    arrays = [a for a in arrays if a is not None and len(a)]
+    if not arrays:
+        return np.empty((0, 5))
+    bars = np.concatenate(arrays)
+    order = np.argsort(bars[:, 0], kind='stable')[::-1]
+    _, first = np.unique(bars[order, 0], return_index=True)
+    return bars[order[first]]
+
+
+def _read_files(files: List[Path]) -> np.ndarray:
+    return _merge(*[_read_day(str(f), f.stat().st_mtime) for f in files])
+
+
+def _day_file(asset: str, day: datetime) -> Path:
+    return RAW_DIR / f"{asset}USDT" / f"{asset}USDT_{day:%Y-%m-%d}.csv"
+
+
+def realized_vol_at(asset: str, as_of: datetime) -> Optional[Dict[str, Any]]:
+    """RV на момент as_of: только бары, закрытые к as_of (кэш разобранных дневных файлов)"""
+    upper = int(as_of.timestamp())
+    days = [as_of - timedelta(days=d) for d in range(TAIL_FILES, -1, -1)]
+    files = [f for f in (_day_file(asset, d) for d in days) if f.exists()]
+    bars = _read_files(files)
+    if not len(bars):
+        return None
+    bars = bars[bars[:, 0] + BAR_SECONDS <= upper]
+    if not len(bars):
+        return None
+    open_, high, low, close = _stack([bars[:, 1:]])
+    return {
+        'candle_ts': int(bars[-1, 0]),
+        'realized_vol': _to_dict(estimate(open_, high, low, close), 0)
+    }
+
+
+# ==================== LIVE ENGINE ====================
+
+class RealizedVolEngine:
+    """Хвосты свечей всех активов в памяти + таблица RV, пересчитываемая при новых свечах"""
+
+    def __init__(self, assets: List[str] = ASSETS, raw_dir: Path = RAW_DIR):
+        self.assets = list(assets)
+        self.raw_dir = raw_dir
+        self.tails: Dict[str, np.ndarray] = {}         # bars x 5 (ts + OHLC)
+        self.last_file: Dict[str, tuple] = {}           # (имя, размер) последнего прочитанного
+        self._table: Optional[Dict[str, Dict[str, np.ndarray]]] = None
+
+    def _update_asset(self, asset: str) -> bool:
+        directory = self.raw_dir / f"{asset}USDT"
+        if not directory.exists():
+            return False
+        names = sorted(n for n in os.listdir(directory) if n.endswith('.csv'))
+        if not names:
+            return False
+
+        last = self.last_file.get(asset)
+        if last is None:
+            todo = names[-TAIL_FILES:]
+        else:
+            name, size = last
+            todo = names[bisect_right(names, name):]
+            if (directory / name).exists() and (directory / name).stat().st_size != size:
+                todo.insert(0, name)   # файл дня дописан
+        if not todo:
+            return False
+
+        self.last_file[asset] = (names[-1], (directory / names[-1]).stat().st_size)
+        tail = self.tails.get(asset)
+        bars = _merge(tail, _read_files([directory / n for n in todo]))[-MAX_BARS:]
+        if tail is not None and np.array_equal(bars, tail):
+            return False
+        self.tails[asset] = bars
+        return True
+
+    def update(self) -> List[str]:
+        """Дочитать новые свечи; -> активы, у которых они появились"""
+        changed = [asset for asset in self.assets if self._update_asset(asset)]
+        if changed:
+            self._table = None
+        return changed
+
+    def table(self) -> Dict[str, Dict[str, np.ndarray]]:
+        """{window: {estimator: массив по self.assets}} - один проход по всем активам"""
+        self.update()
+        if self._table is None:
+            tails = [self.tails[a][:, 1:] if a in self.tails else None for a in self.assets]
+            self._table = estimate(*_stack(tails))
+        return self._table
+
+    def get(self, asset: str) -> Optional[Dict[str, Any]]:
+        """RV актива по всем окнам и оценкам"""
+        table = self.table()
+        if asset not in self.tails:
+            return None
+        return {
+            'candle_ts': int(self.tails[asset][-1, 0]),
+            'realized_vol': _to_dict(table, self.assets.index(asset))
+        }
+
+
+def iv_rv_spreads(realized: Dict[str, Dict[str, Optional[float]]], atm_iv: Dict[str, float],
+                  estimator: str = SPREAD_ESTIMATOR) -> Dict[str, Optional[float]]:
+    """Спред ATM IV тенора минус RV окна той же длины, пункты волатильности"""
+    spreads = {}
+    for window, tenor in SPREAD_TENORS.items():
+        rv = (realized.get(window) or {}).get(estimator)
+        iv = atm_iv.get(tenor)
+        spreads[window] = round(iv - rv, 4) if rv is not None and iv is not None else None
+    return spreads
+
+
+_engine: Optional[RealizedVolEngine] = None
+
+
+def get_rv_engine() -> RealizedVolEngine:
+    """Общий движок процесса (хвосты свечей живут между вызовами)"""
+    global _engine
+    if _engine is None:
+        _engine = RealizedVolEngine()
+    return _engine
+
+
+def _bench():
+    engine = RealizedVolEngine()
+    started = time.perf_counter()
+    engine.update()
+    warm = time.perf_counter() - started
+
+    started = time.perf_counter()
+    engine.update()
+    incremental = time.perf_counter() - started
+
+    tails = [engine.tails[a][:, 1:] if a in engine.tails else None for a in engine.assets]
+    started = time.perf_counter()
+    for _ in range(100):
+        estimate(*_stack(tails))
+    compute = (time.perf_counter() - started) / 100
+
+    print(f"warm-up: {warm * 1000:.1f} ms, update без новых свечей: {incremental * 1000:.2f} ms, "
+          f"расчёт {len(engine.assets)} активов x {len(WINDOWS)} окон x {len(ESTIMATORS)} оценок: "
+          f"{compute * 1e6:.0f} µs")
+
+
+if __name__ == '__main__':
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        _bench()
+        sys.exit(0)
+
+    from iv_history import iv_at
+
+    engine = get_rv_engine()
+    for asset in engine.assets:
+        data = engine.get(asset)
+        if not data:
+            print(f"{asset}: нет свечей")
+            continue
+        print(f"{asset} (последняя свеча {datetime.fromtimestamp(data['candle_ts'])}):")
+        for window, ests in data['realized_vol'].items():
+            cells = '  '.join(f"{est[:5]}={v:.1f}" if v is not None else f"{est[:5]}=-" for est, v in ests.items())
+            print(f"  {window:>3}: {cells}")
+        spreads = iv_rv_spreads(data['realized_vol'], iv_at(asset, int(time.time())))
+        print(f"  IV-RV: {spreads}")
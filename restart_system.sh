@@ -18,21 +18,20 @@ fi
 
 # Start monitors
 echo "3. Запуск мониторов..."
-nohup python3 futures_data_monitor.py > logs/futures_monitor.log 2>&1 &
-sleep 2
-nohup python3 unlimited_oi_monitor.py > logs/oi_monitor.log 2>&1 &
+# futures, liquidations, funding, unlimited_oi - задачи одного процесса supervisor.py
+nohup python3 supervisor.py >> logs/supervisor.log 2>&1 &
 sleep 2
 nohup python3 eth_options_collector.py > logs/eth_options.log 2>&1 &
 
 # Validate
 sleep 5
 echo "4. Проверка..."
-PROCS=$(ps aux | grep -E "futures_data_monitor|unlimited_oi_monitor|eth_options_collector" | grep -v grep | wc -l)
+PROCS=$(ps aux | grep -E "supervisor.py|eth_options_collector" | grep -v grep | wc -l)
 
-if [ $PROCS -eq 3 ]; then
-    echo "✅ Все 3 монитора запущены"
+if [ $PROCS -eq 2 ]; then
+    echo "✅ Supervisor и eth_options_collector запущены (задачи: python3 supervisor.py status)"
 else
-    echo "❌ Запущено только $PROCS процессов!"
+    echo "❌ Запущено только $PROCS процессов из 2!"
     exit 1
 fi
 
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RESULTS LOG - Append-only журнал результатов аналитики по метрикам
+Вместо нового JSON-файла на каждый запуск (data/gex, data/pcr, ...):
+- data/results/<metric>/<YYYYMM>.seg - месячные сегменты, записи дописываются
+  в конец: заголовок (ts, asset, длина) + JSON, сжатый zlib
+- <YYYYMM>.idx - индекс фиксированной ширины (ts, asset, offset, length):
+  диапазон по времени находится searchsorted, читаются только нужные записи
+- Сегменты старше COMPACT_AFTER_DAYS автоматически прореживаются до одной
+  записи на актив за COMPACT_BUCKET (последней в интервале)
+
+Использование:
+    python3 results_log.py stats
+    python3 results_log.py import [--remove]   # перенести старые JSON-каталоги
+    python3 results_log.py compact
+"""
+
+import fcntl
+import json
+import logging
+import os
+import re
+import struct
+import sys
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = Path('./data/results')
+COMPACT_AFTER_DAYS = 30
+COMPACT_BUCKET = 3600  # сек
+
+RECORD_HEADER = struct.Struct('<d8sI')  # ts, asset, длина payload
+INDEX_DTYPE = np.dtype([('ts', '<f8'), ('asset', 'S8'), ('offset', '<u8'), ('length', '<u4')])
+
+# Старые каталоги JSON -> метрика журнала
+LEGACY_DIRS = {
+    'gex': './data/gex',
+    'max_pain': './data/max_pain',
+    'pcr': './data/pcr',
+    'vanna': './data/vanna',
+    'iv_rank': './data/iv_rank',
+    'option_vwap': './data/option_vwap',
+    'volatility': './data/volatility',
+}
+_FILE_TS = re.compile(r'(\d{8}_\d{6})\.json$')
+
+Timestamp = Any  # unix-секунды, datetime или None
+
+
+def _unix(ts: Timestamp) -> Optional[float]:
+    if ts is None:
+        return None
+    if isinstance(ts, datetime):
+        return ts.timestamp()
+    return float(ts)
+
+
+def _segment_name(ts: float) -> str:
+    return datetime.fromtimestamp(ts).strftime('%Y%m')
+
+
+class ResultsLog:
+    """Журнал одной метрики: append / range / latest по активу и времени"""
+
+    def __init__(self, metric: str, base_dir: Path = RESULTS_DIR):
+        self.metric = metric
+        self.dir = Path(base_dir) / metric
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._index_cache: Dict[str, Tuple[int, np.ndarray]] = {}
+
+    # ---------- запись ----------
+
+    def append(self, asset: str, result: Dict[str, Any], ts: Timestamp = None):
+        """Дописать результат (ts по умолчанию - сейчас)"""
+        self.append_many([(_unix(ts) or time.time(), asset, result)])
+
+    def append_many(self, records: Iterable[Tuple[float, str, Dict[str, Any]]]):
+        """Пакетная запись (ts, asset, result); записи раскладываются по сегментам"""
+        by_segment: Dict[str, List[Tuple[float, str, Dict[str, Any]]]] = {}
+        for ts, asset, result in records:
+            by_segment.setdefault(_segment_name(ts), []).append((ts, asset, result))
+
+        new_segment = False
+        for name, items in sorted(by_segment.items()):
+            new_segment |= not (self.dir / f"{name}.seg").exists()
+            self._write(name, sorted(items, key=lambda item: item[0]))
+        if new_segment:
+            self.compact()
+
+    def _write(self, name: str, items: List[Tuple[float, str, Dict[str, Any]]], suffix: str = ''):
+        seg_path, idx_path = self.dir / f"{name}.seg{suffix}", self.dir / f"{name}.idx{suffix}"
+        with open(seg_path, 'ab') as seg, open(idx_path, 'ab') as idx:
+            fcntl.flock(seg, fcntl.LOCK_EX)
+            try:
+                offset = seg.seek(0, os.SEEK_END)
+                entries = np.empty(len(items), dtype=INDEX_DTYPE)
+                chunks = []
+                for i, (ts, asset, result) in enumerate(items):
+                    payload = zlib.compress(json.dumps(result, default=str).encode())
+                    asset_key = asset.encode()[:8]
+                    chunks.append(RECORD_HEADER.pack(ts, asset_key, len(payload)) + payload)
+                    entries[i] = (ts, asset_key, offset + RECORD_HEADER.size, len(payload))
+                    offset += RECORD_HEADER.size + len(payload)
+                seg.write(b''.join(chunks))
+                seg.flush()
+                # Индекс - после данных: запись без индекса при сбое просто не видна
+                idx.write(entries.tobytes())
+            finally:
+                fcntl.flock(seg, fcntl.LOCK_UN)
+
+    # ---------- чтение ----------
+
+    def segments(self) -> List[str]:
+        return sorted(p.stem for p in self.dir.glob('*.idx'))
+
+    def _index(self, name: str) -> np.ndarray:
+        """Индекс сегмента (перечитывается только если файл вырос)"""
+        path = self.dir / f"{name}.idx"
+        size = path.stat().st_size
+        cached = self._index_cache.get(name)
+        if cached and cached[0] == size:
+            return cached[1]
+        index = np.fromfile(path, dtype=INDEX_DTYPE, count=size // INDEX_DTYPE.itemsize)
+        if len(index) > 1 and np.any(np.diff(index['ts']) < 0):
+            index = index[np.argsort(index['ts'], kind='stable')]
+        self._index_cache[name] = (size, index)
+        return index
+
+    def _read(self, name: str, entries: np.ndarray) -> List[Dict[str, Any]]:
+        results = []
+        with open(self.dir / f"{name}.seg", 'rb') as seg:
+            for entry in entries:
+                seg.seek(int(entry['offset']))
+                results.append(json.loads(zlib.decompress(seg.read(int(entry['length'])))))
+        return results
+
+    def range(self, asset: Optional[str] = None, start: Timestamp = None,
+              end: Timestamp = None) -> List[Tuple[float, str, Dict[str, Any]]]:
+        """(ts, asset, result) в [start, end] по возрастанию времени"""
+        start, end = _unix(start), _unix(end)
+        first = _segment_name(start) if start is not None else None
+        last = _segment_name(end) if end is not None else None
+        asset_key = asset.encode()[:8] if asset else None
+
+        out = []
+        for name in self.segments():
+            if (first and name < first) or (last and name > last):
+                continue
+            index = self._index(name)
+            lo = int(np.searchsorted(index['ts'], start, side='left')) if start is not None else 0
+            hi = int(np.searchsorted(index['ts'], end, side='right')) if end is not None else len(index)
+            entries = index[lo:hi]
+            if asset_key is not None:
+                entries = entries[entries['asset'] == asset_key]
+            if len(entries):
+                for entry, result in zip(entries, self._read(name, entries)):
+                    out.append((float(entry['ts']), entry['asset'].decode(), result))
+        return out
+
+    def latest(self, asset: str, before: Timestamp = None) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """Последний результат актива (не позже before)"""
+        before = _unix(before)
+        asset_key = asset.encode()[:8]
+        for name in reversed(self.segments()):
+            if before is not None and name > _segment_name(before):
+                continue
+            index = self._index(name)
+            hi = int(np.searchsorted(index['ts'], before, side='right')) if before is not None else len(index)
+            matches = np.flatnonzero(index['asset'][:hi] == asset_key)
+            if len(matches):
+                entry = index[matches[-1]:matches[-1] + 1]
+                return float(entry['ts'][0]), self._read(name, entry)[0]
+        return None
+
+    def series(self, asset: str, field: str, start: Timestamp = None,
+               end: Timestamp = None) -> List[Tuple[float, Any]]:
+        """(ts, result[field]) для записей, где поле есть"""
+        return [(ts, result[field]) for ts, _, result in self.range(asset, start, end)
+                if result.get(field) is not None]
+
+    # ---------- компакция ----------
+
+    def compact(self, older_than_days: int = COMPACT_AFTER_DAYS, bucket: int = COMPACT_BUCKET) -> int:
+        """
+        Прореживание старых сегментов: одна (последняя) запись на актив за bucket сек.
+        Сегмент переписывается целиком и помечается .compacted; возвращает число сегментов.
+        """
+        cutoff = time.time() - older_than_days * 86400
+        compacted = 0
+        for name in self.segments():
+            marker = self.dir / f"{name}.compacted"
+            if marker.exists():
+                continue
+            index = self._index(name)
+            if not len(index) or index['ts'].max() >= cutoff:
+                continue
+
+            buckets = (index['ts'] // bucket).astype(np.int64)
+            order = np.lexsort((index['ts'], buckets, index['asset']))
+            keys = np.stack([index['asset'][order].view(np.uint64), buckets[order]], axis=1)
+            last_in_bucket = np.append(np.any(keys[1:] != keys[:-1], axis=1), True)
+            keep = index[np.sort(order[last_in_bucket])]
+
+            items = [(float(e['ts']), e['asset'].decode(), r) for e, r in zip(keep, self._read(name, keep))]
+            for suffix in ('.seg.tmp', '.idx.tmp'):
+                (self.dir / f"{name}{suffix}").unlink(missing_ok=True)
+            self._write(name, items, suffix='.tmp')
+            os.replace(self.dir / f"{name}.seg.tmp", self.dir / f"{name}.seg")
+            os.replace(self.dir / f"{name}.idx.tmp", self.dir / f"{name}.idx")
+            marker.touch()
+            self._index_cache.pop(name, None)
+            compacted += 1
+            logger.info(f"🗜️ {self.metric}/{name}: {len(index)} -> {len(keep)} records")
+        return compacted
+
+    def stats(self) -> Dict[str, Any]:
+        records = sum(len(self._index(name)) for name in self.segments())
+        size = sum(p.stat().st_size for p in self.dir.glob('*.*'))
+        return {'metric': self.metric, 'segments': len(self.segments()), 'records': records, 'bytes': size}
+
+
+_logs: Dict[Tuple[str, str], ResultsLog] = {}
+
+
+def get_results_log(metric: str, base_dir: Path = RESULTS_DIR) -> ResultsLog:
+    """Общий экземпляр журнала метрики (кэш индексов живёт между вызовами)"""
+    key = (metric, str(base_dir))
+    if key not in _logs:
+        _logs[key] = ResultsLog(metric, base_dir)
+    return _logs[key]
+
+
+def append_result(metric: str, asset: str, result: Dict[str, Any], ts: Timestamp = None):
+    """Короткий путь для калькуляторов"""
+    get_results_log(metric).append(asset, result, ts)
+
+
+# ==================== МИГРАЦИЯ ====================
+
+def _legacy_records(directory: Path) -> Tuple[List[Tuple[float, str, Dict[str, Any]]], List[Path]]:
+    """JSON-файлы каталога -> (ts, asset, result); ts из поля timestamp или имени файла"""
+    records, files = [], []
+    for path in sorted(directory.glob('*.json')):
+        match = _FILE_TS.search(path.name)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skip {path}: {e}")
+            continue
+        if 'timestamp' in data:
+            ts = datetime.fromisoformat(str(data['timestamp'])).timestamp()
+        elif match:
+            ts = datetime.strptime(match.group(1), '%Y%m%d_%H%M%S').timestamp()
+        else:
+            continue
+
+        asset = data.get('asset') or data.get('symbol')
+        if asset:
+            records.append((ts, asset, data))
+        else:
+            # stage_1.3.3_*.json: {"ETH": {...}, ...}
+            records.extend((ts, key, value) for key, value in data.items() if isinstance(value, dict))
+        files.append(path)
+    return records, files
+
+
+def import_legacy(remove: bool = False) -> Dict[str, int]:
+    """Перенести старые JSON-каталоги в журналы (remove - удалить файлы после записи)"""
+    imported = {}
+    for metric, directory in LEGACY_DIRS.items():
+        directory = Path(directory)
+        if not directory.exists():
+            continue
+        records, files = _legacy_records(directory)
+        if not records:
+            continue
+        get_results_log(metric).append_many(records)
+        imported[metric] = len(records)
+        logger.info(f"✅ {metric}: {len(records)} records from {len(files)} files")
+        if remove:
+            for path in files:
+                path.unlink()
+    return imported
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else 'stats'
+
+    if command == 'import':
+        import_legacy(remove='--remove' in sys.argv)
+    elif command == 'compact':
+        for metric_dir in sorted(RESULTS_DIR.glob('*')):
+            if metric_dir.is_dir() and not metric_dir.name.startswith('.'):
+                get_results_log(metric_dir.name).compact()
+
+    for metric_dir in sorted(RESULTS_DIR.glob('*')):
+        if metric_dir.is_dir() and not metric_dir.name.startswith('.'):
+            s = get_results_log(metric_dir.name).stats()
+            print(f"{s['metric']:<14}{s['segments']:>4} segments{s['records']:>9} records{s['bytes'] / 1024:>10.1f} KB")
@@ -3,25 +3,99 @@
 """
 SIGNAL HISTORY LOGGER - Stage 1.4.8
 Логирование полной истории сигналов для бэктеста и анализа
+
+Метрики снапшота DataIntegrator хранятся типизированными колонками в
+signal_snapshots (одна строка на сигнал, signal_id = signal_history.id),
+так что бэктест и аналитика фильтруют их в SQL / NumPy без json.loads.
+Сырой снапшот - опционально, сжатым JSON в signal_raw вместе со стратегиями.
+
+Использование:
+    python3 signal_history_logger.py migrate   # старые JSON-колонки -> signal_snapshots
+    python3 signal_history_logger.py compact   # + очистить JSON-колонки и VACUUM
 """
 
 import sqlite3
 import json
 import logging
+import zlib
 from datetime import datetime
-from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+
+import pandas as pd
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# колонка -> (SQL тип, путь в снапшоте DataIntegrator.get_all_data)
+SNAPSHOT_COLUMNS = {
+    'available_sources': ('INTEGER', ('quality', 'available_sources')),
+    'completeness': ('REAL', ('quality', 'completeness')),
+    'funding_rate': ('REAL', ('futures', 'funding_rate')),
+    'liq_longs_usd': ('REAL', ('liquidations', 'longs_liquidated')),
+    'liq_shorts_usd': ('REAL', ('liquidations', 'shorts_liquidated')),
+    'liq_ratio': ('REAL', ('liquidations', 'ratio')),
+    'pcr': ('REAL', ('pcr', 'ratio')),
+    'pcr_volume_ratio': ('REAL', ('pcr', 'volume_ratio')),
+    'put_oi': ('REAL', ('pcr', 'put_oi')),
+    'call_oi': ('REAL', ('pcr', 'call_oi')),
+    'max_pain': ('REAL', ('max_pain', 'price')),
+    'max_pain_distance_pct': ('REAL', ('max_pain', 'distance_pct')),
+    'total_gamma': ('REAL', ('gex', 'total_gamma')),
+    'gamma_ratio': ('REAL', ('gex', 'gamma_ratio')),
+    'total_vanna': ('REAL', ('vanna', 'total_vanna')),
+    'iv_rank': ('REAL', ('iv_rank', 'rank')),
+    'current_iv': ('REAL', ('iv_rank', 'current_iv')),
+    'option_vwap': ('REAL', ('option_vwap', 'total_vwap')),
+    'vwap_ratio': ('REAL', ('option_vwap', 'vwap_ratio')),
+    'walls_expiration': ('TEXT', ('expiration_walls', 'expiration')),
+    'walls_dte': ('INTEGER', ('expiration_walls', 'dte')),
+    'call_wall': ('REAL', ('expiration_walls', 'magnetic_levels', 'call_wall')),
+    'put_wall': ('REAL', ('expiration_walls', 'magnetic_levels', 'put_wall')),
+    'call_wall_oi': ('REAL', ('expiration_walls', 'magnetic_levels', 'call_wall_oi')),
+    'put_wall_oi': ('REAL', ('expiration_walls', 'magnetic_levels', 'put_wall_oi')),
+    'walls_pressure': ('TEXT', ('expiration_walls', 'pressure_analysis', 'direction')),
+    'oi_dynamics_signal': ('TEXT', ('oi_dynamics', 'summary', 'overall_signal')),
+    'oi_dynamics_confidence': ('REAL', ('oi_dynamics', 'summary', 'confidence')),
+    'pcr_rsi': ('REAL', ('pcr_rsi',)),
+    'gex_rsi': ('REAL', ('gex_rsi',)),
+    'oi_macd_hist': ('REAL', ('oi_macd', 'histogram')),
+}
+
+_CASTS = {'REAL': float, 'INTEGER': int, 'TEXT': str}
+
+
+def extract_metrics(data_snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """Снапшот DataIntegrator -> значения колонок signal_snapshots (None = нет данных)"""
+    metrics = {}
+    for column, (sql_type, path) in SNAPSHOT_COLUMNS.items():
+        value = data_snapshot
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+        try:
+            metrics[column] = _CASTS[sql_type](value) if value is not None else None
+        except (TypeError, ValueError):
+            metrics[column] = None
+    return metrics
+
+
+def pack(obj: Any) -> Optional[bytes]:
+    """JSON + zlib для signal_raw"""
+    if obj is None:
+        return None
+    return zlib.compress(json.dumps(obj, default=str).encode(), 6)
+
+
+def unpack(blob: Optional[bytes]) -> Any:
+    return json.loads(zlib.decompress(blob)) if blob else None
+
+
 class SignalHistoryLogger:
     """Логирование полной истории сигналов для бэктеста и анализа"""
     
-    def __init__(self):
-        self.db_path = './data/signal_history.db'
-        self.json_dir = Path('./data/signal_history_json/')
-        self.json_dir.mkdir(parents=True, exist_ok=True)
+    def __init__(self, db_path: str = './data/signal_history.db', store_raw: bool = True):
+        self.db_path = db_path
+        self.store_raw = store_raw  # сжатый сырой снапшот в signal_raw
+        self._legacy_checked = False  # старые JSON-строки переносит первый log_signal (или CLI migrate)
         self._init_database()
     
     def _init_database(self):
@@ -47,15 +121,54 @@ class SignalHistoryLogger:
             )
         ''')
         
+        columns = ',\n'.join(f"                {name} {sql_type}"
+                              for name, (sql_type, _) in SNAPSHOT_COLUMNS.items())
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS signal_snapshots (
+                signal_id INTEGER PRIMARY KEY REFERENCES signal_history(id),
+{columns},
+                strategies_count INTEGER,
+                top_strategy TEXT
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS signal_raw (
+                signal_id INTEGER PRIMARY KEY REFERENCES signal_history(id),
+                data_snapshot BLOB,
+                strategies BLOB
+            )
+        ''')
+        
         # Индексы
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON signal_history(timestamp)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_asset ON signal_history(asset)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_config ON signal_history(config_hash)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_asset_timestamp ON signal_history(asset, timestamp)')
         
         conn.commit()
         conn.close()
         logger.info("✅ Signal history database initialized")
     
+    def _write_structured(self, cursor: sqlite3.Cursor, signal_id: int,
+                          data_snapshot: Dict[str, Any], strategies: List[Dict[str, Any]],
+                          store_raw: bool):
+        """Строка signal_snapshots (+ signal_raw) для сигнала"""
+        metrics = extract_metrics(data_snapshot)
+        top = strategies[0] if strategies and isinstance(strategies[0], dict) else {}
+        metrics['strategies_count'] = len(strategies)
+        metrics['top_strategy'] = top.get('strategy_type') or top.get('name')
+        
+        cursor.execute(f'''
+            INSERT OR REPLACE INTO signal_snapshots (signal_id, {', '.join(metrics)})
+            VALUES (?, {', '.join('?' for _ in metrics)})
+        ''', (signal_id, *metrics.values()))
+        
+        cursor.execute('''
+            INSERT OR REPLACE INTO signal_raw (signal_id, data_snapshot, strategies)
+            VALUES (?, ?, ?)
+        ''', (signal_id, pack(data_snapshot) if store_raw else None, pack(strategies)))
+    
     def log_signal(self, signal_result: Dict[str, Any]):
         """Сохранить полную историю сигнала"""
         
@@ -63,6 +176,11 @@ class SignalHistoryLogger:
             signal = signal_result['signal']
             data_snapshot = signal_result['data_snapshot']
             
+            # Старые строки с JSON-колонками переносятся один раз - писателем, не читателями
+            if not self._legacy_checked:
+                self.migrate_legacy()
+                self._legacy_checked = True
+            
             # Сохраняем в БД
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
@@ -71,9 +189,8 @@ class SignalHistoryLogger:
                 INSERT INTO signal_history (
                     timestamp, asset, signal_type, confidence, strength,
                     spot_price, config_hash, data_quality_status,
-                    data_quality_completeness, reasoning,
-                    data_snapshot_json, strategies_json
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    data_quality_completeness, reasoning
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 int(datetime.now().timestamp()),
                 signal_result['asset'],
@@ -84,35 +201,105 @@ class SignalHistoryLogger:
                 signal.get('config_version'),
                 data_snapshot.get('quality', {}).get('status'),
                 data_snapshot.get('quality', {}).get('completeness'),
-                json.dumps(signal.get('reasoning', [])),
-                json.dumps(data_snapshot, default=str),
-                json.dumps(signal_result.get('strategies', []), default=str)
+                json.dumps(signal.get('reasoning', []))
             ))
             
+            self._write_structured(cursor, cursor.lastrowid, data_snapshot,
+                                   signal_result.get('strategies') or [], self.store_raw)
+            
             conn.commit()
             conn.close()
             
-            # Сохраняем JSON
-            self._save_to_json(signal_result)
-            
             logger.info(f"📝 Logged signal for {signal_result['asset']}")
             
         except Exception as e:
             logger.error(f"❌ Error logging signal: {e}")
     
-    def _save_to_json(self, signal_result: Dict[str, Any]):
-        """Сохранение в JSON для ML обработки"""
+    def migrate_legacy(self, drop_json: bool = False) -> int:
+        """
+        Перенести старые строки (data_snapshot_json / strategies_json) в
+        signal_snapshots + signal_raw. drop_json=True - очистить JSON-колонки и VACUUM.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        rows = cursor.execute('''
+            SELECT h.id, h.data_snapshot_json, h.strategies_json
+            FROM signal_history h
+            LEFT JOIN signal_snapshots s ON s.signal_id = h.id
+            WHERE s.signal_id IS NULL AND h.data_snapshot_json IS NOT NULL
+        ''').fetchall()
+        
+        migrated = 0
+        for signal_id, snapshot_json, strategies_json in rows:
+            try:
+                data_snapshot = json.loads(snapshot_json)
+                strategies = json.loads(strategies_json) if strategies_json else []
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Skip signal {signal_id}: {e}")
+                continue
+            self._write_structured(cursor, signal_id, data_snapshot, strategies, store_raw=True)
+            migrated += 1
+        conn.commit()
+        
+        if drop_json:
+            cursor.execute('''
+                UPDATE signal_history SET data_snapshot_json = NULL, strategies_json = NULL
+                WHERE id IN (SELECT signal_id FROM signal_snapshots)
+            ''')
+            conn.commit()
+            conn.execute('VACUUM')
+        conn.close()
+        
+        if migrated:
+            logger.info(f"✅ Migrated {migrated} legacy signals")
+        return migrated
+    
+    def load_frame(self, where: str = '', params: tuple = (),
+                   columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Сигналы + метрики одной таблицей (по времени). where - условие SQL
+        по колонкам h.* (signal_history) и s.* (signal_snapshots).
+        """
+        metrics = ', '.join(f"s.{c}" for c in (columns or list(SNAPSHOT_COLUMNS) + ['strategies_count', 'top_strategy']))
+        conn = sqlite3.connect(self.db_path)
         try:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            asset = signal_result['asset']
-            filename = f"{asset}_signal_{timestamp}.json"
-            filepath = self.json_dir / filename
-            
-            with open(filepath, 'w') as f:
-                json.dump(signal_result, f, indent=2, default=str)
-                
-        except Exception as e:
-            logger.error(f"Error saving JSON: {e}")
+            if not self._legacy_checked and conn.execute('''
+                SELECT 1 FROM signal_history h
+                WHERE h.data_snapshot_json IS NOT NULL
+                  AND NOT EXISTS (SELECT 1 FROM signal_snapshots s WHERE s.signal_id = h.id)
+                LIMIT 1
+            ''').fetchone():
+                logger.warning("Legacy signals without metrics - run: python3 signal_history_logger.py migrate")
+            return pd.read_sql_query(f'''
+                SELECT h.id AS signal_id, h.timestamp, h.asset, h.signal_type, h.confidence,
+                       h.strength, h.spot_price, h.config_hash, {metrics}
+                FROM signal_history h
+                LEFT JOIN signal_snapshots s ON s.signal_id = h.id
+                {'WHERE ' + where if where else ''}
+                ORDER BY h.timestamp ASC
+            ''', conn, params=params)
+        finally:
+            conn.close()
+    
+    def load_raw(self, signal_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """signal_id -> {'data_snapshot', 'strategies'} (распакованные, если сохранены)"""
+        result = {}
+        conn = sqlite3.connect(self.db_path)
+        try:
+            for start in range(0, len(signal_ids), 500):
+                chunk = [int(i) for i in signal_ids[start:start + 500]]
+                rows = conn.execute(f'''
+                    SELECT signal_id, data_snapshot, strategies FROM signal_raw
+                    WHERE signal_id IN ({','.join('?' * len(chunk))})
+                ''', chunk).fetchall()
+                for signal_id, snapshot, strategies in rows:
+                    result[signal_id] = {
+                        'data_snapshot': unpack(snapshot),
+                        'strategies': unpack(strategies) or []
+                    }
+        finally:
+            conn.close()
+        return result
     
     def get_signals_by_config(self, config_hash: str, limit: int = 100):
         """Получить сигналы для определенного конфига"""
@@ -160,6 +347,13 @@ class SignalHistoryLogger:
 
 
 if __name__ == '__main__':
+    import sys
+    
+    if len(sys.argv) > 1 and sys.argv[1] in ('migrate', 'compact'):
+        history = SignalHistoryLogger()
+        history.migrate_legacy(drop_json=sys.argv[1] == 'compact')
+        sys.exit(0)
+    
     # Тестирование
     from data_integrator import DataIntegrator
     from signal_analyzer import SignalAnalyzer
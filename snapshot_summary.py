@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SNAPSHOT SUMMARY - Агрегаты по каждому снапшоту OI
+Одна строка на (asset, timestamp): OI, объём, нотионал и число контрактов
+по путам и коллам. Пишется коллектором при сборе, история для
+PCR/GEX/OI индикаторов читается отсюда вместо GROUP BY по сырым строкам.
+
+Использование:
+    python3 snapshot_summary.py backfill   # заполнить по существующей истории
+"""
+
+import sqlite3
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+OI_DB_PATH = './data/unlimited_oi.db'
+
+_AGGREGATE_SELECT = """
+    SELECT
+        asset,
+        timestamp,
+        SUM(CASE WHEN option_type = 'Put' THEN open_interest ELSE 0 END),
+        SUM(CASE WHEN option_type = 'Call' THEN open_interest ELSE 0 END),
+        SUM(CASE WHEN option_type = 'Put' THEN volume_24h ELSE 0 END),
+        SUM(CASE WHEN option_type = 'Call' THEN volume_24h ELSE 0 END),
+        SUM(CASE WHEN option_type = 'Put' THEN open_interest * spot_price ELSE 0 END),
+        SUM(CASE WHEN option_type = 'Call' THEN open_interest * spot_price ELSE 0 END),
+        SUM(CASE WHEN option_type = 'Put' THEN 1 ELSE 0 END),
+        SUM(CASE WHEN option_type = 'Call' THEN 1 ELSE 0 END),
+        MAX(spot_price)
+    FROM all_positions_tracking
+"""
+
+
+def init_summary_table(conn: sqlite3.Connection):
+    """Создать таблицу агрегатов (идемпотентно)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS snapshot_summary (
+            asset TEXT,
+            timestamp INTEGER,
+            put_oi REAL,
+            call_oi REAL,
+            put_volume REAL,
+            call_volume REAL,
+            put_notional REAL,
+            call_notional REAL,
+            put_contracts INTEGER,
+            call_contracts INTEGER,
+            spot_price REAL,
+            PRIMARY KEY (asset, timestamp)
+        )
+    """)
+
+
+def write_snapshot_summary(conn: sqlite3.Connection, asset: str, timestamp: int):
+    """Записать агрегат одного снапшота (вызывается коллектором после вставки строк)"""
+    conn.execute(f"""
+        INSERT OR REPLACE INTO snapshot_summary
+        {_AGGREGATE_SELECT}
+        WHERE timestamp = ? AND asset = ?
+        GROUP BY asset, timestamp
+    """, (timestamp, asset))
+
+
+def backfill(db_path: str = OI_DB_PATH) -> int:
+    """Заполнить snapshot_summary по всей существующей истории"""
+    conn = sqlite3.connect(db_path)
+    try:
+        init_summary_table(conn)
+        before = conn.execute("SELECT COUNT(*) FROM snapshot_summary").fetchone()[0]
+
+        conn.execute(f"""
+            INSERT OR REPLACE INTO snapshot_summary
+            {_AGGREGATE_SELECT}
+            GROUP BY asset, timestamp
+        """)
+        conn.commit()
+
+        after = conn.execute("SELECT COUNT(*) FROM snapshot_summary").fetchone()[0]
+        logger.info(f"✅ Backfill: {after} snapshots ({after - before} new)")
+        return after
+    finally:
+        conn.close()
+
+
+def get_summary_history(asset: str, hours: int = 168,
+                        db_path: str = OI_DB_PATH) -> List[Dict[str, Any]]:
+    """История агрегатов за период (по возрастанию времени)"""
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        cutoff = int((datetime.now() - timedelta(hours=hours)).timestamp())
+
+        rows = conn.execute("""
+            SELECT * FROM snapshot_summary
+            WHERE asset = ? AND timestamp > ?
+            ORDER BY timestamp ASC
+        """, (asset, cutoff)).fetchall()
+        conn.close()
+
+        return [dict(row) for row in rows]
+
+    except Exception as e:
+        logger.error(f"Error reading snapshot summary for {asset}: {e}")
+        return []
+
+
+def get_latest_summary(asset: str, db_path: str = OI_DB_PATH) -> Optional[Dict[str, Any]]:
+    """Агрегат последнего снапшота"""
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        row = conn.execute("""
+            SELECT * FROM snapshot_summary
+            WHERE asset = ?
+            ORDER BY timestamp DESC
+            LIMIT 1
+        """, (asset,)).fetchone()
+        conn.close()
+        return dict(row) if row else None
+
+    except Exception as e:
+        logger.error(f"Error reading latest summary for {asset}: {e}")
+        return None
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'backfill':
+        db = sys.argv[2] if len(sys.argv) > 2 else OI_DB_PATH
+        print("=" * 60)
+        print("📊 SNAPSHOT SUMMARY BACKFILL")
+        print("=" * 60)
+        backfill(db)
+    else:
+        for asset in ['BTC', 'ETH', 'SOL', 'XRP', 'DOGE', 'MNT']:
+            latest = get_latest_summary(asset)
+            if latest:
+                pcr = latest['put_oi'] / latest['call_oi'] if latest['call_oi'] else 0
+                print(f"{asset}: {datetime.fromtimestamp(latest['timestamp'])} "
+                      f"PCR={pcr:.3f} contracts={latest['put_contracts'] + latest['call_contracts']}")
+            else:
+                print(f"{asset}: no summary (run: python3 snapshot_summary.py backfill)")
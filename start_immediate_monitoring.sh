@@ -14,10 +14,12 @@ python3 admin_daily_report.py
 echo "3. Проверяем процессы..."
 python3 -c "
 import os
+from supervisor import monitor_states
+states = monitor_states()   # задачи supervisor.py; None - он не работает
 result = os.popen('ps aux').read()
 processes = ['unlimited_oi_monitor.py', 'futures_data_monitor.py', 'liquidations_monitor.py', 'funding_rate_monitor.py']
 for p in processes:
-    if p in result:
+    if (states[p] if states is not None else p in result):
         print(f'✅ {p} - ЗАПУЩЕН')
     else:
         print(f'❌ {p} - НЕ ЗАПУЩЕН')
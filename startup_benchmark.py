@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+STARTUP BENCHMARK - Холодный импорт и время до первого результата
+Каждая точка входа замеряется в отдельном чистом интерпретаторе:
+время импорта, время первого вызова и какие тяжёлые модули
+(matplotlib/scipy/sklearn/xgboost) оказались загружены.
+
+Использование:
+    python3 startup_benchmark.py                  # замер
+    python3 startup_benchmark.py --save-baseline  # сохранить как эталон
+    python3 startup_benchmark.py --check          # exit 1 при регрессии
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+BASELINE_PATH = Path('data/benchmarks/startup_baseline.json')
+REPEATS = 3
+REGRESSION_TOLERANCE = 0.25  # +25% к эталону = регрессия
+HEAVY_MODULES = ['matplotlib', 'scipy', 'sklearn', 'xgboost']
+
+# name: (модуль, выражение для первого результата)
+ENTRY_POINTS = {
+    'option_pricing': (
+        'option_pricing',
+        "mod.OptionPricing.calculate_greeks('CALL', 3000.0, 3100.0, 30, 0.6)"
+    ),
+    'gamma_exposure': (
+        'gamma_exposure_calculator',
+        "mod.BlackScholesGreeks(3000.0, 3100.0, 30 / 365, 0.05, 0.8, 'call').gamma()"
+    ),
+    'max_pain': (
+        'max_pain_calculator',
+        "mod.MaxPainCalculator('ETH')"
+    ),
+    'advanced_indicators': (
+        'advanced_indicators',
+        "mod.calculate_rsi([float(i % 7) for i in range(40)])"
+    ),
+    'oi_dynamics': (
+        'oi_dynamics_analyzer',
+        "mod.OIDynamicsAnalyzer(':memory:')"
+    ),
+    'data_integrator': (
+        'data_integrator',
+        "mod.DataIntegrator()"
+    ),
+    'backtest_engine': (
+        'backtest.backtest_engine',
+        None
+    ),
+}
+
+_PROBE = r'''
+import json, sys, time, importlib
+t0 = time.perf_counter()
+mod = importlib.import_module({module!r})
+t1 = time.perf_counter()
+first = {first!r}
+if first:
+    eval(first, {{'mod': mod}})
+t2 = time.perf_counter()
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print('__BENCH__' + json.dumps({{'import_s': t1 - t0, 'first_s': t2 - t1, 'heavy': heavy}}))
+'''
+
+
+def measure_entry_point(module: str, first: Optional[str], repeats: int = REPEATS) -> Dict[str, Any]:
+    """Лучшее из N холодных запусков"""
+    best = None
+    code = _PROBE.format(module=module, first=first, heavy=HEAVY_MODULES)
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+
+    for _ in range(repeats):
+        proc = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                              timeout=300, env=env, cwd=str(Path(__file__).parent))
+        lines = [line for line in proc.stdout.splitlines() if line.startswith('__BENCH__')]
+        if proc.returncode != 0 or not lines:
+            error = (proc.stderr.strip().splitlines() or ['unknown error'])[-1]
+            return {'error': error}
+
+        result = json.loads(lines[-1][len('__BENCH__'):])
+        result['total_s'] = result['import_s'] + result['first_s']
+        if best is None or result['total_s'] < best['total_s']:
+            best = result
+
+    return best
+
+
+def run_benchmark(repeats: int = REPEATS) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for name, (module, first) in ENTRY_POINTS.items():
+        results[name] = measure_entry_point(module, first, repeats)
+    return results
+
+
+def find_regressions(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]]) -> list:
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or 'error' in base or 'error' in result:
+            continue
+        limit = base['total_s'] * (1 + REGRESSION_TOLERANCE)
+        if result['total_s'] > limit:
+            regressions.append(f"{name}: {result['total_s']:.3f}s > {limit:.3f}s (baseline {base['total_s']:.3f}s)")
+        new_heavy = set(result['heavy']) - set(base['heavy'])
+        if new_heavy:
+            regressions.append(f"{name}: now loads {', '.join(sorted(new_heavy))}")
+    return regressions
+
+
+def print_results(results: Dict[str, Dict[str, Any]]):
+    print(f"{'Entry point':<22}{'import':>10}{'first':>10}{'total':>10}  heavy")
+    print("-" * 70)
+    for name, r in results.items():
+        if 'error' in r:
+            print(f"{name:<22}  ❌ {r['error']}")
+            continue
+        heavy = ', '.join(r['heavy']) or '-'
+        print(f"{name:<22}{r['import_s']*1000:>8.0f}ms{r['first_s']*1000:>8.1f}ms{r['total_s']*1000:>8.0f}ms  {heavy}")
+
+
+if __name__ == '__main__':
+    print("=" * 70)
+    print("⏱️  STARTUP BENCHMARK")
+    print("=" * 70)
+
+    results = run_benchmark()
+    print_results(results)
+
+    if '--save-baseline' in sys.argv:
+        BASELINE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Baseline saved: {BASELINE_PATH}")
+
+    if '--check' in sys.argv:
+        if not BASELINE_PATH.exists():
+            print(f"\n⚠️ No baseline at {BASELINE_PATH} (run with --save-baseline)")
+            sys.exit(0)
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline)
+        if regressions:
+            print("\n🚨 REGRESSIONS:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\n✅ No startup regressions")
@@ -3,6 +3,7 @@
 
 echo "🛑 Stopping all monitors..."
 
+pkill -f "supervisor.py" && echo "  ✅ Stopped Supervisor"
 pkill -f "unlimited_oi_monitor.py" && echo "  ✅ Stopped Unlimited OI Monitor"
 pkill -f "futures_data_monitor.py" && echo "  ✅ Stopped Futures Data Monitor"
 pkill -f "liquidations_monitor.py" && echo "  ✅ Stopped Liquidations Monitor"
@@ -2,9 +2,21 @@
 """
 ALL OPTIONS STRATEGIES
 8 конструкций + lottery plays
+P&L - Black-Scholes оценка ног позиции (strategies/options/position_model.py)
 """
 
-from typing import Dict
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from strategies.options.position_model import batch_pnl, strategy_legs
+
+DEFAULT_DTE = 7
+DEFAULT_IV = 0.6
 
 class AllOptionStrategies:
     """
@@ -14,151 +26,101 @@ class AllOptionStrategies:
     def __init__(self):
         print("✅ All Option Strategies initialized (8 + lottery)")
     
+    def _build(self, stype: str, entry_price: float, risk: float, dte: float, iv: float) -> Dict:
+        return {'type': stype, 'entry': entry_price, 'risk': risk, 'dte': dte, 'iv': iv,
+                'legs': strategy_legs(stype, entry_price, dte)}
+    
     # ==================== DIRECTIONAL ====================
     
-    def bull_call_spread(self, entry_price: float, risk: float) -> Dict:
+    def bull_call_spread(self, entry_price: float, risk: float, dte: float = DEFAULT_DTE,
+                         iv: float = DEFAULT_IV) -> Dict:
         """1. Bull Call Spread - бычья ставка"""
-        return {'type': 'bull_call_spread', 'entry': entry_price, 'risk': risk}
+        return self._build('bull_call_spread', entry_price, risk, dte, iv)
     
-    def bear_put_spread(self, entry_price: float, risk: float) -> Dict:
+    def bear_put_spread(self, entry_price: float, risk: float, dte: float = DEFAULT_DTE,
+                        iv: float = DEFAULT_IV) -> Dict:
         """2. Bear Put Spread - медвежья ставка"""
-        return {'type': 'bear_put_spread', 'entry': entry_price, 'risk': risk}
+        return self._build('bear_put_spread', entry_price, risk, dte, iv)
     
     # ==================== NEUTRAL ====================
     
-    def iron_condor(self, entry_price: float, risk: float) -> Dict:
+    def iron_condor(self, entry_price: float, risk: float, dte: float = DEFAULT_DTE,
+                    iv: float = DEFAULT_IV) -> Dict:
         """3. Iron Condor - боковик (нейтральная)"""
-        return {'type': 'iron_condor', 'entry': entry_price, 'risk': risk}
+        return self._build('iron_condor', entry_price, risk, dte, iv)
     
-    def butterfly_spread(self, entry_price: float, risk: float) -> Dict:
+    def butterfly_spread(self, entry_price: float, risk: float, dte: float = DEFAULT_DTE,
+                         iv: float = DEFAULT_IV) -> Dict:
         """4. Butterfly - точечная ставка (цена не двинется)"""
-        return {'type': 'butterfly', 'entry': entry_price, 'risk': risk}
+        return self._build('butterfly', entry_price, risk, dte, iv)
     
     # ==================== VOLATILITY ====================
     
-    def straddle(self, entry_price: float, risk: float) -> Dict:
+    def straddle(self, entry_price: float, risk: float, dte: float = DEFAULT_DTE,
+                 iv: float = DEFAULT_IV) -> Dict:
         """5. Straddle - большое движение в любую сторону"""
-        return {'type': 'straddle', 'entry': entry_price, 'risk': risk}
+        return self._build('straddle', entry_price, risk, dte, iv)
     
-    def strangle(self, entry_price: float, risk: float) -> Dict:
+    def strangle(self, entry_price: float, risk: float, dte: float = DEFAULT_DTE,
+                 iv: float = DEFAULT_IV) -> Dict:
         """6. Strangle - дешевле straddle, нужно больше движения"""
-        return {'type': 'strangle', 'entry': entry_price, 'risk': risk}
+        return self._build('strangle', entry_price, risk, dte, iv)
     
     # ==================== TIME-BASED ====================
     
-    def calendar_spread(self, entry_price: float, risk: float) -> Dict:
+    def calendar_spread(self, entry_price: float, risk: float, dte: float = DEFAULT_DTE,
+                        iv: float = DEFAULT_IV) -> Dict:
         """7. Calendar Spread - игра на временном распаде"""
-        return {'type': 'calendar', 'entry': entry_price, 'risk': risk}
+        return self._build('calendar', entry_price, risk, dte, iv)
     
-    def credit_spread(self, entry_price: float, risk: float, direction: str) -> Dict:
+    def credit_spread(self, entry_price: float, risk: float, direction: str, dte: float = DEFAULT_DTE,
+                      iv: float = DEFAULT_IV) -> Dict:
         """8. Credit Spread - получаем премию сразу"""
-        return {'type': f'credit_{direction}', 'entry': entry_price, 'risk': risk}
+        return self._build(f'credit_{direction}', entry_price, risk, dte, iv)
     
     # ==================== LOTTERY ====================
     
-    def lottery_call(self, entry_price: float, risk: float) -> Dict:
+    def lottery_call(self, entry_price: float, risk: float, dte: float = DEFAULT_DTE,
+                     iv: float = DEFAULT_IV) -> Dict:
         """Лотерейка - далекий OTM call (20%+ OTM)"""
-        return {'type': 'lottery_call', 'entry': entry_price, 'risk': risk}
+        return self._build('lottery_call', entry_price, risk, dte, iv)
     
-    def lottery_put(self, entry_price: float, risk: float) -> Dict:
+    def lottery_put(self, entry_price: float, risk: float, dte: float = DEFAULT_DTE,
+                    iv: float = DEFAULT_IV) -> Dict:
         """Лотерейка - далекий OTM put (20%+ OTM)"""
-        return {'type': 'lottery_put', 'entry': entry_price, 'risk': risk}
+        return self._build('lottery_put', entry_price, risk, dte, iv)
     
     # ==================== P&L CALCULATOR ====================
     
-    def calculate_pnl(self, strategy: Dict, exit_price: float) -> float:
+    def calculate_pnl(self, strategy: Dict, exit_price: float,
+                      elapsed_days: Optional[float] = None) -> float:
         """
         Универсальный расчёт P&L для всех стратегий
+        Mark-to-model по Black-Scholes; позиция масштабирована так, что
+        максимальный убыток = risk. elapsed_days=None - оценка на ближайшей экспирации.
         """
-        entry = strategy['entry']
-        risk = strategy['risk']
-        stype = strategy['type']
-        
-        price_change = (exit_price - entry) / entry
-        
-        # DIRECTIONAL
-        if stype == 'bull_call_spread':
-            if price_change > 0.02: return risk * 1.0      # Max profit
-            elif price_change > 0.01: return risk * 0.5
-            elif price_change < -0.01: return -risk * 0.5  # Max loss
-            else: return risk * price_change * 10
-        
-        elif stype == 'bear_put_spread':
-            if price_change < -0.02: return risk * 1.0
-            elif price_change < -0.01: return risk * 0.5
-            elif price_change > 0.01: return -risk * 0.5
-            else: return -risk * price_change * 10
-        
-        # NEUTRAL
-        elif stype == 'iron_condor':
-            # Profit если цена в коридоре ±3%
-            if abs(price_change) < 0.03:
-                return risk * 0.5  # Max profit = 50% риска
-            else:
-                return -risk * 1.0  # Max loss
-        
-        elif stype == 'butterfly':
-            # Max profit если цена не двинулась
-            if abs(price_change) < 0.01:
-                return risk * 1.5  # High R:R
-            elif abs(price_change) < 0.03:
-                return risk * 0.3
-            else:
-                return -risk * 1.0
-        
-        # VOLATILITY
-        elif stype == 'straddle':
-            # Нужно большое движение
-            if abs(price_change) > 0.05:
-                return risk * 2.0  # Большая прибыль
-            elif abs(price_change) > 0.03:
-                return risk * 0.5
-            else:
-                return -risk * 0.8  # Дорогая премия
-        
-        elif stype == 'strangle':
-            # Дешевле, но нужно ещё больше движения
-            if abs(price_change) > 0.07:
-                return risk * 2.5
-            elif abs(price_change) > 0.04:
-                return risk * 0.5
-            else:
-                return -risk * 0.6
-        
-        # TIME-BASED
-        elif stype == 'calendar':
-            # Profit от временного распада
-            if abs(price_change) < 0.02:
-                return risk * 0.4  # Slow profit
-            else:
-                return -risk * 0.8
-        
-        elif stype in ['credit_bullish', 'credit_bearish']:
-            # Получили премию, держим если цена в диапазоне
-            if abs(price_change) < 0.04:
-                return risk * 0.6
-            else:
-                return -risk * 1.0
-        
-        # LOTTERY
-        elif stype == 'lottery_call':
-            # Огромная прибыль или полная потеря
-            if price_change > 0.20:  # +20%
-                return risk * 10.0  # 10x!
-            elif price_change > 0.10:
-                return risk * 2.0
-            else:
-                return -risk * 1.0  # Полная потеря
-        
-        elif stype == 'lottery_put':
-            if price_change < -0.20:
-                return risk * 10.0
-            elif price_change < -0.10:
-                return risk * 2.0
-            else:
-                return -risk * 1.0
-        
-        return 0
+        return float(self.calculate_pnl_batch([strategy], [exit_price], elapsed_days)[0])
+    
+    def calculate_pnl_batch(self, strategies: Sequence[Dict], exit_prices: Sequence[float],
+                            elapsed_days: Optional[Sequence[float]] = None) -> np.ndarray:
+        """P&L многих сделок одним векторным вызовом"""
+        legs = [self._legs(s) for s in strategies]
+        if elapsed_days is None:
+            elapsed_days = [leg['expiry_days'].min() for leg in legs]
+        return batch_pnl(
+            legs,
+            entry_spots=[s['entry'] for s in strategies],
+            exit_spots=exit_prices,
+            vols=[s.get('iv', DEFAULT_IV) for s in strategies],
+            elapsed_days=np.broadcast_to(np.asarray(elapsed_days, dtype=np.float64), (len(legs),)),
+            risks=[s['risk'] for s in strategies]
+        )
+    
+    @staticmethod
+    def _legs(strategy: Dict) -> np.ndarray:
+        if 'legs' in strategy:
+            return strategy['legs']
+        return strategy_legs(strategy['type'], strategy['entry'], strategy.get('dte', DEFAULT_DTE))
 
 if __name__ == "__main__":
     strategies = AllOptionStrategies()
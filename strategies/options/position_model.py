@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+POSITION MODEL - Векторная оценка многоногих опционных позиций
+Позиция = массив ног (strike, expiry_days, is_call, qty). PositionBook
+склеивает ноги многих позиций в плоские массивы и за один вызов считает
+Black-Scholes стоимость и греки по массивам spot / vol / elapsed_days
+(скаляр, по позиции или матрица сценарии × позиции).
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from lazy_imports import norm
+
+LEG_DTYPE = np.dtype([
+    ('strike', np.float64),
+    ('expiry_days', np.float64),  # дни до экспирации на момент открытия позиции
+    ('is_call', np.bool_),
+    ('qty', np.float64),          # +1 купили, -1 продали
+])
+
+DAYS_PER_YEAR = 365.0
+
+
+def black_scholes(spot, strike, t_years, vol, is_call, rate: float = 0.0,
+                  greeks: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Цена (и греки) европейских опционов, все аргументы броадкастятся.
+    При t_years <= 0 - внутренняя стоимость, дельта-ступенька, остальные греки 0.
+    vega - на 1% волатильности, theta - за день (как в OptionPricing).
+    """
+    spot, strike, t_years, vol, is_call = np.broadcast_arrays(
+        np.asarray(spot, dtype=np.float64), np.asarray(strike, dtype=np.float64),
+        np.asarray(t_years, dtype=np.float64), np.asarray(vol, dtype=np.float64),
+        np.asarray(is_call, dtype=bool))
+
+    live = (t_years > 0) & (vol > 0)
+    intrinsic = np.where(is_call, np.maximum(spot - strike, 0.0), np.maximum(strike - spot, 0.0))
+    result = {'price': intrinsic}
+    if greeks:
+        result['delta'] = np.where(is_call, (spot > strike).astype(float), -(spot < strike).astype(float))
+        for name in ('gamma', 'vega', 'theta'):
+            result[name] = np.zeros(spot.shape)
+
+    if not live.any():
+        return result
+    # Формулы только по живым ногам: на экспирации (частый случай в Monte Carlo) - одна внутренняя стоимость
+    all_live = live.all()
+    pick = (lambda a: a) if all_live else (lambda a: a[live])
+    s, k, t, sigma, call_mask = pick(spot), pick(strike), pick(t_years), pick(vol), pick(is_call)
+
+    sqrt_t = np.sqrt(t)
+    discount = np.exp(-rate * t)
+    d1 = (np.log(s / k) + (rate + 0.5 * sigma ** 2) * t) / (sigma * sqrt_t)
+    d2 = d1 - sigma * sqrt_t
+    cdf_d1, cdf_d2 = norm.cdf(d1), norm.cdf(d2)
+
+    # put через паритет: N(-x) = 1 - N(x)
+    call = s * cdf_d1 - k * discount * cdf_d2
+    put = k * discount * (1.0 - cdf_d2) - s * (1.0 - cdf_d1)
+    values = {'price': np.where(call_mask, call, put)}
+
+    if greeks:
+        pdf = norm.pdf(d1)
+        carry = np.where(call_mask, -rate * k * discount * cdf_d2, rate * k * discount * (1.0 - cdf_d2))
+        values['delta'] = np.where(call_mask, cdf_d1, cdf_d1 - 1.0)
+        values['gamma'] = pdf / (s * sigma * sqrt_t)
+        values['vega'] = s * pdf * sqrt_t / 100
+        values['theta'] = (-s * pdf * sigma / (2 * sqrt_t) + carry) / DAYS_PER_YEAR
+
+    for name, live_values in values.items():
+        if all_live:
+            result[name] = live_values
+        else:
+            result[name] = result[name].astype(np.float64, copy=True)
+            result[name][live] = live_values
+    return result
+
+
+def make_legs(legs: Iterable[Tuple[float, float, str, float]]) -> np.ndarray:
+    """[(strike, expiry_days, 'call'/'put', qty), ...] -> массив LEG_DTYPE"""
+    return np.array([(strike, expiry_days, str(option_type).lower() == 'call', qty)
+                     for strike, expiry_days, option_type, qty in legs], dtype=LEG_DTYPE)
+
+
+def strategy_legs(stype: str, spot: float, dte: float) -> np.ndarray:
+    """
+    Ноги стандартных конструкций AllOptionStrategies, страйки в % от spot.
+    Ширины совпадают с порогами старых ступенчатых P&L (±2%, ±3%, ±4%, 20% OTM).
+    """
+    k = lambda pct: spot * pct
+    templates = {
+        'bull_call_spread': [(k(1.00), dte, 'call', 1), (k(1.02), dte, 'call', -1)],
+        'bear_put_spread': [(k(1.00), dte, 'put', 1), (k(0.98), dte, 'put', -1)],
+        'iron_condor': [(k(0.95), dte, 'put', 1), (k(0.97), dte, 'put', -1),
+                        (k(1.03), dte, 'call', -1), (k(1.05), dte, 'call', 1)],
+        'butterfly': [(k(0.97), dte, 'call', 1), (k(1.00), dte, 'call', -2), (k(1.03), dte, 'call', 1)],
+        'straddle': [(k(1.00), dte, 'call', 1), (k(1.00), dte, 'put', 1)],
+        'strangle': [(k(1.04), dte, 'call', 1), (k(0.96), dte, 'put', 1)],
+        'calendar': [(k(1.00), dte, 'call', -1), (k(1.00), dte * 2, 'call', 1)],
+        'credit_bullish': [(k(0.98), dte, 'put', -1), (k(0.96), dte, 'put', 1)],
+        'credit_bearish': [(k(1.02), dte, 'call', -1), (k(1.04), dte, 'call', 1)],
+        'lottery_call': [(k(1.20), dte, 'call', 1)],
+        'lottery_put': [(k(0.80), dte, 'put', 1)],
+    }
+    if stype not in templates:
+        raise ValueError(f"Unknown strategy type: {stype}")
+    return make_legs(templates[stype])
+
+
+class PositionBook:
+    """Много позиций в плоских массивах ног; оценка всех позиций одним вызовом"""
+
+    def __init__(self, rate: float = 0.0):
+        self.rate = rate
+        self._legs: List[np.ndarray] = []
+        self._legs_flat: Optional[np.ndarray] = None
+        self._owner: Optional[np.ndarray] = None
+        self._starts: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self._legs)
+
+    def add(self, legs: np.ndarray) -> int:
+        """Добавить позицию, вернуть её индекс"""
+        self._legs.append(np.asarray(legs, dtype=LEG_DTYPE))
+        self._legs_flat = None
+        return len(self._legs) - 1
+
+    def _flatten(self):
+        if self._legs_flat is None:
+            counts = np.array([len(legs) for legs in self._legs], dtype=np.int64)
+            self._legs_flat = np.concatenate(self._legs) if self._legs else np.empty(0, dtype=LEG_DTYPE)
+            self._owner = np.repeat(np.arange(len(self._legs)), counts)
+            self._starts = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+        return self._legs_flat, self._owner, self._starts
+
+    def _per_leg(self, values) -> np.ndarray:
+        """Скаляр, (P,), (S, P) или (S, 1) по позициям -> (..., L) по ногам"""
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim == 0:
+            return values
+        values = np.broadcast_to(values, values.shape[:-1] + (len(self),))
+        return values[..., self._owner]
+
+    def evaluate(self, spot, vol, elapsed_days=0.0, greeks: bool = False) -> Dict[str, np.ndarray]:
+        """
+        Mark-to-model стоимость позиций (на единицу базового актива, в валюте spot).
+        spot/vol/elapsed_days: скаляр, массив (P,) по позициям или (S, P) сценарии × позиции.
+        Возвращает {'value': (..., P)} и при greeks=True net delta/gamma/vega/theta.
+        """
+        legs, _, starts = self._flatten()
+        t_years = (legs['expiry_days'] - self._per_leg(elapsed_days)) / DAYS_PER_YEAR
+        leg_result = black_scholes(self._per_leg(spot), legs['strike'], t_years,
+                                   self._per_leg(vol), legs['is_call'], self.rate, greeks)
+
+        result = {}
+        for name, leg_values in leg_result.items():
+            key = 'value' if name == 'price' else name
+            result[key] = np.add.reduceat(leg_values * legs['qty'], starts, axis=-1)
+        return result
+
+    def entry_value(self, spot, vol) -> np.ndarray:
+        """Стоимость позиций в момент открытия (дебет > 0, кредит < 0)"""
+        return self.evaluate(spot, vol, 0.0)['value']
+
+    def max_loss(self, spot, vol, grid_points: int = 600) -> np.ndarray:
+        """
+        Максимальный убыток на единицу базового актива: худший исход на первой
+        экспирации позиции по сетке цен 0..3 × spot плюс страйки её ног - изломы
+        выплаты, где и лежит минимум (дальние ноги - по Black-Scholes)
+        """
+        legs, owner, starts = self._flatten()
+        spot = np.broadcast_to(np.asarray(spot, dtype=np.float64), (len(self),))
+        vol = np.broadcast_to(np.asarray(vol, dtype=np.float64), (len(self),))
+        first_expiry = np.minimum.reduceat(legs['expiry_days'], starts)
+
+        # Страйки позиции - отдельными строками сетки (короткие позиции добиты spot)
+        leg_index = np.arange(len(legs)) - starts[owner]
+        strikes = np.repeat(spot[None, :], leg_index.max(initial=-1) + 1, axis=0)
+        strikes[leg_index, owner] = legs['strike']
+        grid = np.vstack([np.linspace(0.0, 3.0, grid_points)[:, None] * spot[None, :], strikes])
+        with np.errstate(divide='ignore'):  # log(0 / K) у дальних ног при нулевой цене
+            at_expiry = self.evaluate(grid, vol, first_expiry)['value']
+        entry = self.entry_value(spot, vol)
+        return np.maximum(entry - at_expiry.min(axis=0), 0.0)
+
+
+def batch_pnl(legs_list: Sequence[np.ndarray], entry_spots, exit_spots, vols,
+              elapsed_days, risks, rate: float = 0.0) -> np.ndarray:
+    """
+    P&L в $ для многих сделок сразу: позиция масштабируется так, чтобы
+    максимальный убыток равнялся risk.
+    """
+    book = PositionBook(rate)
+    for legs in legs_list:
+        book.add(legs)
+    entry_spots = np.asarray(entry_spots, dtype=np.float64)
+    vols = np.asarray(vols, dtype=np.float64)
+
+    entry = book.entry_value(entry_spots, vols)
+    exit_value = book.evaluate(exit_spots, vols, elapsed_days)['value']
+    max_loss = book.max_loss(entry_spots, vols)
+    units = np.divide(np.asarray(risks, dtype=np.float64), max_loss,
+                      out=np.zeros_like(max_loss), where=max_loss > 0)
+    return units * (exit_value - entry)
+
+
+if __name__ == '__main__':
+    import time
+
+    spot = 100000.0
+    book = PositionBook()
+    for stype in ['bull_call_spread', 'bear_put_spread', 'iron_condor', 'butterfly',
+                  'straddle', 'strangle', 'calendar', 'lottery_call']:
+        book.add(strategy_legs(stype, spot, 7))
+
+    result = book.evaluate(spot, 0.6, 0.0, greeks=True)
+    print(f"{'value':>10}{'delta':>10}{'gamma':>12}{'vega':>10}{'theta':>10}")
+    for i in range(len(book)):
+        print(f"{result['value'][i]:>10.1f}{result['delta'][i]:>10.3f}{result['gamma'][i]:>12.2e}"
+              f"{result['vega'][i]:>10.1f}{result['theta'][i]:>10.1f}")
+
+    # Тысячи сделок × сценарии цены одним вызовом
+    many = PositionBook()
+    for _ in range(2000):
+        many.add(strategy_legs('iron_condor', spot, 14))
+    scenarios = spot * np.exp(np.random.normal(0, 0.03, size=(50, 1)))
+    t0 = time.perf_counter()
+    values = many.evaluate(scenarios, 0.6, 3.0)['value']
+    elapsed = time.perf_counter() - t0
+    print(f"\n{values.shape[1]} positions × {values.shape[0]} scenarios: {elapsed*1000:.1f} ms")
@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SUPERVISOR - Все мониторы данных в одном процессе
+Вместо четырёх долгоживущих python3 (по копии pandas/requests и своих
+соединений с SQLite на каждый) мониторы работают задачами-потоками одного
+процесса (или N рабочих процессов с --workers N):
+- задача = объект монитора + шаг (run_cycle, ...) с интервалом; после
+  каждого успешного шага - heartbeat
+- политика при ошибке: 'restart' (новый объект монитора - новые
+  соединения), 'retry' (тот же объект, следующий интервал), 'stop';
+  экспоненциальная пауза, не больше MAX_RESTARTS за RESTART_WINDOW
+- watchdog: heartbeat старше heartbeat_timeout - задача 'stalled' + алерт
+  (поток не прервать; в режиме --workers зависший процесс перезапускается)
+- backpressure: шаг не перекрывается сам с собой (опоздания - overruns),
+  потоковые записи (ликвидации) идут через BatchWriter - ограниченная
+  очередь и пакетные коммиты одним писателем на файл БД
+- состояние задач пишется в STATUS_PATH, health-проверки читают его
+  вместо поиска процессов
+
+Использование:
+    python3 supervisor.py [--workers N] [TASK ...]
+    python3 supervisor.py status     # код выхода: 0 - всё здорово, 1 - не работает, 2 - сбойные задачи
+"""
+
+import importlib
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STATUS_PATH = './logs/supervisor_status.json'
+STATUS_INTERVAL = 10           # сек между записями статуса / проверками heartbeat
+STATUS_MAX_AGE = 60            # статус старше - супервизор не работает
+BACKOFF_BASE = 5
+BACKOFF_MAX = 300
+MAX_RESTARTS = 5
+RESTART_WINDOW = 3600
+
+WRITER_QUEUE_SIZE = 10000
+WRITER_FLUSH_INTERVAL = 1.0
+
+
+# ==================== BACKPRESSURE: ПИСАТЕЛЬ БД ====================
+
+class BatchWriter:
+    """
+    Один писатель на файл БД: строки копятся в ограниченной очереди и
+    коммитятся пакетами. Переполнение - строка отбрасывается и считается
+    (поток данных не блокирует websocket-поток продюсера).
+    """
+
+    def __init__(self, db_path: str, maxsize: int = WRITER_QUEUE_SIZE,
+                 flush_interval: float = WRITER_FLUSH_INTERVAL):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.queue: 'queue.Queue[Tuple[str, tuple]]' = queue.Queue(maxsize=maxsize)
+        self.stats = {'written': 0, 'dropped': 0, 'batches': 0, 'max_depth': 0, 'last_flush': None,
+                      'last_error': None}
+        self._thread = threading.Thread(target=self._run, name=f'writer-{os.path.basename(db_path)}',
+                                        daemon=True)
+        self._thread.start()
+
+    def put(self, sql: str, params: tuple) -> bool:
+        try:
+            self.queue.put_nowait((sql, params))
+        except queue.Full:
+            self.stats['dropped'] += 1
+            return False
+        self.stats['max_depth'] = max(self.stats['max_depth'], self.queue.qsize())
+        return True
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while time.monotonic() < deadline:
+                try:
+                    batch.append(self.queue.get(timeout=max(deadline - time.monotonic(), 0.001)))
+                except queue.Empty:
+                    break
+            grouped: Dict[str, List[tuple]] = {}
+            for sql, params in batch:
+                grouped.setdefault(sql, []).append(params)
+            try:
+                for sql, rows in grouped.items():
+                    conn.executemany(sql, rows)
+                conn.commit()
+                self.stats['written'] += len(batch)
+                self.stats['batches'] += 1
+                self.stats['last_flush'] = time.time()
+            except sqlite3.Error as e:
+                conn.rollback()
+                self.stats['dropped'] += len(batch)
+                self.stats['last_error'] = str(e)
+                logger.error(f"Writer {self.db_path}: {e}")
+
+    def status(self) -> Dict[str, Any]:
+        return dict(self.stats, depth=self.queue.qsize())
+
+
+_writers: Dict[str, BatchWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(db_path: str) -> BatchWriter:
+    """Общий писатель процесса (один на файл БД)"""
+    key = os.path.abspath(db_path)
+    with _writers_lock:
+        if key not in _writers:
+            _writers[key] = BatchWriter(db_path)
+        return _writers[key]
+
+
+# ==================== ЗАДАЧИ ====================
+
+class Task:
+    """Монитор как задача: 'module', 'Class.method' шага, интервал и политика перезапуска"""
+
+    def __init__(self, name: str, module: str, entry: str, interval: float,
+                 policy: str = 'restart', heartbeat_timeout: Optional[float] = None,
+                 setup: Optional[Callable[[Any], None]] = None):
+        self.name = name
+        self.module = module
+        self.entry = entry
+        self.interval = interval
+        self.policy = policy
+        self.heartbeat_timeout = heartbeat_timeout or interval * 3 + 60
+        self.setup = setup
+
+        self.instance = None
+        self.state = 'stopped'
+        self.restarts: List[float] = []
+        self.stats = {
+            'runs': 0,
+            'failures': 0,
+            'overruns': 0,
+            'last_heartbeat': None,
+            'last_duration': None,
+            'last_error': None,
+            'started_at': None
+        }
+
+    def create(self) -> Callable[[], Any]:
+        """Новый объект монитора (свои соединения); -> шаг"""
+        class_name, method_name = self.entry.split('.', 1)
+        instance = getattr(importlib.import_module(self.module), class_name)()
+        if self.setup:
+            self.setup(instance)
+        self.instance = instance
+        return getattr(instance, method_name)
+
+    def dispose(self):
+        """Освободить старый объект перед перезапуском (websocket, соединения)"""
+        instance, self.instance = self.instance, None
+        if instance is None:
+            return
+        if hasattr(instance, 'running'):
+            instance.running = False   # иначе websocket-монитор переподключится сам
+        for attr in ('ws', 'conn'):
+            resource = getattr(instance, attr, None)
+            if resource is not None:
+                try:
+                    resource.close()
+                except Exception:
+                    pass
+
+    def status(self, now: float) -> Dict[str, Any]:
+        heartbeat = self.stats['last_heartbeat']
+        return dict(self.stats, state=self.state, policy=self.policy, interval=self.interval,
+                    heartbeat_timeout=self.heartbeat_timeout,
+                    heartbeat_age=round(now - heartbeat, 1) if heartbeat else None,
+                    restarts=len(self.restarts))
+
+
+def _liquidations_setup(monitor):
+    # Ликвидации - поток событий: запись через общий писатель futures_data.db
+    monitor.writer = get_writer(monitor.db_path)
+
+
+TASKS = [
+    Task('futures', 'futures_data_monitor', 'FuturesDataMonitor.run_cycle', interval=60),
+    Task('liquidations', 'liquidations_monitor', 'LiquidationsMonitor.ensure_connected', interval=10,
+         setup=_liquidations_setup),
+    Task('funding', 'funding_rate_monitor', 'FundingRateMonitor.run_cycle', interval=1800),
+    Task('unlimited_oi', 'unlimited_oi_monitor', 'UnlimitedOIMonitor.run_unlimited_cycle', interval=600,
+         heartbeat_timeout=3600)
+]
+
+
+def _rss_mb() -> Optional[float]:
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import resource
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    except ImportError:
+        return None
+
+
+class Supervisor:
+    """Задачи-потоки одного процесса + watchdog + статус"""
+
+    def __init__(self, tasks: List[Task] = None, on_alert: Optional[Callable[[str], None]] = None,
+                 status_path: Optional[str] = STATUS_PATH):
+        self.tasks = {task.name: task for task in (tasks or TASKS)}
+        self.on_alert = on_alert or (lambda message: None)
+        self.status_path = status_path
+        self.started_at = time.time()
+        self._stop = threading.Event()
+        self._threads: Dict[str, threading.Thread] = {}
+
+    # ==================== ЦИКЛ ЗАДАЧИ ====================
+
+    def _backoff(self, task: Task) -> Optional[float]:
+        """Пауза до перезапуска; None - лимит перезапусков исчерпан"""
+        now = time.time()
+        task.restarts = [t for t in task.restarts if now - t < RESTART_WINDOW]
+        if len(task.restarts) >= MAX_RESTARTS:
+            return None
+        task.restarts.append(now)
+        return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (len(task.restarts) - 1))
+
+    def _run_task(self, task: Task):
+        step = None
+        next_run = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                if step is None:
+                    task.state = 'starting'
+                    step = task.create()
+                    task.stats['started_at'] = time.time()
+                task.state = 'running'
+                started = time.monotonic()
+                step()
+                finished = time.monotonic()
+                task.stats['runs'] += 1
+                task.stats['last_duration'] = round(finished - started, 3)
+                task.stats['last_heartbeat'] = time.time()
+                task.stats['last_error'] = None
+
+                # Шаг не перекрывается сам с собой: опоздавший запуск - сразу, без очереди
+                next_run += task.interval
+                if next_run < finished:
+                    task.stats['overruns'] += 1
+                    next_run = finished
+                task.state = 'idle'
+                self._stop.wait(max(next_run - time.monotonic(), 0))
+
+            except Exception as e:
+                task.stats['failures'] += 1
+                task.stats['last_error'] = str(e)
+                logger.error(f"Задача {task.name}: {e}")
+                if task.policy == 'stop':
+                    task.state = 'failed'
+                    self.on_alert(f"🚨 ЗАДАЧА ОСТАНОВЛЕНА {task.name}: {e}")
+                    return
+                delay = self._backoff(task)
+                if delay is None:
+                    task.state = 'failed'
+                    self.on_alert(f"🚨 ЗАДАЧА {task.name}: {MAX_RESTARTS} перезапусков за час, остановлена")
+                    return
+                if task.policy == 'restart':
+                    task.dispose()
+                    step = None   # новый объект - новые соединения
+                task.state = 'backoff'
+                logger.info(f"Задача {task.name}: перезапуск через {delay} сек")
+                self._stop.wait(delay)
+                next_run = time.monotonic()
+        task.state = 'stopped'
+
+    # ==================== WATCHDOG / STATUS ====================
+
+    def check_heartbeats(self):
+        now = time.time()
+        for task in self.tasks.values():
+            beat = task.stats['last_heartbeat'] or task.stats['started_at']
+            if task.state in ('running', 'idle', 'stalled') and beat and now - beat > task.heartbeat_timeout:
+                if task.state != 'stalled':
+                    task.state = 'stalled'
+                    logger.error(f"Задача {task.name}: нет heartbeat {now - beat:.0f} сек")
+                    self.on_alert(f"⏰ ЗАВИСАНИЕ {task.name}: нет heartbeat {now - beat:.0f} сек")
+
+    def status(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            'pid': os.getpid(),
+            'updated_at': now,
+            'uptime': round(now - self.started_at),
+            'rss_mb': _rss_mb(),
+            'tasks': {name: task.status(now) for name, task in self.tasks.items()},
+            'writers': {path: writer.status() for path, writer in _writers.items()}
+        }
+
+    def write_status(self, status: Optional[Dict[str, Any]] = None):
+        if not self.status_path:
+            return
+        os.makedirs(os.path.dirname(self.status_path) or '.', exist_ok=True)
+        tmp = f"{self.status_path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(status or self.status(), f, ensure_ascii=False, default=str)
+        os.replace(tmp, self.status_path)
+
+    # ==================== ЗАПУСК ====================
+
+    def start(self):
+        for name, task in self.tasks.items():
+            thread = threading.Thread(target=self._run_task, args=(task,), name=f'task-{name}', daemon=True)
+            self._threads[name] = thread
+            thread.start()
+
+    def run(self, report: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """Запуск задач и цикл watchdog до KeyboardInterrupt / stop()"""
+        self.start()
+        logger.info(f"Supervisor: {', '.join(self.tasks)} (PID {os.getpid()})")
+        try:
+            while not self._stop.wait(STATUS_INTERVAL):
+                self.check_heartbeats()
+                status = self.status()
+                if report:
+                    report(status)
+                else:
+                    self.write_status(status)
+        except KeyboardInterrupt:
+            logger.info("Supervisor: остановка...")
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._stop.set()
+
+
+# ==================== РАБОЧИЕ ПРОЦЕССЫ ====================
+
+def _worker_main(tasks: List[Task], channel):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    supervisor = Supervisor(tasks, status_path=None)
+    supervisor.run(report=channel.put)
+
+
+class ProcessSupervisor:
+    """
+    Задачи по N рабочим процессам (каждый - Supervisor). Процесс, который
+    умер или перестал присылать статус, завершается и запускается заново -
+    так прерываются и зависшие задачи.
+    """
+
+    def __init__(self, workers: int, tasks: List[Task] = None,
+                 on_alert: Optional[Callable[[str], None]] = None, status_path: str = STATUS_PATH):
+        import multiprocessing
+
+        # fork: задачи (с setup-функциями) передаются рабочему процессу без pickle
+        self.mp = multiprocessing.get_context('fork')
+        tasks = tasks or TASKS
+        self.groups = [tasks[i::workers] for i in range(workers) if tasks[i::workers]]
+        self.on_alert = on_alert or (lambda message: None)
+        self.status_path = status_path
+        self.channel = self.mp.Queue()
+        self.procs: Dict[int, Any] = {}
+        self.last_seen: Dict[int, float] = {}
+        self.worker_status: Dict[int, Dict[str, Any]] = {}
+        self.respawns: Dict[int, int] = {}
+
+    def _spawn(self, index: int):
+        proc = self.mp.Process(target=_worker_main, args=(self.groups[index], self.channel),
+                               name=f'worker-{index}', daemon=True)
+        proc.start()
+        self.procs[index] = proc
+        self.last_seen[index] = time.time()
+
+    def run(self):
+        for index in range(len(self.groups)):
+            self._spawn(index)
+        worker_of = {}
+        try:
+            while True:
+                deadline = time.time() + STATUS_INTERVAL
+                while time.time() < deadline:
+                    try:
+                        status = self.channel.get(timeout=max(deadline - time.time(), 0.1))
+                    except queue.Empty:
+                        break
+                    index = worker_of.setdefault(status['pid'], next(
+                        (i for i, p in self.procs.items() if p.pid == status['pid']), None))
+                    if index is not None:
+                        self.last_seen[index] = time.time()
+                        self.worker_status[index] = status
+
+                now = time.time()
+                for index, proc in list(self.procs.items()):
+                    stalled = now - self.last_seen[index] > STATUS_MAX_AGE
+                    if proc.is_alive() and not stalled:
+                        continue
+                    reason = 'завис' if proc.is_alive() else f'завершился ({proc.exitcode})'
+                    names = ', '.join(task.name for task in self.groups[index])
+                    self.on_alert(f"🔄 Рабочий процесс {names}: {reason}, перезапуск")
+                    logger.error(f"Worker {index}: {reason}")
+                    if proc.is_alive():
+                        proc.terminate()
+                        proc.join(5)
+                    self.respawns[index] = self.respawns.get(index, 0) + 1
+                    self._spawn(index)
+                self._write_status()
+        except KeyboardInterrupt:
+            logger.info("Supervisor: остановка рабочих процессов...")
+            for proc in self.procs.values():
+                proc.terminate()
+
+    def _write_status(self):
+        tasks, writers, rss = {}, {}, 0.0
+        for index, status in self.worker_status.items():
+            for name, task in status['tasks'].items():
+                tasks[name] = dict(task, worker=index, worker_pid=status['pid'],
+                                   worker_respawns=self.respawns.get(index, 0))
+            writers.update(status['writers'])
+            rss += status['rss_mb'] or 0
+        merged = {'pid': os.getpid(), 'updated_at': time.time(), 'workers': len(self.groups),
+                  'rss_mb': round(rss + (_rss_mb() or 0), 1), 'tasks': tasks, 'writers': writers}
+        Supervisor([], status_path=self.status_path).write_status(merged)
+
+
+# ==================== HEALTH ====================
+
+def read_status(path: str = STATUS_PATH, max_age: float = STATUS_MAX_AGE) -> Optional[Dict[str, Any]]:
+    """Статус работающего супервизора; None - файла нет или он устарел"""
+    try:
+        with open(path) as f:
+            status = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - status.get('updated_at', 0) > max_age:
+        return None
+    return status
+
+
+def task_healthy(task: Dict[str, Any]) -> bool:
+    """Тот же порог, что у watchdog (статус старой версии - без heartbeat_timeout)"""
+    timeout = task.get('heartbeat_timeout') or task['interval'] * 3 + 60
+    return task['state'] in ('running', 'idle') and (
+        task['heartbeat_age'] is None or task['heartbeat_age'] <= timeout)
+
+
+# Скрипты мониторов, которые заменяют задачи (проверки, искавшие процессы)
+SCRIPT_TASKS = {
+    'futures_data_monitor.py': 'futures',
+    'liquidations_monitor.py': 'liquidations',
+    'funding_rate_monitor.py': 'funding',
+    'unlimited_oi_monitor.py': 'unlimited_oi'
+}
+
+
+def monitor_states(status: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, bool]]:
+    """Скрипт монитора -> его задача здорова; None - супервизор не работает"""
+    status = status or read_status()
+    if status is None:
+        return None
+    return {script: name in status['tasks'] and task_healthy(status['tasks'][name])
+            for script, name in SCRIPT_TASKS.items()}
+
+
+def supervisor_alive(path: str = STATUS_PATH) -> bool:
+    """
+    Процесс супервизора жив (PID из файла статуса, даже устаревшего).
+    Пока он жив, мониторы нельзя запускать отдельными скриптами - второй
+    писатель в те же БД; зависший супервизор перезапускается целиком.
+    """
+    try:
+        with open(path) as f:
+            pid = json.load(f).get('pid')
+    except (OSError, ValueError):
+        return False
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _send_alert(message: str):
+    try:
+        from telegram_helper import send_telegram_message
+        send_telegram_message(message, is_alert=True)
+    except Exception as e:
+        logger.error(f"Не удалось отправить алерт: {e}")
+
+
+if __name__ == '__main__':
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = sys.argv[1:]
+
+    if args[:1] == ['status']:
+        # Код выхода для shell-проверок: 0 - все задачи здоровы, 1 - не работает, 2 - есть сбойные
+        status = read_status()
+        if status is None:
+            print("Supervisor не работает (нет свежего статуса)")
+            sys.exit(1)
+        print(f"PID {status['pid']}, RSS {status['rss_mb']} MB")
+        for name, task in status['tasks'].items():
+            mark = '✅' if task_healthy(task) else '❌'
+            print(f"  {mark} {name:14} {task['state']:9} runs {task['runs']:>6}  failures {task['failures']:>3}  "
+                  f"heartbeat {task['heartbeat_age'] if task['heartbeat_age'] is not None else '-'}s  "
+                  f"{task['last_error'] or ''}")
+        for path, writer in status['writers'].items():
+            print(f"  writer {path}: depth {writer['depth']}, written {writer['written']}, dropped {writer['dropped']}")
+        sys.exit(0 if all(task_healthy(task) for task in status['tasks'].values()) else 2)
+
+    workers = 1
+    if '--workers' in args:
+        i = args.index('--workers')
+        workers = int(args[i + 1])
+        args = args[:i] + args[i + 2:]
+    tasks = [t for t in TASKS if not args or t.name in args]
+
+    if workers > 1:
+        ProcessSupervisor(workers, tasks, on_alert=_send_alert).run()
+    else:
+        Supervisor(tasks, on_alert=_send_alert).run()
@@ -4,8 +4,14 @@
 echo "🏥 HEALTH CHECK"
 echo "="*50
 
-# 1. Процессы
-PROCS=$(ps aux | grep -E "futures_data_monitor|unlimited_oi_monitor|eth_options_collector" | grep -v grep | wc -l)
+# 1. Процессы (мониторы - задачи supervisor.py, по его статусу)
+PROCS=$(ps aux | grep -E "eth_options_collector" | grep -v grep | wc -l)
+MONITORS=$(python3 -c "
+from supervisor import monitor_states
+states = monitor_states() or {}
+print(sum(states.get(s, False) for s in ('futures_data_monitor.py', 'unlimited_oi_monitor.py')))
+")
+PROCS=$((PROCS + MONITORS))
 if [ $PROCS -eq 3 ]; then
     echo "✅ Процессы: 3/3"
 else
@@ -19,7 +25,7 @@ from datetime import datetime
 
 conn = sqlite3.connect('data/unlimited_oi.db')
 cursor = conn.cursor()
-cursor.execute("SELECT MAX(timestamp) FROM all_positions_tracking")
+cursor.execute("SELECT MAX(timestamp) FROM oi_snapshots")
 ts = cursor.fetchone()[0]
 mins = (datetime.now() - datetime.fromtimestamp(ts)).total_seconds() / 60
 
@@ -12,6 +12,8 @@ import os
 from datetime import datetime, timedelta
 import psutil
 
+from supervisor import read_status as read_supervisor_status, task_healthy
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -27,6 +29,10 @@ class SystemManager:
     def __init__(self):
         self.base_dir = os.path.dirname(os.path.abspath(__file__))
         
+        # Мониторы - задачи одного процесса supervisor.py (False - отдельные процессы, как раньше)
+        self.use_supervisor = True
+        self.supervisor = {'script': './supervisor.py', 'enabled': True, 'restart_on_fail': True}
+        
         self.monitors = {
             'futures': {
                 'script': './futures_data_monitor.py',
@@ -50,13 +56,10 @@ class SystemManager:
             }
         }
         
+        # gamma, max_pain, pcr, vanna, iv_rank и сигнал - DAG по снапшотам (analytics_dag),
+        # здесь - скрипты вне DAG (не зависят от снапшотов OI)
         self.analytics = {
-            'gamma': './gamma_exposure_calculator.py',
-            'max_pain': './max_pain_calculator.py',
-            'volatility': './volatility_greeks_analyzer.py',
-            'pcr': './pcr_calculator.py',
-            'vanna': './vanna_calculator.py',
-            'iv_rank': './iv_rank_calculator.py'
+            'volatility': './volatility_greeks_analyzer.py'
         }
         
         self.signal_generator = './advanced_signals_generator.py'
@@ -117,9 +120,12 @@ class SystemManager:
         logger.info("🚀 ЗАПУСК ВСЕХ МОНИТОРОВ")
         logger.info("=" * 80)
         
-        for name, config in self.monitors.items():
-            if config['enabled']:
-                self.start_monitor(name, config)
+        if self.use_supervisor:
+            self.start_monitor('supervisor', self.supervisor)
+        else:
+            for name, config in self.monitors.items():
+                if config['enabled']:
+                    self.start_monitor(name, config)
         
         logger.info("=" * 80)
         logger.info("✅ Запуск завершен")
@@ -130,6 +136,7 @@ class SystemManager:
         logger.info("🛑 ОСТАНОВКА ВСЕХ МОНИТОРОВ")
         logger.info("=" * 80)
         
+        self.stop_monitor('supervisor', self.supervisor)
         for name, config in self.monitors.items():
             self.stop_monitor(name, config)
         
@@ -150,12 +157,28 @@ class SystemManager:
         
         logger.info("\n🔍 МОНИТОРЫ:")
         running_count = 0
-        for name, config in self.monitors.items():
-            is_running, pid = self.is_process_running(config['script'])
-            status = f"✅ Работает (PID: {pid})" if is_running else "❌ Не запущен"
-            logger.info(f"  {name:15} {status}")
-            if is_running:
-                running_count += 1
+        supervisor = read_supervisor_status()
+        if supervisor:
+            # Состояние задач супервизора - без поиска процессов
+            logger.info(f"  supervisor      PID {supervisor['pid']}, RSS {supervisor['rss_mb']} MB")
+            for name in self.monitors:
+                task = supervisor['tasks'].get(name)
+                if task is None:
+                    logger.info(f"  {name:15} ❌ Не запущен")
+                    continue
+                healthy = task_healthy(task)
+                mark = "✅" if healthy else "❌"
+                logger.info(f"  {name:15} {mark} {task['state']} (heartbeat {task['heartbeat_age']}s, "
+                            f"сбоев {task['failures']})")
+                if healthy:
+                    running_count += 1
+        else:
+            for name, config in self.monitors.items():
+                is_running, pid = self.is_process_running(config['script'])
+                status = f"✅ Работает (PID: {pid})" if is_running else "❌ Не запущен"
+                logger.info(f"  {name:15} {status}")
+                if is_running:
+                    running_count += 1
         
         logger.info("\n📊 СВЕЖЕСТЬ ДАННЫХ:")
         self.check_data_freshness()
@@ -175,7 +198,7 @@ class SystemManager:
                 SELECT asset, 
                        MAX(timestamp) as last_ts,
                        datetime(MAX(timestamp), 'unixepoch') as last_update
-                FROM all_positions_tracking 
+                FROM oi_snapshots
                 GROUP BY asset
             """)
             results = cursor.fetchall()
@@ -208,8 +231,24 @@ class SystemManager:
         issues = []
         
         logger.info("\n1️⃣ Проверка мониторов...")
+        supervisor = read_supervisor_status()
+        if supervisor:
+            # Задачи перезапускает сам супервизор - здесь только отчёт
+            for name, task in supervisor['tasks'].items():
+                if not task_healthy(task):
+                    issue = f"Задача {name}: {task['state']} ({task['last_error'] or 'нет heartbeat'})"
+                    issues.append(issue)
+                    logger.warning(f"  ⚠️ {issue}")
+        elif self.use_supervisor:
+            issue = "Supervisor не работает"
+            issues.append(issue)
+            logger.warning(f"  ⚠️ {issue}")
+            if self.supervisor['restart_on_fail']:
+                logger.info("  🔄 Перезапускаем supervisor...")
+                self.start_monitor('supervisor', self.supervisor)
+        
         for name, config in self.monitors.items():
-            if not config['enabled']:
+            if self.use_supervisor or not config['enabled']:
                 continue
             
             is_running, pid = self.is_process_running(config['script'])
@@ -226,7 +265,7 @@ class SystemManager:
         try:
             conn = sqlite3.connect('./data/unlimited_oi.db')
             cursor = conn.cursor()
-            cursor.execute("SELECT MAX(timestamp) FROM all_positions_tracking")
+            cursor.execute("SELECT MAX(timestamp) FROM oi_snapshots")
             last_ts = cursor.fetchone()[0]
             conn.close()
             
@@ -270,6 +309,19 @@ class SystemManager:
         logger.info("📊 ЗАПУСК АНАЛИТИКИ")
         logger.info("=" * 80)
         
+        # Узлы DAG по активам параллельно, сигнал - после своих входов
+        from analytics_dag import AnalyticsDAG
+        dag = AnalyticsDAG()
+        try:
+            for report in dag.run_all():
+                failed = [n for n, s in report['nodes'].items() if s['status'] == 'failed']
+                latency = report.get('snapshot_to_signal')
+                status = f"❌ сбой: {', '.join(failed)}" if failed else "✅"
+                logger.info(f"  {report['asset']:6} {status} за {report['duration']:.1f}с"
+                            + (f", снапшот -> сигнал {latency:.0f}с" if latency is not None else ""))
+        finally:
+            dag.shutdown()
+        
         for name, script in self.analytics.items():
             logger.info(f"\n🔄 Запуск {name}...")
             try:
@@ -5,11 +5,12 @@ TELEGRAM SENDER FIXED - только исправления для отправ
 """
 
 import os
-import requests
 import logging
 from typing import Optional
 from dotenv import load_dotenv
 
+from notification_dispatcher import notify_telegram
+
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO)
@@ -21,37 +22,17 @@ class TelegramSender:
         self.free_chat_id = os.getenv('TELEGRAM_FREE_CHAT_ID')
         self.vip_chat_id = os.getenv('TELEGRAM_VIP_CHAT_ID')
         self.admin_chat_id = os.getenv('TELEGRAM_ADMIN_CHAT_ID')
-
-        # Proxy settings
-        self.proxy_url = os.getenv('TELEGRAM_PROXY_URL')
-        self.proxy_username = os.getenv('TELEGRAM_PROXY_USERNAME')
-        self.proxy_password = os.getenv('TELEGRAM_PROXY_PASSWORD')
-
-        # Настройка прокси
-        if self.proxy_url and self.proxy_username and self.proxy_password:
-            proxy_with_auth = self.proxy_url.replace('http://', f'http://{self.proxy_username}:{self.proxy_password}@')
-            self.proxies = {'http': proxy_with_auth, 'https': proxy_with_auth}
-        else:
-            self.proxies = None
+        # Прокси (TELEGRAM_PROXY_*) подключает notification_dispatcher
 
     def send_message(self, message: str, chat_id: str) -> bool:
-        """Отправка сообщения в указанный чат"""
+        """Постановка сообщения в очередь отправки (True = принято, доставка в фоне)"""
         if not self.bot_token or not chat_id:
             return False
 
         try:
-            url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
-            payload = {
-                'chat_id': chat_id,
-                'text': message,
-                'parse_mode': 'HTML'
-            }
-            
-            response = requests.post(url, json=payload, proxies=self.proxies, timeout=10)
-            return response.status_code == 200
-                
+            return notify_telegram(chat_id, message, 'HTML')
         except Exception as e:
-            logger.error(f"Telegram send failed: {e}")
+            logger.error(f"Telegram enqueue failed: {e}")
             return False
 
     def send_to_free(self, message: str) -> bool:
@@ -4,40 +4,36 @@ import sqlite3
 import time
 from datetime import datetime, timedelta
 
+from indicator_state import get_store as get_indicator_store
+from instrument_registry import get_instrument_registry
+from iv_history import get_iv_history, init_iv_table
+from oi_schema import SnapshotRecorder, delete_expired_positions, init_oi_schema, latest_positions
+from poll_scheduler import PollScheduler
+from snapshot_summary import init_summary_table, write_snapshot_summary
+
 class UnlimitedOIMonitor:
     def __init__(self):
         self.base_url = "https://api.bybit.com"
         self.db_path = "data/unlimited_oi.db"
         self.assets = ['BTC', 'ETH', 'SOL', 'XRP', 'DOGE', 'MNT']
+        self.recorder = SnapshotRecorder()   # RECORD_MODE='delta': keyframe раз в час, между ними - изменения
+        self.scheduler = PollScheduler(self.db_path)
+        self.last_iv = {}   # instrument_id -> (expiry_date, strike, option_type, mark IV %)
+        self.pending = {}   # asset -> опросы с прошлого снапшота: timestamp, spot, tracked, rows
+        self.cleaned_snapshot_id = 0   # снапшоты до него уже очищены от EXPIRED
         self.init_database()
         
     def init_database(self):
         self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
         
-        # Отслеживание ВСЕХ экспираций без ограничений
-        self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS all_positions_tracking (
-                timestamp INTEGER,
-                asset TEXT,
-                symbol TEXT,
-                expiry TEXT,
-                expiry_date TEXT,
-                dte INTEGER,
-                strike REAL,
-                option_type TEXT,
-                open_interest REAL,
-                volume_24h REAL,
-                spot_price REAL,
-                distance_pct REAL,
-                time_category TEXT,
-                PRIMARY KEY (timestamp, symbol)
-            )
-        """)
+        # Снапшоты OI: instruments + oi_snapshots + oi_positions, all_positions_tracking - VIEW
+        # (старая таблица мигрируется при первом запуске)
+        init_oi_schema(self.conn)
         
         # Кумулятивный анализ по каждой позиции
         self.conn.execute("""
             CREATE TABLE IF NOT EXISTS position_cumulative (
-                position_key TEXT PRIMARY KEY,
+                instrument_id INTEGER PRIMARY KEY,
                 asset TEXT,
                 expiry TEXT,
                 expiry_date TEXT,
@@ -74,30 +70,13 @@ class UnlimitedOIMonitor:
             )
         """)
         
+        # Агрегаты по снапшотам для PCR/GEX/OI истории
+        init_summary_table(self.conn)
+        init_iv_table(self.conn)
+        
         self.conn.commit()
         print("Unlimited OI Monitor initialized - tracking ALL expirations")
     
-    def parse_expiry_date(self, expiry_str):
-        """Парсим дату экспирации в формате"""
-        try:
-            day = int(expiry_str[:2])
-            month_str = expiry_str[2:5]
-            year = 2000 + int(expiry_str[5:])
-            
-            month_map = {
-                'JAN': 1, 'FEB': 2, 'MAR': 3, 'APR': 4, 'MAY': 5, 'JUN': 6,
-                'JUL': 7, 'AUG': 8, 'SEP': 9, 'OCT': 10, 'NOV': 11, 'DEC': 12
-            }
-            
-            month = month_map.get(month_str, 1)
-            expiry_date = datetime(year, month, day)
-            dte = (expiry_date - datetime.now()).days
-            
-            return expiry_date.strftime('%Y-%m-%d'), dte
-            
-        except:
-            return None, 999
-    
     def categorize_time_horizon(self, dte):
         """Категоризация временных горизонтов"""
         if dte <= 0:
@@ -121,11 +100,9 @@ class UnlimitedOIMonitor:
         """Автоматическая очистка истекших опционов"""
         current_time = int(time.time())
         
-        # Удаляем истекшие из tracking
-        expired_count = self.conn.execute("""
-            DELETE FROM all_positions_tracking 
-            WHERE time_category = 'EXPIRED'
-        """).rowcount
+        # Удаляем истекшие из tracking: только снапшоты после прошлой очистки,
+        # напрямую по oi_positions (VIEW считает DTE для каждой строки всей истории)
+        expired_count, self.cleaned_snapshot_id = delete_expired_positions(self.conn, self.cleaned_snapshot_id)
         
         # Удаляем истекшие из cumulative
         expired_cumulative = self.conn.execute("""
@@ -138,8 +115,11 @@ class UnlimitedOIMonitor:
         
         self.conn.commit()
     
-    def collect_all_expirations(self, asset):
-        """Сбор ВСЕХ доступных экспираций без ограничений"""
+    def collect_all_expirations(self, asset, only=None, record=True):
+        """
+        Сбор ВСЕХ доступных экспираций без ограничений; only - опросить только эти instrument_id.
+        record=False - только накопить опрос, снапшот пишет record_snapshot по базовому интервалу
+        """
         timestamp = int(time.time())
         
         try:
@@ -148,31 +128,27 @@ class UnlimitedOIMonitor:
                                    params={'category': 'spot', 'symbol': f'{asset}USDT'})
             spot_price = float(spot_resp.json()['result']['list'][0]['lastPrice'])
             
-            # ВСЕ опционы без фильтров
-            instruments_resp = requests.get(f"{self.base_url}/v5/market/instruments-info",
-                                          params={'category': 'option', 'baseCoin': asset})
-            
-            options = instruments_resp.json()['result']['list']
+            # ВСЕ опционы без фильтров (справочник, листинг запрашивается при изменениях)
+            registry = get_instrument_registry(self.db_path)
+            options = registry.contracts(asset)
+            dte_by_expiry = registry.dte_by_expiry(asset)
             
             # Статистика по временным горизонтам
             time_stats = {}
             collected = 0
+            positions = []  # (instrument_id, oi, volume, mark_price, mark_iv)
+            tracked = []    # (instrument_id, expiry_date, dte, distance_pct) - корзины планировщика
+            polled = set()
             
             print(f"  {asset}: Processing {len(options)} options across ALL time horizons...")
             
             for option in options:
-                symbol = option['symbol']
-                parts = symbol.split('-')
-                if len(parts) < 4:
-                    continue
-                
-                expiry = parts[1]
-                strike = float(parts[2])
-                option_type = 'Call' if parts[3] == 'C' else 'Put'
-                
-                expiry_date, dte = self.parse_expiry_date(expiry)
-                if not expiry_date:
-                    continue
+                symbol = option.symbol
+                expiry = option.expiry
+                strike = option.strike
+                option_type = option.option_type
+                expiry_date = option.expiry_date
+                dte = dte_by_expiry[expiry_date]
                 
                 time_category = self.categorize_time_horizon(dte)
                 
@@ -193,6 +169,11 @@ class UnlimitedOIMonitor:
                         continue
                 # Для годовых и долгосрочных НЕТ ограничений
                 
+                tracked.append((option.instrument_id, expiry_date, dte, distance_pct))
+                if only is not None and option.instrument_id not in only:
+                    continue   # не опрошенные в этот раз - значения переносятся
+                polled.add(option.instrument_id)
+                
                 # Получаем данные опциона
                 ticker_resp = requests.get(f"{self.base_url}/v5/market/tickers",
                                          params={'category': 'option', 'symbol': symbol})
@@ -202,15 +183,16 @@ class UnlimitedOIMonitor:
                     
                     oi = float(ticker.get('openInterest', 0))
                     volume = float(ticker.get('volume24h', 0))
+                    mark_price = float(ticker.get('markPrice') or 0)
+                    mark_iv = float(ticker.get('markIv') or 0)
+                    if mark_iv > 0:
+                        self.last_iv[option.instrument_id] = (expiry_date, strike, option_type, mark_iv * 100)
+                    else:
+                        self.last_iv.pop(option.instrument_id, None)
                     
                     # Сохраняем ВСЕ позиции с любым OI или объемом
                     if oi > 0 or volume > 0:
-                        self.conn.execute("""
-                            INSERT OR REPLACE INTO all_positions_tracking VALUES 
-                            (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """, (timestamp, asset, symbol, expiry, expiry_date, dte, strike,
-                              option_type, oi, volume, spot_price, distance_pct, time_category))
-                        
+                        positions.append((option.instrument_id, oi, volume, mark_price, mark_iv))
                         collected += 1
                         
                         # Статистика по категориям
@@ -220,7 +202,17 @@ class UnlimitedOIMonitor:
                 
                 time.sleep(0.001)  # Минимальная задержка
             
-            self.conn.commit()
+            self.scheduler.sync(asset, tracked)
+            self.scheduler.observe(asset, timestamp, [p[:3] for p in positions], polled)
+            
+            # Опрошенные без данных (None) при записи считаются исчезнувшими
+            pending = self.pending.setdefault(asset, {'rows': {}})
+            pending.update(timestamp=timestamp, spot=spot_price, tracked=[t[0] for t in tracked])
+            pending['rows'].update(dict.fromkeys(polled))
+            pending['rows'].update((p[0], p) for p in positions)
+            
+            if record:
+                self.record_snapshot(asset)
             
             # Выводим статистику
             print(f"  {asset}: Collected {collected} positions:")
@@ -233,28 +225,52 @@ class UnlimitedOIMonitor:
             print(f"Error collecting {asset} all expirations: {e}")
             return 0
     
+    def record_snapshot(self, asset):
+        """
+        Снапшот из опросов с прошлой записи: опрошенные - последние значения,
+        остальные отслеживаемые переносятся. Вместе с ним snapshot_summary, ATM IV
+        и RSI/MACD - всё с базовым интервалом, не на каждом тике адаптивного опроса
+        (оконные суммы по снапшотам и шаг индикаторов не зависят от частоты тиков).
+        """
+        pending = self.pending.pop(asset, None)
+        if not pending:
+            return
+        timestamp, spot_price, tracked_ids = pending['timestamp'], pending['spot'], pending['tracked']
+        positions = [row for row in pending['rows'].values() if row is not None]
+        if not positions:
+            self.conn.commit()
+            return
+        
+        # keyframe раз в час, между ними - только изменившиеся контракты
+        carried = [iid for iid in tracked_ids if iid not in pending['rows']]
+        self.recorder.write(self.conn, asset, timestamp, spot_price, positions, keep=carried)
+        write_snapshot_summary(self.conn, asset, timestamp)
+        
+        # IV цепочки - последние значения всех отслеживаемых (не только опрошенных сейчас)
+        iv_chain = [self.last_iv[i] for i in tracked_ids if i in self.last_iv]
+        
+        # ATM IV по тенорам - в той же транзакции
+        if iv_chain:
+            get_iv_history(self.db_path).record(asset, timestamp, spot_price, iv_chain, conn=self.conn)
+        
+        self.conn.commit()
+        
+        # RSI/MACD состояние обновляется один раз на снапшот
+        get_indicator_store().sync(asset)
+    
     def update_position_analytics(self, asset):
         """Обновляем аналитику по всем позициям"""
         
-        latest_data = self.conn.execute("""
-            SELECT symbol, expiry, expiry_date, dte, strike, option_type, 
-                   open_interest, volume_24h, timestamp, time_category
-            FROM all_positions_tracking 
-            WHERE asset = ? AND timestamp = (
-                SELECT MAX(timestamp) FROM all_positions_tracking WHERE asset = ?
-            )
-        """, (asset, asset)).fetchall()
+        latest_data = latest_positions(self.conn, asset)
         
         for row in latest_data:
-            (symbol, expiry, expiry_date, dte, strike, option_type, 
+            (instrument_id, symbol, expiry, expiry_date, dte, strike, option_type, 
              oi, volume, timestamp, time_category) = row
             
-            position_key = f"{asset}_{symbol}"
-            
             # Проверяем существующую запись
             existing = self.conn.execute("""
-                SELECT * FROM position_cumulative WHERE position_key = ?
-            """, (position_key,)).fetchone()
+                SELECT * FROM position_cumulative WHERE instrument_id = ?
+            """, (instrument_id,)).fetchone()
             
             if existing:
                 # Обновляем существующую
@@ -294,16 +310,16 @@ class UnlimitedOIMonitor:
                     SET last_update = ?, dte = ?, current_oi = ?, peak_oi = ?, 
                         total_volume_flow = ?, tracking_days = ?, avg_daily_volume = ?,
                         oi_evolution = ?, big_money_confidence = ?, future_positioning_score = ?
-                    WHERE position_key = ?
+                    WHERE instrument_id = ?
                 """, (timestamp, dte, oi, new_peak_oi, new_total_volume, tracking_days,
-                      avg_daily_vol, oi_evolution, big_money_confidence, future_score, position_key))
+                      avg_daily_vol, oi_evolution, big_money_confidence, future_score, instrument_id))
             
             else:
                 # Новая позиция
                 self.conn.execute("""
                     INSERT INTO position_cumulative VALUES 
                     (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (position_key, asset, expiry, expiry_date, dte, strike, option_type,
+                """, (instrument_id, asset, expiry, expiry_date, dte, strike, option_type,
                       timestamp, timestamp, oi, oi, oi, volume, 1, volume,
                       "NEW", 1.0, 1.0, "ACTIVE"))
         
@@ -397,6 +413,48 @@ class UnlimitedOIMonitor:
                 print(f"Error: {e}")
                 time.sleep(60)
 
+    def adaptive_unlimited_monitoring(self, interval_minutes=10, tick_seconds=60):
+        """
+        Адаптивный опрос: бюджет запросов тот же, что у полного скана раз в
+        interval_minutes, но ближние экспирации / ATM / активные корзины
+        опрашиваются чаще дальних. Тики только накапливают опросы: снапшот (с
+        агрегатами, IV, RSI/MACD) и аналитика - по-прежнему раз в interval_minutes.
+        """
+        print(f"Starting adaptive monitoring (budget = full scan every {interval_minutes} minutes, tick {tick_seconds}s)")
+        
+        self.run_unlimited_cycle()   # полный скан: keyframe и состав корзин
+        last_analytics = time.time()
+        
+        while True:
+            try:
+                time.sleep(tick_seconds)
+                now = time.time()
+                tracked = sum(len(b.members) for b in self.scheduler.buckets.values())
+                budget = max(1, int(tracked * tick_seconds / (interval_minutes * 60)))
+                
+                for asset, ids in self.scheduler.due(now, budget).items():
+                    self.collect_all_expirations(asset, only=ids, record=False)
+                
+                if now - last_analytics >= interval_minutes * 60:
+                    self.cleanup_expired_options()
+                    for asset in self.assets:
+                        # Снапшот из опросов за интервал (+ агрегаты / IV / RSI-MACD)
+                        self.record_snapshot(asset)
+                        self.update_position_analytics(asset)
+                        self.analyze_future_positioning(asset)
+                    self.scheduler.save(self.conn)
+                    for name, group in self.scheduler.summary(now).items():
+                        print(f"  freshness {name}: {group['contracts']} contracts, "
+                              f"mean age {group['mean_age']:.0f}s, max staleness {group['max_staleness']:.1f}")
+                    last_analytics = now
+                
+            except KeyboardInterrupt:
+                print("Adaptive monitoring stopped")
+                break
+            except Exception as e:
+                print(f"Error: {e}")
+                time.sleep(60)
+
 if __name__ == "__main__":
     import sys
     
@@ -405,6 +463,9 @@ if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == 'unlimited':
         interval = int(sys.argv[2]) if len(sys.argv) > 2 else 10
         monitor.continuous_unlimited_monitoring(interval)
+    elif len(sys.argv) > 1 and sys.argv[1] == 'adaptive':
+        interval = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+        monitor.adaptive_unlimited_monitoring(interval)
     else:
         monitor.run_unlimited_cycle()
         print("Unlimited analysis complete")
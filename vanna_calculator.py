@@ -6,13 +6,13 @@ VANNA CALCULATOR - Vanna Exposure
 """
 
 import sqlite3
-import json
-import os
 from datetime import datetime
 import logging
 from scipy.stats import norm
 from math import log, sqrt
 
+from results_log import append_result
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -20,8 +20,6 @@ logger = logging.getLogger(__name__)
 class VannaCalculator:
     def __init__(self):
         self.oi_db = './data/unlimited_oi.db'
-        self.output_dir = './data/vanna/'
-        os.makedirs(self.output_dir, exist_ok=True)
     
     def calculate_vanna(self, S, K, T, r, sigma):
         """Рассчитать Vanna для одного опциона"""
@@ -130,14 +128,9 @@ class VannaCalculator:
             return "BEARISH"
     
     def _save_result(self, asset, result):
-        """Сохранить результат"""
+        """Дописать результат в журнал data/results/vanna"""
         try:
-            filename = f"{asset}_vanna_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            filepath = os.path.join(self.output_dir, filename)
-            
-            with open(filepath, 'w') as f:
-                json.dump(result, f, indent=2)
-                
+            append_result('vanna', asset, result)
         except Exception as e:
             logger.error(f"Ошибка сохранения Vanna: {e}")
     
@@ -1,15 +1,13 @@
 #!/usr/bin/env python3
 """STAGE 1.3.3: VOLATILITY & GREEKS - работаем с тем что есть"""
 
-import sqlite3, pandas as pd, numpy as np, json, logging
-from datetime import datetime
-from pathlib import Path
+import sqlite3, pandas as pd, numpy as np, logging
+
+from results_log import append_result
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-Path('data/volatility').mkdir(parents=True, exist_ok=True)
-
 print("="*80)
 print("📊 STAGE 1.3.3: VOLATILITY & GREEKS")
 print("="*80 + "\n")
@@ -37,9 +35,9 @@ try:
             }
         }
         
-        # Save
-        with open(f'data/volatility/stage_1.3.3_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json', 'w') as f:
-            json.dump(result, f, indent=2)
+        # Save: журнал data/results/volatility, одна запись на актив
+        for asset, values in result.items():
+            append_result('volatility', asset, values)
         
         print(f"\n✅ ETH ANALYZED: {len(df)} options")
     else: